@@ -1,58 +1,34 @@
 import datetime
+import os
 from zoneinfo import ZoneInfo
 from google.adk.agents import Agent
 from google.adk.tools import google_search
 from google.adk.agents import LlmAgent
-from google.adk.tools import agent_tool
-from hack_agent.lyria_music import generate_lyria_music
+from hack_agent.lyria_music import generate_lyria_music_tool
 #from .google_agent import google_agent
-from .text_to_speech import text_to_speech
-
-def gcs_uri_to_public_url(gcs_uri: str) -> str:
-    """
-    Converts a Google Cloud Storage (GCS) URI to its public HTTPS URL format.
-
-    Args:
-        gcs_uri: The GCS URI string (e.g., "gs://bucket_name/object_name").
-
-    Returns:
-        The corresponding public HTTPS URL string
-        (e.g., "https://storage.googleapis.com/bucket_name/object_name").
-
-    Raises:
-        ValueError: If the input string is not a valid GCS URI format
-                    starting with "gs://" and containing a bucket and object name.
-    """
-    if not gcs_uri or not gcs_uri.startswith("gs://"):
-        raise ValueError("Invalid GCS URI: Must start with 'gs://'")
-
-    # Remove the "gs://" prefix
-    path_part = gcs_uri[5:]
-
-    # Find the first slash separating bucket from object
-    slash_index = path_part.find('/')
-
-    # Check if the format is valid (must have bucket and object name)
-    if slash_index == -1:
-        raise ValueError("Invalid GCS URI: Format must be gs://BUCKET_NAME/OBJECT_NAME")
-        # Could potentially handle gs://BUCKET_NAME separately if needed
-    if slash_index == len(path_part) - 1:
-         raise ValueError("Invalid GCS URI: Missing object name after bucket name /")
-
-
-    # Extract bucket name and object name
-    bucket_name = path_part[:slash_index]
-    object_name = path_part[slash_index+1:] # Get everything after the first slash
-
-    if not bucket_name:
-        raise ValueError("Invalid GCS URI: Missing bucket name")
-    # It's okay for object_name to be empty here if the URI was e.g. "gs://bucket//" but usually indicates an issue.
-    # The earlier check for slash_index == len(path_part) - 1 already handles "gs://bucket/"
-
-    # Construct the public URL using an f-string
-    public_url = f"https://storage.googleapis.com/{bucket_name}/{object_name}"
-
-    return public_url
+from .text_to_speech import text_to_speech_async
+from .tts_clients import warm_up_tts_clients
+from .answer_cache import CachedAgentTool
+from .gcs_client import gcs_uri_to_public_url
+from .local_mix import mix_voice_and_music_tool
+from .lyria_pool import start_lyria_pool
+from .llm_usage import instrument_llm_usage
+from .pipeline import build_fast_path_agent, build_pipeline_agent
+
+# "conversational" lets the LLM call the tools one at a time; "pipeline" runs speech and
+# music generation in parallel with ADK workflow agents; "fast" runs the same flow in one
+# code agent. Both use the LLM only for the haiku (see pipeline.py).
+AGENT_MODE = os.getenv("AGENT_MODE", "conversational")
+AGENT_MODES = ("conversational", "pipeline", "fast")
+if AGENT_MODE not in AGENT_MODES:
+    raise ValueError(f"Invalid AGENT_MODE '{AGENT_MODE}'. Valid options are: {', '.join(AGENT_MODES)}")
+
+# Opt-in: pay TTS channel setup at agent start instead of on the first haiku.
+if os.getenv("TTS_WARM_UP_CLIENTS", "").lower() in ("1", "true", "yes"):
+    warm_up_tts_clients()
+
+# Opt-in: keep pre-generated soundtrack clips for the prompts in LYRIA_POOL_TEMPLATES.
+start_lyria_pool()
 
 ga= LlmAgent(
     name="swe_agent",
@@ -88,10 +64,18 @@ root_agent = Agent(
      """
 You communicate with the google agent to answer questions about current events, weather, and time in a haiku style.
 
-Take the output from the google agent and speak it using the text_to_speech tool. you always show the output using the gcs_uri_to_public_url tool. you overlay a HOT edm soundtrtack from lyria over the output. show the output.
+Take the output from the google agent and speak it using the text_to_speech_async tool. you always show the output using the gcs_uri_to_public_url tool. you overlay a HOT edm soundtrtack from lyria over the output using the mix_voice_and_music tool. show the output.
      """
     ),
-    tools=[text_to_speech, agent_tool.AgentTool(agent=ga),gcs_uri_to_public_url,generate_lyria_music],
+    tools=[text_to_speech_async, CachedAgentTool(agent=ga),gcs_uri_to_public_url,generate_lyria_music_tool,mix_voice_and_music_tool],
     #code_executor=[BuiltInCodeExecutor],
 
 )
+
+if AGENT_MODE == "pipeline":
+    root_agent = build_pipeline_agent()
+elif AGENT_MODE == "fast":
+    root_agent = build_fast_path_agent()
+
+# LLM calls, estimated tokens and wall-clock time per request, per mode (get_llm_usage_metrics).
+instrument_llm_usage(root_agent)
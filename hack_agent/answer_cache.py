@@ -0,0 +1,166 @@
+# Filename: answer_cache.py
+# Description: TTL cache around search-grounded sub-agent answers (AgentTool). Answers
+#              are keyed on the normalized question plus locale and expire per intent:
+#              quickly for time, later for weather, latest for general events. Concurrent
+#              identical questions share one upstream agent run.
+
+import asyncio
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Tuple
+
+from google.adk.tools.agent_tool import AgentTool
+from google.adk.tools.tool_context import ToolContext
+
+from .metrics import get_metrics
+from .result_cache import ResultCache, make_cache_key
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "512"))
+# Used when the session state has no "locale".
+ANSWER_CACHE_DEFAULT_LOCALE = os.getenv("ANSWER_CACHE_DEFAULT_LOCALE", "en-US")
+ANSWER_CACHE_TTL_SECONDS = {
+    "time": float(os.getenv("ANSWER_CACHE_TTL_TIME_SECONDS", "30")),
+    "weather": float(os.getenv("ANSWER_CACHE_TTL_WEATHER_SECONDS", "600")),
+    "general": float(os.getenv("ANSWER_CACHE_TTL_GENERAL_SECONDS", "3600")),
+}
+
+# Checked in order: "weather today" is a weather question, not a time question.
+_INTENT_PATTERNS = (
+    ("weather", re.compile(r"\b(weather|forecast|temperature|rain\w*|snow\w*|sunny|cloudy|wind\w*|humid\w*|storm\w*|degrees)\b")),
+    ("time", re.compile(r"\b(time|clock|hour|date|today|tonight|day is it|what day)\b")),
+)
+# Leading filler that does not change the answer.
+_FILLER = re.compile(r"^(?:(?:hey|hi|hello|please|ok|okay|so|can you tell me|could you tell me|tell me|do you know)\s+)+")
+
+_answer_metrics = get_metrics("answer_cache")
+_caches: Dict[str, ResultCache] = {}
+_caches_lock = threading.Lock()
+# Mean upstream latency per intent, credited as saved time on each hit.
+_upstream_latency: Dict[str, Tuple[int, float]] = {}
+_latency_lock = threading.Lock()
+# Cache key -> future of (ok, answer or exception) for the upstream run in progress.
+_in_flight: Dict[str, asyncio.Future] = {}
+
+
+def normalize_query(query: str) -> str:
+    """Lower-cased question without punctuation, extra whitespace or leading filler."""
+    text = re.sub(r"[^\w\s]", " ", (query or "").lower())
+    text = re.sub(r"\s+", " ", text).strip()
+    return _FILLER.sub("", text)
+
+
+def classify_intent(query: str) -> str:
+    """Returns "weather", "time" or "general" for a question."""
+    text = normalize_query(query)
+    for intent, pattern in _INTENT_PATTERNS:
+        if pattern.search(text):
+            return intent
+    return "general"
+
+
+class CachedAgentTool(AgentTool):
+    """
+    AgentTool whose text answers are cached per (agent, normalized request, locale).
+
+    The TTL comes from the request's intent (ANSWER_CACHE_TTL_*_SECONDS). While an
+    upstream run for a key is in flight, identical requests on the same event loop wait
+    for it instead of starting their own. Failed or empty answers are not cached. Agents
+    with an input_schema are passed through uncached.
+    """
+
+    async def run_async(self, *, args: Dict[str, Any], tool_context: ToolContext) -> Any:
+        request = args.get("request")
+        if not ANSWER_CACHE_ENABLED or not isinstance(request, str) or getattr(self.agent, "input_schema", None):
+            return await super().run_async(args=args, tool_context=tool_context)
+
+        locale = tool_context.state.get("locale") or ANSWER_CACHE_DEFAULT_LOCALE
+        intent = classify_intent(request)
+        key = make_cache_key(agent=self.agent.name, query=normalize_query(request), locale=locale)
+        cache = _get_intent_cache(intent)
+
+        cached = cache.get(key)
+        if cached is not None:
+            _answer_metrics.incr("hits")
+            _answer_metrics.incr(f"hits_{intent}")
+            _answer_metrics.incr("saved_seconds", _mean_upstream_seconds(intent))
+            return cached
+
+        loop = asyncio.get_running_loop()
+        flight = _in_flight.get(key)
+        if flight is not None and flight.get_loop() is loop:
+            _answer_metrics.incr("coalesced")
+            try:
+                ok, value = await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                if not flight.cancelled():
+                    raise  # This caller was cancelled
+                # The leading call was cancelled; run upstream ourselves.
+                return await self.run_async(args=args, tool_context=tool_context)
+            _answer_metrics.incr("saved_seconds", _mean_upstream_seconds(intent))
+            if not ok:
+                raise value
+            return value
+
+        _answer_metrics.incr("misses")
+        _answer_metrics.incr(f"misses_{intent}")
+        flight = loop.create_future()
+        _in_flight[key] = flight
+        started = time.monotonic()
+        try:
+            result = await super().run_async(args=args, tool_context=tool_context)
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except Exception as e:
+            flight.set_result((False, e))
+            raise
+        finally:
+            if _in_flight.get(key) is flight:
+                del _in_flight[key]
+        _record_upstream_seconds(intent, time.monotonic() - started)
+        if isinstance(result, str) and result.strip():
+            cache.put(key, result, intent=intent)
+        flight.set_result((True, result))
+        return result
+
+
+def get_answer_cache_stats() -> Dict:
+    """Returns hits, misses and coalesced calls (overall and per intent), hit ratio and saved seconds."""
+    snapshot = _answer_metrics.snapshot()
+    counters = snapshot["counters"]
+    hits = counters.get("hits", 0) + counters.get("coalesced", 0)
+    lookups = hits + counters.get("misses", 0)
+    snapshot["hit_ratio"] = hits / lookups if lookups else None
+    return snapshot
+
+
+def _get_intent_cache(intent: str) -> ResultCache:
+    """One memory-only cache per intent, since ResultCache has a single TTL."""
+    with _caches_lock:
+        cache = _caches.get(intent)
+        if cache is None:
+            cache = ResultCache(
+                name=f"answer_cache_{intent}",
+                max_entries=ANSWER_CACHE_MAX_ENTRIES,
+                ttl_seconds=ANSWER_CACHE_TTL_SECONDS[intent],
+                index_path=None,
+                max_index_entries=ANSWER_CACHE_MAX_ENTRIES,
+            )
+            _caches[intent] = cache
+        return cache
+
+
+def _record_upstream_seconds(intent: str, seconds: float) -> None:
+    _answer_metrics.observe("upstream_seconds", seconds)
+    with _latency_lock:
+        count, mean = _upstream_latency.get(intent, (0, 0.0))
+        count += 1
+        _upstream_latency[intent] = (count, mean + (seconds - mean) / count)
+
+
+def _mean_upstream_seconds(intent: str) -> float:
+    with _latency_lock:
+        return _upstream_latency.get(intent, (0, 0.0))[1]
@@ -0,0 +1,366 @@
+# Filename: audio_probe.py
+# Description: Audio duration from a few ranged reads of a GCS object instead of a full
+#              download. Understands WAV (RIFF header), headerless LINEAR16 .pcm and MP3
+#              (Xing/Info/VBRI headers, or frame sampling); anything else falls back to a
+#              full download read with TinyTag. Results are cached per object generation,
+#              and our own writers stamp the duration into GCS custom metadata.
+
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from google.cloud import storage
+from google.cloud.exceptions import GoogleCloudError, NotFound
+from tinytag import TinyTag
+
+from . import gcs_client
+from .metrics import get_metrics
+from .wav_utils import parse_wav_header
+
+# First ranged read: covers a WAV header, small ID3 tags and the first MP3 frames.
+PROBE_HEAD_BYTES = int(os.getenv("AUDIO_PROBE_HEAD_BYTES", str(8 * 1024)))
+# Headerless .pcm objects without sample_rate_hertz/channels metadata are assumed to be
+# mono LINEAR16 at this rate (the Text-to-Speech default).
+PCM_DEFAULT_SAMPLE_RATE = int(os.getenv("AUDIO_PROBE_PCM_SAMPLE_RATE", "24000"))
+PCM_DEFAULT_CHANNELS = int(os.getenv("AUDIO_PROBE_PCM_CHANNELS", "1"))
+# MP3 frames sampled to estimate the bitrate of a VBR file without a Xing/VBRI header.
+MP3_SAMPLE_FRAMES = 32
+
+# Writers add the duration to the object's custom metadata (part of the same upload request).
+AUDIO_DURATION_STAMP_METADATA = os.getenv("AUDIO_DURATION_STAMP_METADATA", "true").lower() in ("1", "true", "yes")
+AUDIO_DURATION_CACHE_MAX_ENTRIES = int(os.getenv("AUDIO_DURATION_CACHE_MAX_ENTRIES", "1024"))
+DURATION_METADATA_KEY = "duration_seconds"
+FORMAT_METADATA_KEY = "audio_format"
+
+_probe_metrics = get_metrics("audio_probe")
+# (bucket, object, generation) -> (duration_seconds, format). Generations are immutable,
+# so entries never go stale; the LRU bound only limits memory.
+_duration_cache: "OrderedDict[Tuple[str, str, int], Tuple[float, str]]" = OrderedDict()
+_duration_cache_lock = threading.Lock()
+
+
+class AudioProbeError(Exception):
+    """The object is missing, unreadable, or its duration cannot be determined."""
+
+
+def get_gcs_audio_duration(blob: storage.Blob) -> float:
+    """
+    Returns the duration in seconds of an audio object, using the cheapest source available.
+
+    Costs at most one metadata GET (none if blob already has its generation loaded). The
+    duration then comes from the in-process cache for that generation, from stamped
+    custom metadata, or from probe_gcs_audio_duration, in that order.
+
+    Raises:
+        AudioProbeError: If the object does not exist or its duration cannot be read.
+    """
+    try:
+        if blob.generation is None:
+            blob.reload()
+    except NotFound as e:
+        raise AudioProbeError(f"Audio object gs://{blob.bucket.name}/{blob.name} not found.") from e
+    except GoogleCloudError as e:
+        raise AudioProbeError(f"Could not read metadata of gs://{blob.bucket.name}/{blob.name}: {e}") from e
+
+    key = (blob.bucket.name, blob.name, blob.generation)
+    with _duration_cache_lock:
+        cached = _duration_cache.get(key)
+        if cached is not None:
+            _duration_cache.move_to_end(key)
+    if cached is not None:
+        _probe_metrics.incr("cache_hits")
+        return cached[0]
+
+    stamped = (blob.metadata or {}).get(DURATION_METADATA_KEY)
+    if stamped is not None:
+        try:
+            duration = float(stamped)
+        except ValueError:
+            duration = None
+        if duration is not None:
+            _probe_metrics.incr("metadata_hits")
+            _remember(key, duration, (blob.metadata or {}).get(FORMAT_METADATA_KEY, ""))
+            return duration
+
+    duration, kind = _probe(blob)
+    _remember(key, duration, kind)
+    return duration
+
+
+def audio_duration_metadata(duration_seconds: float, audio_format: str) -> Dict[str, str]:
+    """Custom metadata to stamp on a new audio object (empty if stamping is disabled)."""
+    if not AUDIO_DURATION_STAMP_METADATA:
+        return {}
+    return {DURATION_METADATA_KEY: f"{duration_seconds:.6f}", FORMAT_METADATA_KEY: audio_format}
+
+
+def stamp_audio_duration(blob: storage.Blob, duration_seconds: float, audio_format: str) -> None:
+    """Adds duration metadata to blob before it is uploaded (no extra request)."""
+    metadata = audio_duration_metadata(duration_seconds, audio_format)
+    if metadata:
+        blob.metadata = {**(blob.metadata or {}), **metadata}
+
+
+def record_audio_duration(blob: storage.Blob, duration_seconds: float, audio_format: str) -> None:
+    """Caches the duration of an object this process just wrote (needs its generation)."""
+    if blob.generation is not None:
+        _remember((blob.bucket.name, blob.name, blob.generation), duration_seconds, audio_format)
+
+
+def _remember(key: Tuple[str, str, int], duration_seconds: float, audio_format: str) -> None:
+    with _duration_cache_lock:
+        _duration_cache[key] = (duration_seconds, audio_format)
+        _duration_cache.move_to_end(key)
+        while len(_duration_cache) > AUDIO_DURATION_CACHE_MAX_ENTRIES:
+            _duration_cache.popitem(last=False)
+
+
+def probe_gcs_audio_duration(blob: storage.Blob) -> float:
+    """
+    Returns the duration in seconds of an audio object, reading as little of it as possible.
+
+    Args:
+        blob: The object to probe. Its metadata (size, custom metadata) is loaded if needed.
+
+    Raises:
+        AudioProbeError: If the object does not exist or its duration cannot be read.
+    """
+    return _probe(blob)[0]
+
+
+def _probe(blob: storage.Blob) -> Tuple[float, str]:
+    """Returns (duration, format) from ranged reads, falling back to a full download."""
+    started = time.monotonic()
+    try:
+        if blob.size is None:
+            blob.reload()
+    except NotFound as e:
+        raise AudioProbeError(f"Audio object gs://{blob.bucket.name}/{blob.name} not found.") from e
+    except GoogleCloudError as e:
+        raise AudioProbeError(f"Could not read metadata of gs://{blob.bucket.name}/{blob.name}: {e}") from e
+    size = blob.size or 0
+    if size == 0:
+        raise AudioProbeError(f"Audio object gs://{blob.bucket.name}/{blob.name} is empty.")
+
+    reader = _RangeReader(blob, size)
+    extension = os.path.splitext(blob.name)[1].lower()
+    head = reader.read(0, PROBE_HEAD_BYTES)
+    if head[:4] == b"RIFF":
+        kind, duration = "wav", _wav_duration(reader, head, size)
+    elif extension == ".pcm":
+        kind, duration = "pcm", _pcm_duration(blob, size)
+    elif extension == ".mp3" or _looks_like_mp3(head):
+        kind, duration = "mp3", _mp3_duration(reader, head, size)
+    else:
+        kind, duration = "other", None
+
+    if duration is None:
+        kind, duration = f"{kind}_full_download", _tinytag_duration(blob, extension)
+        reader.bytes_read = size
+
+    _probe_metrics.incr(f"probes.{kind}")
+    _probe_metrics.observe(f"bytes_read.{kind}", reader.bytes_read)
+    _probe_metrics.observe(f"seconds.{kind}", time.monotonic() - started)
+    return duration, kind.replace("_full_download", "")
+
+
+def get_audio_probe_metrics() -> dict:
+    """Returns probe counts, bytes read and latency per format."""
+    return _probe_metrics.snapshot()
+
+
+class _RangeReader:
+    """Issues ranged GCS reads and counts the bytes transferred."""
+
+    def __init__(self, blob: storage.Blob, size: int):
+        self.blob = blob
+        self.size = size
+        self.bytes_read = 0
+
+    def read(self, start: int, length: int) -> bytes:
+        end = min(self.size, start + length) - 1
+        if end < start:
+            return b""
+        try:
+            data = gcs_client.read_range(self.blob, start, end)
+        except GoogleCloudError as e:
+            raise AudioProbeError(f"Ranged read of gs://{self.blob.bucket.name}/{self.blob.name} failed: {e}") from e
+        self.bytes_read += len(data)
+        return data
+
+
+# --- WAV / PCM ---
+
+def _wav_duration(reader: _RangeReader, head: bytes, size: int) -> Optional[float]:
+    wav = parse_wav_header(head, total_size=size)
+    if wav is None and len(head) < size:
+        # Large chunks (e.g. LIST/bext) before "data": read a bigger header once.
+        wav = parse_wav_header(head + reader.read(len(head), 16 * PROBE_HEAD_BYTES), total_size=size)
+    if wav is None or not wav.sample_rate or not wav.frame_size:
+        return None
+    return wav.duration_seconds
+
+
+def _pcm_duration(blob: storage.Blob, size: int) -> float:
+    metadata = blob.metadata or {}
+    sample_rate = int(metadata.get("sample_rate_hertz") or PCM_DEFAULT_SAMPLE_RATE)
+    channels = int(metadata.get("channels") or PCM_DEFAULT_CHANNELS)
+    return size / float(sample_rate * channels * 2)
+
+
+# --- MP3 ---
+
+_MP3_BITRATES_KBPS = {
+    # (MPEG-1?, layer) -> bitrate index table
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+class _Mp3Frame:
+    __slots__ = ("offset", "mpeg1", "layer", "bitrate", "sample_rate", "mono", "length", "samples")
+
+    def __init__(self, offset: int, mpeg1: bool, layer: int, bitrate: int, sample_rate: int, mono: bool, padding: int):
+        self.offset = offset
+        self.mpeg1 = mpeg1
+        self.layer = layer
+        self.bitrate = bitrate
+        self.sample_rate = sample_rate
+        self.mono = mono
+        if layer == 1:
+            self.samples = 384
+            self.length = (12 * bitrate // sample_rate + padding) * 4
+        else:
+            self.samples = 1152 if (layer == 2 or mpeg1) else 576
+            self.length = self.samples // 8 * bitrate // sample_rate + padding
+
+
+def _parse_mp3_frame(data: bytes, offset: int) -> Optional[_Mp3Frame]:
+    if offset + 4 > len(data) or data[offset] != 0xFF or (data[offset + 1] & 0xE0) != 0xE0:
+        return None
+    b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+    version = (b1 >> 3) & 0x03  # 3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5
+    layer = 4 - ((b1 >> 1) & 0x03)
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 0x03
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = _MP3_BITRATES_KBPS[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    return _Mp3Frame(offset, mpeg1, layer, bitrate, sample_rate, (b3 >> 6) == 3, (b2 >> 1) & 0x01)
+
+
+def _id3v2_size(head: bytes) -> int:
+    if len(head) < 10 or head[:3] != b"ID3":
+        return 0
+    size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]  # Synchsafe integer
+    footer = 10 if head[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _looks_like_mp3(head: bytes) -> bool:
+    return head[:3] == b"ID3" or _parse_mp3_frame(head, 0) is not None
+
+
+def _find_first_frame(data: bytes, start: int) -> Optional[_Mp3Frame]:
+    """First frame at or after start that is followed by another valid frame (guards against false syncs)."""
+    offset = start
+    while offset + 4 <= len(data):
+        offset = data.find(b"\xff", offset)
+        if offset < 0:
+            return None
+        frame = _parse_mp3_frame(data, offset)
+        if frame is not None and frame.length > 0:
+            following = offset + frame.length
+            if following + 4 > len(data) or _parse_mp3_frame(data, following) is not None:
+                return frame
+        offset += 1
+    return None
+
+
+def _mp3_duration(reader: _RangeReader, head: bytes, size: int) -> Optional[float]:
+    audio_start = _id3v2_size(head)
+    data, data_offset = head, 0
+    if audio_start + 4 > len(head):
+        # Big ID3 tag (e.g. embedded cover art): read from just after it.
+        data, data_offset = reader.read(audio_start, PROBE_HEAD_BYTES), audio_start
+    frame = _find_first_frame(data, max(0, audio_start - data_offset))
+    if frame is None:
+        return None
+
+    vbr_frames = _xing_or_vbri_frame_count(data, frame)
+    if vbr_frames:
+        return vbr_frames * frame.samples / float(frame.sample_rate)
+
+    # No VBR header: average the bitrate over the first frames (exact for CBR).
+    bitrates: List[int] = []
+    offset = frame.offset
+    while len(bitrates) < MP3_SAMPLE_FRAMES:
+        current = _parse_mp3_frame(data, offset)
+        if current is None or current.length <= 0:
+            break
+        bitrates.append(current.bitrate)
+        offset += current.length
+    if not bitrates:
+        return None
+    audio_bytes = size - (data_offset + frame.offset) - _id3v1_size(reader, size)
+    return audio_bytes * 8.0 / (sum(bitrates) / len(bitrates))
+
+
+def _xing_or_vbri_frame_count(data: bytes, frame: _Mp3Frame) -> Optional[int]:
+    """Frame count from a Xing/Info header (after the side info) or a VBRI header (offset 32)."""
+    if frame.mpeg1:
+        side_info = 17 if frame.mono else 32
+    else:
+        side_info = 9 if frame.mono else 17
+    xing = frame.offset + 4 + side_info
+    if data[xing:xing + 4] in (b"Xing", b"Info") and xing + 12 <= len(data):
+        flags = struct.unpack_from(">I", data, xing + 4)[0]
+        if flags & 0x01:
+            return struct.unpack_from(">I", data, xing + 8)[0]
+    vbri = frame.offset + 4 + 32
+    if data[vbri:vbri + 4] == b"VBRI" and vbri + 18 <= len(data):
+        return struct.unpack_from(">I", data, vbri + 14)[0]
+    return None
+
+
+def _id3v1_size(reader: _RangeReader, size: int) -> int:
+    if size < 128:
+        return 0
+    return 128 if reader.read(size - 128, 3) == b"TAG" else 0
+
+
+# --- Fallback ---
+
+def _tinytag_duration(blob: storage.Blob, extension: str) -> float:
+    """Downloads the whole object to a temporary file and reads the duration with TinyTag."""
+    with tempfile.NamedTemporaryFile(suffix=extension or ".tmp") as temp_file:
+        try:
+            blob.download_to_filename(temp_file.name)
+        except GoogleCloudError as e:
+            raise AudioProbeError(f"Download of gs://{blob.bucket.name}/{blob.name} failed: {e}") from e
+        try:
+            duration = TinyTag.get(temp_file.name).duration
+        except Exception as e:
+            raise AudioProbeError(f"TinyTag could not read gs://{blob.bucket.name}/{blob.name}: {e}") from e
+    if duration is None:
+        raise AudioProbeError(f"Could not determine the duration of gs://{blob.bucket.name}/{blob.name}.")
+    return float(duration)
+
+
+def split_gcs_uri(uri: str) -> Tuple[str, str]:
+    """Returns (bucket, object name) for a gs:// URI, raising AudioProbeError if it is invalid."""
+    try:
+        return gcs_client.split_gcs_uri(uri)
+    except ValueError as e:
+        raise AudioProbeError(str(e)) from e
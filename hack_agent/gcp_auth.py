@@ -0,0 +1,119 @@
+# Filename: gcp_auth.py
+# Description: Process-wide Google Cloud credentials and bearer-token provider.
+#              Application Default Credentials are discovered once; the access token is
+#              reused until shortly before expiry and refreshed in the background.
+
+import datetime
+import os
+import threading
+from typing import Optional, Tuple
+
+import google.auth
+import google.auth.transport.requests
+from google.auth.credentials import Credentials
+
+from .metrics import get_metrics
+
+CLOUD_PLATFORM_SCOPE = "https://www.googleapis.com/auth/cloud-platform"
+
+# A token with less than this many seconds left is refreshed synchronously.
+TOKEN_REFRESH_MARGIN_SECONDS = float(os.getenv("GCP_TOKEN_REFRESH_MARGIN_SECONDS", "300"))
+# A token with less than this many seconds left triggers a background refresh.
+TOKEN_BACKGROUND_REFRESH_SECONDS = float(os.getenv("GCP_TOKEN_BACKGROUND_REFRESH_SECONDS", "600"))
+
+_auth_metrics = get_metrics("gcp_auth")
+_lock = threading.Lock()
+_credentials: Optional[Credentials] = None
+_project_id: Optional[str] = None
+_background_refresh: Optional[threading.Thread] = None
+
+
+def get_credentials() -> Tuple[Credentials, Optional[str]]:
+    """
+    Returns the shared (credentials, project_id) from Application Default Credentials.
+
+    Raises:
+        google.auth.exceptions.DefaultCredentialsError: If no ADC are configured.
+    """
+    global _credentials, _project_id
+    if _credentials is not None:
+        return _credentials, _project_id
+    with _lock:
+        if _credentials is None:
+            _credentials, _project_id = google.auth.default(scopes=[CLOUD_PLATFORM_SCOPE])
+            _auth_metrics.incr("credential_discoveries")
+        return _credentials, _project_id
+
+
+def get_access_token() -> str:
+    """
+    Returns a valid OAuth2 bearer token for the shared credentials.
+
+    The cached token is returned while it has more than TOKEN_REFRESH_MARGIN_SECONDS
+    left. Inside TOKEN_BACKGROUND_REFRESH_SECONDS of expiry a background refresh is
+    started so callers rarely wait on a token round trip.
+
+    Raises:
+        google.auth.exceptions.DefaultCredentialsError: If no ADC are configured.
+        google.auth.exceptions.RefreshError: If the token cannot be refreshed.
+        ValueError: If the refresh succeeded but produced no token.
+    """
+    credentials, _ = get_credentials()
+    remaining = _seconds_until_expiry(credentials)
+    if remaining is not None and remaining > TOKEN_REFRESH_MARGIN_SECONDS:
+        if remaining < TOKEN_BACKGROUND_REFRESH_SECONDS:
+            _start_background_refresh(credentials)
+        _auth_metrics.incr("token_cache_hits")
+        return credentials.token
+
+    with _lock:
+        # Another thread may have refreshed while we waited for the lock.
+        remaining = _seconds_until_expiry(credentials)
+        if remaining is None or remaining <= TOKEN_REFRESH_MARGIN_SECONDS:
+            _refresh_locked(credentials)
+    if not credentials.token:
+        raise ValueError("Failed to obtain access token after credential refresh.")
+    return credentials.token
+
+
+def get_token_refresh_count() -> int:
+    """Returns how many token refreshes this process has performed."""
+    return int(_auth_metrics.counter("token_refreshes"))
+
+
+def _seconds_until_expiry(credentials: Credentials) -> Optional[float]:
+    """Seconds of validity left on the current token, or None if there is no usable token."""
+    if not credentials.token:
+        return None
+    expiry = credentials.expiry
+    if expiry is None:
+        return float("inf")  # Tokens without an expiry (e.g. some test creds) never go stale
+    # google-auth stores expiry as a naive UTC datetime.
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    return (expiry - now).total_seconds()
+
+
+def _refresh_locked(credentials: Credentials) -> None:
+    credentials.refresh(google.auth.transport.requests.Request())
+    _auth_metrics.incr("token_refreshes")
+
+
+def _start_background_refresh(credentials: Credentials) -> None:
+    global _background_refresh
+    with _lock:
+        if _background_refresh is not None and _background_refresh.is_alive():
+            return
+
+        def _run() -> None:
+            try:
+                with _lock:
+                    remaining = _seconds_until_expiry(credentials)
+                    if remaining is not None and remaining < TOKEN_BACKGROUND_REFRESH_SECONDS:
+                        _refresh_locked(credentials)
+            except Exception as e:
+                # The next foreground call refreshes synchronously and surfaces the error.
+                _auth_metrics.incr("background_refresh_failures")
+                print(f"WARNING: Background token refresh failed: {e.__class__.__name__}: {e}")
+
+        _background_refresh = threading.Thread(target=_run, name="gcp-token-refresh", daemon=True)
+        _background_refresh.start()
@@ -0,0 +1,324 @@
+# Filename: gcs_client.py
+# Description: Process-wide Cloud Storage client with a connection pool sized for
+#              parallel transfers, plus helpers for byte uploads, ranged reads and
+#              multi-object / chunked uploads and downloads via transfer_manager.
+
+import io
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from google.auth.credentials import AnonymousCredentials
+from google.auth.transport.requests import AuthorizedSession
+from google.cloud import storage
+from google.cloud.storage import transfer_manager
+from requests.adapters import HTTPAdapter
+
+from .gcp_auth import get_credentials
+from .metrics import get_metrics
+
+# Connections kept per host. Transfer workers beyond this wait for a free connection.
+GCS_MAX_CONNECTIONS = int(os.getenv("GCS_MAX_CONNECTIONS", "64"))
+GCS_TRANSFER_WORKERS = int(os.getenv("GCS_TRANSFER_WORKERS", "16"))
+# Objects at least this large are uploaded resumably in GCS_UPLOAD_CHUNK_BYTES chunks,
+# so a transient error only resends the current chunk. Must be a multiple of 256 KiB.
+GCS_RESUMABLE_THRESHOLD_BYTES = int(os.getenv("GCS_RESUMABLE_THRESHOLD_BYTES", str(8 * 1024 * 1024)))
+GCS_UPLOAD_CHUNK_BYTES = int(os.getenv("GCS_UPLOAD_CHUNK_BYTES", str(8 * 1024 * 1024)))
+# Files on disk at least this large are transferred as parallel byte ranges (XML
+# multipart upload / ranged download). Not used against STORAGE_EMULATOR_HOST, since
+# emulators generally lack the XML multipart API.
+GCS_PARALLEL_THRESHOLD_BYTES = int(os.getenv("GCS_PARALLEL_THRESHOLD_BYTES", str(64 * 1024 * 1024)))
+GCS_PARALLEL_CHUNK_BYTES = int(os.getenv("GCS_PARALLEL_CHUNK_BYTES", str(32 * 1024 * 1024)))
+
+_gcs_metrics = get_metrics("gcs")
+_clients: Dict[Optional[str], storage.Client] = {}
+_clients_lock = threading.Lock()
+
+
+def get_storage_client(project: Optional[str] = None) -> storage.Client:
+    """
+    Returns the shared storage client for project (None means the ADC project).
+
+    All clients reuse the process-wide credentials from gcp_auth, and each keeps one
+    keep-alive session whose pool holds GCS_MAX_CONNECTIONS connections. The default
+    requests pool holds 10, which throttles parallel transfers. Honours
+    STORAGE_EMULATOR_HOST (anonymous credentials).
+    """
+    client = _clients.get(project)
+    if client is not None:
+        return client
+    with _clients_lock:
+        client = _clients.get(project)
+        if client is None:
+            if _emulator_host():
+                credentials, default_project = AnonymousCredentials(), "test-project"
+            else:
+                credentials, default_project = get_credentials()
+            client = storage.Client(
+                project=project or default_project,
+                credentials=credentials,
+                _http=_pooled_session(credentials),
+            )
+            _clients[project] = client
+            _gcs_metrics.incr("clients_created")
+        return client
+
+
+def _pooled_session(credentials) -> AuthorizedSession:
+    """An authorized session whose connection pool holds GCS_MAX_CONNECTIONS connections."""
+    session = AuthorizedSession(credentials)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=GCS_MAX_CONNECTIONS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)  # Emulator
+    return session
+
+
+def split_gcs_uri(uri: str) -> Tuple[str, str]:
+    """
+    Returns (bucket, object name) for a gs:// URI.
+
+    Raises:
+        ValueError: If uri is not gs://bucket/object.
+    """
+    if not uri or not uri.startswith("gs://"):
+        raise ValueError(f"Invalid GCS URI: {uri}. Must start with 'gs://'.")
+    bucket_name, _, blob_name = uri[len("gs://"):].partition("/")
+    if not bucket_name or not blob_name:
+        raise ValueError(f"Invalid GCS URI: {uri}. Expected gs://bucket/object.")
+    return bucket_name, blob_name
+
+
+def gcs_blob(uri: str, project: Optional[str] = None) -> storage.Blob:
+    """Returns a Blob handle (no request is made) for a gs:// URI on the shared client."""
+    bucket_name, blob_name = split_gcs_uri(uri)
+    return get_storage_client(project).bucket(bucket_name).blob(blob_name)
+
+
+def gcs_uri_to_public_url(gcs_uri: str) -> str:
+    """
+    Converts a Google Cloud Storage (GCS) URI to its public HTTPS URL format.
+
+    Args:
+        gcs_uri: The GCS URI string (e.g., "gs://bucket_name/object_name").
+
+    Returns:
+        The corresponding public HTTPS URL string
+        (e.g., "https://storage.googleapis.com/bucket_name/object_name").
+
+    Raises:
+        ValueError: If the input string is not a valid GCS URI format
+                    starting with "gs://" and containing a bucket and object name.
+    """
+    if not gcs_uri or not gcs_uri.startswith("gs://"):
+        raise ValueError("Invalid GCS URI: Must start with 'gs://'")
+
+    # Remove the "gs://" prefix
+    path_part = gcs_uri[5:]
+
+    # Find the first slash separating bucket from object
+    slash_index = path_part.find('/')
+
+    # Check if the format is valid (must have bucket and object name)
+    if slash_index == -1:
+        raise ValueError("Invalid GCS URI: Format must be gs://BUCKET_NAME/OBJECT_NAME")
+        # Could potentially handle gs://BUCKET_NAME separately if needed
+    if slash_index == len(path_part) - 1:
+         raise ValueError("Invalid GCS URI: Missing object name after bucket name /")
+
+
+    # Extract bucket name and object name
+    bucket_name = path_part[:slash_index]
+    object_name = path_part[slash_index+1:] # Get everything after the first slash
+
+    if not bucket_name:
+        raise ValueError("Invalid GCS URI: Missing bucket name")
+    # It's okay for object_name to be empty here if the URI was e.g. "gs://bucket//" but usually indicates an issue.
+    # The earlier check for slash_index == len(path_part) - 1 already handles "gs://bucket/"
+
+    # Construct the public URL using an f-string
+    public_url = f"https://storage.googleapis.com/{bucket_name}/{object_name}"
+
+    return public_url
+
+
+def upload_from_bytes(
+    data: bytes,
+    uri: str,
+    content_type: str = "application/octet-stream",
+    metadata: Optional[Dict[str, str]] = None,
+    project: Optional[str] = None,
+) -> storage.Blob:
+    """
+    Uploads data to uri and returns the blob (with its generation set).
+
+    Payloads of at least GCS_RESUMABLE_THRESHOLD_BYTES use a chunked resumable upload.
+    """
+    blob = gcs_blob(uri, project)
+    if metadata:
+        blob.metadata = metadata
+    if len(data) >= GCS_RESUMABLE_THRESHOLD_BYTES:
+        blob.chunk_size = GCS_UPLOAD_CHUNK_BYTES
+    started = time.monotonic()
+    blob.upload_from_string(data, content_type=content_type)
+    _record_transfer("upload", len(data), time.monotonic() - started)
+    return blob
+
+
+def read_range(blob: Union[storage.Blob, str], start: int, end: int) -> bytes:
+    """Returns bytes start..end (inclusive) of a blob or gs:// URI in one request."""
+    if isinstance(blob, str):
+        blob = gcs_blob(blob)
+    data = blob.download_as_bytes(start=start, end=end)
+    _gcs_metrics.incr("ranged_reads")
+    _gcs_metrics.incr("ranged_read_bytes", len(data))
+    return data
+
+
+def upload_file(
+    path: str,
+    uri: str,
+    content_type: Optional[str] = None,
+    metadata: Optional[Dict[str, str]] = None,
+    max_workers: int = GCS_TRANSFER_WORKERS,
+) -> storage.Blob:
+    """
+    Uploads a local file, choosing the transfer by size:
+    at least GCS_PARALLEL_THRESHOLD_BYTES as parallel parts, at least
+    GCS_RESUMABLE_THRESHOLD_BYTES as a chunked resumable upload, otherwise in one request.
+    """
+    blob = gcs_blob(uri)
+    if metadata:
+        blob.metadata = metadata
+    size = os.path.getsize(path)
+    started = time.monotonic()
+    if size >= GCS_PARALLEL_THRESHOLD_BYTES and not _emulator_host():
+        transfer_manager.upload_chunks_concurrently(
+            path,
+            blob,
+            content_type=content_type,
+            chunk_size=GCS_PARALLEL_CHUNK_BYTES,
+            worker_type=transfer_manager.THREAD,
+            max_workers=max_workers,
+        )
+        _gcs_metrics.incr("parallel_uploads")
+    else:
+        if size >= GCS_RESUMABLE_THRESHOLD_BYTES:
+            blob.chunk_size = GCS_UPLOAD_CHUNK_BYTES
+        blob.upload_from_filename(path, content_type=content_type)
+    _record_transfer("upload", size, time.monotonic() - started)
+    return blob
+
+
+def upload_many(
+    uploads: Sequence[Tuple[Union[bytes, str], str]],
+    content_type: Optional[str] = None,
+    max_workers: int = GCS_TRANSFER_WORKERS,
+) -> List[str]:
+    """
+    Uploads many objects in parallel on the shared client.
+
+    Args:
+        uploads: (source, destination gs:// URI) pairs; a source is bytes or a local path.
+                 Files of at least GCS_PARALLEL_THRESHOLD_BYTES are uploaded one after
+                 another, each split into parallel parts (see upload_file).
+        content_type: Applied to every object; None guesses it from file names.
+
+    Returns:
+        The destination URIs, in input order.
+
+    Raises:
+        The first upload error (remaining uploads still run to completion).
+    """
+    pairs = []
+    large_files = []
+    total_bytes = 0
+    for source, uri in uploads:
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            pairs.append((io.BytesIO(source), _sized_blob(uri, len(source))))
+            total_bytes += len(source)
+        elif os.path.getsize(source) >= GCS_PARALLEL_THRESHOLD_BYTES:
+            large_files.append((source, uri))
+        else:
+            size = os.path.getsize(source)
+            pairs.append((source, _sized_blob(uri, size)))
+            total_bytes += size
+
+    started = time.monotonic()
+    if pairs:
+        upload_kwargs = {"content_type": content_type} if content_type else None
+        transfer_manager.upload_many(
+            pairs,
+            upload_kwargs=upload_kwargs,
+            raise_exception=True,
+            worker_type=transfer_manager.THREAD,
+            max_workers=max_workers,
+        )
+        _record_transfer("upload", total_bytes, time.monotonic() - started, objects=len(pairs))
+    for path, uri in large_files:
+        upload_file(path, uri, content_type=content_type, max_workers=max_workers)
+    return [uri for _, uri in uploads]
+
+
+def download_many(uris: Sequence[str], max_workers: int = GCS_TRANSFER_WORKERS) -> List[bytes]:
+    """
+    Downloads many objects in parallel on the shared client and returns their contents
+    in input order.
+
+    Raises:
+        The first download error.
+    """
+    buffers = [io.BytesIO() for _ in uris]
+    started = time.monotonic()
+    transfer_manager.download_many(
+        [(gcs_blob(uri), buffer) for uri, buffer in zip(uris, buffers)],
+        raise_exception=True,
+        worker_type=transfer_manager.THREAD,
+        max_workers=max_workers,
+    )
+    contents = [buffer.getvalue() for buffer in buffers]
+    _record_transfer("download", sum(len(c) for c in contents), time.monotonic() - started, objects=len(contents))
+    return contents
+
+
+def download_file(uri: str, path: str, max_workers: int = GCS_TRANSFER_WORKERS) -> str:
+    """Downloads an object to path, as parallel byte ranges if it is large; returns path."""
+    blob = gcs_blob(uri)
+    blob.reload()
+    started = time.monotonic()
+    if blob.size and blob.size >= GCS_PARALLEL_THRESHOLD_BYTES:
+        transfer_manager.download_chunks_concurrently(
+            blob,
+            path,
+            chunk_size=GCS_PARALLEL_CHUNK_BYTES,
+            worker_type=transfer_manager.THREAD,
+            max_workers=max_workers,
+        )
+        _gcs_metrics.incr("parallel_downloads")
+    else:
+        blob.download_to_filename(path)
+    _record_transfer("download", blob.size or 0, time.monotonic() - started)
+    return path
+
+
+def get_gcs_metrics() -> dict:
+    """Returns object and byte counts and throughput (MB/s) for uploads and downloads."""
+    return _gcs_metrics.snapshot()
+
+
+def _sized_blob(uri: str, size: int) -> storage.Blob:
+    blob = gcs_blob(uri)
+    if size >= GCS_RESUMABLE_THRESHOLD_BYTES:
+        blob.chunk_size = GCS_UPLOAD_CHUNK_BYTES
+    return blob
+
+
+def _record_transfer(direction: str, size: int, seconds: float, objects: int = 1) -> None:
+    _gcs_metrics.incr(f"{direction}_objects", objects)
+    _gcs_metrics.incr(f"{direction}_bytes", size)
+    if seconds > 0:
+        _gcs_metrics.observe(f"{direction}_mb_per_second", size / seconds / 1e6)
+
+
+def _emulator_host() -> Optional[str]:
+    return os.getenv("STORAGE_EMULATOR_HOST")
@@ -4,6 +4,7 @@ from google.adk.agents import Agent
 from google.adk.tools import google_search
 from .text_to_speech import text_to_speech
 from google.adk.agents import LlmAgent
+from .answer_cache import CachedAgentTool
 
 google_agent = LlmAgent(
     name="weather_time_agent",
@@ -29,3 +30,6 @@ You will use the text_to_speech tool to speak your answers in a haiku style. you
     #code_executor=[BuiltInCodeExecutor],
 
 )
+
+# Use this (not AgentTool(agent=google_agent)) so repeated questions are answered from cache.
+google_agent_tool = CachedAgentTool(agent=google_agent)
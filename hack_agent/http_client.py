@@ -0,0 +1,102 @@
+# Filename: http_client.py
+# Description: Pooled keep-alive HTTP session for Google REST endpoints (e.g. Lyria
+#              :predict). One requests.Session per process, with timeouts, a per-host
+#              connection cap and jittered exponential backoff on connect errors and
+#              throttling statuses.
+#
+# There is deliberately no async (httpx, HTTP/2) client. Every caller is a blocking
+# tool (Lyria :predict) that agents reach through tool_executor.async_tool, so requests
+# already run on a bounded worker pool off the event loop. Each worker holds one
+# keep-alive connection from this pool, which gives the same connection reuse as a
+# multiplexed HTTP/2 client at the concurrency the tool pools allow. It also keeps a
+# single retry policy and needs no second client per event loop.
+
+import os
+import threading
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+from .metrics import get_metrics
+
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "10"))
+# Lyria takes tens of seconds per clip, so the read timeout is generous.
+HTTP_READ_TIMEOUT_SECONDS = float(os.getenv("HTTP_READ_TIMEOUT_SECONDS", "180"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "32"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "4"))
+HTTP_BACKOFF_BASE_SECONDS = float(os.getenv("HTTP_BACKOFF_BASE_SECONDS", "1.0"))
+HTTP_BACKOFF_MAX_SECONDS = float(os.getenv("HTTP_BACKOFF_MAX_SECONDS", "30"))
+
+# Statuses that mean the request was not processed (throttled or no capacity), so
+# repeating a POST cannot pay for a second generation.
+RETRYABLE_STATUSES = (429, 503)
+
+_http_metrics = get_metrics("http_client")
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """
+    Returns the process-wide keep-alive session.
+
+    Connections are pooled per host (at most HTTP_MAX_CONNECTIONS_PER_HOST; callers
+    beyond that wait for a free connection). Only failures where the server never
+    processed the request are retried, for every method including POST: connection
+    errors before the request is sent and RETRYABLE_STATUSES responses, with jittered
+    exponential backoff and Retry-After support. Read timeouts and other errors after
+    the request was sent are never retried, since :predict calls are costly and a
+    repeat would generate (and bill) again.
+    """
+    global _session
+    if _session is not None:
+        return _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=HTTP_MAX_RETRIES,
+                connect=HTTP_MAX_RETRIES,
+                read=False,  # Raise read timeouts as-is, without a retry
+                other=0,
+                status=HTTP_MAX_RETRIES,
+                allowed_methods=None,  # Status retries apply to POST as well
+                status_forcelist=RETRYABLE_STATUSES,
+                backoff_factor=HTTP_BACKOFF_BASE_SECONDS,
+                backoff_max=HTTP_BACKOFF_MAX_SECONDS,
+                backoff_jitter=HTTP_BACKOFF_BASE_SECONDS,
+                respect_retry_after_header=True,
+                raise_on_status=False,  # Hand the final response to raise_for_status()
+            )
+            adapter = HTTPAdapter(
+                pool_connections=8,
+                pool_maxsize=HTTP_MAX_CONNECTIONS_PER_HOST,
+                pool_block=True,
+                max_retries=retry,
+            )
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def post_json(url: str, headers: Dict[str, str], payload: Optional[Dict]) -> requests.Response:
+    """
+    POSTs JSON on the pooled session with connect/read timeouts and retries.
+
+    Returns:
+        The final response (after retries); callers check raise_for_status().
+
+    Raises:
+        requests.exceptions.RequestException: On connection errors that persist after
+            retries, or on the first read timeout.
+    """
+    _http_metrics.incr("requests")
+    return get_http_session().post(
+        url,
+        headers=headers,
+        json=payload,
+        timeout=(HTTP_CONNECT_TIMEOUT_SECONDS, HTTP_READ_TIMEOUT_SECONDS),
+    )
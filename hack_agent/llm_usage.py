@@ -0,0 +1,127 @@
+# Filename: llm_usage.py
+# Description: Counts LLM calls, estimated tokens and wall-clock time per agent request, so the
+#              agent modes (conversational, pipeline, fast) can be compared on the same
+#              questions. Counts are per root agent name in the "llm_usage" metrics.
+
+import contextvars
+import json
+import time
+from typing import Dict, Optional
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.tools.agent_tool import AgentTool
+
+from .metrics import get_metrics
+
+# Token counts are estimated from request/response text at this many characters per
+# token: ADK 0.4's LlmResponse drops the model's usage metadata.
+CHARS_PER_TOKEN = 4.0
+
+_usage_metrics = get_metrics("llm_usage")
+# Per-request totals. Set by the root agent's before-callback; child tasks (ParallelAgent
+# branches, AgentTool runs) inherit the same dict and add to it.
+_request_usage: contextvars.ContextVar[Optional[Dict]] = contextvars.ContextVar("llm_request_usage", default=None)
+
+
+def instrument_llm_usage(root_agent: BaseAgent) -> BaseAgent:
+    """
+    Adds request and model callbacks to root_agent and every LlmAgent below it, including
+    agents wrapped in AgentTool. Existing callbacks keep running first. Returns root_agent.
+    """
+    root_agent.before_agent_callback = _chain(root_agent.before_agent_callback, _start_request)
+    root_agent.after_agent_callback = _chain(_end_request, root_agent.after_agent_callback)
+    seen = set()
+
+    def _visit(agent: BaseAgent) -> None:
+        if id(agent) in seen:
+            return
+        seen.add(id(agent))
+        if isinstance(agent, LlmAgent):
+            agent.before_model_callback = _chain(agent.before_model_callback, _count_llm_call)
+            agent.after_model_callback = _chain(agent.after_model_callback, _count_llm_response)
+            for tool in agent.tools:
+                if isinstance(tool, AgentTool):
+                    _visit(tool.agent)
+        for sub_agent in agent.sub_agents:
+            _visit(sub_agent)
+
+    _visit(root_agent)
+    return root_agent
+
+
+def get_llm_usage_metrics() -> dict:
+    """
+    Returns, per root agent name: llm_calls, est_prompt_tokens, est_output_tokens and
+    request_seconds per request (count, mean, p50/p90/p99).
+    """
+    return _usage_metrics.snapshot()
+
+
+def _chain(first, second):
+    """Runs first, then second unless first returned a value (which short-circuits, as in ADK)."""
+    if first is None or second is None:
+        return first or second
+
+    def _both(**kwargs):
+        result = first(**kwargs)
+        return result if result is not None else second(**kwargs)
+
+    return _both
+
+
+def _start_request(callback_context):
+    _request_usage.set({"llm_calls": 0, "est_prompt_tokens": 0.0, "est_output_tokens": 0.0, "started": time.monotonic()})
+    return None
+
+
+def _end_request(callback_context):
+    usage = _request_usage.get()
+    if usage is None:
+        return None
+    name = callback_context.agent_name
+    _usage_metrics.incr(f"{name}.requests")
+    _usage_metrics.observe(f"{name}.request_seconds", time.monotonic() - usage["started"])
+    _usage_metrics.observe(f"{name}.llm_calls", usage["llm_calls"])
+    _usage_metrics.observe(f"{name}.est_prompt_tokens", usage["est_prompt_tokens"])
+    _usage_metrics.observe(f"{name}.est_output_tokens", usage["est_output_tokens"])
+    _request_usage.set(None)
+    return None
+
+
+def _count_llm_call(callback_context, llm_request):
+    usage = _request_usage.get()
+    if usage is not None:
+        usage["llm_calls"] += 1
+        usage["est_prompt_tokens"] += _request_chars(llm_request) / CHARS_PER_TOKEN
+    _usage_metrics.incr(f"{callback_context.agent_name}.llm_calls")
+    return None
+
+
+def _count_llm_response(callback_context, llm_response):
+    usage = _request_usage.get()
+    if usage is None:
+        return None
+    usage["est_output_tokens"] += _content_chars(llm_response.content) / CHARS_PER_TOKEN
+    return None
+
+
+def _request_chars(llm_request) -> int:
+    chars = sum(_content_chars(content) for content in llm_request.contents or [])
+    config = llm_request.config
+    if config is not None and isinstance(config.system_instruction, str):
+        chars += len(config.system_instruction)
+    return chars
+
+
+def _content_chars(content) -> int:
+    if content is None or not content.parts:
+        return 0
+    chars = 0
+    for part in content.parts:
+        if part.text:
+            chars += len(part.text)
+        elif part.function_call is not None:
+            chars += len(json.dumps(part.function_call.args or {})) + len(part.function_call.name or "")
+        elif part.function_response is not None:
+            chars += len(json.dumps(part.function_response.response or {}, default=str))
+    return chars
@@ -0,0 +1,283 @@
+# Filename: local_mix.py
+# Description: Mixes a TTS voice track with a Lyria soundtrack locally, without a
+#              Transcoder job. Both inputs are streamed from GCS in fixed-size blocks,
+#              resampled to a common rate, and the music is ducked under speech using
+#              an RMS envelope of the voice. The mix is streamed back to GCS as a WAV.
+
+import math
+import os
+import time
+import uuid
+from typing import Optional
+
+import numpy as np
+from google.cloud import storage
+
+from .audio_probe import AudioProbeError, split_gcs_uri, stamp_audio_duration
+from .gcs_client import get_storage_client
+from .metrics import get_metrics
+from .tool_executor import async_tool
+from .wav_utils import build_wav_header, parse_wav_header
+
+LOCAL_MIX_SAMPLE_RATE = int(os.getenv("LOCAL_MIX_SAMPLE_RATE", "48000"))
+LOCAL_MIX_CHANNELS = int(os.getenv("LOCAL_MIX_CHANNELS", "2"))
+LOCAL_MIX_BLOCK_SECONDS = float(os.getenv("LOCAL_MIX_BLOCK_SECONDS", "1.0"))
+# Music level under silence, and the extra attenuation while the voice is speaking.
+LOCAL_MIX_MUSIC_GAIN_DB = float(os.getenv("LOCAL_MIX_MUSIC_GAIN_DB", "-6"))
+LOCAL_MIX_DUCK_DB = float(os.getenv("LOCAL_MIX_DUCK_DB", "-12"))
+LOCAL_MIX_DUCK_THRESHOLD_DB = float(os.getenv("LOCAL_MIX_DUCK_THRESHOLD_DB", "-40"))
+LOCAL_MIX_ENVELOPE_MS = float(os.getenv("LOCAL_MIX_ENVELOPE_MS", "10"))
+LOCAL_MIX_ATTACK_MS = float(os.getenv("LOCAL_MIX_ATTACK_MS", "40"))
+LOCAL_MIX_RELEASE_MS = float(os.getenv("LOCAL_MIX_RELEASE_MS", "400"))
+# Music keeps playing this long after the voice ends, fading out.
+LOCAL_MIX_TAIL_SECONDS = float(os.getenv("LOCAL_MIX_TAIL_SECONDS", "1.5"))
+# Headerless .pcm voice tracks without sample_rate_hertz/channels metadata.
+LOCAL_MIX_PCM_SAMPLE_RATE = int(os.getenv("LOCAL_MIX_PCM_SAMPLE_RATE", "24000"))
+LOCAL_MIX_READ_CHUNK_BYTES = 1024 * 1024
+
+_mix_metrics = get_metrics("local_mix")
+
+
+class LocalMixError(Exception):
+    """An input is missing or not 16-bit PCM, or the mix could not be written."""
+
+
+def mix_voice_and_music(voice_uri: str, music_uri: str) -> str:
+    """
+    Overlays a soundtrack under a spoken voice track and stores the mix as a WAV in GCS.
+    The music is automatically lowered while the voice is speaking.
+
+    Args:
+        voice_uri: GCS URI of the voice audio from text_to_speech (LINEAR16 .pcm or WAV).
+        music_uri: GCS URI of the music WAV from generate_lyria_music.
+
+    Returns:
+        The GCS URI of the mixed WAV, or an error message string.
+    """
+    try:
+        voice_bucket, voice_name = split_gcs_uri(voice_uri)
+        music_bucket, music_name = split_gcs_uri(music_uri)
+        client = get_storage_client()
+        output_bucket = os.getenv("GOOGLE_CLOUD_BUCKET", voice_bucket)
+        output_blob = client.bucket(output_bucket).blob(f"mix_output_{uuid.uuid4()}.wav")
+        mix_to_gcs(
+            client.bucket(voice_bucket).blob(voice_name),
+            client.bucket(music_bucket).blob(music_name),
+            output_blob,
+        )
+        return f"gs://{output_bucket}/{output_blob.name}"
+    except (AudioProbeError, LocalMixError) as e:
+        return f"ERROR: {e}"
+    except Exception as e:
+        return f"ERROR: Local mix failed: {e.__class__.__name__}: {e}"
+
+
+# The blocking tool on its own thread pool; mixing is CPU-bound, so the pool is small.
+mix_voice_and_music_tool = async_tool(mix_voice_and_music, max_workers=2)
+
+
+def mix_to_gcs(
+    voice_blob: storage.Blob,
+    music_blob: storage.Blob,
+    output_blob: storage.Blob,
+    sample_rate: int = LOCAL_MIX_SAMPLE_RATE,
+    channels: int = LOCAL_MIX_CHANNELS,
+    block_seconds: float = LOCAL_MIX_BLOCK_SECONDS,
+) -> float:
+    """
+    Streams voice + ducked music into output_blob as a 16-bit WAV.
+
+    Memory use is bounded by block_seconds regardless of the input durations. The mix
+    lasts as long as the voice plus LOCAL_MIX_TAIL_SECONDS; shorter music is padded with
+    silence and longer music is cut, fading out over the tail.
+
+    Returns:
+        Duration of the mix in seconds.
+
+    Raises:
+        LocalMixError: If an input is missing or not 16-bit PCM.
+    """
+    started = time.monotonic()
+    voice = _Source(voice_blob, sample_rate, channels)
+    try:
+        music = _Source(music_blob, sample_rate, channels)
+        try:
+            duration = _write_mix(voice, music, output_blob, sample_rate, channels, block_seconds)
+        finally:
+            music.close()
+    finally:
+        voice.close()
+
+    elapsed = time.monotonic() - started
+    _mix_metrics.incr("mixes")
+    _mix_metrics.observe("audio_seconds", duration)
+    _mix_metrics.observe("wall_seconds", elapsed)
+    if elapsed > 0:
+        _mix_metrics.observe("realtime_multiple", duration / elapsed)
+    print(f"Local mix: {duration:.1f}s of audio in {elapsed:.2f}s ({duration / max(elapsed, 1e-9):.0f}x realtime).")
+    return duration
+
+
+def _write_mix(voice: "_Source", music: "_Source", output_blob: storage.Blob,
+               sample_rate: int, channels: int, block_seconds: float) -> float:
+    """Streams the ducked mix of two open sources into output_blob; returns its duration."""
+    tail_frames = int(LOCAL_MIX_TAIL_SECONDS * sample_rate)
+    total_frames = voice.output_frames + tail_frames
+    block_frames = max(1, int(block_seconds * sample_rate))
+    ducker = _Ducker(sample_rate)
+    music_gain = _db_to_gain(LOCAL_MIX_MUSIC_GAIN_DB)
+
+    duration = total_frames / float(sample_rate)
+    stamp_audio_duration(output_blob, duration, "wav")
+    output_blob.chunk_size = LOCAL_MIX_READ_CHUNK_BYTES
+    with output_blob.open("wb", content_type="audio/wav") as out:
+        out.write(build_wav_header(sample_rate, channels, 16, total_frames * channels * 2))
+        for start in range(0, total_frames, block_frames):
+            frames = min(block_frames, total_frames - start)
+            speech = voice.read(frames)
+            gains = ducker.gains(speech) * music_gain
+            fade_start = voice.output_frames - start
+            if fade_start < frames:
+                # Fade the music out over the tail after the voice ends.
+                position = np.arange(frames, dtype=np.float32) - fade_start
+                gains *= np.clip(1.0 - position / max(1, tail_frames), 0.0, 1.0)
+            mixed = speech + music.read(frames) * gains[:, None]
+            out.write(np.clip(np.rint(mixed * 32767.0), -32768, 32767).astype("<i2").tobytes())
+    return duration
+
+
+def get_local_mix_metrics() -> dict:
+    """Returns mix counts, audio/wall seconds and realtime multiples."""
+    return _mix_metrics.snapshot()
+
+
+def _db_to_gain(db: float) -> float:
+    return 10.0 ** (db / 20.0)
+
+
+class _Source:
+    """A 16-bit PCM object read in blocks and resampled to (sample_rate, channels) float32."""
+
+    def __init__(self, blob: storage.Blob, sample_rate: int, channels: int):
+        try:
+            blob.reload()
+        except Exception as e:
+            raise LocalMixError(f"Cannot read gs://{blob.bucket.name}/{blob.name}: {e}") from e
+        head = blob.download_as_bytes(start=0, end=min(blob.size, 64 * 1024) - 1) if blob.size else b""
+        wav = parse_wav_header(head, total_size=blob.size)
+        if wav is not None:
+            if wav.bits_per_sample != 16:
+                raise LocalMixError(f"gs://{blob.bucket.name}/{blob.name} is {wav.bits_per_sample}-bit; only 16-bit PCM is supported.")
+            self.in_rate, self.in_channels, data_offset, data_size = wav.sample_rate, wav.channels, wav.data_offset, wav.data_size
+        elif blob.name.lower().endswith(".pcm"):
+            metadata = blob.metadata or {}
+            if metadata.get("encoding", "LINEAR16") != "LINEAR16":
+                raise LocalMixError(f"gs://{blob.bucket.name}/{blob.name} is {metadata['encoding']}; only LINEAR16 is supported.")
+            self.in_rate = int(metadata.get("sample_rate_hertz") or LOCAL_MIX_PCM_SAMPLE_RATE)
+            self.in_channels = int(metadata.get("channels") or 1)
+            data_offset, data_size = 0, blob.size or 0
+        else:
+            raise LocalMixError(f"gs://{blob.bucket.name}/{blob.name} is not a WAV or LINEAR16 .pcm file.")
+
+        self.channels = channels
+        self._frame_bytes = 2 * self.in_channels
+        self._remaining = data_size - data_size % self._frame_bytes
+        self.output_frames = int(self._remaining // self._frame_bytes * sample_rate / self.in_rate)
+        self._file = blob.open("rb", chunk_size=LOCAL_MIX_READ_CHUNK_BYTES)
+        self._file.seek(data_offset)
+        self._resampler = _Resampler(self.in_rate, sample_rate)
+
+    def close(self) -> None:
+        self._file.close()
+
+    def read(self, frames: int) -> np.ndarray:
+        """Returns exactly frames output frames (zero-padded after the end of the data)."""
+        wanted = self._resampler.input_needed(frames)
+        block = self._read_input(wanted)
+        return self._remix(self._resampler.process(block, frames))
+
+    def _read_input(self, frames: int) -> np.ndarray:
+        count = min(frames * self._frame_bytes, self._remaining)
+        data = self._file.read(count) if count > 0 else b""
+        data = data[:len(data) - len(data) % self._frame_bytes]
+        self._remaining -= len(data)
+        samples = np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+        return samples.reshape(-1, self.in_channels)
+
+    def _remix(self, block: np.ndarray) -> np.ndarray:
+        if block.shape[1] == self.channels:
+            return block
+        mono = block.mean(axis=1, keepdims=True)
+        return np.repeat(mono, self.channels, axis=1)
+
+
+class _Resampler:
+    """
+    Streaming linear-interpolation resampler. Input may arrive in any block sizes; the
+    fractional read position and the last input frames carry over between blocks.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int):
+        self.step = in_rate / float(out_rate)
+        self._position = 0.0  # Fractional index into self._pending of the next output frame
+        self._pending: Optional[np.ndarray] = None
+
+    def input_needed(self, out_frames: int) -> int:
+        """New input frames required to produce out_frames outputs."""
+        last_index = self._position + (out_frames - 1) * self.step
+        have = 0 if self._pending is None else len(self._pending)
+        return max(0, int(math.floor(last_index)) + 2 - have)
+
+    def process(self, new_input: np.ndarray, out_frames: int) -> np.ndarray:
+        buffer = new_input if self._pending is None else np.concatenate([self._pending, new_input])
+        if self.step == 1.0 and self._position == 0.0:
+            out = buffer[:out_frames]
+            self._pending = buffer[out_frames:]
+        else:
+            positions = self._position + np.arange(out_frames) * self.step
+            index = np.floor(positions).astype(np.int64)
+            frac = (positions - index).astype(np.float32)[:, None]
+            shortfall = index[-1] + 2 - len(buffer)
+            padded = buffer
+            if shortfall > 0:  # End of stream: interpolate towards silence
+                padded = np.concatenate([buffer, np.zeros((shortfall, buffer.shape[1]), np.float32)])
+            out = padded[index] * (1.0 - frac) + padded[index + 1] * frac
+            advance = self._position + out_frames * self.step
+            consumed = min(int(math.floor(advance)), len(buffer))
+            self._pending = buffer[consumed:]
+            self._position = advance - consumed
+        if len(out) < out_frames:
+            out = np.concatenate([out, np.zeros((out_frames - len(out), out.shape[1]), np.float32)])
+        return out
+
+
+class _Ducker:
+    """Music gain per output frame from a windowed RMS envelope of the voice (attack/release smoothed)."""
+
+    def __init__(self, sample_rate: int):
+        self.window = max(1, int(sample_rate * LOCAL_MIX_ENVELOPE_MS / 1000.0))
+        window_seconds = self.window / float(sample_rate)
+        self.attack = 1.0 - math.exp(-window_seconds / max(1e-6, LOCAL_MIX_ATTACK_MS / 1000.0))
+        self.release = 1.0 - math.exp(-window_seconds / max(1e-6, LOCAL_MIX_RELEASE_MS / 1000.0))
+        self.threshold = _db_to_gain(LOCAL_MIX_DUCK_THRESHOLD_DB)
+        self.ducked = _db_to_gain(LOCAL_MIX_DUCK_DB)
+        self._gain = 1.0
+
+    def gains(self, voice: np.ndarray) -> np.ndarray:
+        frames = len(voice)
+        windows = -(-frames // self.window)
+        mono = voice.mean(axis=1)
+        padded = np.zeros(windows * self.window, dtype=np.float32)
+        padded[:frames] = mono
+        rms = np.sqrt(np.mean(padded.reshape(windows, self.window) ** 2, axis=1))
+        targets = np.where(rms > self.threshold, self.ducked, 1.0)
+        # One smoothing step per window (not per sample) keeps the recursive part tiny.
+        smoothed = np.empty(windows, dtype=np.float32)
+        gain = self._gain
+        for i, target in enumerate(targets):
+            gain += (target - gain) * (self.attack if target < gain else self.release)
+            smoothed[i] = gain
+        self._gain = gain
+        centers = (np.arange(windows) + 0.5) * self.window
+        return np.interp(np.arange(frames), centers, smoothed).astype(np.float32)
+
@@ -1,17 +1,63 @@
-import base64
+import binascii
+import math
+import re
+import threading
 import google.auth
-import google.auth.transport.requests
+import google.auth.exceptions
 import requests
 import os
+import time
 import uuid # For generating unique filenames
-from typing import Dict, Optional, Union # Union will be resolved to str effectively
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union # Union will be resolved to str effectively
 
 from dotenv import load_dotenv # For implicitly loading .env file
-from google.cloud import storage # For GCS upload
+from google.api_core import exceptions as google_exceptions
+
+from .audio_probe import record_audio_duration, stamp_audio_duration
+from .gcp_auth import get_access_token
+from .gcs_client import gcs_blob, get_storage_client
+from .http_client import post_json
+from .metrics import get_metrics
+from .result_cache import ResultCache, make_cache_key
+from .tool_executor import async_tool
+from .wav_utils import build_wav_header, crossfaded_length, parse_wav_header, pcm_view, write_crossfaded_pcm
 
 # Load environment variables from .env file if it exists
 load_dotenv()
 
+# Decoded audio is uploaded in chunks of this size (must be a multiple of 256 KiB).
+LYRIA_UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# --- Batch limits (what a single :predict call is allowed to carry) ---
+LYRIA_MAX_INSTANCES_PER_REQUEST = int(os.getenv("LYRIA_MAX_INSTANCES_PER_REQUEST", "1"))
+LYRIA_MAX_SAMPLE_COUNT = int(os.getenv("LYRIA_MAX_SAMPLE_COUNT", "4"))
+LYRIA_MAX_PARALLEL_REQUESTS = int(os.getenv("LYRIA_MAX_PARALLEL_REQUESTS", "4"))
+LYRIA_MAX_PARALLEL_UPLOADS = int(os.getenv("LYRIA_MAX_PARALLEL_UPLOADS", "8"))
+
+# --- Soundtrack extension (several clips stitched with crossfades) ---
+LYRIA_CLIP_SECONDS = 30.0
+LYRIA_EXTEND_CROSSFADE_SECONDS = float(os.getenv("LYRIA_EXTEND_CROSSFADE_SECONDS", "2.0"))
+LYRIA_EXTEND_MAX_CLIPS = int(os.getenv("LYRIA_EXTEND_MAX_CLIPS", "40"))
+
+# --- Result cache (normalized prompt, negative prompt, model and seed -> GCS URI) ---
+LYRIA_CACHE_ENABLED = os.getenv("LYRIA_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LYRIA_CACHE_MAX_ENTRIES = int(os.getenv("LYRIA_CACHE_MAX_ENTRIES", "128"))
+LYRIA_CACHE_TTL_SECONDS = float(os.getenv("LYRIA_CACHE_TTL_SECONDS", str(30 * 86400)))
+# Clips beyond this total size are evicted oldest first and their WAVs deleted.
+LYRIA_CACHE_MAX_BYTES = int(os.getenv("LYRIA_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+# Defaults to gs://<GOOGLE_CLOUD_BUCKET>/lyria_cache/manifest.json
+LYRIA_CACHE_MANIFEST_URI = os.getenv("LYRIA_CACHE_MANIFEST_URI")
+
+_lyria_metrics = get_metrics("lyria")
+_lyria_caches: Dict[str, ResultCache] = {}
+_lyria_caches_lock = threading.Lock()
+
+
+class LyriaError(Exception):
+    """A Lyria step failed; str(error) is the message returned to the caller."""
+
+
 # --- Helper function (no changes needed here) ---
 def _send_request_to_google_api(api_endpoint: str, access_token: str, data: Optional[Dict] = None) -> Dict:
     """Sends an HTTP request to a Google API endpoint. Can raise requests.exceptions.RequestException."""
@@ -19,8 +65,9 @@ def _send_request_to_google_api(api_endpoint: str, access_token: str, data: Opti
         "Authorization": f"Bearer {access_token}",
         "Content-Type": "application/json",
     }
+    # Pooled keep-alive session with timeouts and retries on connect errors and 429/503 (see http_client).
     # This can raise various requests.exceptions.RequestException (e.g., ConnectionError, Timeout)
-    response = requests.post(api_endpoint, headers=headers, json=data)
+    response = post_json(api_endpoint, headers, data)
     # This will raise HTTPError for bad responses (4xx or 5xx)
     response.raise_for_status()
     try:
@@ -38,6 +85,7 @@ def generate_lyria_music(
     """
     Generates a single WAV music file using Lyria, uploads it to GCS,
     and returns its GCS URI string or an error message string.
+    Repeated prompts return the previously generated clip (warm-pool prompts get a fresh pooled clip while one is ready).
     Audio length per clip	30 seconds
     
     Examples of prompts: 
@@ -50,8 +98,303 @@ def generate_lyria_music(
         negative_prompt: (Optional) Description of what to exclude.
         
     """
+    return _generate_single(prompt, negative_prompt, use_cache=LYRIA_CACHE_ENABLED)
+
+
+# The blocking tool on its own thread pool, so a Lyria request does not stall the event loop.
+generate_lyria_music_tool = async_tool(generate_lyria_music, max_workers=LYRIA_MAX_PARALLEL_REQUESTS)
+
+
+def generate_fresh_lyria_music(prompt: str, negative_prompt: str) -> str:
+    """Like generate_lyria_music, but always generates a new clip (the result is still cached)."""
+    return _generate_single(prompt, negative_prompt, use_cache=False)
+
+
+def generate_lyria_clip(prompt: str, negative_prompt: Optional[str] = None) -> Tuple[str, int]:
+    """
+    Generates one new clip without consulting or filling the cache (used by the warm pool).
+
+    Returns:
+        (GCS URI, size in bytes) of the uploaded WAV.
 
+    Raises:
+        LyriaError: With the caller-facing error message.
+    """
     # --- Resolve configuration from environment variables ---
+    settings = _lyria_settings()
+    if not prompt:
+        raise LyriaError("ERROR: A 'prompt' is required.")
+
+    # --- 1. Authentication (for Lyria API) ---
+    access_token = _lyria_access_token()
+
+    # --- 2./3. Endpoint and request payload ---
+    instance_payload: Dict[str, Union[str, int]] = {"prompt": prompt}
+    if negative_prompt: instance_payload["negative_prompt"] = negative_prompt
+    request_body = {"instances": [instance_payload], "parameters": {}}
+
+    # --- 4. Send request to the Lyria API ---
+    predictions = _predict(settings, access_token, request_body)
+
+    # --- 5./6. Stream the first prediction's decoded WAV straight to GCS ---
+    bucket = _lyria_bucket(settings)
+    return _upload_prediction(bucket, settings["bucket_name"], predictions[0]) # Process only the first prediction
+
+
+def cache_lyria_clip(prompt: str, negative_prompt: Optional[str], gcs_uri: str, size_bytes: int) -> None:
+    """Records an existing clip as the cached result for prompt/negative_prompt."""
+    settings = _lyria_settings()
+    cache_key = _lyria_cache_key(settings, prompt, negative_prompt, seed=None, variant=0)
+    _get_lyria_cache(settings).put(cache_key, gcs_uri, size_bytes=size_bytes)
+
+
+def _generate_single(prompt: str, negative_prompt: str, use_cache: bool) -> str:
+    try:
+        settings = _lyria_settings()
+        if not prompt:
+            return "ERROR: A 'prompt' is required."
+
+        if use_cache:
+            # --- Warm pool first: a fresh pre-generated clip for a configured prompt
+            #     template. Pooled clips are not cached, so every request for a template
+            #     takes the next clip and the refilled ones get used.
+            from .lyria_pool import take_pooled_clip # Imported lazily; the pool builds on this module
+            pooled = take_pooled_clip(prompt, negative_prompt)
+            if pooled is not None:
+                return pooled[0]
+
+        # --- Cache lookup (no auth or network on a memory hit) ---
+        cache = _get_lyria_cache(settings)
+        cache_key = _lyria_cache_key(settings, prompt, negative_prompt, seed=None, variant=0)
+        if use_cache:
+            cached_uri = cache.get(cache_key)
+            if cached_uri:
+                print(f"Lyria cache hit: {cached_uri}")
+                return cached_uri
+
+        gcs_uri, size_bytes = generate_lyria_clip(prompt, negative_prompt)
+        cache.put(cache_key, gcs_uri, size_bytes=size_bytes)
+        return gcs_uri
+    except LyriaError as e:
+        return str(e)
+
+
+def generate_lyria_music_batch(items: List[Dict], use_cache: bool = LYRIA_CACHE_ENABLED) -> List[str]:
+    """
+    Generates many Lyria clips with as few :predict calls as the endpoint allows.
+
+    Items without a seed that share a prompt and negative prompt are folded into one
+    instance with sample_count (up to LYRIA_MAX_SAMPLE_COUNT); seeded items get their
+    own instance, since Lyria does not accept seed and sample_count together. Instances
+    are packed LYRIA_MAX_INSTANCES_PER_REQUEST per call, calls run concurrently, and
+    every returned prediction is decoded and uploaded concurrently.
+
+    Cached clips are reused per item: a seeded item matches its seed, and the n-th
+    seedless item with a given prompt matches the n-th cached variant of that prompt.
+
+    Args:
+        items: Dicts with "prompt" and optional "negative_prompt" and "seed" keys.
+        use_cache: Set to False to generate fresh clips for every item.
+
+    Returns:
+        One entry per item, in input order: the GCS URI of its clip, or an
+        "ERROR: ..." message if that item could not be generated.
+    """
+    results: List[Optional[str]] = [None] * len(items)
+    started = time.monotonic()
+    try:
+        settings = _lyria_settings()
+    except LyriaError as e:
+        return [str(e)] * len(items)
+
+    # 1. Resolve cache hits, then build instances for the rest; each instance remembers
+    #    which item indices its samples belong to.
+    cache = _get_lyria_cache(settings)
+    cache_keys: Dict[int, str] = {}
+    variants: Dict[Tuple[str, str], int] = {}
+    instances: List[Tuple[Dict, List[int]]] = []
+    unseeded: Dict[Tuple[str, str], List[int]] = {}
+    for index, item in enumerate(items):
+        if not item.get("prompt"):
+            results[index] = "ERROR: A 'prompt' is required."
+            continue
+        seed = item.get("seed")
+        normalized = (normalize_prompt(item["prompt"]), normalize_prompt(item.get("negative_prompt")))
+        variant = 0
+        if seed is None:
+            variant = variants.get(normalized, 0)
+            variants[normalized] = variant + 1
+        cache_keys[index] = _lyria_cache_key(settings, item["prompt"], item.get("negative_prompt"), seed, variant)
+        if use_cache:
+            results[index] = cache.get(cache_keys[index])
+            if results[index]:
+                continue
+        if seed is not None:
+            instances.append((_instance_payload(item, seed=seed), [index]))
+        else:
+            unseeded.setdefault(normalized, []).append(index)
+    if not instances and not unseeded:
+        _lyria_metrics.incr("batch_cache_only")
+        return [result or "ERROR: An unknown error occurred after processing predictions." for result in results]
+
+    try:
+        access_token = _lyria_access_token()
+        bucket = _lyria_bucket(settings)
+    except LyriaError as e:
+        return [result or str(e) for result in results]
+    for indices in unseeded.values():
+        for start in range(0, len(indices), max(1, LYRIA_MAX_SAMPLE_COUNT)):
+            group = indices[start:start + max(1, LYRIA_MAX_SAMPLE_COUNT)]
+            payload = _instance_payload(items[group[0]], seed=None)
+            if len(group) > 1:
+                payload["sample_count"] = len(group)
+            instances.append((payload, group))
+
+    # 2. Pack instances into requests and send them concurrently.
+    requests_to_send = [
+        instances[start:start + LYRIA_MAX_INSTANCES_PER_REQUEST]
+        for start in range(0, len(instances), max(1, LYRIA_MAX_INSTANCES_PER_REQUEST))
+    ]
+
+    def _run_request(packed: List[Tuple[Dict, List[int]]]) -> List[Tuple[int, Union[Dict, str]]]:
+        owners = [index for _, indices in packed for index in indices]
+        body = {"instances": [payload for payload, _ in packed], "parameters": {}}
+        try:
+            predictions = _predict(settings, access_token, body)
+        except LyriaError as e:
+            return [(index, str(e)) for index in owners]
+        # Predictions come back instance by instance, sample_count each. The response does
+        # not say which instance a prediction belongs to, so if the count is off nothing
+        # can be attributed safely and the whole request fails.
+        if len(predictions) != len(owners):
+            error = (f"ERROR: Lyria returned {len(predictions)} predictions for {len(owners)} requested "
+                     f"samples across {len(packed)} instance(s); discarding them.")
+            return [(index, error) for index in owners]
+        results_by_instance = []
+        offset = 0
+        for _, indices in packed:
+            results_by_instance.extend(zip(indices, predictions[offset:offset + len(indices)]))
+            offset += len(indices)
+        return results_by_instance
+
+    # 3. Decode and upload every prediction concurrently as soon as its request returns.
+    def _upload(index: int, prediction: Dict) -> Tuple[int, str]:
+        try:
+            gcs_uri, size_bytes = _upload_prediction(bucket, settings["bucket_name"], prediction)
+            cache.put(cache_keys[index], gcs_uri, size_bytes=size_bytes)
+            return index, gcs_uri
+        except LyriaError as e:
+            return index, str(e)
+
+    with ThreadPoolExecutor(max_workers=max(1, LYRIA_MAX_PARALLEL_UPLOADS)) as upload_pool:
+        uploads = []
+        with ThreadPoolExecutor(max_workers=max(1, LYRIA_MAX_PARALLEL_REQUESTS)) as request_pool:
+            for outcome in request_pool.map(_run_request, requests_to_send):
+                for index, prediction in outcome:
+                    if isinstance(prediction, str):
+                        results[index] = prediction
+                    else:
+                        uploads.append(upload_pool.submit(_upload, index, prediction))
+        for future in uploads:
+            index, uri = future.result()
+            results[index] = uri
+
+    elapsed = time.monotonic() - started
+    clips = sum(1 for result in results if result and not result.startswith("ERROR"))
+    _lyria_metrics.incr("batch_clips", clips)
+    _lyria_metrics.incr("batch_predict_calls", len(requests_to_send))
+    if elapsed > 0:
+        _lyria_metrics.observe("batch_clips_per_minute", clips * 60.0 / elapsed)
+    print(f"Lyria batch: {clips}/{len(items)} clips in {elapsed:.1f}s using {len(requests_to_send)} :predict call(s).")
+    return [result or "ERROR: An unknown error occurred after processing predictions." for result in results]
+
+
+def extend_lyria_soundtrack(
+    prompt: str,
+    negative_prompt: str,
+    target_duration_seconds: float,
+    crossfade_seconds: float = LYRIA_EXTEND_CROSSFADE_SECONDS,
+) -> str:
+    """
+    Generates a soundtrack at least target_duration_seconds long as one WAV in GCS.
+
+    Lyria clips are 30 seconds, so enough clips for the target (see soundtrack_clip_count)
+    are generated concurrently from the same prompt and joined with equal-power
+    crossfades of crossfade_seconds. Stitching streams each clip's PCM straight into the
+    upload; only the overlapped frames are copied.
+
+    Args:
+        prompt: Description of the music, as for generate_lyria_music.
+        negative_prompt: (Optional) Description of what to exclude.
+        target_duration_seconds: Minimum length, usually the narration's duration.
+        crossfade_seconds: Overlap between consecutive clips.
+
+    Returns:
+        The GCS URI of the soundtrack WAV, or an "ERROR: ..." message.
+    """
+    try:
+        settings = _lyria_settings()
+        if not prompt:
+            return "ERROR: A 'prompt' is required."
+        if not target_duration_seconds or target_duration_seconds <= 0:
+            return "ERROR: target_duration_seconds must be positive."
+        clip_count = soundtrack_clip_count(target_duration_seconds, crossfade_seconds)
+        if clip_count == 1:
+            return _generate_single(prompt, negative_prompt, use_cache=LYRIA_CACHE_ENABLED)
+        if clip_count > LYRIA_EXTEND_MAX_CLIPS:
+            return f"ERROR: A {target_duration_seconds:.0f}s soundtrack needs {clip_count} clips; the limit is {LYRIA_EXTEND_MAX_CLIPS} (LYRIA_EXTEND_MAX_CLIPS)."
+
+        cache = _get_lyria_cache(settings)
+        cache_key = _lyria_cache_key(
+            settings, prompt, negative_prompt, seed=None, variant=f"soundtrack:{clip_count}:{crossfade_seconds:g}"
+        )
+        if LYRIA_CACHE_ENABLED:
+            cached_uri = cache.get(cache_key)
+            if cached_uri:
+                print(f"Lyria soundtrack cache hit: {cached_uri}")
+                return cached_uri
+
+        started = time.monotonic()
+        access_token = _lyria_access_token()
+        clips = _generate_decoded_clips(settings, access_token, prompt, negative_prompt, clip_count)
+        generated = time.monotonic()
+
+        bucket = _lyria_bucket(settings)
+        blob_name = f"lyria_soundtrack_{uuid.uuid4()}.wav"
+        size_bytes = _upload_stitched_clips(bucket, blob_name, clips, crossfade_seconds)
+        gcs_uri = f"gs://{settings['bucket_name']}/{blob_name}"
+        _lyria_metrics.observe("extend_generate_seconds", generated - started)
+        _lyria_metrics.observe("extend_stitch_upload_seconds", time.monotonic() - generated)
+        print(f"✅ {clip_count}-clip soundtrack uploaded to GCS: {gcs_uri}")
+        cache.put(cache_key, gcs_uri, size_bytes=size_bytes)
+        return gcs_uri
+    except LyriaError as e:
+        return str(e)
+
+
+def soundtrack_clip_count(target_duration_seconds: float, crossfade_seconds: float) -> int:
+    """Clips needed so that n clips overlapped by crossfade_seconds cover the target."""
+    step = LYRIA_CLIP_SECONDS - crossfade_seconds
+    if step <= 0:
+        raise LyriaError(f"ERROR: crossfade_seconds must be shorter than a {LYRIA_CLIP_SECONDS:.0f}s clip.")
+    return max(1, math.ceil((target_duration_seconds - crossfade_seconds) / step))
+
+
+def get_lyria_metrics() -> dict:
+    """Returns Lyria counters, including batch clips-per-minute throughput."""
+    return _lyria_metrics.snapshot()
+
+
+def get_lyria_cache_stats() -> dict:
+    """Returns hit/miss counters and sizes of the Lyria result cache."""
+    with _lyria_caches_lock:
+        caches = list(_lyria_caches.values())
+    return caches[0].stats() if caches else get_metrics("lyria_cache").snapshot()
+
+
+# --- Internal helpers (raise LyriaError with a caller-facing message) ---
+
+def _lyria_settings() -> Dict[str, str]:
     resolved_project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
     # Using GOOGLE_CLOUD_LOCATION for consistency if preferred, or stick to LYRIA_LOCATION
     resolved_location = os.getenv("GOOGLE_CLOUD_LOCATION", os.getenv("LYRIA_LOCATION", "us-central1"))
@@ -59,45 +402,102 @@ def generate_lyria_music(
     gcs_bucket_name = os.getenv("GOOGLE_CLOUD_BUCKET", "byron-alpha-vpagent") # As per user's last snippet
 
     if not resolved_project_id:
-        return "ERROR: GOOGLE_CLOUD_PROJECT environment variable must be set."
+        raise LyriaError("ERROR: GOOGLE_CLOUD_PROJECT environment variable must be set.")
     if not gcs_bucket_name:
-        return "ERROR: GOOGLE_CLOUD_BUCKET environment variable must be set for Lyria output."
-    if not prompt:
-        return "ERROR: A 'prompt' is required."
-    
-    # --- 1. Authentication (for Lyria API) ---
-    access_token: Optional[str] = None
+        raise LyriaError("ERROR: GOOGLE_CLOUD_BUCKET environment variable must be set for Lyria output.")
+    return {
+        "project_id": resolved_project_id,
+        "location": resolved_location,
+        "model_id": resolved_model_id,
+        "bucket_name": gcs_bucket_name,
+    }
+
+
+def _lyria_access_token() -> str:
+    # The token is cached process-wide and only refreshed shortly before it expires.
     try:
-        creds, _ = google.auth.default(scopes=['https://www.googleapis.com/auth/cloud-platform'])
-        auth_req = google.auth.transport.requests.Request()
-        creds.refresh(auth_req)
-        access_token = creds.token
-        if not access_token: # Should not happen if creds.refresh succeeded without error
-            return "ERROR: Failed to obtain access token after credential refresh."
+        return get_access_token()
     except google.auth.exceptions.DefaultCredentialsError:
-        return "ERROR: Google Cloud ADC not found. Run 'gcloud auth application-default login'."
+        raise LyriaError("ERROR: Google Cloud ADC not found. Run 'gcloud auth application-default login'.")
     except google.auth.exceptions.RefreshError as e:
-        return f"ERROR: Could not refresh access token: {e}."
+        raise LyriaError(f"ERROR: Could not refresh access token: {e}.")
+    except ValueError:
+        raise LyriaError("ERROR: Failed to obtain access token after credential refresh.")
     except Exception as e_auth: # Catch any other unexpected auth errors
-        return f"ERROR: An unexpected authentication error occurred: {e_auth}."
+        raise LyriaError(f"ERROR: An unexpected authentication error occurred: {e_auth}.")
 
 
-    # --- 2. Construct Lyria API Endpoint ---
-    api_endpoint = (
-        f"https://{resolved_location}-aiplatform.googleapis.com/v1/projects/{resolved_project_id}"
-        f"/locations/{resolved_location}/publishers/google/models/{resolved_model_id}:predict"
+def _lyria_endpoint(settings: Dict[str, str]) -> str:
+    return (
+        f"https://{settings['location']}-aiplatform.googleapis.com/v1/projects/{settings['project_id']}"
+        f"/locations/{settings['location']}/publishers/google/models/{settings['model_id']}:predict"
     )
 
-    # --- 3. Prepare Lyria request payload ---
-    instance_payload: Dict[str, Union[str, int]] = {"prompt": prompt}
-    if negative_prompt: instance_payload["negative_prompt"] = negative_prompt
 
+def _lyria_bucket(settings: Dict[str, str]):
+    try:
+        return get_storage_client(settings["project_id"]).bucket(settings["bucket_name"])
+    except Exception as e_gcs_client:
+        raise LyriaError(f"ERROR: Failed to initialize GCS client or bucket '{settings['bucket_name']}': {e_gcs_client}.")
 
-    request_body = {"instances": [instance_payload], "parameters": {}}
-    print(f"Sending request to Lyria model: {request_body} at {api_endpoint}")
 
-    # --- 4. Send request to the Lyria API ---
-    response_json: Optional[Dict] = None
+def normalize_prompt(prompt: Optional[str]) -> str:
+    """Case- and whitespace-insensitive form of a prompt, so trivial rewordings share a clip."""
+    return re.sub(r"\s+", " ", (prompt or "").strip().lower()).rstrip(".!")
+
+
+def _lyria_cache_key(settings: Dict[str, str], prompt: str, negative_prompt: Optional[str],
+                     seed: Optional[int], variant: Union[int, str]) -> str:
+    return make_cache_key(
+        prompt=normalize_prompt(prompt),
+        negative_prompt=normalize_prompt(negative_prompt),
+        model_id=settings["model_id"],
+        seed=None if seed is None else int(seed),
+        variant=variant,
+    )
+
+
+def _get_lyria_cache(settings: Dict[str, str]) -> ResultCache:
+    """Returns the cache whose manifest lives in the output bucket (one per manifest URI)."""
+    manifest_uri = LYRIA_CACHE_MANIFEST_URI or f"gs://{settings['bucket_name']}/lyria_cache/manifest.json"
+    with _lyria_caches_lock:
+        cache = _lyria_caches.get(manifest_uri)
+        if cache is None:
+            cache = ResultCache(
+                name="lyria_cache",
+                max_entries=LYRIA_CACHE_MAX_ENTRIES,
+                ttl_seconds=LYRIA_CACHE_TTL_SECONDS,
+                index_path=manifest_uri,
+                max_total_bytes=LYRIA_CACHE_MAX_BYTES,
+                on_evict=_delete_evicted_clip,
+            )
+            _lyria_caches[manifest_uri] = cache
+        return cache
+
+
+def _delete_evicted_clip(_key: str, entry: Dict) -> None:
+    """Deletes the WAV behind an evicted cache entry so the bucket does not collect orphans."""
+    uri = entry.get("value", "")
+    if not uri.startswith("gs://"):
+        return
+    try:
+        gcs_blob(uri).delete()
+        _lyria_metrics.incr("cache_blobs_deleted")
+    except google_exceptions.NotFound:
+        pass
+
+
+def _instance_payload(item: Dict, seed: Optional[int]) -> Dict[str, Union[str, int]]:
+    instance_payload: Dict[str, Union[str, int]] = {"prompt": item["prompt"]}
+    if item.get("negative_prompt"): instance_payload["negative_prompt"] = item["negative_prompt"]
+    if seed is not None: instance_payload["seed"] = int(seed)
+    return instance_payload
+
+
+def _predict(settings: Dict[str, str], access_token: str, request_body: Dict) -> List[Dict]:
+    """Calls :predict and returns the non-empty predictions list."""
+    api_endpoint = _lyria_endpoint(settings)
+    print(f"Sending request to Lyria model: {request_body} at {api_endpoint}")
     try:
         response_json = _send_request_to_google_api(api_endpoint, access_token, request_body)
     except requests.exceptions.HTTPError as e_http:
@@ -108,79 +508,158 @@ def generate_lyria_music(
             except Exception:
                 error_message += " Could not decode response content."
         print(error_message)
-        return error_message
+        raise LyriaError(error_message)
     except requests.exceptions.RequestException as e_req: # Catches other network/request issues
         error_message = f"Lyria API Request Failed (e.g., network issue): {e_req}."
         print(error_message)
-        return error_message
+        raise LyriaError(error_message)
     except ValueError as e_json_decode: # Catches JSONDecodeError from helper or other ValueErrors
         error_message = f"Error processing Lyria API response (likely JSON decoding): {e_json_decode}."
         print(error_message)
-        return error_message
+        raise LyriaError(error_message)
     except Exception as e_unexpected_api: # Fallback for truly unexpected errors in API call
         error_message = f"An unexpected error occurred during Lyria API call: {e_unexpected_api}."
         print(error_message)
-        return error_message
+        raise LyriaError(error_message)
 
-    # --- 5. Initialize GCS Client ---
-    try:
-        storage_client = storage.Client(project=resolved_project_id)
-        bucket = storage_client.bucket(gcs_bucket_name)
-    except Exception as e_gcs_client:
-        return f"ERROR: Failed to initialize GCS client or bucket '{gcs_bucket_name}': {e_gcs_client}."
-
-    # --- 6. Process first prediction, save WAV locally, upload to GCS, and cleanup ---
     if not response_json or "predictions" not in response_json or not response_json["predictions"]:
-        return "ERROR: API response did not contain 'predictions' or predictions list is empty."
+        raise LyriaError("ERROR: API response did not contain 'predictions' or predictions list is empty.")
+    return response_json["predictions"]
 
-    pred_data = response_json["predictions"][0] # Process only the first prediction
 
+def _upload_prediction(bucket, gcs_bucket_name: str, pred_data: Dict) -> Tuple[str, int]:
+    """Streams one prediction's decoded WAV to a new GCS object; returns (URI, size in bytes)."""
     if "bytesBase64Encoded" not in pred_data:
-        return "ERROR: First prediction from API is missing 'bytesBase64Encoded' data."
-    
-    bytes_b64 = pred_data["bytesBase64Encoded"]
-    try:
-        decoded_wav_data = base64.b64decode(bytes_b64)
-    except base64.binascii.Error as e_decode:
-        return f"ERROR: Failed to decode base64 audio data from API prediction: {e_decode}."
+        raise LyriaError("ERROR: Prediction from API is missing 'bytesBase64Encoded' data.")
 
-    local_wav_filename = f"lyria_output_{uuid.uuid4()}.wav"
-    blob_name = local_wav_filename
-    gcs_uri_result: Optional[str] = None
+    # Detach the base64 string so it is freed as soon as this upload finishes.
+    bytes_b64 = pred_data.pop("bytesBase64Encoded")
 
+    blob_name = f"lyria_output_{uuid.uuid4()}.wav"
+    gcs_uri_result = f"gs://{gcs_bucket_name}/{blob_name}"
     try:
-        # a. Save decoded WAV data locally
-        with open(local_wav_filename, "wb") as out_wav:
-            out_wav.write(decoded_wav_data)
-        print(f"Audio content temporarily written to: '{local_wav_filename}'")
-
-        # b. Upload local WAV to GCS
-        blob = bucket.blob(blob_name)
-        print(f"Uploading '{local_wav_filename}' to GCS bucket '{gcs_bucket_name}'...")
-        blob.upload_from_filename(local_wav_filename, content_type='audio/wav')
-        gcs_uri_result = f"gs://{gcs_bucket_name}/{blob_name}"
+        print(f"Uploading Lyria audio to GCS bucket '{gcs_bucket_name}'...")
+        size_bytes = _upload_base64_audio(bucket, blob_name, bytes_b64)
         print(f"✅ Audio successfully uploaded to GCS: {gcs_uri_result}")
+        return gcs_uri_result, size_bytes # Success path
+    except binascii.Error as e_decode:
+        raise LyriaError(f"ERROR: Failed to decode base64 audio data from API prediction: {e_decode}.")
+    except Exception as e_upload:
+        raise LyriaError(f"ERROR during GCS upload: {e_upload}.")
 
-        # c. Clean up local WAV file (after successful upload)
-        try:
-            os.remove(local_wav_filename)
-            print(f"Local WAV file '{local_wav_filename}' removed.")
-        except OSError as e_remove:
-            # Log/print warning but still return success URI as upload was successful
-            print(f"WARNING: Upload to {gcs_uri_result} Succeeded, BUT failed to remove local file '{local_wav_filename}': {e_remove}.")
-        
-        return gcs_uri_result # Success path
 
-    except Exception as e_main_op: # Covers local write or GCS upload errors
-        # Attempt to clean up local file if it exists, even on failure
-        if os.path.exists(local_wav_filename):
+def _generate_decoded_clips(
+    settings: Dict[str, str], access_token: str, prompt: str, negative_prompt: Optional[str], clip_count: int
+) -> List[bytes]:
+    """Requests clip_count samples of one prompt concurrently and returns the decoded WAVs in order."""
+    samples_per_instance = max(1, LYRIA_MAX_SAMPLE_COUNT)
+    instances = []
+    for start in range(0, clip_count, samples_per_instance):
+        payload = _instance_payload({"prompt": prompt, "negative_prompt": negative_prompt}, seed=None)
+        samples = min(samples_per_instance, clip_count - start)
+        if samples > 1:
+            payload["sample_count"] = samples
+        instances.append(payload)
+    per_request = max(1, LYRIA_MAX_INSTANCES_PER_REQUEST)
+    bodies = [
+        {"instances": instances[start:start + per_request], "parameters": {}}
+        for start in range(0, len(instances), per_request)
+    ]
+
+    def _run(body: Dict) -> List[bytes]:
+        decoded = []
+        for prediction in _predict(settings, access_token, body):
+            if "bytesBase64Encoded" not in prediction:
+                raise LyriaError("ERROR: Prediction from API is missing 'bytesBase64Encoded' data.")
             try:
-                os.remove(local_wav_filename)
-                print(f"Cleaned up local file '{local_wav_filename}' after error: {e_main_op}.")
-            except OSError as e_rem_on_fail:
-                print(f"WARNING: Failed to remove local file '{local_wav_filename}' after an error during main operation: {e_rem_on_fail}")
-        return f"ERROR during local file write or GCS upload: {e_main_op}."
+                decoded.append(binascii.a2b_base64(prediction.pop("bytesBase64Encoded"), strict_mode=True))
+            except binascii.Error as e_decode:
+                raise LyriaError(f"ERROR: Failed to decode base64 audio data from API prediction: {e_decode}.")
+        return decoded
+
+    with ThreadPoolExecutor(max_workers=max(1, min(len(bodies), LYRIA_MAX_PARALLEL_REQUESTS))) as pool:
+        clips = [clip for decoded in pool.map(_run, bodies) for clip in decoded]
+    if len(clips) < clip_count:
+        raise LyriaError("ERROR: Lyria returned fewer predictions than requested.")
+    return clips[:clip_count]
+
 
-    # Fallback - This should ideally not be reached if all paths are covered.
-    return "ERROR: An unknown error occurred after processing predictions."
+def _upload_stitched_clips(bucket, blob_name: str, clips: List[bytes], crossfade_seconds: float) -> int:
+    """Streams the crossfaded concatenation of WAV clips into one GCS object; returns its size."""
+    formats = [parse_wav_header(clip) for clip in clips]
+    first = formats[0]
+    if first is None or any(
+        f is None or (f.sample_rate, f.channels, f.bits_per_sample) != (first.sample_rate, first.channels, 16)
+        for f in formats
+    ):
+        raise LyriaError("ERROR: Lyria clips are not all 16-bit WAV with the same sample rate and channels.")
 
+    views = [pcm_view(clip) for clip in clips]
+    crossfade_frames = int(first.sample_rate * crossfade_seconds)
+    data_size = crossfaded_length([len(view) for view in views], first.channels, crossfade_frames)
+    try:
+        blob = bucket.blob(blob_name)
+        blob.chunk_size = LYRIA_UPLOAD_CHUNK_BYTES
+        stamp_audio_duration(blob, data_size / float(first.sample_rate * first.channels * 2), "wav")
+        with blob.open("wb", content_type="audio/wav") as out:
+            out.write(build_wav_header(first.sample_rate, first.channels, 16, data_size))
+            write_crossfaded_pcm(out, views, first.channels, crossfade_frames)
+    except Exception as e_upload:
+        raise LyriaError(f"ERROR during GCS upload: {e_upload}.")
+    return 44 + data_size
+
+
+def _upload_base64_audio(bucket, blob_name: str, bytes_b64: str) -> int:
+    """
+    Decodes base64 WAV data incrementally into a resumable GCS upload and returns the
+    decoded size in bytes.
+
+    The string is validated before the upload starts, then decoded in small pieces
+    straight into the blob writer, so little more than one upload chunk of decoded audio
+    is in memory and nothing is written to local disk. If the upload fails, the partial
+    object is deleted.
+
+    Raises:
+        binascii.Error: If bytes_b64 is not valid base64 (nothing is uploaded).
+    """
+    encoded = bytes_b64.strip()
+    if len(encoded) % 4 or not _BASE64_RE.fullmatch(encoded):
+        raise binascii.Error("Invalid base64 audio data (bad length, alphabet or padding).")
+    decoded_size = len(encoded) // 4 * 3 - encoded.count("=", -2)
+
+    blob = bucket.blob(blob_name)
+    blob.chunk_size = LYRIA_UPLOAD_CHUNK_BYTES
+    wav = parse_wav_header(binascii.a2b_base64(encoded[:4096]), total_size=decoded_size)
+    if wav is not None:
+        stamp_audio_duration(blob, wav.duration_seconds, "wav")
+    step = _BASE64_DECODE_BYTES // 3 * 4  # Whole 4-character groups
+    out = blob.open("wb", content_type="audio/wav")
+    try:
+        for start in range(0, len(encoded), step):
+            out.write(binascii.a2b_base64(encoded[start:start + step]))
+        out.close()
+    except Exception:
+        _discard_partial_upload(blob, out)
+        raise
+    if wav is not None:
+        record_audio_duration(blob, wav.duration_seconds, "wav")
+    return decoded_size
+
+
+_BASE64_RE = re.compile(r"[A-Za-z0-9+/]*={0,2}")
+# Decoded bytes handed to the writer per write; the writer buffers up to one upload chunk.
+_BASE64_DECODE_BYTES = 256 * 1024
+
+
+def _discard_partial_upload(blob, writer) -> None:
+    """Closes a failed writer (so it cannot finalize later) and deletes whatever it wrote."""
+    try:
+        writer.close()
+    except Exception:
+        pass
+    try:
+        blob.delete()
+    except google_exceptions.NotFound:
+        pass
+    except Exception as e:
+        print(f"Warning: could not delete partial upload gs://{blob.bucket.name}/{blob.name}: {e}")
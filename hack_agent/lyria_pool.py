@@ -0,0 +1,306 @@
+# Filename: lyria_pool.py
+# Description: Warm pool of pre-generated Lyria clips for configured prompt templates.
+#              A background asyncio worker keeps up to K clips per template, refilling
+#              under a clips-per-minute budget, so the first request for a mood is served
+#              without waiting on Lyria.
+
+import asyncio
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from google.api_core import exceptions as google_exceptions
+
+from .gcs_client import gcs_blob
+from .lyria_music import LyriaError, generate_lyria_clip, normalize_prompt
+from .metrics import get_metrics
+
+# Templates: a JSON list of prompts or {"prompt": ..., "negative_prompt": ...} objects,
+# or prompts separated by "|", e.g. "a hot edm soundtrack|a calm acoustic guitar piece".
+LYRIA_POOL_TEMPLATES = os.getenv("LYRIA_POOL_TEMPLATES", "")
+LYRIA_POOL_DEPTH = int(os.getenv("LYRIA_POOL_DEPTH", "2"))
+LYRIA_POOL_CLIPS_PER_MINUTE = float(os.getenv("LYRIA_POOL_CLIPS_PER_MINUTE", "4"))
+LYRIA_POOL_MAX_CONCURRENT = int(os.getenv("LYRIA_POOL_MAX_CONCURRENT", "2"))
+# "round_robin" rotates through a template's clips; "lru" hands out the least recently used one.
+LYRIA_POOL_ORDER = os.getenv("LYRIA_POOL_ORDER", "round_robin")
+# A clip is retired (and replaced) after this many hand-outs; 1 means every clip is used once.
+LYRIA_POOL_MAX_USES = int(os.getenv("LYRIA_POOL_MAX_USES", "1"))
+LYRIA_POOL_IDLE_SECONDS = float(os.getenv("LYRIA_POOL_IDLE_SECONDS", "5"))
+# Delete never-used clips from GCS at interpreter exit. Off by default: other processes
+# sharing the bucket may still hand them out, and network calls during shutdown are fragile.
+LYRIA_POOL_DELETE_ON_EXIT = os.getenv("LYRIA_POOL_DELETE_ON_EXIT", "false").lower() in ("1", "true", "yes")
+
+POOL_ORDERS = ("round_robin", "lru")
+
+
+class _PooledClip:
+    __slots__ = ("gcs_uri", "size_bytes", "created_at", "last_used_at", "uses")
+
+    def __init__(self, gcs_uri: str, size_bytes: int):
+        self.gcs_uri = gcs_uri
+        self.size_bytes = size_bytes
+        self.created_at = time.time()
+        self.last_used_at = 0.0
+        self.uses = 0
+
+
+class LyriaClipPool:
+    """
+    Keeps up to depth ready clips per prompt template and refills them in the background.
+
+    Requests match a template when their normalized prompt and negative prompt are equal
+    (see lyria_music.normalize_prompt). Refills run on a dedicated event loop thread; each
+    generation is a blocking Lyria call run in a worker thread, at most max_concurrent at a
+    time and at most clips_per_minute overall (token bucket).
+    """
+
+    def __init__(
+        self,
+        templates: List[Dict[str, str]],
+        depth: int = LYRIA_POOL_DEPTH,
+        clips_per_minute: float = LYRIA_POOL_CLIPS_PER_MINUTE,
+        max_concurrent: int = LYRIA_POOL_MAX_CONCURRENT,
+        order: str = LYRIA_POOL_ORDER,
+        max_uses: int = LYRIA_POOL_MAX_USES,
+        generate: Callable[[str, Optional[str]], Tuple[str, int]] = generate_lyria_clip,
+    ):
+        if order not in POOL_ORDERS:
+            raise ValueError(f"Invalid pool order '{order}'. Valid options are: {', '.join(POOL_ORDERS)}")
+        self.templates = {self._key(t["prompt"], t.get("negative_prompt")): t for t in templates}
+        self.depth = depth
+        self.clips_per_minute = clips_per_minute
+        self.max_concurrent = max(1, max_concurrent)
+        self.order = order
+        self.max_uses = max(1, max_uses)
+        self.metrics = get_metrics("lyria_pool")
+        self._generate = generate
+        self._lock = threading.Lock()
+        self._clips: Dict[Tuple[str, str], Deque[_PooledClip]] = {key: deque() for key in self.templates}
+        self._in_flight: Dict[Tuple[str, str], int] = {key: 0 for key in self.templates}
+        self._tokens = float(max(1, self.max_concurrent))
+        self._tokens_at = time.monotonic()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    @staticmethod
+    def _key(prompt: str, negative_prompt: Optional[str]) -> Tuple[str, str]:
+        return normalize_prompt(prompt), normalize_prompt(negative_prompt)
+
+    # --- Hand-out ---
+
+    def take(self, prompt: str, negative_prompt: Optional[str]) -> Optional[Tuple[str, int]]:
+        """
+        Returns (GCS URI, size in bytes) of a ready clip for a matching template, or None
+        if no template matches or the template's clips are all in use.
+        """
+        key = self._key(prompt, negative_prompt)
+        with self._lock:
+            clips = self._clips.get(key)
+            if clips is None:
+                return None
+            if not clips:
+                self.metrics.incr("misses")
+                self._wake_refill()
+                return None
+            if self.order == "lru":
+                clip = min(clips, key=lambda c: c.last_used_at)
+                clips.remove(clip)
+            else:
+                clip = clips.popleft()
+            clip.uses += 1
+            clip.last_used_at = time.time()
+            if clip.uses < self.max_uses:
+                clips.append(clip)
+            self._update_depth_locked(key)
+        self.metrics.incr("hits")
+        self._wake_refill()
+        return clip.gcs_uri, clip.size_bytes
+
+    def stats(self) -> Dict:
+        """Returns pool depth per template, hit rate and refill latency."""
+        snapshot = self.metrics.snapshot()
+        hits = snapshot["counters"].get("hits", 0)
+        misses = snapshot["counters"].get("misses", 0)
+        snapshot["hit_rate"] = hits / (hits + misses) if hits + misses else None
+        with self._lock:
+            snapshot["depth"] = {self.templates[key]["prompt"]: len(clips) for key, clips in self._clips.items()}
+        return snapshot
+
+    # --- Background refill ---
+
+    def start(self) -> None:
+        """Starts the refill worker on its own event loop thread (idempotent)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._run_loop, name="lyria-pool", daemon=True)
+            self._thread.start()
+
+    def stop(self, delete_unused: bool = True) -> None:
+        """
+        Stops the refill worker. Clips that were never handed out are deleted from GCS
+        (unless delete_unused is False) so restarts do not leave orphaned objects.
+        """
+        self._stopping = True
+        self._wake_refill()
+        if self._thread is not None:
+            self._thread.join(timeout=LYRIA_POOL_IDLE_SECONDS + 1)
+        if not delete_unused:
+            return
+        with self._lock:
+            unused = [clip for clips in self._clips.values() for clip in clips if clip.uses == 0]
+            for clips in self._clips.values():
+                clips.clear()
+        for clip in unused:
+            try:
+                gcs_blob(clip.gcs_uri).delete()
+            except google_exceptions.NotFound:
+                pass
+            except Exception as e:
+                print(f"WARNING: Failed to delete unused pooled clip {clip.gcs_uri}: {e}")
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._refill_forever())
+        finally:
+            self._loop.close()
+
+    def _wake_refill(self) -> None:
+        loop, wake = self._loop, self._wake
+        if loop is not None and wake is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:
+                pass  # Loop already shut down
+
+    async def _refill_forever(self) -> None:
+        self._wake = asyncio.Event()
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+        tasks = set()
+        while not self._stopping:
+            while True:
+                # Emptiest template first; in-flight refills count, so a template can get
+                # several refills in one pass while tokens last.
+                needing = self._templates_needing_clips()
+                if not needing or not self._take_token():
+                    break
+                key = needing[0]
+                with self._lock:
+                    self._in_flight[key] += 1
+                await semaphore.acquire()
+                task = asyncio.ensure_future(self._refill_one(key, semaphore))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self._seconds_until_token())
+            except asyncio.TimeoutError:
+                pass
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _refill_one(self, key: Tuple[str, str], semaphore: asyncio.Semaphore) -> None:
+        template = self.templates[key]
+        started = time.monotonic()
+        try:
+            gcs_uri, size_bytes = await asyncio.to_thread(
+                self._generate, template["prompt"], template.get("negative_prompt")
+            )
+            self.metrics.observe("refill_seconds", time.monotonic() - started)
+            with self._lock:
+                self._clips[key].append(_PooledClip(gcs_uri, size_bytes))
+                self._update_depth_locked(key)
+            self.metrics.incr("refills")
+        except LyriaError as e:
+            self.metrics.incr("refill_failures")
+            print(f"WARNING: Lyria pool refill failed for '{template['prompt']}': {e}")
+        except Exception as e:
+            self.metrics.incr("refill_failures")
+            print(f"WARNING: Lyria pool refill failed for '{template['prompt']}': {e.__class__.__name__}: {e}")
+        finally:
+            with self._lock:
+                self._in_flight[key] -= 1
+            semaphore.release()
+
+    def _templates_needing_clips(self) -> List[Tuple[str, str]]:
+        """Templates below depth (counting in-flight refills), emptiest first."""
+        with self._lock:
+            levels = {key: len(self._clips[key]) + self._in_flight[key] for key in self.templates}
+        return sorted((key for key, level in levels.items() if level < self.depth), key=levels.get)
+
+    def _take_token(self) -> bool:
+        self._add_tokens()
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def _seconds_until_token(self) -> float:
+        self._add_tokens()
+        if self._tokens >= 1 or self.clips_per_minute <= 0:
+            return LYRIA_POOL_IDLE_SECONDS
+        return min(LYRIA_POOL_IDLE_SECONDS, (1 - self._tokens) * 60.0 / self.clips_per_minute)
+
+    def _add_tokens(self) -> None:
+        now = time.monotonic()
+        burst = float(self.max_concurrent)
+        self._tokens = min(burst, self._tokens + (now - self._tokens_at) * self.clips_per_minute / 60.0)
+        self._tokens_at = now
+
+    def _update_depth_locked(self, key: Tuple[str, str]) -> None:
+        self.metrics.set_gauge(f"depth.{self.templates[key]['prompt']}", len(self._clips[key]))
+
+
+def parse_pool_templates(value: str) -> List[Dict[str, str]]:
+    """Parses LYRIA_POOL_TEMPLATES (JSON list or "|"-separated prompts)."""
+    value = value.strip()
+    if not value:
+        return []
+    if value.startswith("["):
+        return [{"prompt": t} if isinstance(t, str) else dict(t) for t in json.loads(value)]
+    return [{"prompt": prompt.strip()} for prompt in value.split("|") if prompt.strip()]
+
+
+_pool: Optional[LyriaClipPool] = None
+_pool_lock = threading.Lock()
+
+
+def start_lyria_pool(templates: Optional[List[Dict[str, str]]] = None) -> Optional[LyriaClipPool]:
+    """
+    Creates and starts the process-wide pool from templates (default LYRIA_POOL_TEMPLATES).
+
+    Returns:
+        The running pool, or None if there are no templates or the depth is 0.
+    """
+    global _pool
+    templates = parse_pool_templates(LYRIA_POOL_TEMPLATES) if templates is None else templates
+    if not templates or LYRIA_POOL_DEPTH <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = LyriaClipPool(templates)
+            atexit.register(functools.partial(_pool.stop, delete_unused=LYRIA_POOL_DELETE_ON_EXIT))
+        _pool.start()
+        return _pool
+
+
+def take_pooled_clip(prompt: str, negative_prompt: Optional[str]) -> Optional[Tuple[str, int]]:
+    """Returns a pooled (GCS URI, size) for a matching template, or None if there is none ready."""
+    pool = _pool
+    return pool.take(prompt, negative_prompt) if pool is not None else None
+
+
+def get_lyria_pool_stats() -> Dict:
+    """Returns pool depth, hit rate and refill latency (empty if the pool is not running)."""
+    pool = _pool
+    return pool.stats() if pool is not None else {}
@@ -0,0 +1,105 @@
+# Filename: metrics.py
+# Description: Minimal in-process counters, gauges and latency observations.
+#              Each component keeps its own named Metrics instance; snapshots are
+#              plain dicts so they can be printed, logged or returned from a tool.
+
+import threading
+from collections import deque
+from typing import Deque, Dict
+
+# Number of recent observations kept per key for percentile estimates.
+_MAX_SAMPLES = 1024
+
+
+class Metrics:
+    """Thread-safe counters, gauges and value observations for one component."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._observations: Dict[str, Dict[str, float]] = {}
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def incr(self, key: str, amount: float = 1) -> None:
+        """Adds amount to the counter named key."""
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_gauge(self, key: str, value: float) -> None:
+        """Sets the gauge named key to value."""
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, key: str, value: float) -> None:
+        """Records one observation (e.g. a latency in seconds) under key."""
+        with self._lock:
+            stats = self._observations.get(key)
+            if stats is None:
+                stats = {"count": 0, "total": 0.0, "min": value, "max": value}
+                self._observations[key] = stats
+                self._samples[key] = deque(maxlen=_MAX_SAMPLES)
+            stats["count"] += 1
+            stats["total"] += value
+            stats["min"] = min(stats["min"], value)
+            stats["max"] = max(stats["max"], value)
+            self._samples[key].append(value)
+
+    def counter(self, key: str) -> float:
+        """Returns the current value of a counter (0 if never incremented)."""
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        Returns a copy of all metrics.
+
+        Returns:
+            A dict with "counters", "gauges" and "observations". Each observation has
+            count, total, mean, min, max and p50/p90/p99 over the most recent samples.
+        """
+        with self._lock:
+            observations = {}
+            for key, stats in self._observations.items():
+                samples = sorted(self._samples[key])
+                observations[key] = {
+                    **stats,
+                    "mean": stats["total"] / stats["count"],
+                    "p50": _percentile(samples, 0.50),
+                    "p90": _percentile(samples, 0.90),
+                    "p99": _percentile(samples, 0.99),
+                }
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "observations": observations,
+            }
+
+
+def _percentile(sorted_samples, fraction: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, int(round(fraction * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+_registry: Dict[str, Metrics] = {}
+_registry_lock = threading.Lock()
+
+
+def get_metrics(name: str) -> Metrics:
+    """Returns the process-wide Metrics instance for a component, creating it if needed."""
+    with _registry_lock:
+        metrics = _registry.get(name)
+        if metrics is None:
+            metrics = Metrics(name)
+            _registry[name] = metrics
+        return metrics
+
+
+def metrics_snapshot() -> Dict[str, Dict]:
+    """Returns snapshots of every registered component, keyed by component name."""
+    with _registry_lock:
+        components = list(_registry.values())
+    return {metrics.name: metrics.snapshot() for metrics in components}
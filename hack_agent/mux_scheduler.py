@@ -0,0 +1,432 @@
+# Filename: mux_scheduler.py
+# Description: Queues mux jobs and submits them to the Transcoder API under a
+#              concurrent-job limit. One shared TranscoderServiceAsyncClient and one
+#              driver loop per event loop poll every in-flight job together, so a burst of
+#              sessions waits in the queue instead of failing on the Transcoder quota.
+
+import asyncio
+import os
+import time
+import weakref
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, Dict, Iterable, List, Optional, Set
+
+from google.api_core.exceptions import NotFound, ResourceExhausted
+from google.cloud.video import transcoder_v1
+from google.cloud.video.transcoder_v1.types import Job
+
+from .metrics import get_metrics
+from .mux_audio import build_mux_job, transcoder_parent, validate_mux_inputs
+from .transcoder_waiter import (
+    FINAL_STATES,
+    TRANSCODER_PUBSUB_SUBSCRIPTION,
+    TRANSCODER_PUSH_FALLBACK_POLL_SECONDS,
+    TRANSCODER_WAIT_TIMEOUT_SECONDS,
+    PollSchedule,
+    estimate_eta_seconds,
+    get_push_listener,
+    job_failure,
+    record_job_completion,
+)
+
+# Jobs this process keeps running at once. Keep it at or below the project's Transcoder
+# concurrent-job quota (shared with anything else submitting jobs in the project).
+TRANSCODER_MAX_CONCURRENT_JOBS = int(os.getenv("TRANSCODER_MAX_CONCURRENT_JOBS", "5"))
+# After a quota rejection (429) no new job is submitted for this long, and the limit is
+# held at the number of jobs then running; it then grows back by at most one job per period.
+TRANSCODER_QUOTA_RETRY_SECONDS = float(os.getenv("TRANSCODER_QUOTA_RETRY_SECONDS", "10"))
+
+
+class MuxResult:
+    """Outcome of one scheduled mux job: output_uri on success, error otherwise."""
+
+    __slots__ = ("index", "output_uri", "error", "job_name", "queue_wait_seconds")
+
+    def __init__(
+        self,
+        index: int,
+        output_uri: Optional[str] = None,
+        error: Optional[Exception] = None,
+        job_name: Optional[str] = None,
+        queue_wait_seconds: Optional[float] = None,
+    ):
+        self.index = index
+        self.output_uri = output_uri
+        self.error = error
+        self.job_name = job_name
+        self.queue_wait_seconds = queue_wait_seconds
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def as_text(self) -> str:
+        """The output URI, or an "Error: ..." string as returned by mux_audio."""
+        if self.error is None:
+            return self.output_uri
+        return f"Error: {type(self.error).__name__} - {self.error}"
+
+
+class _MuxTask:
+    __slots__ = (
+        "index", "video_uri", "audio_uri", "end_time_offset", "text_stream_content",
+        "future", "queued_at", "submitted_at", "job", "output_uri", "job_name",
+        "last_status", "notification", "polls",
+    )
+
+    def __init__(self, index, video_uri, audio_uri, end_time_offset, text_stream_content, future):
+        self.index = index
+        self.video_uri = video_uri
+        self.audio_uri = audio_uri
+        self.end_time_offset = end_time_offset
+        self.text_stream_content = text_stream_content
+        self.future = future
+        self.queued_at = time.monotonic()
+        self.submitted_at: Optional[float] = None
+        self.job: Optional[Job] = None  # Built once; reused if the submission is retried
+        self.output_uri: Optional[str] = None
+        self.job_name: Optional[str] = None
+        self.last_status: Optional[Job] = None
+        self.notification: Optional[asyncio.Future] = None
+        self.polls = 0
+
+
+class MuxScheduler:
+    """
+    Runs mux jobs with at most max_concurrent_jobs in flight.
+
+    Jobs are submitted in arrival order as slots free up. A single driver task polls all
+    in-flight jobs with one round of get_job calls per tick, paced by the earliest ETA
+    (see transcoder_waiter.PollSchedule), or woken by Pub/Sub notifications when a
+    subscription is configured. The driver runs only while there is work.
+
+    A scheduler belongs to the event loop it is first used on (the async client's gRPC
+    channel is bound to it); use get_mux_scheduler() for the shared per-loop instance.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        parent: Optional[str] = None,
+        max_concurrent_jobs: int = TRANSCODER_MAX_CONCURRENT_JOBS,
+        quota_retry_seconds: float = TRANSCODER_QUOTA_RETRY_SECONDS,
+        timeout_seconds: float = TRANSCODER_WAIT_TIMEOUT_SECONDS,
+        subscription: Optional[str] = TRANSCODER_PUBSUB_SUBSCRIPTION,
+        build_job: Callable = build_mux_job,
+    ):
+        """
+        Args:
+            client: A TranscoderServiceAsyncClient, or any object with async
+                    create_job(parent=, job=), get_job(name=) and delete_job(name=)
+                    (e.g. a local fake). Jobs that time out are deleted.
+                    Created from the default credentials on first use if None.
+            parent: "projects/<project>/locations/<location>"; inferred if None.
+            build_job: Coroutine returning (Job, output URI) for one request;
+                       see mux_audio.build_mux_job.
+        """
+        self.max_concurrent_jobs = max(1, max_concurrent_jobs)
+        self.quota_retry_seconds = quota_retry_seconds
+        self.timeout_seconds = timeout_seconds
+        self.subscription = subscription
+        self.metrics = get_metrics("mux_scheduler")
+        self._client = client
+        self._parent = parent
+        self._build_job = build_job
+        self._queue: Deque[_MuxTask] = deque()
+        self._in_flight: Dict[str, _MuxTask] = {}
+        self._submissions: Set[asyncio.Task] = set()
+        self._limit = self.max_concurrent_jobs
+        self._quota_retry_at = 0.0
+        self._relax_at = 0.0
+        self._schedule = PollSchedule()
+        self._driver: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    # --- Public API ---
+
+    async def mux(
+        self,
+        video_uri: str,
+        audio_uri: str,
+        end_time_offset: float,
+        text_stream_content: Optional[str] = None,
+    ) -> MuxResult:
+        """Queues one mux job and waits for its result (never raises for job failures)."""
+        return await self._enqueue(0, video_uri, audio_uri, end_time_offset, text_stream_content)
+
+    async def mux_many(self, jobs: Iterable[Dict]) -> AsyncIterator[MuxResult]:
+        """
+        Queues every job and yields results as jobs finish (not in input order).
+
+        Args:
+            jobs: Dicts with video_uri, audio_uri, end_time_offset and optionally
+                  text_stream_content (the mux_audio arguments). MuxResult.index is the
+                  job's position in this iterable.
+        """
+        started = time.monotonic()
+        futures = [
+            self._enqueue(
+                index,
+                job.get("video_uri"),
+                job.get("audio_uri"),
+                job.get("end_time_offset"),
+                job.get("text_stream_content"),
+            )
+            for index, job in enumerate(jobs)
+        ]
+        for future in asyncio.as_completed(futures):
+            yield await future
+        elapsed = time.monotonic() - started
+        if futures and elapsed > 0:
+            self.metrics.observe("batch_jobs_per_minute", len(futures) * 60.0 / elapsed)
+
+    def stats(self) -> Dict:
+        """Returns queue depth, in-flight jobs, the current limit and queue-wait percentiles."""
+        snapshot = self.metrics.snapshot()
+        snapshot["queued"] = len(self._queue)
+        snapshot["in_flight"] = len(self._in_flight) + len(self._submissions)
+        snapshot["limit"] = self._limit
+        return snapshot
+
+    # --- Queueing ---
+
+    def _enqueue(self, index, video_uri, audio_uri, end_time_offset, text_stream_content) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        try:
+            validate_mux_inputs(video_uri, audio_uri)
+            if end_time_offset is None or end_time_offset <= 0:
+                raise ValueError(f"Invalid end_time_offset: {end_time_offset}.")
+            self._ensure_client()
+        except ValueError as e:
+            future.set_result(MuxResult(index, error=e))
+            return future
+
+        self._queue.append(_MuxTask(index, video_uri, audio_uri, end_time_offset, text_stream_content, future))
+        self.metrics.incr("jobs_queued")
+        self._update_gauges()
+        if self._driver is None or self._driver.done():
+            self._wake = asyncio.Event()
+            self._driver = loop.create_task(self._drive())
+        else:
+            self._wake.set()
+        return future
+
+    def _ensure_client(self) -> None:
+        if self._client is not None and self._parent is not None:
+            return
+        credentials, parent = transcoder_parent()
+        if self._client is None:
+            self._client = transcoder_v1.TranscoderServiceAsyncClient(credentials=credentials)
+        if self._parent is None:
+            self._parent = parent
+
+    # --- Driver ---
+
+    async def _drive(self) -> None:
+        listener = get_push_listener(self.subscription) if self.subscription else None
+        try:
+            while True:
+                self._wake.clear()
+                self._start_submissions(listener)
+                if self._in_flight:
+                    await self._poll_in_flight(listener)
+                if not (self._queue or self._in_flight or self._submissions):
+                    break
+                await self._sleep(self._next_delay())
+        except Exception as e:
+            # Never leave callers waiting on a dead driver.
+            print(f"ERROR: Mux scheduler stopped: {e.__class__.__name__}: {e}")
+            for task in list(self._queue) + list(self._in_flight.values()):
+                self._finish(task, error=e, listener=listener)
+            self._queue.clear()
+            self._in_flight.clear()
+            raise
+
+    def _start_submissions(self, listener) -> None:
+        if time.monotonic() < self._quota_retry_at:
+            return
+        loop = asyncio.get_running_loop()
+        while self._queue and len(self._in_flight) + len(self._submissions) < self._limit:
+            submission = loop.create_task(self._submit(self._queue.popleft(), listener))
+            self._submissions.add(submission)
+            submission.add_done_callback(self._submissions.discard)
+
+    async def _submit(self, task: _MuxTask, listener) -> None:
+        try:
+            if task.job is None:
+                task.job, task.output_uri = await self._build_job(
+                    self._client, self._parent, task.video_uri, task.audio_uri,
+                    task.end_time_offset, task.text_stream_content,
+                )
+            created = await self._client.create_job(parent=self._parent, job=task.job)
+        except ResourceExhausted as e:
+            # Concurrent-job quota reached: requeue at the front, hold the limit at what is
+            # running now and pause submissions for a while.
+            self._queue.appendleft(task)
+            self._limit = max(1, len(self._in_flight))
+            self._quota_retry_at = time.monotonic() + self.quota_retry_seconds
+            self.metrics.incr("quota_rejections")
+            print(f"WARNING: Transcoder quota reached ({e}); holding at {self._limit} concurrent job(s).")
+        except Exception as e:
+            self._finish(task, error=e, listener=listener)
+        else:
+            task.job_name = created.name
+            task.submitted_at = time.monotonic()
+            if listener is not None:
+                task.notification = listener.register(created.name)
+            self._in_flight[created.name] = task
+            self._schedule = PollSchedule()  # New job: start checking quickly again
+            self.metrics.observe("queue_wait_seconds", task.submitted_at - task.queued_at)
+            print(f"Transcoder job created: {created.name}")
+        finally:
+            self._update_gauges()
+            self._wake.set()
+
+    async def _poll_in_flight(self, listener) -> None:
+        tasks = list(self._in_flight.values())
+        replies = await asyncio.gather(
+            *(self._client.get_job(name=task.job_name) for task in tasks),
+            return_exceptions=True,
+        )
+        self.metrics.incr("get_job_calls", len(tasks))
+        now = time.monotonic()
+        timed_out: List[_MuxTask] = []
+        for task, reply in zip(tasks, replies):
+            task.polls += 1
+            if isinstance(reply, Exception):
+                self.metrics.incr("poll_errors")  # Transient; retried on the next tick
+                status = None
+            else:
+                task.last_status = status = reply
+            if status is not None and status.state in FINAL_STATES:
+                del self._in_flight[task.job_name]
+                record_job_completion(status, now - task.submitted_at, task.polls, task.end_time_offset)
+                if status.state == Job.ProcessingState.FAILED:
+                    self._finish(task, error=job_failure(status, task.job_name), listener=listener)
+                else:
+                    self._finish(task, output_uri=task.output_uri, listener=listener)
+                self._relax_limit()
+            elif now - task.submitted_at >= self.timeout_seconds:
+                del self._in_flight[task.job_name]
+                error = asyncio.TimeoutError(f"Transcoder job '{task.job_name}' not finished after {now - task.submitted_at:.0f}s.")
+                self._finish(task, error=error, listener=listener)
+                timed_out.append(task)
+        if timed_out:
+            # Deleted before their slots are reused, so the abandoned jobs stop counting
+            # against the concurrent-job quota.
+            await self._delete_jobs(timed_out)
+            for _ in timed_out:
+                self._relax_limit()
+        self._update_gauges()
+
+    async def _delete_jobs(self, tasks: List[_MuxTask]) -> None:
+        replies = await asyncio.gather(
+            *(self._client.delete_job(name=task.job_name) for task in tasks),
+            return_exceptions=True,
+        )
+        for task, reply in zip(tasks, replies):
+            if isinstance(reply, NotFound):
+                continue  # Already gone
+            if isinstance(reply, Exception):
+                # Still running; a quota rejection will hold the limit down until it ends.
+                self.metrics.incr("delete_errors")
+                print(f"WARNING: Could not delete timed-out Transcoder job '{task.job_name}': {reply}")
+            else:
+                self.metrics.incr("jobs_deleted")
+
+    def _next_delay(self) -> Optional[float]:
+        """Seconds until the next tick, or None to wait only for a submission to finish."""
+        now = time.monotonic()
+        delay = None
+        if self._in_flight:
+            tasks = self._in_flight.values()
+            if all(task.notification is not None for task in tasks):
+                delay = TRANSCODER_PUSH_FALLBACK_POLL_SECONDS
+            else:
+                etas = [
+                    estimate_eta_seconds(task.last_status, now - task.submitted_at, task.end_time_offset)
+                    for task in tasks
+                    if task.last_status is not None
+                ]
+                etas = [eta for eta in etas if eta is not None and eta > 0]
+                delay = self._schedule.next_delay(min(etas) if etas else None)
+            # Never sleep past a job's timeout.
+            deadline = min(task.submitted_at for task in tasks) + self.timeout_seconds
+            delay = max(0.0, min(delay, deadline - now))
+        if self._queue and len(self._in_flight) + len(self._submissions) < self._limit:
+            # Slots are free; only the quota pause (if any) holds the queue back.
+            wait = max(0.0, self._quota_retry_at - now)
+            delay = wait if delay is None else min(delay, wait)
+        return delay
+
+    async def _sleep(self, delay: Optional[float]) -> None:
+        if delay == 0:
+            return
+        waiters = [task.notification for task in self._in_flight.values() if task.notification is not None]
+        wake = asyncio.ensure_future(self._wake.wait())
+        try:
+            await asyncio.wait([wake, *waiters], timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            wake.cancel()
+        for task in self._in_flight.values():
+            if task.notification is not None and task.notification.done():
+                self.metrics.incr("push_notifications")
+                task.notification = None  # get_job confirms next; if it lags the message, poll adaptively
+
+    # --- Bookkeeping ---
+
+    def _finish(self, task: _MuxTask, output_uri: Optional[str] = None, error: Optional[Exception] = None, listener=None) -> None:
+        if listener is not None and task.job_name:
+            listener.unregister(task.job_name)
+        queue_wait = task.submitted_at - task.queued_at if task.submitted_at is not None else None
+        self.metrics.incr("jobs_failed" if error is not None else "jobs_succeeded")
+        if not task.future.done():
+            task.future.set_result(MuxResult(task.index, output_uri, error, task.job_name, queue_wait))
+
+    def _relax_limit(self) -> None:
+        """After a quota pause, grow the limit back by one per quota_retry_seconds as jobs finish."""
+        now = time.monotonic()
+        if self._limit < self.max_concurrent_jobs and now >= max(self._quota_retry_at, self._relax_at):
+            self._limit += 1
+            self._relax_at = now + self.quota_retry_seconds
+
+    def _update_gauges(self) -> None:
+        self.metrics.set_gauge("queued", len(self._queue))
+        self.metrics.set_gauge("in_flight", len(self._in_flight))
+        self.metrics.set_gauge("limit", self._limit)
+
+
+_schedulers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, MuxScheduler]" = weakref.WeakKeyDictionary()
+
+
+def get_mux_scheduler() -> MuxScheduler:
+    """Returns the shared scheduler for the running event loop, creating it if needed."""
+    loop = asyncio.get_running_loop()
+    scheduler = _schedulers.get(loop)
+    if scheduler is None:
+        scheduler = MuxScheduler()
+        _schedulers[loop] = scheduler
+    return scheduler
+
+
+async def mux_audio_batch(jobs: List[Dict]) -> List[str]:
+    """
+    Muxes many (video, audio, captions, duration) jobs through the shared scheduler.
+
+    Args:
+        jobs: Dicts with video_uri, audio_uri, end_time_offset and optionally
+              text_stream_content, as for mux_audio.
+
+    Returns:
+        One entry per job, in input order: the muxed output URI or an "Error: ..." string.
+    """
+    results: List[Optional[str]] = [None] * len(jobs)
+    async for result in get_mux_scheduler().mux_many(jobs):
+        results[result.index] = result.as_text()
+    return results
+
+
+def get_mux_scheduler_metrics() -> Dict:
+    """Returns queue-wait percentiles, throughput, quota rejections and in-flight gauges."""
+    return get_metrics("mux_scheduler").snapshot()
@@ -0,0 +1,282 @@
+# Filename: pipeline.py
+# Description: Alternatives to the conversational root_agent. AGENT_MODE=pipeline is a
+#              workflow-agent version: Lyria music generation starts as soon as the request
+#              arrives and runs in parallel with search, haiku writing and TTS, and a final
+#              step joins both for the overlay. AGENT_MODE=fast runs the same flow in one
+#              code agent. Both use the LLM only to write the haiku.
+
+import asyncio
+import os
+import time
+import uuid
+from typing import AsyncGenerator, Dict, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from google.adk.agents import BaseAgent, LlmAgent, ParallelAgent, SequentialAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.runners import InMemoryRunner
+from google.adk.tools import google_search
+from google.genai import types
+
+from .gcs_client import gcs_uri_to_public_url
+from .llm_usage import instrument_llm_usage
+from .local_mix import mix_voice_and_music_tool
+from .lyria_music import generate_lyria_music_tool
+from .metrics import get_metrics
+from .text_to_speech import text_to_speech_async
+
+PIPELINE_MODEL = os.getenv("PIPELINE_MODEL", "gemini-2.0-flash")
+# The soundtrack cannot depend on the haiku (it starts before the haiku exists).
+PIPELINE_MUSIC_PROMPT = os.getenv(
+    "PIPELINE_MUSIC_PROMPT", "A HOT, high-energy EDM soundtrack with a driving beat and bright synth leads."
+)
+PIPELINE_MUSIC_NEGATIVE_PROMPT = os.getenv("PIPELINE_MUSIC_NEGATIVE_PROMPT", "vocals")
+# Pipeline and fast modes speak with a fixed voice instead of asking the LLM to pick one.
+FAST_PATH_VOICE_CATEGORY = os.getenv("FAST_PATH_VOICE_CATEGORY", "male_high")
+FAST_PATH_SPEAKING_RATE = float(os.getenv("FAST_PATH_SPEAKING_RATE", "1.15"))
+
+# Session state keys shared by the stages.
+HAIKU_KEY = "haiku"
+VOICE_URI_KEY = "voice_uri"
+MUSIC_URI_KEY = "music_uri"
+MIX_URI_KEY = "mix_uri"
+
+_pipeline_metrics = get_metrics("pipeline")
+# (invocation id, agent name) -> start time, for per-stage latency.
+_stage_started: Dict[Tuple[str, str], float] = {}
+
+
+def _start_stage(callback_context: CallbackContext) -> Optional[types.Content]:
+    _stage_started[(callback_context.invocation_id, callback_context.agent_name)] = time.monotonic()
+    return None
+
+
+def _end_stage(callback_context: CallbackContext) -> Optional[types.Content]:
+    started = _stage_started.pop((callback_context.invocation_id, callback_context.agent_name), None)
+    if started is not None:
+        _pipeline_metrics.observe(f"{callback_context.agent_name}_seconds", time.monotonic() - started)
+    return None
+
+
+def _is_gcs_uri(value) -> bool:
+    return isinstance(value, str) and value.startswith("gs://")
+
+
+def _state_event(ctx: InvocationContext, author: str, state_delta: Dict, text: Optional[str] = None) -> Event:
+    content = types.Content(role="model", parts=[types.Part(text=text)]) if text else None
+    return Event(
+        author=author,
+        invocation_id=ctx.invocation_id,
+        branch=ctx.branch,
+        content=content,
+        actions=EventActions(state_delta=state_delta),
+    )
+
+
+async def _speak(haiku: str, voice_category: str, speaking_rate: float) -> str:
+    """Speaks the haiku; returns the voice URI, or an "ERROR: ..." message."""
+    try:
+        return await text_to_speech_async(f"<speak>{escape(haiku.strip())}</speak>", voice_category, speaking_rate)
+    except Exception as e:
+        return f"ERROR: {e.__class__.__name__}: {e}"
+
+
+class VoiceAgent(BaseAgent):
+    """Speaks state[haiku] with a fixed voice, without an LLM turn, and stores the URI in state[voice_uri]."""
+
+    voice_category: str = FAST_PATH_VOICE_CATEGORY
+    speaking_rate: float = FAST_PATH_SPEAKING_RATE
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        haiku = ctx.session.state.get(HAIKU_KEY) or ""
+        voice_uri = await _speak(haiku, self.voice_category, self.speaking_rate)
+        yield _state_event(ctx, self.name, {VOICE_URI_KEY: voice_uri})
+
+
+class SoundtrackAgent(BaseAgent):
+    """Generates the soundtrack without an LLM turn and stores its URI in state[music_uri]."""
+
+    prompt: str = PIPELINE_MUSIC_PROMPT
+    negative_prompt: str = PIPELINE_MUSIC_NEGATIVE_PROMPT
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        music_uri = await generate_lyria_music_tool(self.prompt, self.negative_prompt)
+        yield _state_event(ctx, self.name, {MUSIC_URI_KEY: music_uri})
+
+
+class OverlayAgent(BaseAgent):
+    """Joins the branches: mixes state[voice_uri] with state[music_uri] and shows the public URL."""
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        yield await _overlay_event(ctx, self.name, state.get(HAIKU_KEY), state.get(VOICE_URI_KEY), state.get(MUSIC_URI_KEY))
+
+
+class FastPathAgent(BaseAgent):
+    """
+    Runs the fixed flow in code: the haiku from its one sub-agent (the only LLM work),
+    then TTS with a fixed voice, the soundtrack (started at the beginning), the mix and
+    the public URL. No LLM turns are spent deciding which tool to call next.
+    """
+
+    voice_category: str = FAST_PATH_VOICE_CATEGORY
+    speaking_rate: float = FAST_PATH_SPEAKING_RATE
+    music_prompt: str = PIPELINE_MUSIC_PROMPT
+    music_negative_prompt: str = PIPELINE_MUSIC_NEGATIVE_PROMPT
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        # The soundtrack does not depend on the haiku, so it is generated meanwhile.
+        music = asyncio.ensure_future(generate_lyria_music_tool(self.music_prompt, self.music_negative_prompt))
+        try:
+            async for event in self.sub_agents[0].run_async(ctx):
+                yield event
+            haiku = ctx.session.state.get(HAIKU_KEY) or ""
+            voice_uri = await _speak(haiku, self.voice_category, self.speaking_rate)
+            music_uri = await music
+        finally:
+            music.cancel()  # No-op once finished; stops waiting if the session was aborted
+        yield await _overlay_event(ctx, self.name, haiku, voice_uri, music_uri)
+
+
+async def _overlay_event(ctx: InvocationContext, author: str, haiku, voice_uri, music_uri) -> Event:
+    """Mixes the voice with the music (falling back to the voice alone) and shows the public URL."""
+    haiku = (haiku or "").strip()
+    if not _is_gcs_uri(voice_uri):
+        return _state_event(ctx, author, {}, f"{haiku}\n\n(Speech failed: {voice_uri or 'no audio was produced'})")
+    output_uri = voice_uri
+    note = ""
+    if _is_gcs_uri(music_uri):
+        mixed = await mix_voice_and_music_tool(voice_uri, music_uri)
+        if _is_gcs_uri(mixed):
+            output_uri = mixed
+        else:
+            note = f"\n(Soundtrack overlay failed: {mixed})"
+    else:
+        note = f"\n(Soundtrack unavailable: {music_uri})"
+    return _state_event(
+        ctx,
+        author,
+        {MIX_URI_KEY: output_uri},
+        f"{haiku}\n\n{gcs_uri_to_public_url(output_uri)}{note}",
+    )
+
+
+def _build_haiku_writer() -> LlmAgent:
+    """The search-grounded haiku writer; its reply is stored in state[haiku]."""
+    return LlmAgent(
+        name="haiku_writer",
+        model=PIPELINE_MODEL,
+        description="Answers questions about current events, weather and time as a haiku.",
+        instruction=(
+            """
+You are a freindly software engineer agent.
+You answer questions about current events, weather, and time in a haiku style.
+
+You are amusing and answer in code haiku style.
+
+use google search to find current events, weather, and time.
+
+Reply with only the haiku.
+"""
+        ),
+        tools=[google_search],
+        output_key=HAIKU_KEY,
+        before_agent_callback=_start_stage,
+        after_agent_callback=_end_stage,
+    )
+
+
+def build_pipeline_agent(name: str = "swe_pipeline_agent") -> SequentialAgent:
+    """
+    Builds the workflow version of root_agent:
+
+        Sequential[
+            Parallel[
+                Sequential[haiku_writer (search + haiku), voice_agent (TTS)],
+                soundtrack_agent (Lyria),
+            ],
+            overlay_agent (mix + public URL),
+        ]
+
+    The LLM is used only for the haiku. The voice (a fixed FAST_PATH_VOICE_CATEGORY), the
+    soundtrack and the overlay run as code, so the request costs one LLM turn and its
+    wall time is that of the slower branch plus the mix. Each call returns fresh agent
+    instances (an agent has one parent).
+    """
+    haiku_writer = _build_haiku_writer()
+    voice_agent = VoiceAgent(
+        name="voice_agent",
+        description="Speaks the haiku.",
+        before_agent_callback=_start_stage,
+        after_agent_callback=_end_stage,
+    )
+    soundtrack_agent = SoundtrackAgent(
+        name="soundtrack_agent",
+        description="Generates the soundtrack with Lyria.",
+        before_agent_callback=_start_stage,
+        after_agent_callback=_end_stage,
+    )
+    return SequentialAgent(
+        name=name,
+        description="Amusing SWE Root Agent (parallel speech and music pipeline)",
+        sub_agents=[
+            ParallelAgent(
+                name="speech_and_music",
+                sub_agents=[
+                    SequentialAgent(name="speech", sub_agents=[haiku_writer, voice_agent]),
+                    soundtrack_agent,
+                ],
+            ),
+            OverlayAgent(
+                name="overlay_agent",
+                description="Overlays the soundtrack on the speech.",
+                before_agent_callback=_start_stage,
+                after_agent_callback=_end_stage,
+            ),
+        ],
+        before_agent_callback=_start_stage,
+        after_agent_callback=_end_stage,
+    )
+
+
+def build_fast_path_agent(name: str = "swe_fast_agent") -> FastPathAgent:
+    """Builds the code-driven flow (see FastPathAgent); the LLM only writes the haiku."""
+    return FastPathAgent(
+        name=name,
+        description="Amusing SWE Root Agent (fixed flow, one LLM turn for the haiku)",
+        sub_agents=[_build_haiku_writer()],
+        before_agent_callback=_start_stage,
+        after_agent_callback=_end_stage,
+    )
+
+
+async def run_fast_path(question: str, user_id: str = "fast_path") -> str:
+    """
+    Answers one question with the fast path outside the ADK web server (e.g. from a
+    script) and returns the final text: the haiku and the public URL of the audio.
+    LLM usage is recorded under swe_fast_agent in get_llm_usage_metrics().
+    """
+    return await run_agent(instrument_llm_usage(build_fast_path_agent()), question, user_id)
+
+
+async def run_agent(agent: BaseAgent, question: str, user_id: str = "script") -> str:
+    """Runs agent on one question with an in-memory runner and returns its final text."""
+    app_name = f"{agent.name}_app"
+    runner = InMemoryRunner(agent=agent, app_name=app_name)
+    session = runner.session_service.create_session(app_name=app_name, user_id=user_id, session_id=uuid.uuid4().hex)
+    final_text = ""
+    async for event in runner.run_async(
+        user_id=user_id,
+        session_id=session.id,
+        new_message=types.Content(role="user", parts=[types.Part(text=question)]),
+    ):
+        if event.content and event.content.parts and event.content.parts[0].text:
+            final_text = event.content.parts[0].text
+    return final_text
+
+
+def get_pipeline_metrics() -> dict:
+    """Returns per-stage and end-to-end latency (<agent name>_seconds) for pipeline runs."""
+    return _pipeline_metrics.snapshot()
@@ -0,0 +1,321 @@
+# Filename: result_cache.py
+# Description: Content-addressed cache mapping a hashed request to the GCS URI of a
+#              previously generated result. Two tiers: a bounded in-memory LRU and a
+#              persistent JSON index (local file or gs:// manifest) that survives restarts.
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from google.api_core import exceptions as google_exceptions
+
+from .gcs_client import gcs_blob
+from .metrics import get_metrics
+
+
+def make_cache_key(**parts) -> str:
+    """
+    Builds a stable content hash from keyword arguments.
+
+    Args:
+        **parts: JSON-serializable request fields (already normalized by the caller).
+
+    Returns:
+        A hex SHA-256 digest that is identical for identical parts.
+    """
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier cache of request hash -> result URI with TTL expiry.
+
+    The memory tier holds at most max_entries recently used entries. The persistent
+    index (if index_path is set) holds at most max_index_entries and, if max_total_bytes
+    is set, at most that many bytes of results (per the entries' size_bytes field). It is
+    rewritten atomically on every change; an index_path of the form gs://bucket/object
+    keeps it as a GCS manifest shared by every process using the bucket. Manifest
+    uploads happen outside the lock, one at a time, and changes made while one is in
+    flight are coalesced into the next upload.
+
+    Entries that are evicted, found expired or replaced by a put with a different value
+    are passed to on_evict (outside the lock), so callers can delete the result they
+    point to. Hit and miss counts are exported
+    through metrics.get_metrics(name).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int,
+        ttl_seconds: float,
+        index_path: Optional[str],
+        max_index_entries: int = 10000,
+        max_total_bytes: Optional[int] = None,
+        on_evict: Optional[Callable[[str, Dict], None]] = None,
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.index_path = index_path
+        self.max_index_entries = max_index_entries
+        self.max_total_bytes = max_total_bytes
+        self.on_evict = on_evict
+        self.metrics = get_metrics(name)
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._index: Optional[Dict[str, Dict]] = None  # Loaded lazily from index_path
+        self._index_generation: Optional[int] = None  # GCS generation the index was read at
+        # GCS manifest only: local changes not yet written, replayed onto the remote
+        # manifest if another process wrote it first.
+        self._changed_keys: set = set()
+        self._removed_keys: set = set()
+        self._manifest_dirty = False
+        self._manifest_writing = False  # A thread is in _flush_manifest's upload loop
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached value for key, or None on a miss or expired entry."""
+        now = time.time()
+        expired: List[Tuple[str, Dict]] = []
+        try:
+            with self._lock:
+                entry = self._memory.get(key)
+                if entry is not None:
+                    if self._is_fresh(entry, now):
+                        self._memory.move_to_end(key)
+                        self.metrics.incr("hits_memory")
+                        return entry["value"]
+                    self._remove_locked(key)
+
+                index = self._load_index_locked()
+                entry = index.get(key)
+                if entry is not None:
+                    if self._is_fresh(entry, now):
+                        self._remember_locked(key, entry)
+                        self.metrics.incr("hits_index")
+                        return entry["value"]
+                    self._remove_locked(key)
+                    self._save_index_locked()
+                    expired.append((key, entry))
+                    self.metrics.incr("expirations")
+
+                self.metrics.incr("misses")
+                return None
+        finally:
+            self._flush_manifest()
+            self._notify_evicted(expired)
+
+    def put(self, key: str, value: str, **extra) -> None:
+        """
+        Stores value under key in both tiers.
+
+        Args:
+            key: The request hash (see make_cache_key).
+            value: The result to cache, usually a gs:// URI.
+            **extra: Additional JSON-serializable fields kept with the entry.
+        """
+        entry = {"value": value, "created_at": time.time(), **extra}
+        evicted: List[Tuple[str, Dict]] = []
+        with self._lock:
+            self._remember_locked(key, entry)
+            index = self._load_index_locked()
+            replaced = index.get(key)
+            if replaced is not None and replaced["value"] != value:
+                evicted.append((key, replaced))  # Its result is no longer referenced
+                self.metrics.incr("replacements")
+            index[key] = entry
+            if self._is_gcs_index():
+                self._changed_keys.add(key)
+                self._removed_keys.discard(key)
+            total_bytes = sum(e.get("size_bytes", 0) for e in index.values())
+            while len(index) > 1 and (
+                len(index) > self.max_index_entries
+                or (self.max_total_bytes is not None and total_bytes > self.max_total_bytes)
+            ):
+                oldest = min(index, key=lambda k: index[k]["created_at"])
+                evicted_entry = index[oldest]
+                self._remove_locked(oldest)
+                total_bytes -= evicted_entry.get("size_bytes", 0)
+                evicted.append((oldest, evicted_entry))
+                self.metrics.incr("evictions_index")
+            self._save_index_locked()
+            self.metrics.set_gauge("index_bytes", total_bytes)
+        self.metrics.incr("puts")
+        self._flush_manifest()
+        self._notify_evicted(evicted)
+
+    def invalidate(self, key: str) -> None:
+        """Removes key from both tiers (e.g. when the cached object no longer exists)."""
+        with self._lock:
+            self._load_index_locked()
+            self._remove_locked(key)
+            self._save_index_locked()
+        self._flush_manifest()
+
+    def stats(self) -> Dict:
+        """Returns hit/miss counters plus current tier sizes."""
+        with self._lock:
+            self.metrics.set_gauge("memory_entries", len(self._memory))
+            self.metrics.set_gauge("index_entries", len(self._index or {}))
+        return self.metrics.snapshot()
+
+    # --- Internal helpers (caller holds self._lock) ---
+
+    def _is_fresh(self, entry: Dict, now: float) -> bool:
+        return (now - entry["created_at"]) < self.ttl_seconds
+
+    def _notify_evicted(self, evicted: List[Tuple[str, Dict]]) -> None:
+        """Hands removed entries to on_evict; called without holding the lock."""
+        if self.on_evict is None:
+            return
+        for key, entry in evicted:
+            try:
+                self.on_evict(key, entry)
+            except Exception as e:
+                print(f"WARNING: {self.name} eviction callback failed for {entry.get('value')}: {e}")
+
+    def _remember_locked(self, key: str, entry: Dict) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.metrics.incr("evictions_memory")
+
+    def _remove_locked(self, key: str) -> None:
+        self._memory.pop(key, None)
+        if self._index is not None and self._index.pop(key, None) is not None and self._is_gcs_index():
+            self._changed_keys.discard(key)
+            self._removed_keys.add(key)
+
+    def _is_gcs_index(self) -> bool:
+        return bool(self.index_path) and self.index_path.startswith("gs://")
+
+    def _load_index_locked(self) -> Dict[str, Dict]:
+        if self._index is not None:
+            return self._index
+        self._index = {}
+        if self._is_gcs_index():
+            remote, self._index_generation = self._read_gcs_index()
+            self._index = remote or {}
+        elif self.index_path and os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"WARNING: Ignoring unreadable cache index '{self.index_path}': {e}")
+        return self._index
+
+    def _save_index_locked(self) -> None:
+        if not self.index_path or self._index is None:
+            return
+        if self._is_gcs_index():
+            self._manifest_dirty = True  # Written by _flush_manifest once the lock is released
+            return
+        try:
+            os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+            tmp_path = f"{self.index_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._index, f)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            print(f"WARNING: Failed to persist cache index '{self.index_path}': {e}")
+
+    # --- GCS manifest (index_path = gs://bucket/object) ---
+
+    def _index_blob(self):
+        return gcs_blob(self.index_path)
+
+    def _read_gcs_index(self) -> Tuple[Optional[Dict[str, Dict]], Optional[int]]:
+        """Returns (manifest or None, generation to use as the write precondition)."""
+        try:
+            blob = self._index_blob()
+            data = blob.download_as_bytes()
+            return json.loads(data), blob.generation
+        except google_exceptions.NotFound:
+            return None, 0  # Create-only precondition for the first write
+        except Exception as e:
+            print(f"WARNING: Ignoring unreadable cache manifest '{self.index_path}': {e}")
+            return None, None
+
+    def _flush_manifest(self) -> None:
+        """
+        Uploads the GCS manifest if it changed; called without holding self._lock.
+
+        Only one thread uploads at a time. Callers that find an upload in flight return
+        at once, and the uploading thread sends the latest index again before it stops,
+        so a burst of changes costs at most one extra upload. The upload carries a
+        generation precondition. If another process wrote the manifest since we read it,
+        our changes since then (puts and removals) are replayed onto its copy and the
+        upload is retried once; entries we evicted or expired stay removed.
+        """
+        if not self._is_gcs_index():
+            return
+        with self._lock:
+            if self._manifest_writing or not self._manifest_dirty:
+                return
+            self._manifest_writing = True
+        try:
+            conflicts = 0
+            while True:
+                with self._lock:
+                    if not self._manifest_dirty:
+                        self._manifest_writing = False
+                        return
+                    self._manifest_dirty = False
+                    snapshot = dict(self._index)
+                    generation = self._index_generation
+                    changed, removed = set(self._changed_keys), set(self._removed_keys)
+                try:
+                    blob = self._index_blob()
+                    blob.upload_from_string(
+                        json.dumps(snapshot),
+                        content_type="application/json",
+                        if_generation_match=generation,
+                    )
+                except google_exceptions.PreconditionFailed:
+                    self.metrics.incr("manifest_conflicts")
+                    if conflicts:
+                        print(f"WARNING: Cache manifest '{self.index_path}' changed concurrently; retrying on the next change.")
+                        self._stop_flushing()
+                        return
+                    conflicts += 1
+                    remote, remote_generation = self._read_gcs_index()
+                    with self._lock:
+                        self._merge_remote_locked(remote or {}, remote_generation)
+                    continue
+                except Exception as e:
+                    print(f"WARNING: Failed to persist cache manifest '{self.index_path}': {e}")
+                    self._stop_flushing()  # Retried with the next change
+                    return
+                with self._lock:
+                    self._index_generation = blob.generation
+                    # Keys touched again after the snapshot still need to be written.
+                    self._changed_keys -= {key for key in changed if self._index.get(key) is snapshot.get(key)}
+                    self._removed_keys -= {key for key in removed if key not in self._index}
+        except BaseException:
+            self._stop_flushing()
+            raise
+
+    def _stop_flushing(self) -> None:
+        """Gives up the upload loop with the index still marked dirty."""
+        with self._lock:
+            self._manifest_dirty = True
+            self._manifest_writing = False
+
+    def _merge_remote_locked(self, remote: Dict[str, Dict], generation: Optional[int]) -> None:
+        """Replaces the index with remote plus our unwritten puts, minus our removals."""
+        for key in self._changed_keys:
+            if key in self._index:
+                remote[key] = self._index[key]
+        for key in self._removed_keys:
+            remote.pop(key, None)
+        self._index = remote
+        self._index_generation = generation
+        for key in [key for key in self._memory if key not in remote]:
+            del self._memory[key]  # Removed by another process
+        self._manifest_dirty = True
@@ -0,0 +1,99 @@
+# Filename: ssml_chunker.py
+# Description: Splits SSML (or plain text) into independently synthesizable chunks at
+#              sentence, paragraph or <break> boundaries without cutting through tags.
+
+import re
+from typing import List, Tuple
+
+_TAG_RE = re.compile(r"(<[^>]+>)")
+_SPEAK_OPEN_RE = re.compile(r"^\s*(<speak\b[^>]*>)", re.IGNORECASE)
+_SPEAK_CLOSE_RE = re.compile(r"</speak>\s*$", re.IGNORECASE)
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+# Closing tags (and <break/>) after which a new chunk may start.
+_BOUNDARY_TAGS = ("</p>", "</s>", "</paragraph>", "</sentence>")
+
+
+def split_ssml(ssml: str, target_chunk_bytes: int) -> List[str]:
+    """
+    Splits an SSML document into chunks of roughly target_chunk_bytes.
+
+    Splits only happen between top-level elements inside <speak> (never inside a
+    <voice>, <prosody> or other element), at paragraph/sentence closes, <break/> tags
+    and sentence-ending punctuation. Every returned chunk is a complete <speak>
+    document carrying the original <speak> attributes.
+
+    Args:
+        ssml: The SSML document, with or without the outer <speak> element.
+        target_chunk_bytes: Preferred maximum UTF-8 size of each chunk. A single
+                            unsplittable piece larger than this becomes its own chunk.
+
+    Returns:
+        The list of SSML chunks in document order (one chunk if nothing can be split).
+    """
+    speak_open, body = _strip_speak(ssml)
+    wrapper_bytes = len(speak_open.encode("utf-8")) + len("</speak>")
+    pieces = _split_top_level(body)
+    return [f"{speak_open}{chunk}</speak>" for chunk in _pack(pieces, target_chunk_bytes - wrapper_bytes)]
+
+
+def split_text(text: str, target_chunk_bytes: int) -> List[str]:
+    """Splits plain text at sentence ends into chunks of roughly target_chunk_bytes."""
+    pieces = [piece + " " for piece in _SENTENCE_END_RE.split(text.strip()) if piece]
+    return [chunk.strip() for chunk in _pack(pieces, target_chunk_bytes)]
+
+
+def _strip_speak(ssml: str) -> Tuple[str, str]:
+    match = _SPEAK_OPEN_RE.match(ssml)
+    if not match:
+        return "<speak>", ssml
+    body = _SPEAK_CLOSE_RE.sub("", ssml[match.end():])
+    return match.group(1), body
+
+
+def _split_top_level(body: str) -> List[str]:
+    """Returns consecutive pieces of body; each boundary is at nesting depth 0."""
+    pieces: List[str] = []
+    current: List[str] = []
+    depth = 0
+    for token in _TAG_RE.split(body):
+        if not token:
+            continue
+        if token.startswith("<"):
+            current.append(token)
+            lowered = token.lower()
+            if lowered.startswith("</"):
+                depth = max(0, depth - 1)
+            elif not token.endswith("/>") and not lowered.startswith(("<!--", "<?")):
+                depth += 1
+            if depth == 0 and (lowered in _BOUNDARY_TAGS or lowered.startswith("<break")):
+                pieces.append("".join(current))
+                current = []
+        elif depth == 0:
+            sentences = _SENTENCE_END_RE.split(token)
+            for sentence in sentences[:-1]:
+                current.append(sentence + " ")
+                pieces.append("".join(current))
+                current = []
+            current.append(sentences[-1])
+        else:
+            current.append(token)
+    if current:
+        pieces.append("".join(current))
+    return [piece for piece in pieces if piece.strip()]
+
+
+def _pack(pieces: List[str], budget_bytes: int) -> List[str]:
+    """Greedily joins consecutive pieces while the result stays within budget_bytes."""
+    chunks: List[str] = []
+    current = ""
+    current_bytes = 0
+    for piece in pieces:
+        piece_bytes = len(piece.encode("utf-8"))
+        if current and current_bytes + piece_bytes > budget_bytes:
+            chunks.append(current)
+            current, current_bytes = "", 0
+        current += piece
+        current_bytes += piece_bytes
+    if current:
+        chunks.append(current)
+    return chunks
@@ -3,20 +3,100 @@
 #              synthesizing long audio directly to Google Cloud Storage.
 #              Requires all synthesis parameters to be explicitly provided.
 
+import asyncio
+import os
+import re
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from google.cloud import texttospeech_v1 as texttospeech
-from google.api_core.exceptions import GoogleAPICallError, RetryError
-from google.cloud.texttospeech_v1.types import SsmlVoiceGender
+from google.api_core.exceptions import GoogleAPICallError, NotFound, RetryError, ServiceUnavailable
+
+from .audio_probe import record_audio_duration, stamp_audio_duration
+from .gcs_client import get_storage_client
+from .metrics import get_metrics
+from .result_cache import ResultCache, make_cache_key
+from .ssml_chunker import split_ssml, split_text
+from .voice_catalog import VOICE_CATEGORY_DEFAULTS, get_voice_catalog  # noqa: F401 (re-exported)
+from .tts_clients import (
+    LONG_AUDIO_CLIENT,
+    STANDARD_CLIENT,
+    get_async_tts_client,
+    get_long_audio_client,
+    get_standard_client,
+    invalidate_async_tts_client,
+    invalidate_tts_client,
+)
+from .wav_utils import build_wav_header, crossfaded_length, parse_wav_header, pcm_view, write_crossfaded_pcm
 
 # --- Voice Category Definitions ---
-# (Same as before)
-VOICE_CATEGORY_DEFAULTS = {
-    "male_high": {"language_code": "en-US", "name": "en-US-Wavenet-D", "ssml_gender": SsmlVoiceGender.MALE},
-    "female_high": {"language_code": "en-US", "name": "en-US-Wavenet-F", "ssml_gender": SsmlVoiceGender.FEMALE},
-    "male_low": {"language_code": "en-US", "name": "en-US-Standard-D", "ssml_gender": SsmlVoiceGender.MALE},
-    "female_low": {"language_code": "en-US", "name": "en-US-Standard-F", "ssml_gender": SsmlVoiceGender.FEMALE},
-}
-#TODO: FIgure out how to not hard code these values!!
+# Categories are resolved through the indexed voice catalog (see voice_catalog.py);
+# VOICE_CATEGORY_DEFAULTS holds the pinned en-US voices for the original four categories.
+
+# --- Synthesis Routing ---
+# SSML up to this many UTF-8 bytes goes through the unary synthesize_speech API instead
+# of a long-audio operation (the unary API accepts at most 5000 bytes). 0 disables it.
+TTS_FAST_PATH_MAX_BYTES = int(os.getenv("TTS_FAST_PATH_MAX_BYTES", "4500"))
+_tts_metrics = get_metrics("tts")
+_UNARY_MAX_BYTES = 5000
+
+# Opt-in: inputs above the fast-path threshold are split at sentence/paragraph/<break>
+# boundaries and the chunks synthesized in parallel with the unary API, then stitched
+# into one LINEAR16 WAV. Inputs that cannot be split small enough use the long-audio path.
+TTS_CHUNKED_MODE = os.getenv("TTS_CHUNKED_MODE", "false").lower() in ("1", "true", "yes")
+TTS_CHUNK_TARGET_BYTES = int(os.getenv("TTS_CHUNK_TARGET_BYTES", "1500"))
+TTS_CHUNK_MAX_PARALLEL = int(os.getenv("TTS_CHUNK_MAX_PARALLEL", "8"))
+TTS_CHUNK_CROSSFADE_MS = float(os.getenv("TTS_CHUNK_CROSSFADE_MS", "10"))
+
+# Streaming: small chunks so the first sentence is ready quickly. Plain text uses the
+# native streaming API when a streaming-capable voice (e.g. en-US-Chirp3-HD-Charon) is set.
+TTS_STREAM_CHUNK_BYTES = int(os.getenv("TTS_STREAM_CHUNK_BYTES", "300"))
+TTS_STREAM_SAMPLE_RATE = int(os.getenv("TTS_STREAM_SAMPLE_RATE", "24000"))
+TTS_STREAMING_VOICE_NAME = os.getenv("TTS_STREAMING_VOICE_NAME", "")
+# Chunks that may wait for the GCS upload; a slower writer then holds back the stream.
+TTS_STREAM_UPLOAD_QUEUE_CHUNKS = int(os.getenv("TTS_STREAM_UPLOAD_QUEUE_CHUNKS", "8"))
+_STREAM_ENCODINGS = {"LINEAR16": ("pcm", f"audio/l16; rate={TTS_STREAM_SAMPLE_RATE}"), "OGG_OPUS": ("ogg", "audio/ogg")}
+
+# --- Result Cache ---
+# Identical SSML + voice parameters map to the GCS object synthesized earlier.
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+_tts_cache = ResultCache(
+    name="tts_cache",
+    max_entries=int(os.getenv("TTS_CACHE_MAX_ENTRIES", "256")),
+    ttl_seconds=float(os.getenv("TTS_CACHE_TTL_SECONDS", "86400")),
+    index_path=os.getenv(
+        "TTS_CACHE_INDEX_PATH",
+        os.path.join(os.path.expanduser("~"), ".cache", "hack_agent", "tts_cache_index.json"),
+    ),
+)
+
+
+def _tts_cache_key(
+    text: str,
+    gcs_bucket_name: str,
+    voice_name: str,
+    speaking_rate: float,
+    pitch: float,
+    volume_gain_db: float,
+    is_ssml: bool,
+) -> str:
+    """Hashes a normalized synthesis request; whitespace-only SSML differences share a key."""
+    return make_cache_key(
+        text=re.sub(r"\s+", " ", text.strip()),
+        bucket=gcs_bucket_name,
+        voice_name=voice_name,
+        speaking_rate=round(float(speaking_rate), 3),
+        pitch=round(float(pitch), 3),
+        volume_gain_db=round(float(volume_gain_db), 3),
+        is_ssml=is_ssml,
+    )
+
+
+def get_tts_cache_stats() -> dict:
+    """Returns hit/miss counters and tier sizes for the TTS result cache."""
+    return _tts_cache.stats()
 
 
 
@@ -70,13 +150,16 @@ def synthesize_text_to_gcs_sync(
     """
     (Synchronous) Synthesizes text to MP3 in GCS, requiring all params explicitly.
 
-    Uses the synchronous Google Cloud Text-to-Speech client and handles long audio
-    requests, blocking until the operation completes or times out.
+    Uses the synchronous Google Cloud Text-to-Speech clients, blocking until the audio
+    is in GCS. Inputs up to TTS_FAST_PATH_MAX_BYTES use the unary API and are uploaded
+    directly; larger inputs use a long audio operation that writes to GCS itself, or,
+    with TTS_CHUNKED_MODE, are split and synthesized in parallel unary chunks.
 
     Args:
         text: The text (or SSML string) to synthesize.
         gcs_bucket_name: The name of the GCS bucket to store the output MP3.
-        voice_category: One of male_high, female_high, male_low, female_low specifying the voice.
+        voice_category: A voice catalog category, e.g. male_high, female_low, female_neural2
+                        or en-GB:female_high (see voice_catalog.VoiceCatalog.resolve).
         speaking_rate: Speed of speech (e.g., 1.0 for normal).
         pitch: Pitch adjustment (e.g., 0.0 for normal).
         volume_gain_db: Volume gain adjustment (e.g., 0.0 for normal).
@@ -84,7 +167,9 @@ def synthesize_text_to_gcs_sync(
         is_ssml: True if 'text' contains SSML markup, False if plain text.
 
     Returns:
-        The GCS URI (gs://bucket-name/file-name.pcm) of the synthesized audio file in LINEAR16 PCM format.
+        The GCS URI of the synthesized LINEAR16 audio: gs://bucket-name/file-name.wav (with a
+        WAV header) for the unary and chunked paths, gs://bucket-name/file-name.pcm for the
+        long-audio path.
 
     Raises:
         ValueError: If an invalid voice_category is provided.
@@ -92,23 +177,491 @@ def synthesize_text_to_gcs_sync(
         TimeoutError: If waiting for the synthesis operation exceeds timeout_seconds.
         Exception: For other unexpected errors.
     """
-    normalized_category = voice_category.lower().replace(" ", "_")
-    if normalized_category not in VOICE_CATEGORY_DEFAULTS:
-        raise ValueError(
-            f"Invalid voice_category: '{voice_category}'. "
-            f"Valid options are: {', '.join(VOICE_CATEGORY_DEFAULTS.keys())}"
+    plan = _plan_synthesis(text, gcs_bucket_name, voice_category, speaking_rate, pitch, volume_gain_db, is_ssml)
+    cached_uri = _cached_result(plan)
+    if cached_uri:
+        return cached_uri
+
+    print(f"Starting {plan.path} synthesis for category '{voice_category}'. Output: {plan.gcs_output_uri}")
+    started = time.monotonic()
+    if plan.path == "long":
+        _synthesize_long_to_gcs(
+            plan.synthesis_input, plan.voice, plan.audio_config, plan.gcs_output_uri, timeout_seconds,
+            GOOGLE_CLOUD_PROJECT, GOOGLE_CLOUD_LOCATION,
         )
+    elif plan.path == "fast":
+        audio_content = _synthesize_unary(plan.synthesis_input, plan.voice, plan.audio_config, timeout_seconds)
+        _upload_synthesized(plan, _upload_audio_bytes, audio_content, GOOGLE_CLOUD_PROJECT)
+    else:
+        def _synthesize_chunk(chunk: str) -> bytes:
+            return _synthesize_unary(_synthesis_input(chunk, is_ssml), plan.voice, plan.audio_config, timeout_seconds)
 
-    voice_config = VOICE_CATEGORY_DEFAULTS[normalized_category]
+        with ThreadPoolExecutor(max_workers=max(1, min(len(plan.chunks), TTS_CHUNK_MAX_PARALLEL))) as pool:
+            segments = list(pool.map(_synthesize_chunk, plan.chunks))
+        _upload_synthesized(plan, _upload_stitched_wav, segments, GOOGLE_CLOUD_PROJECT)
+    return _finish_synthesis(plan, time.monotonic() - started)
 
-    # 1. Use the SYNCHRONOUS client
-    client = texttospeech.TextToSpeechLongAudioSynthesizeClient() 
 
-    # 2. Prepare input, voice, and audio config
-    if is_ssml:
-        synthesis_input = texttospeech.SynthesisInput(ssml=text)
+def synthesize_text_to_bytes_sync(
+    text: str,
+    voice_category: str,
+    speaking_rate: float,
+    pitch: float,
+    volume_gain_db: float,
+    timeout_seconds: float,
+    is_ssml: bool,
+) -> bytes:
+    """
+    (Synchronous) Synthesizes short text with the unary API and keeps the audio in memory.
+
+    Args:
+        text: The text (or SSML string) to synthesize. Must fit the unary API limit
+              (see TTS_FAST_PATH_MAX_BYTES).
+        voice_category: A voice catalog category (see synthesize_text_to_gcs_sync).
+        speaking_rate: Speed of speech (e.g., 1.0 for normal).
+        pitch: Pitch adjustment (e.g., 0.0 for normal).
+        volume_gain_db: Volume gain adjustment (e.g., 0.0 for normal).
+        timeout_seconds: Max seconds to wait for the API call.
+        is_ssml: True if 'text' contains SSML markup, False if plain text.
+
+    Returns:
+        LINEAR16 audio bytes (with the WAV header returned by the API).
+
+    Raises:
+        ValueError: If an invalid voice_category is provided.
+        GoogleAPICallError: If the API call fails.
+    """
+    voice_config = _resolve_voice(voice_category)
+    synthesis_input, voice, audio_config = _build_synthesis_config(
+        text, voice_config, speaking_rate, pitch, volume_gain_db, is_ssml
+    )
+    started = time.monotonic()
+    audio_content = _synthesize_unary(synthesis_input, voice, audio_config, timeout_seconds)
+    _tts_metrics.observe("latency_memory_seconds", time.monotonic() - started)
+    _tts_metrics.incr("requests_memory")
+    return audio_content
+
+
+# --- Async Variants ---
+# Same behaviour as the synchronous functions above, built on the async TTS clients so
+# a slow long-audio operation does not block the ADK event loop.
+
+async def text_to_speech_async(
+    text: str,
+    voice_category: str,
+    speaking_rate: float
+) -> str:
+    """
+    Synthesizes SSML to LINEAR16 PCM in GCS without blocking other sessions.
+
+    Args:
+        text: SSML to synthesize. Must include <speak> tag. may include <voice> tags.
+        voice_category: one of male_high, female_high, male_low, female_low specifying the voice.
+        speaking_rate: Speed of speech (e.g., 1.0 for normal).
+
+    Returns:
+        The GCS URI (gs://bucket-name/file-name.wav, or .pcm for long inputs) of the synthesized audio.
+    """
+    return await synthesize_text_to_gcs_async(
+        text=text,
+        gcs_bucket_name="byron-alpha-vpagent",
+        voice_category=voice_category,
+        speaking_rate=speaking_rate,
+        pitch=0.0,
+        volume_gain_db=0.0,
+        timeout_seconds=300.0,
+        is_ssml=True,
+        GOOGLE_CLOUD_PROJECT="byron-alpha", #TODO: parameterize
+        GOOGLE_CLOUD_LOCATION="us-central1"
+    )
+
+
+async def text_to_speech_batch(
+    items: List[Dict],
+    max_concurrency: int,
+) -> List[Dict]:
+    """
+    Synthesizes many SSML items concurrently.
+
+    Args:
+        items: Dicts with "text", "voice_category" and "speaking_rate" keys (the same
+               arguments as text_to_speech).
+        max_concurrency: Maximum number of syntheses in flight at once.
+
+    Returns:
+        One dict per input item, in input order: {"gcs_uri": str, "error": None} on
+        success or {"gcs_uri": None, "error": str} if that item failed. One failing item
+        does not affect the others.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def _run_one(item: Dict) -> Dict:
+        async with semaphore:
+            try:
+                gcs_uri = await text_to_speech_async(
+                    text=item["text"],
+                    voice_category=item["voice_category"],
+                    speaking_rate=item["speaking_rate"],
+                )
+                return {"gcs_uri": gcs_uri, "error": None}
+            except Exception as e:
+                return {"gcs_uri": None, "error": f"{e.__class__.__name__}: {e}"}
+
+    return list(await asyncio.gather(*(_run_one(item) for item in items)))
+
+
+async def synthesize_text_to_gcs_async(
+    text: str,
+    gcs_bucket_name: str,
+    voice_category: str,
+    speaking_rate: float,
+    pitch: float,
+    volume_gain_db: float,
+    timeout_seconds: float,
+    is_ssml: bool,
+    GOOGLE_CLOUD_PROJECT: str,
+    GOOGLE_CLOUD_LOCATION: str
+) -> str:
+    """
+    (Async) Synthesizes text to LINEAR16 PCM in GCS; see synthesize_text_to_gcs_sync.
+
+    Returns:
+        The GCS URI (.wav or .pcm, see synthesize_text_to_gcs_sync) of the synthesized audio file.
+
+    Raises:
+        ValueError: If an invalid voice_category is provided.
+        GoogleAPICallError: If the API call or operation fails.
+        TimeoutError: If waiting for the synthesis operation exceeds timeout_seconds.
+        Exception: For other unexpected errors.
+    """
+    plan = _plan_synthesis(text, gcs_bucket_name, voice_category, speaking_rate, pitch, volume_gain_db, is_ssml)
+    # The cache index is a JSON file (or GCS manifest); its I/O stays off the event loop.
+    if plan.cache_key:
+        cached_uri = await asyncio.to_thread(_cached_result, plan)
+        if cached_uri:
+            return cached_uri
+
+    print(f"Starting async {plan.path} synthesis for category '{voice_category}'. Output: {plan.gcs_output_uri}")
+    started = time.monotonic()
+    if plan.path == "long":
+        await _synthesize_long_to_gcs_async(
+            plan.synthesis_input, plan.voice, plan.audio_config, plan.gcs_output_uri, timeout_seconds,
+            GOOGLE_CLOUD_PROJECT, GOOGLE_CLOUD_LOCATION,
+        )
+    else:
+        if plan.path == "fast":
+            upload = _upload_audio_bytes
+            audio = await _synthesize_unary_async(plan.synthesis_input, plan.voice, plan.audio_config, timeout_seconds)
+        else:
+            semaphore = asyncio.Semaphore(TTS_CHUNK_MAX_PARALLEL)
+
+            async def _synthesize_chunk(chunk: str) -> bytes:
+                async with semaphore:
+                    return await _synthesize_unary_async(
+                        _synthesis_input(chunk, is_ssml), plan.voice, plan.audio_config, timeout_seconds
+                    )
+
+            upload = _upload_stitched_wav
+            audio = await asyncio.gather(*(_synthesize_chunk(chunk) for chunk in plan.chunks))
+        await asyncio.to_thread(_upload_synthesized, plan, upload, audio, GOOGLE_CLOUD_PROJECT)
+    elapsed = time.monotonic() - started
+    return await asyncio.to_thread(_finish_synthesis, plan, elapsed)
+
+
+# --- Streaming Synthesis ---
+# Audio is handed to the caller chunk by chunk as soon as it is synthesized, and the same
+# bytes are teed into a resumable GCS upload so a durable URI exists at the end.
+
+class SpeechStream:
+    """
+    Async iterable of synthesized audio chunks.
+
+    Iterate with `async for chunk in stream`. LINEAR16 chunks are raw 16-bit mono PCM
+    at TTS_STREAM_SAMPLE_RATE (no WAV header); OGG_OPUS chunks are complete Ogg pages.
+    After iteration finishes, gcs_uri holds the URI of the uploaded audio.
+    """
+
+    def __init__(
+        self,
+        chunks: AsyncIterator[bytes],
+        gcs_bucket_name: str,
+        blob_name: str,
+        content_type: str,
+        metadata: Dict[str, str],
+        GOOGLE_CLOUD_PROJECT: str,
+    ):
+        self.gcs_uri: Optional[str] = None
+        self.time_to_first_audio_seconds: Optional[float] = None
+        self._chunks = chunks
+        self._gcs_bucket_name = gcs_bucket_name
+        self._blob_name = blob_name
+        self._content_type = content_type
+        self._metadata = metadata
+        self._project = GOOGLE_CLOUD_PROJECT
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        started = time.monotonic()
+        blob, writer = await asyncio.to_thread(self._open_writer)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, TTS_STREAM_UPLOAD_QUEUE_CHUNKS))
+        uploader = asyncio.create_task(self._upload(blob, writer, queue))
+        try:
+            async for chunk in self._chunks:
+                if self.time_to_first_audio_seconds is None:
+                    self.time_to_first_audio_seconds = time.monotonic() - started
+                    _tts_metrics.observe("stream_time_to_first_audio_seconds", self.time_to_first_audio_seconds)
+                await self._enqueue(queue, chunk, uploader)
+                yield chunk
+            await self._enqueue(queue, None, uploader)
+            await uploader
+        finally:
+            if not uploader.done():
+                # Consumer stopped early or synthesis failed: drop what is queued and let
+                # the uploader close the writer and delete the partial object.
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(_ABORT_UPLOAD)
+                await asyncio.gather(uploader, return_exceptions=True)
+        self.gcs_uri = f"gs://{self._gcs_bucket_name}/{self._blob_name}"
+        _tts_metrics.observe("latency_stream_seconds", time.monotonic() - started)
+        _tts_metrics.incr("requests_stream")
+        print(f"Streaming synthesis complete. Audio saved to: {self.gcs_uri}")
+
+    def _open_writer(self):
+        blob = get_storage_client(self._project).bucket(self._gcs_bucket_name).blob(self._blob_name)
+        blob.metadata = self._metadata
+        return blob, blob.open("wb", content_type=self._content_type)
+
+    @staticmethod
+    async def _enqueue(queue: asyncio.Queue, chunk: Optional[bytes], uploader: asyncio.Task) -> None:
+        """Waits for room in the bounded queue; raises the upload's error if it fails meanwhile."""
+        if not queue.full() and not uploader.done():
+            queue.put_nowait(chunk)
+            return
+        put = asyncio.ensure_future(queue.put(chunk))
+        await asyncio.wait((put, uploader), return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+        if uploader.done():
+            uploader.result()
+
+    @staticmethod
+    async def _upload(blob, writer, queue: asyncio.Queue) -> None:
+        try:
+            while True:
+                chunk = await queue.get()
+                if chunk is None:
+                    await asyncio.to_thread(writer.close)
+                    return
+                if chunk is _ABORT_UPLOAD:
+                    break
+                await asyncio.to_thread(writer.write, chunk)
+        except Exception:
+            await asyncio.to_thread(_discard_partial_upload, blob, writer)
+            raise
+        await asyncio.to_thread(_discard_partial_upload, blob, writer)
+
+
+_ABORT_UPLOAD = object()
+
+
+def _discard_partial_upload(blob, writer) -> None:
+    """Closes an abandoned stream writer (finalizing what it has) and deletes the object."""
+    try:
+        writer.close()
+        blob.delete()
+    except NotFound:
+        pass
+    except Exception as e:
+        print(f"Warning: could not discard partial stream upload gs://{blob.bucket.name}/{blob.name}: {e}")
+
+
+def stream_text_to_speech(
+    text: str,
+    voice_category: str,
+    speaking_rate: float,
+    audio_encoding: str,
+) -> SpeechStream:
+    """
+    Streams synthesized speech for lowest time-to-first-audio.
+
+    Args:
+        text: SSML to synthesize. Must include <speak> tag. may include <voice> tags.
+        voice_category: one of male_high, female_high, male_low, female_low specifying the voice.
+        speaking_rate: Speed of speech (e.g., 1.0 for normal).
+        audio_encoding: "LINEAR16" or "OGG_OPUS".
+
+    Returns:
+        A SpeechStream to iterate with `async for`; its gcs_uri is set when done.
+    """
+    return synthesize_text_stream(
+        text=text,
+        gcs_bucket_name="byron-alpha-vpagent",
+        voice_category=voice_category,
+        speaking_rate=speaking_rate,
+        audio_encoding=audio_encoding,
+        timeout_seconds=300.0,
+        is_ssml=True,
+        GOOGLE_CLOUD_PROJECT="byron-alpha", #TODO: parameterize
+    )
+
+
+def synthesize_text_stream(
+    text: str,
+    gcs_bucket_name: str,
+    voice_category: str,
+    speaking_rate: float,
+    audio_encoding: str,
+    timeout_seconds: float,
+    is_ssml: bool,
+    GOOGLE_CLOUD_PROJECT: str,
+) -> SpeechStream:
+    """
+    Builds a SpeechStream for text.
+
+    Plain text uses the bidirectional streaming_synthesize API when
+    TTS_STREAMING_VOICE_NAME names a voice that supports it. Otherwise (including all
+    SSML) the input is split into small chunks that are synthesized concurrently with
+    the unary API and yielded in order, so the first sentence plays while the rest is
+    still being synthesized.
+
+    Raises:
+        ValueError: If voice_category or audio_encoding is invalid.
+    """
+    encoding = audio_encoding.upper()
+    if encoding not in _STREAM_ENCODINGS:
+        raise ValueError(f"Invalid audio_encoding: '{audio_encoding}'. Valid options are: {', '.join(_STREAM_ENCODINGS)}")
+    voice_config = _resolve_voice(voice_category)
+    extension, content_type = _STREAM_ENCODINGS[encoding]
+
+    if TTS_STREAMING_VOICE_NAME and not is_ssml:
+        chunks = _stream_native(text, encoding, speaking_rate, timeout_seconds)
     else:
-        synthesis_input = texttospeech.SynthesisInput(text=text)
+        _, voice, audio_config = _build_synthesis_config(text, voice_config, speaking_rate, 0.0, 0.0, is_ssml)
+        audio_config.audio_encoding = texttospeech.AudioEncoding[encoding]
+        audio_config.sample_rate_hertz = TTS_STREAM_SAMPLE_RATE
+        pieces = split_ssml(text, TTS_STREAM_CHUNK_BYTES) if is_ssml else split_text(text, TTS_STREAM_CHUNK_BYTES)
+        chunks = _stream_unary_chunks(pieces, is_ssml, voice, audio_config, encoding, timeout_seconds)
+
+    metadata = {"encoding": encoding, "sample_rate_hertz": str(TTS_STREAM_SAMPLE_RATE), "channels": "1"}
+    blob_name = f"tts_output_{uuid.uuid4()}.{extension}"
+    print(f"Starting streaming synthesis for category '{voice_category}'. Output: gs://{gcs_bucket_name}/{blob_name}")
+    return SpeechStream(chunks, gcs_bucket_name, blob_name, content_type, metadata, GOOGLE_CLOUD_PROJECT)
+
+
+def get_tts_latency_metrics() -> dict:
+    """Returns per-path (fast/chunked/long/memory/stream) request counts and latency statistics."""
+    return _tts_metrics.snapshot()
+
+
+# --- Internal helpers ---
+
+def _resolve_voice(voice_category: str) -> Dict:
+    """Returns the voice config (language_code, name, ssml_gender) for a category; raises ValueError if unknown."""
+    return get_voice_catalog().resolve(voice_category)
+
+
+@dataclass
+class _SynthesisPlan:
+    """What the sync and async entry points decide before calling the API."""
+    voice_category: str
+    cache_key: Optional[str]
+    synthesis_input: texttospeech.SynthesisInput
+    voice: texttospeech.VoiceSelectionParams
+    audio_config: texttospeech.AudioConfig
+    path: str  # "fast", "chunked" or "long"
+    chunks: Optional[List[str]]
+    gcs_bucket_name: str
+    blob_name: str
+
+    @property
+    def gcs_output_uri(self) -> str:
+        return f"gs://{self.gcs_bucket_name}/{self.blob_name}"
+
+
+def _plan_synthesis(
+    text: str,
+    gcs_bucket_name: str,
+    voice_category: str,
+    speaking_rate: float,
+    pitch: float,
+    volume_gain_db: float,
+    is_ssml: bool,
+) -> _SynthesisPlan:
+    """Resolves the voice, cache key, request config, route and output object; raises ValueError for an unknown voice."""
+    voice_config = _resolve_voice(voice_category)
+    cache_key = None
+    if TTS_CACHE_ENABLED:
+        cache_key = _tts_cache_key(
+            text, gcs_bucket_name, voice_config["name"], speaking_rate, pitch, volume_gain_db, is_ssml
+        )
+    synthesis_input, voice, audio_config = _build_synthesis_config(
+        text, voice_config, speaking_rate, pitch, volume_gain_db, is_ssml
+    )
+    path, chunks = _choose_synthesis_path(text, is_ssml)
+    return _SynthesisPlan(
+        voice_category, cache_key, synthesis_input, voice, audio_config, path, chunks,
+        gcs_bucket_name, _output_blob_name(path),
+    )
+
+
+def _cached_result(plan: _SynthesisPlan) -> Optional[str]:
+    """Returns the cached URI for the plan's request, if any (blocking index I/O)."""
+    if not plan.cache_key:
+        return None
+    cached_uri = _tts_cache.get(plan.cache_key)
+    if cached_uri:
+        print(f"TTS cache hit for category '{plan.voice_category}': {cached_uri}")
+    return cached_uri
+
+
+def _finish_synthesis(plan: _SynthesisPlan, elapsed_seconds: float) -> str:
+    """Records latency for the plan's path and caches its URI (blocking index I/O); returns the URI."""
+    _tts_metrics.observe(f"latency_{plan.path}_seconds", elapsed_seconds)
+    _tts_metrics.incr(f"requests_{plan.path}")
+    print(f"Synthesis successful! Audio saved to: {plan.gcs_output_uri}")
+    if plan.cache_key:
+        _tts_cache.put(plan.cache_key, plan.gcs_output_uri)
+    return plan.gcs_output_uri
+
+
+def _use_fast_path(text: str) -> bool:
+    return 0 < len(text.encode("utf-8")) <= min(TTS_FAST_PATH_MAX_BYTES, _UNARY_MAX_BYTES)
+
+
+def _choose_synthesis_path(text: str, is_ssml: bool) -> Tuple[str, Optional[List[str]]]:
+    """Returns ("fast" | "chunked" | "long", chunks); chunks is only set for "chunked"."""
+    if _use_fast_path(text):
+        return "fast", None
+    if TTS_CHUNKED_MODE:
+        target_bytes = min(TTS_CHUNK_TARGET_BYTES, _UNARY_MAX_BYTES)
+        chunks = split_ssml(text, target_bytes) if is_ssml else split_text(text, target_bytes)
+        if len(chunks) > 1 and all(len(chunk.encode("utf-8")) <= _UNARY_MAX_BYTES for chunk in chunks):
+            return "chunked", chunks
+    return "long", None
+
+
+def _output_blob_name(path: str) -> str:
+    """Unary LINEAR16 responses (and chunks stitched from them) carry a RIFF/WAV header, so
+    their objects are .wav; the long-audio operation's output keeps the historical .pcm."""
+    return f"tts_output_{uuid.uuid4()}.{'pcm' if path == 'long' else 'wav'}"
+
+
+def _synthesis_input(text: str, is_ssml: bool) -> texttospeech.SynthesisInput:
+    if is_ssml:
+        return texttospeech.SynthesisInput(ssml=text)
+    return texttospeech.SynthesisInput(text=text)
+
+
+def _build_synthesis_config(
+    text: str,
+    voice_config: dict,
+    speaking_rate: float,
+    pitch: float,
+    volume_gain_db: float,
+    is_ssml: bool,
+):
+    """Returns the (SynthesisInput, VoiceSelectionParams, AudioConfig) shared by all paths."""
+    synthesis_input = _synthesis_input(text, is_ssml)
 
     voice = texttospeech.VoiceSelectionParams(
         language_code=voice_config["language_code"],
@@ -124,10 +677,78 @@ def synthesize_text_to_gcs_sync(
         volume_gain_db=volume_gain_db,
         effects_profile_id=[],
     )
+    return synthesis_input, voice, audio_config
+
+
+def _synthesize_unary(synthesis_input, voice, audio_config, timeout_seconds: float) -> bytes:
+    """Runs one unary synthesize_speech call on the shared standard client."""
+    client = get_standard_client()
+    try:
+        response = client.synthesize_speech(
+            input=synthesis_input, voice=voice, audio_config=audio_config, timeout=timeout_seconds
+        )
+        return response.audio_content
+    except GoogleAPICallError as e:
+        if isinstance(e, ServiceUnavailable):
+            invalidate_tts_client(STANDARD_CLIENT, client)
+        error_message = f"ERROR: Unary synthesis call failed: {e}"
+        print(error_message)
+        raise GoogleAPICallError(error_message) from e
 
-    # 3. Define output location and create request
-    unique_filename = f"tts_output_{uuid.uuid4()}.pcm"
-    gcs_output_uri = f"gs://{gcs_bucket_name}/{unique_filename}"
+
+def _upload_synthesized(plan: _SynthesisPlan, upload, audio, GOOGLE_CLOUD_PROJECT: str) -> None:
+    """Runs upload(audio, bucket, blob name, project), reporting failures against the output URI."""
+    try:
+        upload(audio, plan.gcs_bucket_name, plan.blob_name, GOOGLE_CLOUD_PROJECT)
+    except Exception as e:
+        error_message = f"ERROR: Failed to upload synthesized audio to {plan.gcs_output_uri}: {e.__class__.__name__}: {e}"
+        print(error_message)
+        raise Exception(error_message) from e
+
+
+def _upload_audio_bytes(audio_content: bytes, gcs_bucket_name: str, blob_name: str, GOOGLE_CLOUD_PROJECT: str) -> None:
+    blob = get_storage_client(GOOGLE_CLOUD_PROJECT).bucket(gcs_bucket_name).blob(blob_name)
+    wav = parse_wav_header(audio_content)
+    if wav is not None:
+        stamp_audio_duration(blob, wav.duration_seconds, "wav")
+    blob.upload_from_string(audio_content, content_type="audio/wav")
+    if wav is not None:
+        record_audio_duration(blob, wav.duration_seconds, "wav")
+
+
+def _upload_stitched_wav(segments: List[bytes], gcs_bucket_name: str, blob_name: str, GOOGLE_CLOUD_PROJECT: str) -> None:
+    """Streams the crossfaded concatenation of WAV segments into one GCS object."""
+    formats = [parse_wav_header(segment) for segment in segments]
+    first = formats[0]
+    if first is None or any(
+        f is None or (f.sample_rate, f.channels, f.bits_per_sample) != (first.sample_rate, first.channels, 16)
+        for f in formats
+    ):
+        raise ValueError("Chunk audio segments are not all 16-bit WAV with the same sample rate and channels.")
+
+    views = [pcm_view(segment) for segment in segments]
+    crossfade_frames = int(first.sample_rate * TTS_CHUNK_CROSSFADE_MS / 1000.0)
+    data_size = crossfaded_length([len(view) for view in views], first.channels, crossfade_frames)
+
+    blob = get_storage_client(GOOGLE_CLOUD_PROJECT).bucket(gcs_bucket_name).blob(blob_name)
+    stamp_audio_duration(blob, data_size / float(first.sample_rate * first.channels * 2), "wav")
+    with blob.open("wb", content_type="audio/wav") as out:
+        out.write(build_wav_header(first.sample_rate, first.channels, 16, data_size))
+        write_crossfaded_pcm(out, views, first.channels, crossfade_frames)
+
+
+def _synthesize_long_to_gcs(
+    synthesis_input,
+    voice,
+    audio_config,
+    gcs_output_uri: str,
+    timeout_seconds: float,
+    GOOGLE_CLOUD_PROJECT: str,
+    GOOGLE_CLOUD_LOCATION: str,
+) -> None:
+    """Runs a long-audio operation that writes directly to gcs_output_uri and waits for it."""
+    # Use the shared SYNCHRONOUS client (created once per process, see tts_clients)
+    client = get_long_audio_client()
 
     request = texttospeech.SynthesizeLongAudioRequest(
         input=synthesis_input,
@@ -137,24 +758,23 @@ def synthesize_text_to_gcs_sync(
         parent=f"projects/{GOOGLE_CLOUD_PROJECT}/locations/{GOOGLE_CLOUD_LOCATION}",
     )
 
-    print(f"Starting synthesis operation for category '{voice_category}'. Output: {gcs_output_uri}")
     try:
-        # 4. Initiate the long-running operation
+        # Initiate the long-running operation
         operation = client.synthesize_long_audio(request=request)
 
         print(f"Waiting for operation {operation.operation.name} to complete...")
 
-        # 5. Wait for the operation to complete (using explicit timeout)
+        # Wait for the operation to complete (using explicit timeout)
         result_metadata = operation.result(timeout=timeout_seconds)
 
-        print(f"Synthesis successful! Audio saved to: {gcs_output_uri}")
-        return gcs_output_uri
-
     except RetryError:
         error_message = f"ERROR: Synthesis operation timed out after {timeout_seconds} seconds for {gcs_output_uri}."
         print(error_message)
         raise TimeoutError(error_message)
     except GoogleAPICallError as e:
+        if isinstance(e, ServiceUnavailable):
+            # Channel is likely broken; make the next call build a fresh client.
+            invalidate_tts_client(LONG_AUDIO_CLIENT, client)
         error_message = f"ERROR: API call or operation failed for {gcs_output_uri}: {e}"
         print(error_message)
         raise GoogleAPICallError(error_message) from e
@@ -162,3 +782,121 @@ def synthesize_text_to_gcs_sync(
         error_message = f"ERROR: An unexpected error occurred for {gcs_output_uri}: {e.__class__.__name__}: {e}"
         print(error_message)
         raise Exception(error_message) from e
+
+
+async def _synthesize_unary_async(synthesis_input, voice, audio_config, timeout_seconds: float) -> bytes:
+    """Async counterpart of _synthesize_unary."""
+    client = get_async_tts_client(STANDARD_CLIENT)
+    try:
+        response = await client.synthesize_speech(
+            input=synthesis_input, voice=voice, audio_config=audio_config, timeout=timeout_seconds
+        )
+        return response.audio_content
+    except GoogleAPICallError as e:
+        if isinstance(e, ServiceUnavailable):
+            invalidate_async_tts_client(STANDARD_CLIENT, client)
+        error_message = f"ERROR: Unary synthesis call failed: {e}"
+        print(error_message)
+        raise GoogleAPICallError(error_message) from e
+
+
+async def _synthesize_long_to_gcs_async(
+    synthesis_input,
+    voice,
+    audio_config,
+    gcs_output_uri: str,
+    timeout_seconds: float,
+    GOOGLE_CLOUD_PROJECT: str,
+    GOOGLE_CLOUD_LOCATION: str,
+) -> None:
+    """Async counterpart of _synthesize_long_to_gcs."""
+    client = get_async_tts_client(LONG_AUDIO_CLIENT)
+
+    request = texttospeech.SynthesizeLongAudioRequest(
+        input=synthesis_input,
+        voice=voice,
+        audio_config=audio_config,
+        output_gcs_uri=gcs_output_uri,
+        parent=f"projects/{GOOGLE_CLOUD_PROJECT}/locations/{GOOGLE_CLOUD_LOCATION}",
+    )
+
+    try:
+        operation = await client.synthesize_long_audio(request=request)
+        print(f"Waiting for operation {operation.operation.name} to complete...")
+        await operation.result(timeout=timeout_seconds)
+
+    except (RetryError, asyncio.TimeoutError):
+        error_message = f"ERROR: Synthesis operation timed out after {timeout_seconds} seconds for {gcs_output_uri}."
+        print(error_message)
+        raise TimeoutError(error_message)
+    except GoogleAPICallError as e:
+        if isinstance(e, ServiceUnavailable):
+            invalidate_async_tts_client(LONG_AUDIO_CLIENT, client)
+        error_message = f"ERROR: API call or operation failed for {gcs_output_uri}: {e}"
+        print(error_message)
+        raise GoogleAPICallError(error_message) from e
+    except Exception as e:
+        error_message = f"ERROR: An unexpected error occurred for {gcs_output_uri}: {e.__class__.__name__}: {e}"
+        print(error_message)
+        raise Exception(error_message) from e
+
+
+async def _stream_unary_chunks(
+    pieces: List[str],
+    is_ssml: bool,
+    voice,
+    audio_config,
+    encoding: str,
+    timeout_seconds: float,
+) -> AsyncIterator[bytes]:
+    """Synthesizes pieces concurrently (bounded) and yields their audio in order."""
+    semaphore = asyncio.Semaphore(TTS_CHUNK_MAX_PARALLEL)
+
+    async def _synthesize_piece(piece: str) -> bytes:
+        async with semaphore:
+            return await _synthesize_unary_async(_synthesis_input(piece, is_ssml), voice, audio_config, timeout_seconds)
+
+    tasks = [asyncio.create_task(_synthesize_piece(piece)) for piece in pieces]
+    try:
+        for task in tasks:
+            audio_content = await task
+            # Unary LINEAR16 responses carry a WAV header; the stream is raw PCM.
+            yield bytes(pcm_view(audio_content)) if encoding == "LINEAR16" else audio_content
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _stream_native(
+    text: str,
+    encoding: str,
+    speaking_rate: float,
+    timeout_seconds: float,
+) -> AsyncIterator[bytes]:
+    """Yields audio from the bidirectional streaming_synthesize API, one sentence sent at a time."""
+    client = get_async_tts_client(STANDARD_CLIENT)
+    language_code = "-".join(TTS_STREAMING_VOICE_NAME.split("-")[:2])
+    streaming_config = texttospeech.StreamingSynthesizeConfig(
+        voice=texttospeech.VoiceSelectionParams(language_code=language_code, name=TTS_STREAMING_VOICE_NAME),
+        streaming_audio_config=texttospeech.StreamingAudioConfig(
+            audio_encoding=texttospeech.AudioEncoding.PCM if encoding == "LINEAR16" else texttospeech.AudioEncoding.OGG_OPUS,
+            sample_rate_hertz=TTS_STREAM_SAMPLE_RATE,
+            speaking_rate=speaking_rate,
+        ),
+    )
+
+    async def _requests():
+        yield texttospeech.StreamingSynthesizeRequest(streaming_config=streaming_config)
+        for sentence in split_text(text, TTS_STREAM_CHUNK_BYTES):
+            yield texttospeech.StreamingSynthesizeRequest(input=texttospeech.StreamingSynthesisInput(text=sentence))
+
+    try:
+        responses = await client.streaming_synthesize(requests=_requests(), timeout=timeout_seconds)
+        async for response in responses:
+            yield response.audio_content
+    except GoogleAPICallError as e:
+        if isinstance(e, ServiceUnavailable):
+            invalidate_async_tts_client(STANDARD_CLIENT, client)
+        error_message = f"ERROR: Streaming synthesis failed: {e}"
+        print(error_message)
+        raise GoogleAPICallError(error_message) from e
@@ -0,0 +1,137 @@
+# Filename: tool_executor.py
+# Description: Runs blocking agent tools in bounded per-tool thread pools and exposes
+#              them as async tools, so one slow call (a long TTS operation, a Lyria
+#              request, a GCS download) does not stall every session on the ADK event loop.
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from .metrics import get_metrics
+
+# Default pool size and queue bound per tool. Override for one tool with
+# TOOL_WORKERS_<TOOL_NAME> / TOOL_MAX_QUEUE_<TOOL_NAME>, e.g. TOOL_WORKERS_GENERATE_LYRIA_MUSIC=2.
+TOOL_WORKERS = int(os.getenv("TOOL_WORKERS", "4"))
+TOOL_MAX_QUEUE = int(os.getenv("TOOL_MAX_QUEUE", "32"))
+
+_tool_metrics = get_metrics("tool_executor")
+
+
+class _ToolPool:
+    """Thread pool for one tool, with queued/running counts."""
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"tool-{name}")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+
+    def try_reserve(self) -> bool:
+        """Counts a new call as queued unless the queue is already full."""
+        with self._lock:
+            if self.queued >= self.max_queue + max(0, self.max_workers - self.running):
+                return False
+            self.queued += 1
+            self._publish_locked()
+            return True
+
+    def submit(self, func: Callable, args, kwargs):
+        queued_at = time.monotonic()
+        context = contextvars.copy_context()
+
+        def _run():
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+                self._publish_locked()
+            started = time.monotonic()
+            _tool_metrics.observe(f"{self.name}.wait_seconds", started - queued_at)
+            try:
+                return context.run(func, *args, **kwargs)
+            finally:
+                _tool_metrics.observe(f"{self.name}.run_seconds", time.monotonic() - started)
+                with self._lock:
+                    self.running -= 1
+                    self._publish_locked()
+
+        return self._executor.submit(_run)
+
+    def release_cancelled(self) -> None:
+        """Un-counts a call cancelled while still queued (its _run never starts)."""
+        with self._lock:
+            self.queued -= 1
+            self._publish_locked()
+
+    def _publish_locked(self) -> None:
+        _tool_metrics.set_gauge(f"{self.name}.queued", self.queued)
+        _tool_metrics.set_gauge(f"{self.name}.running", self.running)
+
+
+_pools: Dict[str, _ToolPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(name: str, max_workers: Optional[int], max_queue: Optional[int]) -> _ToolPool:
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            env_name = name.upper()
+            workers = int(os.getenv(f"TOOL_WORKERS_{env_name}", max_workers or TOOL_WORKERS))
+            queue = int(os.getenv(f"TOOL_MAX_QUEUE_{env_name}", TOOL_MAX_QUEUE if max_queue is None else max_queue))
+            pool = _ToolPool(name, workers, queue)
+            _pools[name] = pool
+        return pool
+
+
+def async_tool(
+    func: Callable[..., Any],
+    max_workers: Optional[int] = None,
+    max_queue: Optional[int] = None,
+) -> Callable[..., Any]:
+    """
+    Wraps a blocking tool function as an async tool that runs in its own thread pool.
+
+    The wrapper keeps the function's name, docstring and signature, so the ADK tool
+    declaration is unchanged. Calls beyond the pool size wait in a queue of at most
+    max_queue; when it is full the call returns an "ERROR: ..." string instead of piling
+    up. If the awaiting session is cancelled, a call that has not started is dropped; a
+    running call finishes in its thread and its result is discarded.
+
+    Args:
+        func: The blocking tool.
+        max_workers: Threads for this tool (default TOOL_WORKERS, or TOOL_WORKERS_<NAME>).
+        max_queue: Calls allowed to wait for a thread (default TOOL_MAX_QUEUE).
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        pool = _get_pool(name, max_workers, max_queue)
+        if not pool.try_reserve():
+            _tool_metrics.incr(f"{name}.rejected")
+            return f"ERROR: {name} is busy ({pool.queued} calls waiting). Please try again shortly."
+        future = pool.submit(func, args, kwargs)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if future.cancel():
+                pool.release_cancelled()
+                _tool_metrics.incr(f"{name}.cancelled_queued")
+            else:
+                _tool_metrics.incr(f"{name}.abandoned_running")
+            raise
+
+    return wrapper
+
+
+def get_tool_executor_stats() -> Dict:
+    """Returns per-tool queue depth, running calls, wait/run time percentiles and rejections."""
+    return _tool_metrics.snapshot()
@@ -0,0 +1,220 @@
+# Filename: transcoder_config.py
+# Description: The mux encoding ladder (elementary streams, mux streams, HLS manifest)
+#              in one place. The base JobConfig is built or fetched once, kept as
+#              immutable serialized bytes, and cloned and patched per request.
+
+import os
+from typing import Dict, Optional
+
+from google.api_core.exceptions import AlreadyExists, NotFound
+from google.cloud.video import transcoder_v1
+from google.cloud.video.transcoder_v1.types import JobConfig
+from google.protobuf.duration_pb2 import Duration
+
+from .metrics import get_metrics
+
+# Optional: keep the ladder in a registered Transcoder job template. It is created from
+# the default ladder below if it does not exist, and edits to it apply to new jobs after
+# a restart.
+TRANSCODER_JOB_TEMPLATE_ID = os.getenv("TRANSCODER_JOB_TEMPLATE_ID")
+
+VIDEO_INPUT_KEY = "video_input_key"
+AUDIO_INPUT_KEY = "audio_input_key"
+TEXT_INPUT_KEY = "text_input_key"
+TEXT_MUX_STREAM_KEY = "text-vtt-en"
+ATOM_KEY = "atom_part_0"
+
+_config_metrics = get_metrics("transcoder_config")
+# parent/template -> serialized base JobConfig. Bytes are immutable; every request gets
+# its own deserialized copy.
+_base_configs: Dict[str, bytes] = {}
+
+
+def default_ladder_config() -> JobConfig:
+    """The encoding ladder shared by every mux job (no inputs, edit list or text track)."""
+    config = JobConfig()
+
+    # Video stream elementary stream
+    config.elementary_streams.append(
+        transcoder_v1.types.ElementaryStream(
+            key="output_video_stream",
+            video_stream=transcoder_v1.types.VideoStream(
+                h264=transcoder_v1.types.VideoStream.H264CodecSettings(
+                    height_pixels=720,
+                    width_pixels=1280,
+                    bitrate_bps=5000000,
+                    frame_rate=30,
+                ),
+            ),
+        )
+    )
+
+    # Audio stream elementary stream
+    config.elementary_streams.append(
+        transcoder_v1.types.ElementaryStream(
+            key="output_audio_stream",
+            audio_stream=transcoder_v1.types.AudioStream(
+                codec="aac",
+                bitrate_bps=128000,
+            ),
+        )
+    )
+
+    config.mux_streams.append(
+        transcoder_v1.types.MuxStream(
+            key="sd-hls-fmp4",
+            container="fmp4",
+            elementary_streams=["output_video_stream"],
+        )
+    )
+    config.mux_streams.append(
+        transcoder_v1.types.MuxStream(
+            key="audio-hls-fmp4",
+            container="fmp4",
+            elementary_streams=["output_audio_stream"],
+        )
+    )
+    # The subtitle stream is listed by build_mux_job_config when a job has a text track.
+    config.manifests.append(
+        transcoder_v1.types.Manifest(
+            file_name="manifest.m3u8",
+            type_="HLS",
+            mux_streams=[stream.key for stream in config.mux_streams],
+        ),
+    )
+    return config
+
+
+async def get_base_job_config(client, parent: str, template_id: Optional[str] = TRANSCODER_JOB_TEMPLATE_ID) -> bytes:
+    """
+    Returns the serialized base JobConfig, building or fetching it only once per process.
+
+    Args:
+        client: TranscoderServiceAsyncClient (only used when template_id is set).
+        parent: "projects/<project>/locations/<location>".
+        template_id: Job template holding the ladder; None uses default_ladder_config().
+    """
+    cache_key = f"{parent}/{template_id}"
+    base = _base_configs.get(cache_key)
+    if base is None:
+        # Concurrent first calls may both build it; the results are identical.
+        if template_id:
+            config = await ensure_job_template(client, parent, template_id)
+        else:
+            config = default_ladder_config()
+        base = JobConfig.serialize(config)
+        _base_configs[cache_key] = base
+        _config_metrics.incr("base_config_builds")
+    return base
+
+
+async def ensure_job_template(client, parent: str, template_id: str) -> JobConfig:
+    """Returns the config of the named job template, registering the default ladder under it if missing."""
+    name = f"{parent}/jobTemplates/{template_id}"
+    try:
+        template = await client.get_job_template(name=name)
+    except NotFound:
+        try:
+            template = await client.create_job_template(
+                parent=parent,
+                job_template=transcoder_v1.types.JobTemplate(config=default_ladder_config()),
+                job_template_id=template_id,
+            )
+            print(f"Registered Transcoder job template: {name}")
+        except AlreadyExists:  # Another process registered it first
+            template = await client.get_job_template(name=name)
+    return template.config
+
+
+def build_mux_job_config(
+    base_config: bytes,
+    video_uri: str,
+    audio_uri: str,
+    end_time_offset: float,
+    text_track_uri: Optional[str] = None,
+    pubsub_topic: Optional[str] = None,
+) -> JobConfig:
+    """
+    Clones the base config and fills in the per-request fields: inputs, the edit list,
+    the optional subtitle track and the completion topic.
+
+    Job templates cannot carry these (a templated job may only supply one input_uri),
+    so jobs are always submitted with the patched config inline.
+    """
+    config = JobConfig.deserialize(base_config)
+    _config_metrics.incr("configs_cloned")
+
+    config.inputs.append(transcoder_v1.types.Input(key=VIDEO_INPUT_KEY, uri=video_uri))
+    config.inputs.append(transcoder_v1.types.Input(key=AUDIO_INPUT_KEY, uri=audio_uri))
+    edit_atom_inputs = [VIDEO_INPUT_KEY, AUDIO_INPUT_KEY]
+    if text_track_uri:
+        config.inputs.append(transcoder_v1.types.Input(key=TEXT_INPUT_KEY, uri=text_track_uri))
+        edit_atom_inputs.append(TEXT_INPUT_KEY)
+
+    config.edit_list.append(
+        transcoder_v1.types.EditAtom(
+            key=ATOM_KEY,
+            inputs=edit_atom_inputs,
+            start_time_offset=Duration(seconds=0),
+            end_time_offset=seconds_to_duration(end_time_offset),
+        )
+    )
+
+    if text_track_uri:
+        config.elementary_streams.append(
+            transcoder_v1.types.ElementaryStream(
+                key="output_text_stream",
+                text_stream=transcoder_v1.types.TextStream(
+                    codec="webvtt",
+                    language_code="en-US",
+                    display_name="English",
+                    mapping_=[
+                        transcoder_v1.types.TextStream.TextMapping(
+                            atom_key=ATOM_KEY,
+                            input_key=TEXT_INPUT_KEY,
+                        ),
+                    ],
+                ),
+            )
+        )
+        # The text stream is muxed on its own (VTT), not into the MP4/fMP4 streams.
+        config.mux_streams.append(
+            transcoder_v1.types.MuxStream(
+                key=TEXT_MUX_STREAM_KEY,
+                container="vtt",
+                elementary_streams=["output_text_stream"],
+                segment_settings=transcoder_v1.types.SegmentSettings(
+                    segment_duration=seconds_to_duration(end_time_offset),
+                    individual_segments=True,
+                ),
+            )
+        )
+
+    _sync_manifest_streams(config, add_text=bool(text_track_uri))
+
+    if pubsub_topic:
+        config.pubsub_destination = transcoder_v1.types.PubsubDestination(topic=pubsub_topic)
+    return config
+
+
+def _sync_manifest_streams(config: JobConfig, add_text: bool) -> None:
+    """
+    Makes every manifest list only mux streams the job produces. The text stream joins
+    the HLS manifests when the job has one; a template from before text tracks were
+    optional may still list it, and the Transcoder rejects a job whose manifest names a
+    missing stream.
+    """
+    present = {stream.key for stream in config.mux_streams}
+    for manifest in config.manifests:
+        streams = [key for key in manifest.mux_streams if key in present]
+        if add_text and manifest.type_ == transcoder_v1.types.Manifest.ManifestType.HLS and TEXT_MUX_STREAM_KEY not in streams:
+            streams.append(TEXT_MUX_STREAM_KEY)
+        manifest.mux_streams = streams
+
+
+def seconds_to_duration(seconds: float) -> Duration:
+    """Converts float seconds to a protobuf Duration."""
+    duration = Duration()
+    duration.seconds = int(seconds)
+    duration.nanos = int((seconds - duration.seconds) * 1e9)
+    return duration
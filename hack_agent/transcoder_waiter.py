@@ -0,0 +1,211 @@
+# Filename: transcoder_waiter.py
+# Description: How MuxScheduler waits for Transcoder jobs: the adaptive get_job poll
+#              schedule (fast first, then paced by an ETA estimate), the learned
+#              processing speed behind the ETA, completion metrics, and the Pub/Sub
+#              listener that resolves jobs on their completion notification when a
+#              subscription is configured (polling then only runs as a slow safety net).
+
+import asyncio
+import datetime
+import json
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from google.cloud.video.transcoder_v1.types import Job
+
+from .metrics import get_metrics
+
+TRANSCODER_POLL_INITIAL_SECONDS = float(os.getenv("TRANSCODER_POLL_INITIAL_SECONDS", "1.0"))
+TRANSCODER_POLL_MULTIPLIER = float(os.getenv("TRANSCODER_POLL_MULTIPLIER", "1.5"))
+TRANSCODER_POLL_MAX_SECONDS = float(os.getenv("TRANSCODER_POLL_MAX_SECONDS", "15"))
+TRANSCODER_WAIT_TIMEOUT_SECONDS = float(os.getenv("TRANSCODER_WAIT_TIMEOUT_SECONDS", "1800"))
+# Push mode: the job's pubsub_destination topic and a subscription attached to it. Needs
+# the optional google-cloud-pubsub package (honours PUBSUB_EMULATOR_HOST).
+TRANSCODER_PUBSUB_TOPIC = os.getenv("TRANSCODER_PUBSUB_TOPIC")
+TRANSCODER_PUBSUB_SUBSCRIPTION = os.getenv("TRANSCODER_PUBSUB_SUBSCRIPTION")
+# In push mode, get_job is still called this often in case a notification is lost.
+TRANSCODER_PUSH_FALLBACK_POLL_SECONDS = float(os.getenv("TRANSCODER_PUSH_FALLBACK_POLL_SECONDS", "60"))
+
+FINAL_STATES = (Job.ProcessingState.SUCCEEDED, Job.ProcessingState.FAILED)
+
+_transcoder_metrics = get_metrics("transcoder")
+
+
+class TranscoderJobError(Exception):
+    """The Transcoder job finished in the FAILED state."""
+
+
+class PollSchedule:
+    """
+    Delays between get_job calls.
+
+    Without an ETA the delay grows geometrically from initial_seconds to max_seconds.
+    With an ETA (from job progress, or from the learned seconds of processing per second
+    of media) the next poll is timed for the expected completion, clamped to the same
+    bounds; once the ETA has passed, polling restarts from initial_seconds.
+    """
+
+    def __init__(
+        self,
+        initial_seconds: float = TRANSCODER_POLL_INITIAL_SECONDS,
+        multiplier: float = TRANSCODER_POLL_MULTIPLIER,
+        max_seconds: float = TRANSCODER_POLL_MAX_SECONDS,
+    ):
+        self.initial_seconds = initial_seconds
+        self.multiplier = multiplier
+        self.max_seconds = max_seconds
+        self._attempt = 0
+
+    def next_delay(self, eta_seconds: Optional[float]) -> float:
+        if eta_seconds is not None and eta_seconds > 0:
+            self._attempt = 0
+            return min(self.max_seconds, max(self.initial_seconds, eta_seconds))
+        delay = min(self.max_seconds, self.initial_seconds * (self.multiplier ** self._attempt))
+        self._attempt += 1
+        return delay
+
+
+class _ThroughputModel:
+    """EWMA of Transcoder processing seconds per second of output media."""
+
+    def __init__(self, alpha: float = 0.3):
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._seconds_per_media_second: Optional[float] = None
+
+    def observe(self, job_seconds: float, media_seconds: float) -> None:
+        if job_seconds <= 0 or media_seconds <= 0:
+            return
+        ratio = job_seconds / media_seconds
+        with self._lock:
+            current = self._seconds_per_media_second
+            self._seconds_per_media_second = ratio if current is None else current + self.alpha * (ratio - current)
+
+    def expected_seconds(self, media_seconds: Optional[float]) -> Optional[float]:
+        with self._lock:
+            ratio = self._seconds_per_media_second
+        if ratio is None or not media_seconds:
+            return None
+        return ratio * media_seconds
+
+
+_throughput = _ThroughputModel()
+
+
+def estimate_eta_seconds(job: Job, elapsed_seconds: float, media_seconds: Optional[float]) -> Optional[float]:
+    """
+    Seconds until job is expected to finish, or None if there is nothing to go on.
+
+    Uses the job's progress fraction when the API reports one (Transcoder v1 does not; the
+    field is read if present), otherwise the learned processing speed for media_seconds.
+    """
+    progress = getattr(job, "progress", None)
+    fraction = getattr(progress, "processed", None) if progress is not None else None
+    if fraction:
+        return elapsed_seconds * (1.0 - fraction) / fraction
+    expected = _throughput.expected_seconds(media_seconds)
+    if expected is None:
+        return None
+    return expected - elapsed_seconds
+
+
+def get_transcoder_metrics() -> dict:
+    """Returns job time, wait time, added latency and poll counts."""
+    return _transcoder_metrics.snapshot()
+
+
+def job_failure(job: Job, job_name: str) -> TranscoderJobError:
+    """Builds the error for a FAILED job from its error status."""
+    error_message = "Unknown error"
+    if job.error:
+        error_message = getattr(job.error, 'message', str(job.error))
+    return TranscoderJobError(f"Transcoder job '{job_name}' failed: {error_message}")
+
+
+def record_job_completion(job: Job, waited_seconds: float, polls: int, media_seconds: Optional[float]) -> None:
+    """Records wait/job time for a finished job and feeds the processing-speed model used for ETAs."""
+    _transcoder_metrics.incr("jobs")
+    _transcoder_metrics.observe("wait_seconds", waited_seconds)
+    _transcoder_metrics.observe("polls_per_job", polls)
+    start, end = _as_datetime(job.start_time), _as_datetime(job.end_time)
+    if start is not None and end is not None:
+        job_seconds = (end - start).total_seconds()
+        _transcoder_metrics.observe("job_seconds", job_seconds)
+        if media_seconds:
+            _throughput.observe(job_seconds, media_seconds)
+    if end is not None:
+        # How long after the job actually ended we noticed (clock skew aside).
+        now = datetime.datetime.now(datetime.timezone.utc)
+        _transcoder_metrics.observe("added_latency_seconds", max(0.0, (now - end).total_seconds()))
+
+
+def _as_datetime(value) -> Optional[datetime.datetime]:
+    """proto-plus returns Timestamp fields as aware datetimes; unset ones are falsy or None."""
+    if not value or not isinstance(value, datetime.datetime) or value.timestamp() <= 0:
+        return None
+    return value if value.tzinfo else value.replace(tzinfo=datetime.timezone.utc)
+
+
+# --- Push mode ---
+
+class _PushListener:
+    """Streaming-pull subscriber that resolves one future per job on its notification."""
+
+    def __init__(self, subscription: str):
+        from google.cloud import pubsub_v1  # Optional dependency
+
+        self.subscription = subscription
+        self._lock = threading.Lock()
+        self._waiters: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = {}
+        self._subscriber = pubsub_v1.SubscriberClient()
+        self._streaming_pull = self._subscriber.subscribe(subscription, callback=self._on_message)
+
+    def register(self, job_name: str) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            self._waiters[job_name] = (loop, future)
+        return future
+
+    def unregister(self, job_name: str) -> None:
+        with self._lock:
+            self._waiters.pop(job_name, None)
+
+    def _on_message(self, message) -> None:
+        """Runs on the subscriber's thread pool."""
+        try:
+            job = json.loads(message.data.decode("utf-8")).get("job", {})
+        except (ValueError, UnicodeDecodeError):
+            job = {}
+        # Acked either way: the waiter confirms with get_job, and unknown jobs fall back to polling.
+        message.ack()
+        with self._lock:
+            waiter = self._waiters.get(job.get("name", ""))
+        if waiter is not None:
+            loop, future = waiter
+            loop.call_soon_threadsafe(_resolve, future, job.get("state"))
+
+
+def _resolve(future: asyncio.Future, state) -> None:
+    if not future.done():
+        future.set_result(state)
+
+
+_listeners: Dict[str, Optional[_PushListener]] = {}
+_listeners_lock = threading.Lock()
+
+
+def get_push_listener(subscription: str) -> Optional[_PushListener]:
+    """Returns the shared listener for subscription, or None if push mode is unavailable."""
+    with _listeners_lock:
+        if subscription not in _listeners:
+            try:
+                _listeners[subscription] = _PushListener(subscription)
+            except ImportError:
+                print("WARNING: TRANSCODER_PUBSUB_SUBSCRIPTION is set but google-cloud-pubsub is not installed; polling instead.")
+                _listeners[subscription] = None
+            except Exception as e:
+                print(f"WARNING: Could not subscribe to '{subscription}' ({e.__class__.__name__}: {e}); polling instead.")
+                _listeners[subscription] = None
+        return _listeners[subscription]
@@ -0,0 +1,211 @@
+# Filename: tts_clients.py
+# Description: Process-wide, thread-safe registry of Google Text-to-Speech clients.
+#              Clients are created lazily, reused across requests and replaced
+#              when their gRPC channel shuts down or they exceed a maximum age.
+#              Async clients are bound to an event loop, so they are pooled per loop.
+
+import asyncio
+import os
+import threading
+import time
+import weakref
+from typing import Callable, Dict, Optional
+
+import grpc
+from google.cloud import texttospeech_v1 as texttospeech
+
+# --- Client Kinds ---
+LONG_AUDIO_CLIENT = "long_audio"
+STANDARD_CLIENT = "standard"
+
+_CLIENT_FACTORIES: Dict[str, Callable[[], object]] = {
+    LONG_AUDIO_CLIENT: texttospeech.TextToSpeechLongAudioSynthesizeClient,
+    STANDARD_CLIENT: texttospeech.TextToSpeechClient,
+}
+
+_ASYNC_CLIENT_FACTORIES: Dict[str, Callable[[], object]] = {
+    LONG_AUDIO_CLIENT: texttospeech.TextToSpeechLongAudioSynthesizeAsyncClient,
+    STANDARD_CLIENT: texttospeech.TextToSpeechAsyncClient,
+}
+
+# Clients older than this are rebuilt on next use (credentials/channels are long lived,
+# but a periodic rebuild protects against silently wedged connections).
+TTS_CLIENT_MAX_AGE_SECONDS = float(os.getenv("TTS_CLIENT_MAX_AGE_SECONDS", "3600"))
+
+
+class _PooledClient:
+    """A client plus the bookkeeping needed to decide whether it can be reused."""
+
+    def __init__(self, client: object):
+        self.client = client
+        self.created_at = time.monotonic()
+        self.healthy = True
+        self._channel = getattr(getattr(client, "transport", None), "grpc_channel", None)
+        self._watch_channel()
+
+    def _watch_channel(self) -> None:
+        """Marks the client unhealthy as soon as its gRPC channel is shut down."""
+        channel = self._channel
+        if channel is None or not hasattr(channel, "subscribe"):
+            # REST transports and grpc.aio channels have no connectivity callbacks.
+            return
+
+        def _on_state_change(state: grpc.ChannelConnectivity) -> None:
+            if state == grpc.ChannelConnectivity.SHUTDOWN:
+                self.healthy = False
+
+        try:
+            channel.subscribe(_on_state_change, try_to_connect=False)
+        except Exception as e:
+            # Age-based expiry still applies if the channel cannot be watched.
+            print(f"WARNING: Could not watch TTS channel connectivity: {e}")
+
+    def _channel_closed(self) -> bool:
+        """True once the channel was closed locally (e.g. client.transport.close())."""
+        if self._channel is None:
+            return False
+        if isinstance(self._channel, grpc.aio.Channel):
+            return self._channel.get_state(try_to_connect=False) == grpc.ChannelConnectivity.SHUTDOWN
+        # Sync channels never report a local close() to subscribers and have no public
+        # state query, but a closed channel refuses this non-connecting one.
+        check = getattr(getattr(self._channel, "_channel", None), "check_connectivity_state", None)
+        if check is None:
+            return False
+        try:
+            check(False)
+        except ValueError:
+            return True
+        return False
+
+    def is_reusable(self) -> bool:
+        if self.healthy and self._channel_closed():
+            self.healthy = False
+        return self.healthy and (time.monotonic() - self.created_at) < TTS_CLIENT_MAX_AGE_SECONDS
+
+
+_clients: Dict[str, _PooledClient] = {}
+_clients_lock = threading.Lock()
+
+# event loop -> {kind: _PooledClient}; entries disappear with their loop.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, _PooledClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_tts_client(kind: str = STANDARD_CLIENT):
+    """
+    Returns the shared Text-to-Speech client of the given kind, creating it on first use.
+
+    Args:
+        kind: LONG_AUDIO_CLIENT or STANDARD_CLIENT.
+
+    Returns:
+        A TextToSpeechLongAudioSynthesizeClient or TextToSpeechClient instance that is
+        safe to share between threads.
+
+    Raises:
+        ValueError: If an unknown client kind is requested.
+    """
+    if kind not in _CLIENT_FACTORIES:
+        raise ValueError(f"Unknown TTS client kind: '{kind}'. Valid options are: {', '.join(_CLIENT_FACTORIES)}")
+
+    pooled = _clients.get(kind)
+    if pooled is not None and pooled.is_reusable():
+        return pooled.client
+
+    with _clients_lock:
+        pooled = _clients.get(kind)
+        if pooled is None or not pooled.is_reusable():
+            if pooled is not None:
+                # The old client is not closed here: other threads may still be mid-call
+                # on it. Its channel is released once the last reference goes away.
+                print(f"Replacing stale TTS client '{kind}'.")
+            pooled = _PooledClient(_CLIENT_FACTORIES[kind]())
+            _clients[kind] = pooled
+        return pooled.client
+
+
+def get_long_audio_client() -> texttospeech.TextToSpeechLongAudioSynthesizeClient:
+    """Returns the shared long-audio synthesis client."""
+    return get_tts_client(LONG_AUDIO_CLIENT)
+
+
+def get_standard_client() -> texttospeech.TextToSpeechClient:
+    """Returns the shared standard (unary) synthesis client."""
+    return get_tts_client(STANDARD_CLIENT)
+
+
+def get_async_tts_client(kind: str = STANDARD_CLIENT):
+    """
+    Returns the async Text-to-Speech client of the given kind for the running event loop.
+
+    Must be called from a coroutine. Each event loop gets its own clients because gRPC
+    aio channels cannot be shared across loops.
+
+    Args:
+        kind: LONG_AUDIO_CLIENT or STANDARD_CLIENT.
+
+    Returns:
+        A TextToSpeechLongAudioSynthesizeAsyncClient or TextToSpeechAsyncClient instance.
+
+    Raises:
+        ValueError: If an unknown client kind is requested.
+        RuntimeError: If called without a running event loop.
+    """
+    if kind not in _ASYNC_CLIENT_FACTORIES:
+        raise ValueError(f"Unknown TTS client kind: '{kind}'. Valid options are: {', '.join(_ASYNC_CLIENT_FACTORIES)}")
+
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        loop_clients = _async_clients.setdefault(loop, {})
+        pooled = loop_clients.get(kind)
+        if pooled is None or not pooled.is_reusable():
+            pooled = _PooledClient(_ASYNC_CLIENT_FACTORIES[kind]())
+            loop_clients[kind] = pooled
+        return pooled.client
+
+
+def invalidate_async_tts_client(kind: str, client: Optional[object] = None) -> None:
+    """Like invalidate_tts_client, for the async client of the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        loop_clients = _async_clients.get(loop, {})
+        pooled = loop_clients.get(kind)
+        if pooled is None or (client is not None and pooled.client is not client):
+            return
+        del loop_clients[kind]
+
+
+def invalidate_tts_client(kind: str, client: Optional[object] = None) -> None:
+    """
+    Drops a pooled client so the next caller gets a fresh one.
+
+    Args:
+        kind: The client kind to invalidate.
+        client: If given, only invalidate when the pooled client is this instance, so a
+                late failure on an old client does not evict its replacement.
+    """
+    with _clients_lock:
+        pooled = _clients.get(kind)
+        if pooled is None or (client is not None and pooled.client is not client):
+            return
+        del _clients[kind]
+
+
+def warm_up_tts_clients() -> None:
+    """
+    Eagerly creates all TTS clients and opens their channels.
+
+    Intended to be called once at agent start so the first request does not pay for
+    credential discovery and the TLS handshake. Failures are logged, not raised.
+    """
+    for kind in _CLIENT_FACTORIES:
+        try:
+            client = get_tts_client(kind)
+            channel = getattr(getattr(client, "transport", None), "grpc_channel", None)
+            if channel is not None:
+                grpc.channel_ready_future(channel).result(timeout=10)
+            print(f"TTS client '{kind}' warmed up.")
+        except Exception as e:
+            print(f"WARNING: Failed to warm up TTS client '{kind}': {e.__class__.__name__}: {e}")
+
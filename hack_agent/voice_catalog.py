@@ -0,0 +1,266 @@
+# Filename: voice_catalog.py
+# Description: Indexed catalog of Text-to-Speech voices. list_voices is called at most
+#              once per refresh interval; the result is persisted to a local snapshot
+#              and indexed by language, gender, tier and voice category.
+
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from google.cloud.texttospeech_v1.types import SsmlVoiceGender
+
+from .tts_clients import get_standard_client
+
+# --- Pinned Category Voices ---
+# These keep the historical en-US voices for the four original categories; every other
+# (language, category) pair is resolved from the catalog.
+VOICE_CATEGORY_DEFAULTS = {
+    "male_high": {"language_code": "en-US", "name": "en-US-Wavenet-D", "ssml_gender": SsmlVoiceGender.MALE},
+    "female_high": {"language_code": "en-US", "name": "en-US-Wavenet-F", "ssml_gender": SsmlVoiceGender.FEMALE},
+    "male_low": {"language_code": "en-US", "name": "en-US-Standard-D", "ssml_gender": SsmlVoiceGender.MALE},
+    "female_low": {"language_code": "en-US", "name": "en-US-Standard-F", "ssml_gender": SsmlVoiceGender.FEMALE},
+}
+
+# Quality levels map to voice tiers in order of preference. Any tier can also be asked
+# for directly, e.g. "female_neural2" or "male_chirp3-hd".
+CATEGORY_TIERS = {
+    "high": ["Wavenet", "Neural2", "Studio"],
+    "low": ["Standard"],
+}
+
+DEFAULT_LANGUAGE_CODE = os.getenv("TTS_LANGUAGE_CODE", "en-US")
+VOICE_CATALOG_PATH = os.getenv(
+    "TTS_VOICE_CATALOG_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "hack_agent", "voice_catalog.json"),
+)
+VOICE_CATALOG_REFRESH_SECONDS = float(os.getenv("TTS_VOICE_CATALOG_REFRESH_SECONDS", "86400"))
+# Offline seed used until the first snapshot exists (and by tests).
+VOICE_CATALOG_FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "voice_catalog_fixture.json")
+
+
+def parse_voice_name(name: str) -> Tuple[str, str]:
+    """
+    Splits a voice name into (language_code, tier).
+
+    Examples: "en-US-Wavenet-D" -> ("en-US", "Wavenet"),
+              "en-US-Chirp3-HD-Charon" -> ("en-US", "Chirp3-HD").
+    """
+    parts = name.split("-")
+    if len(parts) < 4:
+        return "-".join(parts[:2]), ""
+    return "-".join(parts[:2]), "-".join(parts[2:-1])
+
+
+class VoiceCatalog:
+    """
+    In-memory indexes over a list of voices, with lazy loading and background refresh.
+
+    Voices are plain dicts with name, language_codes, ssml_gender (e.g. "MALE") and
+    natural_sample_rate_hertz, matching the persisted snapshot format.
+    """
+
+    def __init__(
+        self,
+        snapshot_path: Optional[str],
+        refresh_seconds: float,
+        fetch_voices: Optional[Callable[[], List[Dict]]],
+        fallback_path: Optional[str] = VOICE_CATALOG_FIXTURE_PATH,
+    ):
+        self.snapshot_path = snapshot_path
+        self.refresh_seconds = refresh_seconds
+        self.fallback_path = fallback_path
+        self._fetch_voices = fetch_voices
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._fetched_at = 0.0
+        self._refreshing = False
+        self.by_name: Dict[str, Dict] = {}
+        self.by_language: Dict[str, List[Dict]] = {}
+        self.by_gender: Dict[str, List[Dict]] = {}
+        self.by_tier: Dict[str, List[Dict]] = {}
+        self.by_category: Dict[Tuple[str, str], Dict] = {}
+
+    # --- Lookups ---
+
+    def resolve(self, voice_category: str, language_code: Optional[str] = None) -> Dict:
+        """
+        Resolves a voice category to VoiceSelectionParams fields in O(1).
+
+        Args:
+            voice_category: "<gender>_<high|low|tier>", optionally prefixed by a language
+                            code, e.g. "male_high", "female_neural2", "en-GB:female_high".
+            language_code: Language to use when voice_category has no prefix
+                           (defaults to TTS_LANGUAGE_CODE).
+
+        Returns:
+            A dict with language_code, name and ssml_gender (SsmlVoiceGender).
+
+        Raises:
+            ValueError: If no voice matches the category in that language.
+        """
+        self._ensure_loaded()
+        language, category = self.split_category(voice_category, language_code)
+        voice = self.by_category.get((language.lower(), category))
+        pinned = VOICE_CATEGORY_DEFAULTS.get(category)
+        if voice is None and pinned is not None and pinned["language_code"].lower() == language.lower():
+            return dict(pinned)  # Catalog is empty or lacks the pinned voice
+        if voice is None:
+            valid = sorted(c for (lang, c) in self.by_category if lang == language.lower())
+            raise ValueError(
+                f"Invalid voice_category: '{voice_category}' for language '{language}'. "
+                f"Valid options are: {', '.join(valid) if valid else 'none (unknown language)'}"
+            )
+        return {
+            "language_code": language,
+            "name": voice["name"],
+            "ssml_gender": SsmlVoiceGender[voice["ssml_gender"]],
+        }
+
+    def categories(self, language_code: Optional[str] = None) -> List[str]:
+        """Returns the categories available for a language."""
+        self._ensure_loaded()
+        language = (language_code or DEFAULT_LANGUAGE_CODE).lower()
+        return sorted(c for (lang, c) in self.by_category if lang == language)
+
+    @staticmethod
+    def split_category(voice_category: str, language_code: Optional[str] = None) -> Tuple[str, str]:
+        """Returns (language_code, normalized category) for a possibly prefixed category."""
+        language = language_code or DEFAULT_LANGUAGE_CODE
+        category = voice_category.strip()
+        if ":" in category:
+            language, category = category.split(":", 1)
+        return language.strip(), category.lower().replace(" ", "_")
+
+    # --- Loading ---
+
+    def load_voices(self, voices: List[Dict], fetched_at: float) -> None:
+        """Replaces the indexes with the given voices."""
+        by_name, by_language, by_gender, by_tier = {}, {}, {}, {}
+        for voice in sorted(voices, key=lambda v: v["name"]):
+            _, tier = parse_voice_name(voice["name"])
+            by_name[voice["name"]] = voice
+            for language in voice["language_codes"]:
+                by_language.setdefault(language.lower(), []).append(voice)
+            by_gender.setdefault(voice["ssml_gender"], []).append(voice)
+            by_tier.setdefault(tier.lower(), []).append(voice)
+
+        by_category: Dict[Tuple[str, str], Dict] = {}
+        for language, language_voices in by_language.items():
+            for voice in language_voices:
+                _, tier = parse_voice_name(voice["name"])
+                gender = voice["ssml_gender"].lower()
+                by_category.setdefault((language, f"{gender}_{tier.lower()}"), voice)
+            for level, tiers in CATEGORY_TIERS.items():
+                for gender in ("male", "female"):
+                    for tier in tiers:
+                        match = next(
+                            (v for v in language_voices
+                             if v["ssml_gender"].lower() == gender and parse_voice_name(v["name"])[1] == tier),
+                            None,
+                        )
+                        if match is not None:
+                            by_category.setdefault((language, f"{gender}_{level}"), match)
+                            break
+        for category, pinned in VOICE_CATEGORY_DEFAULTS.items():
+            if pinned["name"] in by_name:
+                by_category[(pinned["language_code"].lower(), category)] = by_name[pinned["name"]]
+
+        with self._lock:
+            self.by_name, self.by_language, self.by_gender, self.by_tier = by_name, by_language, by_gender, by_tier
+            self.by_category = by_category
+            self._fetched_at = fetched_at
+            self._loaded = True
+
+    def load_snapshot(self, path: str) -> bool:
+        """Loads voices from a snapshot file. Returns False if it is missing or unreadable."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            self.load_voices(snapshot["voices"], snapshot.get("fetched_at", 0.0))
+            return True
+        except (OSError, ValueError, KeyError) as e:
+            if os.path.exists(path):
+                print(f"WARNING: Ignoring unreadable voice catalog snapshot '{path}': {e}")
+            return False
+
+    def refresh(self) -> None:
+        """Fetches voices from the API, re-indexes them and writes the snapshot."""
+        if self._fetch_voices is None:
+            return
+        voices = self._fetch_voices()
+        fetched_at = time.time()
+        self.load_voices(voices, fetched_at)
+        print(f"Voice catalog refreshed: {len(voices)} voices.")
+        if self.snapshot_path:
+            try:
+                os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+                tmp_path = f"{self.snapshot_path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"fetched_at": fetched_at, "voices": voices}, f)
+                os.replace(tmp_path, self.snapshot_path)
+            except OSError as e:
+                print(f"WARNING: Failed to write voice catalog snapshot '{self.snapshot_path}': {e}")
+
+    def _ensure_loaded(self) -> None:
+        """Loads the snapshot (or offline fixture) on first use; refreshes stale data in the background."""
+        if not self._loaded:
+            with self._lock:
+                first_load = not self._loaded
+            if first_load:
+                if not (self.snapshot_path and self.load_snapshot(self.snapshot_path)):
+                    if not (self.fallback_path and self.load_snapshot(self.fallback_path)):
+                        self.load_voices([], 0.0)
+        if time.time() - self._fetched_at >= self.refresh_seconds:
+            self._refresh_in_background()
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refreshing or self._fetch_voices is None:
+                return
+            self._refreshing = True
+
+        def _run() -> None:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"WARNING: Voice catalog refresh failed: {e.__class__.__name__}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing = False
+                    # Back off for a full interval after a failure as well.
+                    self._fetched_at = max(self._fetched_at, time.time())
+
+        threading.Thread(target=_run, name="voice-catalog-refresh", daemon=True).start()
+
+
+def _list_voices_from_api() -> List[Dict]:
+    """Calls list_voices once on the shared client and converts voices to snapshot dicts."""
+    response = get_standard_client().list_voices()
+    return [
+        {
+            "name": voice.name,
+            "language_codes": list(voice.language_codes),
+            "ssml_gender": SsmlVoiceGender(voice.ssml_gender).name,
+            "natural_sample_rate_hertz": voice.natural_sample_rate_hertz,
+        }
+        for voice in response.voices
+    ]
+
+
+_catalog: Optional[VoiceCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_voice_catalog() -> VoiceCatalog:
+    """Returns the process-wide voice catalog (created lazily, loaded on first lookup)."""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = VoiceCatalog(
+                snapshot_path=VOICE_CATALOG_PATH,
+                refresh_seconds=VOICE_CATALOG_REFRESH_SECONDS,
+                fetch_voices=_list_voices_from_api,
+            )
+        return _catalog
@@ -0,0 +1,146 @@
+# Filename: wav_utils.py
+# Description: Small helpers for 16-bit PCM / WAV data: header parsing and building,
+#              and streaming concatenation of PCM segments with short crossfades.
+
+import struct
+from dataclasses import dataclass
+from typing import BinaryIO, List, Optional
+
+import numpy as np
+
+WAV_HEADER_SIZE = 44
+
+
+@dataclass(frozen=True)
+class WavFormat:
+    """Format of a PCM payload plus where it sits inside its container."""
+    sample_rate: int
+    channels: int
+    bits_per_sample: int
+    data_offset: int
+    data_size: int
+
+    @property
+    def frame_size(self) -> int:
+        return self.channels * self.bits_per_sample // 8
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.data_size / float(self.sample_rate * self.frame_size)
+
+
+def parse_wav_header(data: bytes, total_size: Optional[int] = None) -> Optional[WavFormat]:
+    """
+    Parses the RIFF/WAVE header at the start of data.
+
+    Args:
+        data: At least the first few hundred bytes of the file (the whole file is fine).
+        total_size: Size of the whole file if data is only a prefix. Used when the data
+                    chunk size is missing or larger than the file (streamed WAVs).
+
+    Returns:
+        The WavFormat, or None if data does not start with a RIFF/WAVE header or the
+        fmt/data chunks are not within data.
+    """
+    if len(data) < 12 or data[0:4] != b"RIFF" or data[8:12] != b"WAVE":
+        return None
+    total_size = total_size if total_size is not None else len(data)
+
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id = data[offset:offset + 4]
+        chunk_size = struct.unpack_from("<I", data, offset + 4)[0]
+        body = offset + 8
+        if chunk_id == b"fmt " and body + 16 <= len(data):
+            _, channels, sample_rate, _, _, bits = struct.unpack_from("<HHIIHH", data, body)
+            fmt = (sample_rate, channels, bits)
+        elif chunk_id == b"data":
+            if fmt is None:
+                return None
+            data_size = min(chunk_size, total_size - body)
+            return WavFormat(fmt[0], fmt[1], fmt[2], body, data_size)
+        offset = body + chunk_size + (chunk_size & 1)  # Chunks are word aligned
+    return None
+
+
+def build_wav_header(sample_rate: int, channels: int, bits_per_sample: int, data_size: int) -> bytes:
+    """Returns a canonical 44-byte PCM WAV header for data_size bytes of sample data."""
+    block_align = channels * bits_per_sample // 8
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, 1, channels, sample_rate, sample_rate * block_align, block_align, bits_per_sample,
+        b"data", data_size,
+    )
+
+
+def pcm_view(segment: bytes) -> memoryview:
+    """Returns a zero-copy view of the sample data in segment (WAV header stripped if present)."""
+    wav = parse_wav_header(segment)
+    view = memoryview(segment)
+    if wav is None:
+        return view
+    return view[wav.data_offset:wav.data_offset + wav.data_size]
+
+
+def write_crossfaded_pcm(
+    out: BinaryIO,
+    segments: List[memoryview],
+    channels: int,
+    crossfade_frames: int,
+) -> int:
+    """
+    Streams 16-bit PCM segments to out, overlapping each boundary by crossfade_frames.
+
+    Only the overlapped frames are copied (to mix them); the rest of every segment is
+    written straight from its buffer.
+
+    Args:
+        out: A writable binary file-like object (e.g. a GCS BlobWriter).
+        segments: Raw little-endian int16 PCM buffers in playback order.
+        channels: Interleaved channel count of every segment.
+        crossfade_frames: Frames to overlap at each boundary (clamped to half of the
+                          shortest segment).
+
+    Returns:
+        Number of bytes written.
+    """
+    frame_bytes = 2 * channels
+    if segments:
+        shortest = min(len(seg) // frame_bytes for seg in segments)
+        crossfade_frames = max(0, min(crossfade_frames, shortest // 2))
+    fade_bytes = crossfade_frames * frame_bytes
+    if fade_bytes:
+        # Equal-power curves keep perceived loudness constant through the overlap.
+        t = (np.arange(crossfade_frames, dtype=np.float32) + 0.5) / crossfade_frames
+        fade_out = np.repeat(np.cos(t * np.pi / 2), channels)
+        fade_in = np.repeat(np.sin(t * np.pi / 2), channels)
+
+    written = 0
+    for i, seg in enumerate(segments):
+        start = fade_bytes if i > 0 else 0
+        end = len(seg) - len(seg) % frame_bytes
+        is_last = i == len(segments) - 1
+        body_end = end if is_last else end - fade_bytes
+        out.write(seg[start:body_end])
+        written += body_end - start
+        if not is_last and fade_bytes:
+            tail = np.frombuffer(seg[body_end:end], dtype="<i2")
+            head = np.frombuffer(segments[i + 1][:fade_bytes], dtype="<i2")
+            mixed = tail * fade_out + head * fade_in
+            block = np.clip(np.rint(mixed), -32768, 32767).astype("<i2").tobytes()
+            out.write(block)
+            written += len(block)
+    return written
+
+
+def crossfaded_length(segment_sizes: List[int], channels: int, crossfade_frames: int) -> int:
+    """Byte length write_crossfaded_pcm will produce for segments of these sizes."""
+    if not segment_sizes:
+        return 0
+    frame_bytes = 2 * channels
+    shortest = min(size // frame_bytes for size in segment_sizes)
+    crossfade_frames = max(0, min(crossfade_frames, shortest // 2))
+    total = sum(size - size % frame_bytes for size in segment_sizes)
+    return total - crossfade_frames * frame_bytes * (len(segment_sizes) - 1)
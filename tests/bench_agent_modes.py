@@ -0,0 +1,101 @@
+# Filename: bench_agent_modes.py
+# Description: Runs the same questions through the conversational root_agent, the
+#              pipeline agent and run_fast_path and compares LLM calls, estimated tokens
+#              and wall-clock time per request, as recorded by llm_usage.
+#
+#     python -m tests.bench_agent_modes [--live] ["question" ...]
+#
+# By default the agents run offline: every LLM turn is a FakeGemini taking
+# FAKE_LLM_SECONDS, and TTS, Lyria and GCS are the local fakes with the latencies below.
+# Token counts then reflect the fake's short texts, not Gemini's. With --live the agents
+# call Gemini, Text-to-Speech, Lyria and GCS for real (needs credentials,
+# GOOGLE_CLOUD_PROJECT and GOOGLE_CLOUD_BUCKET). The answer and Lyria caches are
+# disabled so every request does the full work in both modes.
+
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+
+FAKE_LLM_SECONDS = 0.8
+FAKE_TTS_SECONDS = 0.5
+FAKE_LYRIA_SECONDS = 2.0
+QUESTIONS = (
+    "What's the weather in Tokyo today?",
+    "What time is it in London?",
+    "What happened in tech news this week?",
+    "Is it going to rain in Seattle tomorrow?",
+    "Who won the football match last night?",
+)
+
+
+@contextlib.contextmanager
+def _offline_services():
+    """Points every agent model and service at the local fakes."""
+    from hack_agent import agent, lyria_music, pipeline
+    from tests.fakes import FakeGemini, FakeHttpServer, FakeLyria, FakeStorageClient, FakeTextToSpeechServer, install_fakes
+
+    storage = FakeStorageClient()
+    with FakeTextToSpeechServer(base_seconds=FAKE_TTS_SECONDS, on_long_audio=storage.write_uri) as tts, \
+            FakeHttpServer(FakeLyria(seconds_per_request=FAKE_LYRIA_SECONDS)) as lyria:
+        install_fakes(tts, storage)
+        os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "bench-project")
+        os.environ.setdefault("GOOGLE_CLOUD_BUCKET", "bench-bucket")
+        lyria_music._lyria_endpoint = lambda settings: f"{lyria.url}/predict"
+        lyria_music.get_access_token = lambda: "bench-token"
+        model = FakeGemini(seconds_per_call=FAKE_LLM_SECONDS)
+        pipeline.PIPELINE_MODEL = model
+        agent.root_agent.model = model
+        agent.ga.model = model
+        yield
+
+
+async def _run_all(questions):
+    from hack_agent import agent
+    from hack_agent.llm_usage import instrument_llm_usage
+    from hack_agent.pipeline import build_pipeline_agent, run_agent, run_fast_path
+
+    for question in questions:
+        await run_agent(agent.root_agent, question, user_id="bench")
+        await run_agent(instrument_llm_usage(build_pipeline_agent()), question, user_id="bench")
+        await run_fast_path(question, user_id="bench")
+
+
+def main() -> None:
+    args = sys.argv[1:]
+    live = "--live" in args
+    questions = [arg for arg in args if arg != "--live"] or list(QUESTIONS)
+    os.environ["AGENT_MODE"] = "conversational"  # root_agent is the conversational agent
+
+    from hack_agent import agent, answer_cache, lyria_music
+    from hack_agent.llm_usage import get_llm_usage_metrics
+
+    answer_cache.ANSWER_CACHE_ENABLED = False
+    lyria_music.LYRIA_CACHE_ENABLED = False
+    services = contextlib.nullcontext() if live else _offline_services()
+    with services, contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(_run_all(questions))
+
+    metrics = get_llm_usage_metrics()
+    observations = metrics["observations"]
+    print(f"{len(questions)} questions, {'live services' if live else f'offline fakes, {FAKE_LLM_SECONDS}s per LLM turn'}")
+    print(f"{'mode':>15} | {'LLM calls':>9} {'prompt tok':>10} {'output tok':>10} | {'wall p50':>8} {'mean':>7}")
+    for label, name in (
+        ("conversational", agent.root_agent.name), ("pipeline", "swe_pipeline_agent"), ("fast", "swe_fast_agent"),
+    ):
+        calls = observations[f"{name}.llm_calls"]
+        prompt = observations[f"{name}.est_prompt_tokens"]
+        output = observations[f"{name}.est_output_tokens"]
+        seconds = observations[f"{name}.request_seconds"]
+        print(
+            f"{label:>15} | {calls['mean']:>9.1f} {prompt['mean']:>10.0f} {output['mean']:>10.0f} | "
+            f"{seconds['p50']:>7.2f}s {seconds['mean']:>6.2f}s"
+        )
+    print("\nget_llm_usage_metrics():")
+    print(json.dumps(metrics, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
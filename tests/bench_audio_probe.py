@@ -0,0 +1,85 @@
+# Filename: bench_audio_probe.py
+# Description: Bytes read and latency of probe_gcs_audio_duration (ranged reads of the
+#              header) versus the old approach (download the whole object, then TinyTag),
+#              per format, against in-memory GCS.
+#
+#     python -m tests.bench_audio_probe
+#
+# Every read against the fake pays FAKE_RTT_SECONDS plus size / FAKE_BANDWIDTH, to model
+# a GCS request from Cloud Run. Each object holds AUDIO_SECONDS of audio. TinyTag cannot
+# read headerless .pcm, so its "full" row is the download alone.
+
+import os
+import time
+
+from hack_agent import audio_probe, gcs_client
+from hack_agent.wav_utils import build_wav_header
+from tests.fakes import FakeBlob, FakeStorageClient, fake_mp3
+
+AUDIO_SECONDS = 300
+FAKE_RTT_SECONDS = 0.02
+FAKE_BANDWIDTH = 50 * 1024 * 1024  # Bytes per second
+RUNS = 5
+
+
+def _objects():
+    frames = int(AUDIO_SECONDS * 48000 / 1152)
+    pcm_size = AUDIO_SECONDS * 24000 * 2
+    return {
+        "wav": ("speech.wav", build_wav_header(24000, 1, 16, pcm_size) + b"\x00" * pcm_size),
+        "pcm": ("speech.pcm", b"\x00" * pcm_size),
+        "mp3 (Xing)": ("music_vbr.mp3", fake_mp3(frames, bitrates_kbps=(96, 192, 320), xing=True)),
+        "mp3 (CBR)": ("music_cbr.mp3", fake_mp3(frames, bitrates_kbps=(128,), id3v2_bytes=4096, id3v1=True)),
+    }
+
+
+def _slow_reads():
+    download = FakeBlob.download_as_bytes
+
+    def _download_as_bytes(self, start=None, end=None, **kwargs):
+        data = download(self, start=start, end=end, **kwargs)
+        time.sleep(FAKE_RTT_SECONDS + len(data) / FAKE_BANDWIDTH)
+        return data
+
+    FakeBlob.download_as_bytes = _download_as_bytes
+
+
+def _full_download(blob):
+    if os.path.splitext(blob.name)[1] == ".pcm":
+        blob.download_as_bytes()
+        return None
+    return audio_probe._tinytag_duration(blob, os.path.splitext(blob.name)[1])
+
+
+def _measure(storage, name, fn):
+    timings, read, duration = [], 0, None
+    for _ in range(RUNS):
+        blob = storage.bucket("audio").blob(name)
+        blob.reload()
+        storage.bytes_read = 0
+        started = time.perf_counter()
+        duration = fn(blob)
+        timings.append(time.perf_counter() - started)
+        read = storage.bytes_read
+    return duration, read, sorted(timings)[len(timings) // 2]
+
+
+def main() -> None:
+    storage = FakeStorageClient()
+    gcs_client._clients = storage.registry()
+    _slow_reads()
+    objects = _objects()
+    for name, data in objects.values():
+        storage.bucket("audio").blob(name).upload_from_string(data)
+
+    print(f"{AUDIO_SECONDS} s of audio per object; median of {RUNS} runs")
+    print(f"{'format':>11} {'size':>9} | {'mode':>6} {'duration':>9} {'bytes read':>11} {'latency':>9}")
+    for kind, (name, data) in objects.items():
+        for mode, fn in (("full", _full_download), ("ranged", audio_probe.probe_gcs_audio_duration)):
+            duration, read, latency = _measure(storage, name, fn)
+            shown = "-" if duration is None else f"{duration:.2f}s"
+            print(f"{kind:>11} {len(data) / 1024 / 1024:>7.1f}MB | {mode:>6} {shown:>9} {read:>11,} {latency * 1000:>7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# Filename: bench_chunked_tts.py
+# Description: Wall-clock time against input length for the sequential long-audio path
+#              and the chunked parallel path (TTS_CHUNKED_MODE), against a local fake
+#              Text-to-Speech server whose latency grows linearly with input size.
+#
+#     python -m tests.bench_chunked_tts [seconds_per_kb]
+#
+# The fake charges seconds_per_kb per KB of input on every call, so the sequential path
+# grows linearly while the chunked path stays near one chunk's latency until
+# TTS_CHUNK_MAX_PARALLEL chunks are in flight. Timings include stitching and upload.
+
+import contextlib
+import io
+import sys
+import time
+
+from hack_agent import text_to_speech
+from tests.fakes import FakeStorageClient, FakeTextToSpeechServer, install_fakes
+
+INPUT_KB = (2, 4, 8, 16, 32)
+SENTENCE = "The quick brown fox jumps over the lazy dog while the build is green. "
+
+
+def _ssml(kb: int) -> str:
+    body = SENTENCE * (kb * 1024 // len(SENTENCE))
+    return f"<speak>{body}</speak>"
+
+
+def _timed(ssml: str) -> float:
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # Keep the progress prints out of the table
+        text_to_speech.synthesize_text_to_gcs_sync(
+            text=ssml,
+            gcs_bucket_name="bench-bucket",
+            voice_category="male_high",
+            speaking_rate=1.0,
+            pitch=0.0,
+            volume_gain_db=0.0,
+            timeout_seconds=600.0,
+            is_ssml=True,
+            GOOGLE_CLOUD_PROJECT="bench-project",
+            GOOGLE_CLOUD_LOCATION="us-central1",
+        )
+    return time.perf_counter() - started
+
+
+def main(seconds_per_kb: float = 0.1) -> None:
+    storage = FakeStorageClient(keep_data=False)
+    with FakeTextToSpeechServer(seconds_per_kb=seconds_per_kb, on_long_audio=storage.write_uri) as server:
+        install_fakes(server, storage)
+        text_to_speech.TTS_FAST_PATH_MAX_BYTES = 0
+        _timed(_ssml(1))  # Warm the clients
+
+        print(f"fake latency {seconds_per_kb:.3f} s/KB, chunk target {text_to_speech.TTS_CHUNK_TARGET_BYTES} B, "
+              f"max parallel {text_to_speech.TTS_CHUNK_MAX_PARALLEL}")
+        print(f"{'input':>8} {'sequential':>12} {'chunked':>10} {'speedup':>8}")
+        for kb in INPUT_KB:
+            ssml = _ssml(kb)
+            text_to_speech.TTS_CHUNKED_MODE = False
+            sequential = _timed(ssml)
+            text_to_speech.TTS_CHUNKED_MODE = True
+            chunked = _timed(ssml)
+            print(f"{kb:>6} KB {sequential:>10.2f} s {chunked:>8.2f} s {sequential / chunked:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 0.1)
@@ -0,0 +1,86 @@
+# Filename: bench_gcs_emulator.py
+# Description: Upload throughput for 1 large file and 50 small files against a local GCS
+#              emulator: a new storage.Client per upload (what the agent did before the
+#              shared client), the shared pooled client one upload at a time, and
+#              gcs_client.upload_many in parallel.
+#
+#     STORAGE_EMULATOR_HOST=http://localhost:4443 python -m tests.bench_gcs_emulator
+#
+# e.g. with fsouza/fake-gcs-server:
+#     docker run -d -p 4443:4443 fsouza/fake-gcs-server -scheme http -port 4443
+# The script does nothing if STORAGE_EMULATOR_HOST is unset. Objects go to BUCKET, which
+# is created if missing.
+
+import os
+import sys
+import tempfile
+import time
+
+from google.api_core.exceptions import Conflict
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import storage
+
+from hack_agent import gcs_client
+
+BUCKET = "bench-gcs-emulator"
+LARGE_BYTES = 64 * 1024 * 1024
+SMALL_COUNT = 50
+SMALL_BYTES = 256 * 1024
+
+
+def _new_client_upload(path: str, uri: str) -> None:
+    bucket_name, blob_name = gcs_client.split_gcs_uri(uri)
+    client = storage.Client(project="test-project", credentials=AnonymousCredentials())
+    client.bucket(bucket_name).blob(blob_name).upload_from_filename(path)
+
+
+def _shared_client_upload(path: str, uri: str) -> None:
+    gcs_client.upload_file(path, uri)
+
+
+def _timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    if not os.getenv("STORAGE_EMULATOR_HOST"):
+        print("STORAGE_EMULATOR_HOST is not set; start a GCS emulator and point it there.")
+        sys.exit(0)
+    try:
+        gcs_client.get_storage_client().create_bucket(BUCKET)
+    except Conflict:
+        pass
+
+    with tempfile.TemporaryDirectory() as tmp:
+        large = os.path.join(tmp, "large.wav")
+        with open(large, "wb") as f:
+            f.write(os.urandom(LARGE_BYTES))
+        small = []
+        for i in range(SMALL_COUNT):
+            path = os.path.join(tmp, f"small_{i}.wav")
+            with open(path, "wb") as f:
+                f.write(os.urandom(SMALL_BYTES))
+            small.append(path)
+        small_uris = [f"gs://{BUCKET}/small/{i}.wav" for i in range(SMALL_COUNT)]
+
+        rows = [
+            ("1 large", "new client", LARGE_BYTES, _timed(lambda: _new_client_upload(large, f"gs://{BUCKET}/large.wav"))),
+            ("1 large", "shared client", LARGE_BYTES, _timed(lambda: _shared_client_upload(large, f"gs://{BUCKET}/large.wav"))),
+            (f"{SMALL_COUNT} small", "new client", SMALL_COUNT * SMALL_BYTES,
+             _timed(lambda: [_new_client_upload(p, u) for p, u in zip(small, small_uris)])),
+            (f"{SMALL_COUNT} small", "shared client", SMALL_COUNT * SMALL_BYTES,
+             _timed(lambda: [_shared_client_upload(p, u) for p, u in zip(small, small_uris)])),
+            (f"{SMALL_COUNT} small", "upload_many", SMALL_COUNT * SMALL_BYTES,
+             _timed(lambda: gcs_client.upload_many(list(zip(small, small_uris))))),
+        ]
+
+    print(f"large = {LARGE_BYTES // (1024 * 1024)} MiB, small = {SMALL_BYTES // 1024} KiB; emulator {os.getenv('STORAGE_EMULATOR_HOST')}")
+    print(f"{'objects':>9} {'mode':>14} | {'seconds':>8} {'MiB/s':>8}")
+    for objects, mode, size, seconds in rows:
+        print(f"{objects:>9} {mode:>14} | {seconds:>8.2f} {size / 1024 / 1024 / seconds:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
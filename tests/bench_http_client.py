@@ -0,0 +1,71 @@
+# Filename: bench_http_client.py
+# Description: Connection reuse of the pooled HTTP session against a local fake REST
+#              endpoint, at concurrency 1, 8 and 32. "fresh" opens a new connection per
+#              request (requests.post, the old behaviour); "pooled" posts through
+#              http_client.post_json.
+#
+#     python -m tests.bench_http_client [requests] [server_ms]
+#
+# Locally a new connection costs a TCP handshake only; against googleapis.com it also
+# pays for TLS, so the production gap per request is larger.
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from hack_agent import http_client
+from tests.fakes import FakeHttpServer, percentile
+
+CONCURRENCY = (1, 8, 32)
+PAYLOAD = {"instances": [{"prompt": "calm piano"}], "parameters": {"sample_count": 1}}
+
+
+def _fresh_post(url: str) -> requests.Response:
+    return requests.post(url, headers={}, json=PAYLOAD, timeout=(10, 30))
+
+
+def _pooled_post(url: str) -> requests.Response:
+    return http_client.post_json(url, {}, PAYLOAD)
+
+
+def _run(post, total: int, concurrency: int, server_seconds: float) -> dict:
+    def _handle(path, body):
+        time.sleep(server_seconds)
+        return 200, {"predictions": []}
+
+    def _timed(url):
+        started = time.perf_counter()
+        post(url).raise_for_status()
+        return time.perf_counter() - started
+
+    with FakeHttpServer(_handle) as server:
+        url = f"{server.url}/predict"
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            latencies = list(pool.map(_timed, [url] * total))
+        elapsed = time.perf_counter() - started
+        return {
+            "rps": total / elapsed,
+            "p50": percentile(latencies, 0.50),
+            "p99": percentile(latencies, 0.99),
+            "connections": server.connections,
+        }
+
+
+def main(total: int = 512, server_ms: float = 2.0) -> None:
+    print(f"{total} requests per run, {server_ms:g} ms server time")
+    print(f"{'mode':<7} {'conc':>4} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'connections':>12}")
+    for concurrency in CONCURRENCY:
+        for mode, post in (("fresh", _fresh_post), ("pooled", _pooled_post)):
+            http_client._session = None  # Each run starts with an empty pool
+            row = _run(post, total, concurrency, server_ms / 1000.0)
+            if http_client._session is not None:
+                http_client._session.close()
+            print(f"{mode:<7} {concurrency:>4} {row['rps']:>9.0f} {row['p50'] * 1000:>8.2f}"
+                  f" {row['p99'] * 1000:>8.2f} {row['connections']:>12}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 512, float(sys.argv[2]) if len(sys.argv) > 2 else 2.0)
@@ -0,0 +1,60 @@
+# Filename: bench_local_mix.py
+# Description: Realtime multiple of the local voice + music mix (audio seconds produced
+#              per wall second, tail included) by voice length and block size, against in-memory GCS.
+#              The voice is 24 kHz mono speech as TTS produces it, and the music is a
+#              48 kHz stereo Lyria-style WAV, so every run resamples and up-mixes.
+#
+#     python -m tests.bench_local_mix [voice_seconds ...]
+#
+# Against real GCS the mix also waits on downloads and the resumable upload; this
+# measures the CPU cost that bounds mixes per worker.
+
+import contextlib
+import io
+import sys
+import time
+
+import numpy as np
+
+from hack_agent.local_mix import mix_to_gcs
+from hack_agent.wav_utils import build_wav_header
+from tests.fakes import FakeStorageClient
+
+BLOCK_SECONDS = (0.25, 1.0, 4.0)
+RUNS = 3
+
+
+def _wav(seconds: float, rate: int, channels: int, freq: float) -> bytes:
+    t = np.arange(int(seconds * rate), dtype=np.float32) / rate
+    tone = np.sin(2 * np.pi * freq * t) * 0.25 * (np.sin(2 * np.pi * 0.5 * t) > 0)  # Speech-like on/off
+    pcm = np.repeat((tone * 32767).astype("<i2")[:, None], channels, axis=1).tobytes()
+    return build_wav_header(rate, channels, 16, len(pcm)) + pcm
+
+
+def _best_run(storage: FakeStorageClient, block_seconds: float):
+    """(mix duration, best wall seconds) over RUNS mixes."""
+    best = float("inf")
+    for _ in range(RUNS):
+        voice = storage.bucket("bench").blob("speech.wav")
+        music = storage.bucket("bench").blob("music.wav")
+        output = storage.bucket("bench").blob("mix.wav")
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            duration = mix_to_gcs(voice, music, output, block_seconds=block_seconds)
+        best = min(best, time.perf_counter() - started)
+    return duration, best
+
+
+def main(voice_lengths=(10.0, 60.0, 300.0)) -> None:
+    print(f"{'voice s':>8} {'block s':>8} {'wall s':>8} {'realtime x':>11}")
+    for voice_seconds in voice_lengths:
+        storage = FakeStorageClient()
+        storage.write_uri("gs://bench/speech.wav", _wav(voice_seconds, 24000, 1, 220.0))
+        storage.write_uri("gs://bench/music.wav", _wav(voice_seconds + 5.0, 48000, 2, 440.0))
+        for block_seconds in BLOCK_SECONDS:
+            duration, wall = _best_run(storage, block_seconds)
+            print(f"{voice_seconds:>8.0f} {block_seconds:>8.2f} {wall:>8.3f} {duration / wall:>11.0f}")
+
+
+if __name__ == "__main__":
+    main(tuple(float(arg) for arg in sys.argv[1:]) or (10.0, 60.0, 300.0))
@@ -0,0 +1,72 @@
+# Filename: bench_lyria_batch.py
+# Description: Lyria throughput in clips per minute, one :predict call per clip versus
+#              generate_lyria_music_batch, against a local fake :predict endpoint and
+#              in-memory GCS.
+#
+#     python -m tests.bench_lyria_batch [clips] [clip_seconds]
+#
+# The fake charges FAKE_REQUEST_SECONDS per call plus FAKE_SAMPLE_SECONDS per sample and
+# returns full-size base64 WAVs, so decode and upload costs are included.
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+from hack_agent import gcs_client, lyria_music
+from tests.fakes import FakeHttpServer, FakeLyria, FakeStorageClient
+
+FAKE_REQUEST_SECONDS = 1.0
+FAKE_SAMPLE_SECONDS = 0.1
+PROMPTS = ("driving EDM bed", "lo-fi hip hop loop", "calm ambient pads", "upbeat funk groove")
+
+
+def _items(clips: int):
+    return [{"prompt": PROMPTS[i % len(PROMPTS)]} for i in range(clips)]
+
+
+def _one_call_per_clip(items) -> list:
+    return [lyria_music.generate_lyria_clip(item["prompt"])[0] for item in items]
+
+
+def _batch(items) -> list:
+    return lyria_music.generate_lyria_music_batch(items, use_cache=False)
+
+
+def _report(label: str, run, items, lyria: FakeLyria) -> None:
+    calls_before = len(lyria.bodies)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # Keep the progress prints out of the table
+        uris = run(items)
+    elapsed = time.perf_counter() - started
+    clips = sum(1 for uri in uris if uri.startswith("gs://"))
+    print(f"{label:<22} {clips:>3} clips  {len(lyria.bodies) - calls_before:>3} calls  "
+          f"{elapsed:>6.2f} s  {clips * 60.0 / elapsed:>7.1f} clips/min")
+
+
+def main(clips: int = 16, clip_seconds: float = 30.0) -> None:
+    lyria = FakeLyria(clip_seconds=clip_seconds, seconds_per_request=FAKE_REQUEST_SECONDS,
+                      seconds_per_sample=FAKE_SAMPLE_SECONDS)
+    storage = FakeStorageClient(keep_data=False)
+    with FakeHttpServer(lyria) as server:
+        os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "bench-project")
+        os.environ.setdefault("GOOGLE_CLOUD_BUCKET", "bench-bucket")
+        gcs_client._clients = storage.registry()
+        lyria_music._lyria_endpoint = lambda settings: f"{server.url}/predict"
+        lyria_music.get_access_token = lambda: "bench-token"
+
+        print(f"fake latency {FAKE_REQUEST_SECONDS:.1f} s/call + {FAKE_SAMPLE_SECONDS:.1f} s/sample, "
+              f"{clip_seconds:.0f} s clips, {len(PROMPTS)} prompts")
+        items = _items(clips)
+        _report("one call per clip", _one_call_per_clip, items, lyria)
+        for instances in (1, 4):
+            lyria_music.LYRIA_MAX_INSTANCES_PER_REQUEST = instances
+            _report(f"batch ({instances} inst/call)", _batch, items, lyria)
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 16,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 30.0,
+    )
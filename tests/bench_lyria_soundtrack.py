@@ -0,0 +1,99 @@
+# Filename: bench_lyria_soundtrack.py
+# Description: extend_lyria_soundtrack for 1, 3 and 10 minute targets against a local
+#              fake :predict endpoint and in-memory GCS, plus the stitching step on its
+#              own versus naive np.concatenate stitching (a full copy per boundary).
+#
+#     python -m tests.bench_lyria_soundtrack
+#
+# Clips are 30 s of 48 kHz stereo noise (5.5 MiB each); the fake charges
+# FAKE_REQUEST_SECONDS per :predict call. Peak memory is measured with tracemalloc
+# around the stitching step only, on top of the decoded clips it is given.
+
+import contextlib
+import io
+import os
+import time
+import tracemalloc
+
+import numpy as np
+
+from hack_agent import gcs_client, lyria_music
+from hack_agent.wav_utils import pcm_view
+from tests.fakes import FakeHttpServer, FakeLyria, FakeStorageClient
+
+TARGET_MINUTES = (1, 3, 10)
+CROSSFADE_SECONDS = 2.0
+FAKE_REQUEST_SECONDS = 1.0
+
+
+class _NoisyLyria(FakeLyria):
+    """Clips of noise, so crossfades mix real samples."""
+
+    def clip(self, prompt: str) -> bytes:
+        wav = bytearray(super().clip(prompt))
+        rng = np.random.default_rng(len(wav))
+        wav[44:] = rng.integers(-8000, 8000, (len(wav) - 44) // 2, dtype="<i2").tobytes()
+        return bytes(wav)
+
+
+def _naive_stitch(clips, channels: int, crossfade_frames: int) -> bytes:
+    """np.concatenate per boundary: the approach the streamed stitcher replaces."""
+    t = (np.arange(crossfade_frames, dtype=np.float32) + 0.5) / crossfade_frames
+    fade_out = np.repeat(np.cos(t * np.pi / 2), channels)
+    fade_in = np.repeat(np.sin(t * np.pi / 2), channels)
+    n = crossfade_frames * channels
+    out = np.frombuffer(pcm_view(clips[0]), dtype="<i2")
+    for clip in clips[1:]:
+        pcm = np.frombuffer(pcm_view(clip), dtype="<i2")
+        mixed = np.clip(np.rint(out[-n:] * fade_out + pcm[:n] * fade_in), -32768, 32767).astype("<i2")
+        out = np.concatenate([out[:-n], mixed, pcm[n:]])
+    return out.tobytes()
+
+
+def _peak_mib(run) -> tuple:
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        run()
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak / 2 ** 20
+
+
+def main() -> None:
+    lyria = _NoisyLyria(clip_seconds=lyria_music.LYRIA_CLIP_SECONDS, seconds_per_request=FAKE_REQUEST_SECONDS)
+    storage = FakeStorageClient(keep_data=False)
+    with FakeHttpServer(lyria) as server:
+        os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "bench-project")
+        os.environ.setdefault("GOOGLE_CLOUD_BUCKET", "bench-bucket")
+        gcs_client._clients = storage.registry()
+        lyria_music._lyria_endpoint = lambda settings: f"{server.url}/predict"
+        lyria_music.get_access_token = lambda: "bench-token"
+        lyria_music.LYRIA_CACHE_ENABLED = False
+
+        print(f"fake latency {FAKE_REQUEST_SECONDS:.1f} s per :predict call, {CROSSFADE_SECONDS:.0f} s crossfades, "
+              f"{lyria_music.LYRIA_MAX_PARALLEL_REQUESTS} parallel requests")
+        print(f"{'target':>7} {'clips':>5} {'end-to-end':>11} {'stitch+upload':>14} {'stitch peak':>12} "
+              f"{'naive concat':>13} {'naive peak':>11}")
+        bucket = storage.bucket("bench-bucket")
+        for minutes in TARGET_MINUTES:
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):  # Keep the progress prints out of the table
+                uri = lyria_music.extend_lyria_soundtrack("calm ambient pads", None, minutes * 60.0, CROSSFADE_SECONDS)
+            end_to_end = time.perf_counter() - started
+            assert uri.startswith("gs://"), uri
+
+            count = lyria_music.soundtrack_clip_count(minutes * 60.0, CROSSFADE_SECONDS)
+            clips = [lyria.clip(f"clip {i}") for i in range(count)]
+            stitch_seconds, stitch_peak = _peak_mib(
+                lambda: lyria_music._upload_stitched_clips(bucket, "bench.wav", clips, CROSSFADE_SECONDS)
+            )
+            naive_seconds, naive_peak = _peak_mib(lambda: _naive_stitch(clips, 2, int(48000 * CROSSFADE_SECONDS)))
+            print(f"{minutes:>5} m {count:>5} {end_to_end:>9.2f} s {stitch_seconds:>12.2f} s {stitch_peak:>8.1f} MiB "
+                  f"{naive_seconds:>11.2f} s {naive_peak:>7.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# Filename: bench_mux_scheduler.py
+# Description: Load test for MuxScheduler against a local fake Transcoder: a burst of
+#              mux jobs under different concurrency limits, reporting jobs per minute,
+#              queue-wait percentiles, quota rejections and peak running jobs.
+#
+#     python -m tests.bench_mux_scheduler [jobs]
+#
+# The fake enforces a concurrent-job quota of FAKE_QUOTA; the "over quota" row sets the
+# scheduler's limit above it to show 429s being absorbed by the queue. Time runs
+# TIME_SCALE times faster than real; results are reported in unscaled units.
+
+import asyncio
+import contextlib
+import functools
+import io
+import random
+import sys
+import time
+
+from google.cloud.video.transcoder_v1.types import Job
+
+from hack_agent import mux_scheduler, transcoder_waiter
+from hack_agent.mux_scheduler import MuxScheduler
+from tests.fakes import FakeTranscoder, percentile
+
+TIME_SCALE = 0.01
+FAKE_QUOTA = 5
+JOB_SECONDS = (20, 60)  # Uniform range of Transcoder processing time per job
+RPC_SECONDS = 0.1  # Latency of each create_job/get_job call
+
+
+async def _build_job(client, parent, video_uri, audio_uri, end_time_offset, text_stream_content):
+    return Job(labels={"seconds": str(end_time_offset)}), f"gs://bench/muxed/{audio_uri.rsplit('/', 1)[-1]}.mp4"
+
+
+async def _run(limit: int, count: int):
+    rng = random.Random(7)
+    transcoder = FakeTranscoder(
+        job_seconds=lambda job: float(job.labels["seconds"]) * TIME_SCALE,
+        max_running=FAKE_QUOTA,
+        rpc_seconds=RPC_SECONDS * TIME_SCALE,
+    )
+    scheduler = MuxScheduler(
+        client=transcoder, parent="projects/bench/locations/us-central1", subscription=None,
+        max_concurrent_jobs=limit, quota_retry_seconds=10 * TIME_SCALE, build_job=_build_job,
+    )
+    jobs = [
+        {"video_uri": "gs://bench/video.mp4", "audio_uri": f"gs://bench/{i}.wav", "end_time_offset": rng.uniform(*JOB_SECONDS)}
+        for i in range(count)
+    ]
+    started = time.monotonic()
+    results = [result async for result in scheduler.mux_many(jobs)]
+    elapsed = (time.monotonic() - started) / TIME_SCALE
+    waits = [result.queue_wait_seconds / TIME_SCALE for result in results if result.queue_wait_seconds is not None]
+    rejected = transcoder.calls["create_job"] - count
+    return sum(result.ok for result in results), elapsed, waits, rejected, transcoder.max_seen_running
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    initial, multiplier, max_seconds = (
+        transcoder_waiter.TRANSCODER_POLL_INITIAL_SECONDS,
+        transcoder_waiter.TRANSCODER_POLL_MULTIPLIER,
+        transcoder_waiter.TRANSCODER_POLL_MAX_SECONDS,
+    )
+    mux_scheduler.PollSchedule = functools.partial(
+        transcoder_waiter.PollSchedule, initial * TIME_SCALE, multiplier, max_seconds * TIME_SCALE
+    )
+    print(f"{count} jobs of {JOB_SECONDS[0]}-{JOB_SECONDS[1]} s, Transcoder quota {FAKE_QUOTA}")
+    print(f"{'limit':>15} | {'ok':>4} {'jobs/min':>9} | {'wait p50':>9} {'p95':>8} {'p99':>8} | {'429s':>5} {'peak':>5}")
+    for label, limit in (("1", 1), ("3", 3), (f"{FAKE_QUOTA}", FAKE_QUOTA), (f"{FAKE_QUOTA * 2} (over quota)", FAKE_QUOTA * 2)):
+        transcoder_waiter._throughput = transcoder_waiter._ThroughputModel()
+        with contextlib.redirect_stdout(io.StringIO()):
+            ok, elapsed, waits, rejected, peak = asyncio.run(_run(limit, count))
+        print(
+            f"{label:>15} | {ok:>4} {count * 60.0 / elapsed:>9.1f} | "
+            f"{percentile(waits, 0.50):>8.1f}s {percentile(waits, 0.95):>7.1f}s {percentile(waits, 0.99):>7.1f}s | "
+            f"{rejected:>5} {peak:>5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# Filename: bench_transcoder_wait.py
+# Description: Added latency (time between a Transcoder job finishing and MuxScheduler
+#              returning its result) and get_job calls per job, for the old fixed 15 s
+#              poll, the adaptive schedule, the adaptive schedule with a learned ETA, and
+#              push notifications, against a local fake Transcoder.
+#
+#     python -m tests.bench_transcoder_wait
+#
+# Time runs TIME_SCALE times faster than real (a 30 s job takes 1.5 s); results are
+# reported in unscaled seconds. Jobs take JOB_SECONDS_PER_MEDIA_SECOND per second of media.
+
+import asyncio
+import contextlib
+import functools
+import io
+import time
+
+from google.cloud.video.transcoder_v1.types import Job
+
+from hack_agent import mux_scheduler, transcoder_waiter
+from hack_agent.mux_scheduler import MuxScheduler
+from hack_agent.transcoder_waiter import PollSchedule
+from tests.fakes import FakeTranscoder
+
+TIME_SCALE = 0.05
+MEDIA_SECONDS = (40, 100, 300)
+JOB_SECONDS_PER_MEDIA_SECOND = 0.1
+PARENT = "projects/bench/locations/us-central1"
+SUBSCRIPTION = "projects/bench/subscriptions/transcoder-jobs"
+
+
+def _schedule(mode: str):
+    if mode == "fixed 15s":
+        return functools.partial(PollSchedule, 15 * TIME_SCALE, 1.0, 15 * TIME_SCALE)
+    return functools.partial(
+        PollSchedule,
+        transcoder_waiter.TRANSCODER_POLL_INITIAL_SECONDS * TIME_SCALE,
+        transcoder_waiter.TRANSCODER_POLL_MULTIPLIER,
+        transcoder_waiter.TRANSCODER_POLL_MAX_SECONDS * TIME_SCALE,
+    )
+
+
+async def _build_job(client, parent, video_uri, audio_uri, end_time_offset, text_stream_content):
+    return Job(), "gs://bench/muxed.mp4"
+
+
+async def _wait_one(mode: str, media_seconds: float):
+    transcoder = FakeTranscoder(job_seconds=media_seconds * JOB_SECONDS_PER_MEDIA_SECOND * TIME_SCALE)
+    subscription = None
+    if mode == "push":
+        subscription = SUBSCRIPTION
+        transcoder_waiter._listeners[SUBSCRIPTION] = transcoder.push_listener()
+    transcoder_waiter._throughput = transcoder_waiter._ThroughputModel()
+    if mode == "learned ETA":
+        # As after earlier jobs in the same process.
+        transcoder_waiter._throughput.observe(JOB_SECONDS_PER_MEDIA_SECOND, 1.0)
+    mux_scheduler.PollSchedule = _schedule(mode)
+    scheduler = MuxScheduler(client=transcoder, parent=PARENT, subscription=subscription, build_job=_build_job)
+    result = await scheduler.mux("gs://bench/video.mp4", "gs://bench/voice.wav", media_seconds * TIME_SCALE)
+    return time.monotonic() - transcoder.end_of(result.job_name), transcoder.calls["get_job"]
+
+
+def main() -> None:
+    mux_scheduler.TRANSCODER_PUSH_FALLBACK_POLL_SECONDS = 60 * TIME_SCALE
+    print(f"{'mode':>12} | " + " | ".join(f"{m * JOB_SECONDS_PER_MEDIA_SECOND:>4.0f}s job: added  polls" for m in MEDIA_SECONDS))
+    for mode in ("fixed 15s", "adaptive", "learned ETA", "push"):
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = [asyncio.run(_wait_one(mode, media)) for media in MEDIA_SECONDS]
+        print(f"{mode:>12} | " + " | ".join(
+            f"{added / TIME_SCALE:>15.2f}s {polls:>6}" for added, polls in results
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Filename: bench_tts_clients.py
+# Description: Cold vs warm per-call overhead of Text-to-Speech calls against a local fake
+#              gRPC server. Cold builds a client and channel per call (the old behaviour);
+#              warm reuses the pooled client from tts_clients.
+#
+#     python -m tests.bench_tts_clients [calls]
+#
+# Against the real service a cold call also pays for credential discovery and the TLS
+# handshake, so the production gap is larger than the local one.
+
+import statistics
+import sys
+import time
+
+from google.cloud import texttospeech_v1 as texttospeech
+
+from hack_agent import tts_clients
+from tests.fakes import FakeTextToSpeechServer, percentile
+
+REQUEST = dict(
+    input=texttospeech.SynthesisInput(ssml="<speak>hi</speak>"),
+    voice=texttospeech.VoiceSelectionParams(language_code="en-US"),
+    audio_config=texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.LINEAR16),
+)
+
+
+def _timed_calls(calls: int, get_client, close: bool) -> list:
+    latencies = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        client = get_client()
+        client.synthesize_speech(**REQUEST)
+        latencies.append(time.perf_counter() - started)
+        if close:
+            client.transport.close()
+    return latencies
+
+
+def _report(label: str, latencies: list) -> None:
+    print(
+        f"{label:<6} calls={len(latencies):<5} mean={statistics.mean(latencies) * 1000:8.2f} ms"
+        f"  p50={percentile(latencies, 0.50) * 1000:8.2f} ms  p99={percentile(latencies, 0.99) * 1000:8.2f} ms"
+    )
+
+
+def main(calls: int = 200) -> None:
+    with FakeTextToSpeechServer() as server:
+        tts_clients._CLIENT_FACTORIES[tts_clients.STANDARD_CLIENT] = server.standard_client
+        tts_clients.invalidate_tts_client(tts_clients.STANDARD_CLIENT)
+
+        cold = _timed_calls(calls, server.standard_client, close=True)
+        warm = _timed_calls(calls, tts_clients.get_standard_client, close=False)
+        _report("cold", cold)
+        _report("warm", warm)
+        saved = statistics.mean(cold) - statistics.mean(warm)
+        print(f"pooled client saves {saved * 1000:.2f} ms per call ({statistics.mean(cold) / statistics.mean(warm):.1f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,55 @@
+import pytest
+
+from hack_agent import gcs_client, lyria_music, text_to_speech, tts_clients, voice_catalog
+from hack_agent.result_cache import ResultCache
+from tests.fakes import FakeHttpServer, FakeLyria, FakeStorageClient, FakeTextToSpeechServer
+
+
+@pytest.fixture
+def fake_storage(monkeypatch):
+    """Every get_storage_client() call returns one in-memory FakeStorageClient."""
+    client = FakeStorageClient()
+    monkeypatch.setattr(gcs_client, "_clients", client.registry())
+    return client
+
+
+@pytest.fixture
+def fake_tts(monkeypatch, fake_storage):
+    """
+    Routes the shared TTS clients to a FakeTextToSpeechServer (long-audio output lands in
+    fake_storage), resolves voices from the bundled catalog fixture and uses a memory-only
+    TTS result cache.
+    """
+    with FakeTextToSpeechServer(on_long_audio=fake_storage.write_uri) as server:
+        monkeypatch.setattr(tts_clients, "_clients", {})
+        monkeypatch.setattr(tts_clients, "_CLIENT_FACTORIES", {
+            tts_clients.STANDARD_CLIENT: server.standard_client,
+            tts_clients.LONG_AUDIO_CLIENT: server.long_audio_client,
+        })
+        monkeypatch.setattr(tts_clients, "_ASYNC_CLIENT_FACTORIES", {
+            tts_clients.STANDARD_CLIENT: server.standard_async_client,
+            tts_clients.LONG_AUDIO_CLIENT: server.long_audio_async_client,
+        })
+        monkeypatch.setattr(voice_catalog, "_catalog", voice_catalog.VoiceCatalog(
+            snapshot_path=None, refresh_seconds=float("inf"), fetch_voices=None,
+        ))
+        monkeypatch.setattr(text_to_speech, "_tts_cache", ResultCache(
+            name="tts_cache_test", max_entries=64, ttl_seconds=3600, index_path=None,
+        ))
+        yield server
+
+
+@pytest.fixture
+def fake_lyria(monkeypatch, fake_storage):
+    """
+    Points Lyria :predict at a local FakeLyria endpoint with a fixed access token; clips
+    and the cache manifest land in fake_storage (bucket "lyria-bucket").
+    """
+    lyria = FakeLyria()
+    with FakeHttpServer(lyria) as server:
+        monkeypatch.setenv("GOOGLE_CLOUD_PROJECT", "test-project")
+        monkeypatch.setenv("GOOGLE_CLOUD_BUCKET", "lyria-bucket")
+        monkeypatch.setattr(lyria_music, "_lyria_endpoint", lambda settings: f"{server.url}/predict")
+        monkeypatch.setattr(lyria_music, "get_access_token", lambda: "test-token")
+        monkeypatch.setattr(lyria_music, "_lyria_caches", {})
+        yield lyria
@@ -0,0 +1,651 @@
+# Filename: fakes.py
+# Description: Local stand-ins for the Google services the agent talks to, so tests and
+#              benchmarks run offline: an in-process gRPC Text-to-Speech server, an
+#              in-memory Cloud Storage client, a local HTTP server for REST endpoints such
+#              as Lyria, an async Transcoder client and a scripted Gemini model.
+
+import asyncio
+import base64
+import datetime
+import http.server
+import io
+import itertools
+import json
+import struct
+import threading
+import time
+from collections import Counter
+from concurrent import futures
+from typing import Dict, Optional, Tuple
+
+import grpc
+import numpy as np
+from google.cloud import texttospeech_v1 as texttospeech
+from google.cloud.texttospeech_v1.services.text_to_speech.transports import (
+    TextToSpeechGrpcAsyncIOTransport,
+    TextToSpeechGrpcTransport,
+)
+from google.cloud.texttospeech_v1.services.text_to_speech_long_audio_synthesize.transports import (
+    TextToSpeechLongAudioSynthesizeGrpcAsyncIOTransport,
+    TextToSpeechLongAudioSynthesizeGrpcTransport,
+)
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.api_core import exceptions as google_exceptions
+from google.cloud.storage.fileio import BlobWriter
+from google.longrunning import operations_pb2
+from google.genai import types as genai_types
+from google.protobuf import any_pb2
+
+# Fake speech lasts this long per input character, at FAKE_TTS_SAMPLE_RATE mono.
+FAKE_TTS_SECONDS_PER_CHAR = 0.06
+FAKE_TTS_SAMPLE_RATE = 8000
+
+
+def fake_speech_wav(text: str, sample_rate: int = FAKE_TTS_SAMPLE_RATE) -> bytes:
+    """A 16-bit mono WAV (440 Hz tone) whose length is proportional to len(text)."""
+    frames = max(1, int(len(text) * FAKE_TTS_SECONDS_PER_CHAR * sample_rate))
+    t = np.arange(frames, dtype=np.float32) / sample_rate
+    pcm = (np.sin(2 * np.pi * 440.0 * t) * 8000).astype("<i2").tobytes()
+    header = struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + len(pcm), b"WAVE",
+        b"fmt ", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+        b"data", len(pcm),
+    )
+    return header + pcm
+
+
+# fake_mp3 writes MPEG-1 Layer III frames at 48 kHz stereo: 1152 samples per frame, and
+# 144 * bitrate / 48000 bytes per frame with no padding for the bitrates used in tests.
+_MP3_BITRATE_INDEX = {32: 1, 64: 5, 96: 7, 128: 9, 192: 11, 320: 14}
+
+
+def fake_mp3(frames: int, bitrates_kbps=(128,), xing: bool = False, id3v2_bytes: int = 0, id3v1: bool = False) -> bytes:
+    """
+    An MP3 of silent frames (about 24 ms each) cycling through bitrates_kbps.
+
+    xing puts an Xing header with the frame count in the first frame (which, as in real
+    encoders, is not counted). id3v2_bytes prepends an ID3v2 tag of that total size and
+    id3v1 appends a 128-byte ID3v1 tag.
+    """
+    out = bytearray()
+    if id3v2_bytes:
+        size = id3v2_bytes - 10
+        out += b"ID3\x03\x00\x00" + bytes([(size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F])
+        out += b"\x00" * size
+
+    def _frame(kbps: int) -> bytearray:
+        header = bytes([0xFF, 0xFB, (_MP3_BITRATE_INDEX[kbps] << 4) | (1 << 2), 0x00])
+        return bytearray(header + b"\x00" * (144 * kbps * 1000 // 48000 - 4))
+
+    if xing:
+        first = _frame(bitrates_kbps[0])
+        first[36:48] = b"Xing" + struct.pack(">II", 0x01, frames)
+        out += first
+    for i in range(frames):
+        out += _frame(bitrates_kbps[i % len(bitrates_kbps)])
+    if id3v1:
+        out += b"TAG" + b"\x00" * 125
+    return bytes(out)
+
+
+class FakeTextToSpeechServer:
+    """
+    In-process gRPC server for the TextToSpeech and TextToSpeechLongAudioSynthesize services.
+
+    SynthesizeSpeech returns fake_speech_wav of the input. SynthesizeLongAudio writes the
+    same audio to output_gcs_uri through on_long_audio(uri, wav) and returns a completed
+    operation. Each call sleeps base_seconds + seconds_per_kb per KB of input, to model
+    service latency that grows with input length.
+    """
+
+    def __init__(self, base_seconds: float = 0.0, seconds_per_kb: float = 0.0, on_long_audio=None, max_workers: int = 32):
+        self.base_seconds = base_seconds
+        self.seconds_per_kb = seconds_per_kb
+        self.on_long_audio = on_long_audio
+        self.calls = {"SynthesizeSpeech": 0, "SynthesizeLongAudio": 0}
+        self.peers = set()
+        self._lock = threading.Lock()
+        self._server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers))
+        self._server.add_generic_rpc_handlers((
+            grpc.method_handlers_generic_handler("google.cloud.texttospeech.v1.TextToSpeech", {
+                "SynthesizeSpeech": grpc.unary_unary_rpc_method_handler(
+                    self._synthesize_speech,
+                    request_deserializer=texttospeech.SynthesizeSpeechRequest.deserialize,
+                    response_serializer=texttospeech.SynthesizeSpeechResponse.serialize,
+                ),
+            }),
+            grpc.method_handlers_generic_handler("google.cloud.texttospeech.v1.TextToSpeechLongAudioSynthesize", {
+                "SynthesizeLongAudio": grpc.unary_unary_rpc_method_handler(
+                    self._synthesize_long_audio,
+                    request_deserializer=texttospeech.SynthesizeLongAudioRequest.deserialize,
+                    response_serializer=operations_pb2.Operation.SerializeToString,
+                ),
+            }),
+        ))
+        port = self._server.add_insecure_port("127.0.0.1:0")
+        self.address = f"127.0.0.1:{port}"
+
+    def __enter__(self) -> "FakeTextToSpeechServer":
+        self._server.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.stop(grace=None)
+
+    def standard_client(self) -> texttospeech.TextToSpeechClient:
+        """A new client on its own channel to this server (what a cold call pays for)."""
+        return texttospeech.TextToSpeechClient(
+            transport=TextToSpeechGrpcTransport(channel=grpc.insecure_channel(self.address))
+        )
+
+    def long_audio_client(self) -> texttospeech.TextToSpeechLongAudioSynthesizeClient:
+        return texttospeech.TextToSpeechLongAudioSynthesizeClient(
+            transport=TextToSpeechLongAudioSynthesizeGrpcTransport(channel=grpc.insecure_channel(self.address))
+        )
+
+    def standard_async_client(self) -> texttospeech.TextToSpeechAsyncClient:
+        return texttospeech.TextToSpeechAsyncClient(
+            transport=TextToSpeechGrpcAsyncIOTransport(channel=grpc.aio.insecure_channel(self.address))
+        )
+
+    def long_audio_async_client(self) -> texttospeech.TextToSpeechLongAudioSynthesizeAsyncClient:
+        return texttospeech.TextToSpeechLongAudioSynthesizeAsyncClient(
+            transport=TextToSpeechLongAudioSynthesizeGrpcAsyncIOTransport(channel=grpc.aio.insecure_channel(self.address))
+        )
+
+    def _record(self, method: str, context: grpc.ServicerContext, text: str) -> None:
+        with self._lock:
+            self.calls[method] += 1
+            self.peers.add(context.peer())
+        delay = self.base_seconds + self.seconds_per_kb * len(text.encode("utf-8")) / 1024.0
+        if delay:
+            time.sleep(delay)
+
+    def _synthesize_speech(self, request, context):
+        text = request.input.ssml or request.input.text
+        self._record("SynthesizeSpeech", context, text)
+        return texttospeech.SynthesizeSpeechResponse(audio_content=fake_speech_wav(text))
+
+    def _synthesize_long_audio(self, request, context):
+        text = request.input.ssml or request.input.text
+        self._record("SynthesizeLongAudio", context, text)
+        if self.on_long_audio is not None:
+            self.on_long_audio(request.output_gcs_uri, fake_speech_wav(text))
+        response = any_pb2.Any()
+        response.Pack(texttospeech.SynthesizeLongAudioResponse.pb(texttospeech.SynthesizeLongAudioResponse()))
+        return operations_pb2.Operation(name="operations/fake", done=True, response=response)
+
+
+class _StoredObject:
+    __slots__ = ("data", "size", "metadata", "content_type", "generation")
+
+    def __init__(self, data: Optional[bytes], size: int, metadata, content_type, generation: int):
+        self.data = data
+        self.size = size
+        self.metadata = dict(metadata) if metadata else None
+        self.content_type = content_type
+        self.generation = generation
+
+
+class FakeStorageClient:
+    """
+    In-memory Cloud Storage with the Client/Bucket/Blob calls the agent makes.
+
+    blob.open("wb") returns the library's real BlobWriter on top of a fake resumable
+    upload, so chunking and buffering behave as against the real service. With
+    keep_data=False only object sizes are kept (for memory measurements). requests
+    counts calls by kind and bytes_read counts downloaded bytes.
+    """
+
+    def __init__(self, keep_data: bool = True):
+        self.keep_data = keep_data
+        self.objects: Dict[Tuple[str, str], _StoredObject] = {}
+        self.requests: Counter = Counter()
+        self.bytes_read = 0
+        self._generations = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def bucket(self, name: str) -> "FakeBucket":
+        return FakeBucket(self, name)
+
+    def registry(self) -> Dict:
+        """A stand-in for gcs_client's per-project client registry that always returns self."""
+        return _EveryProject(self)
+
+    def write_uri(self, uri: str, data: bytes, content_type: Optional[str] = None) -> None:
+        """Stores data at a gs:// URI (for fakes of services that write to GCS themselves)."""
+        bucket_name, _, blob_name = uri[len("gs://"):].partition("/")
+        self.bucket(bucket_name).blob(blob_name).upload_from_string(data, content_type=content_type)
+
+    def read_uri(self, uri: str) -> bytes:
+        bucket_name, _, blob_name = uri[len("gs://"):].partition("/")
+        return self.objects[(bucket_name, blob_name)].data
+
+    def _store(self, blob: "FakeBlob", data: bytes, size: int, content_type, if_generation_match=None) -> None:
+        key = (blob.bucket.name, blob.name)
+        with self._lock:
+            current = self.objects.get(key)
+            if if_generation_match is not None and (current.generation if current else 0) != if_generation_match:
+                raise google_exceptions.PreconditionFailed(f"gs://{key[0]}/{key[1]} generation mismatch")
+            stored = _StoredObject(
+                bytes(data) if self.keep_data else None, size, blob.metadata, content_type, next(self._generations)
+            )
+            self.objects[key] = stored
+            self.requests["upload"] += 1
+        blob._load(stored)
+
+    def _get(self, blob: "FakeBlob") -> _StoredObject:
+        stored = self.objects.get((blob.bucket.name, blob.name))
+        if stored is None:
+            raise google_exceptions.NotFound(f"gs://{blob.bucket.name}/{blob.name} not found")
+        return stored
+
+
+class _EveryProject(dict):
+    def __init__(self, client: FakeStorageClient):
+        super().__init__()
+        self._client = client
+
+    def get(self, key, default=None):
+        return self._client
+
+
+class FakeBucket:
+    def __init__(self, client: FakeStorageClient, name: str):
+        self.client = client
+        self.name = name
+
+    def blob(self, blob_name: str, chunk_size: Optional[int] = None) -> "FakeBlob":
+        return FakeBlob(self, blob_name, chunk_size)
+
+
+class FakeBlob:
+    def __init__(self, bucket: FakeBucket, name: str, chunk_size: Optional[int] = None):
+        self.bucket = bucket
+        self.name = name
+        self.chunk_size = chunk_size
+        self.metadata = None
+        self.generation = None
+        self.size = None
+        self.content_type = None
+
+    @property
+    def client(self) -> FakeStorageClient:
+        return self.bucket.client
+
+    def _load(self, stored: _StoredObject) -> None:
+        self.generation = stored.generation
+        self.size = stored.size
+        self.content_type = stored.content_type
+        self.metadata = dict(stored.metadata) if stored.metadata else None
+
+    # --- Uploads ---
+
+    def upload_from_string(self, data, content_type="text/plain", if_generation_match=None, **kwargs) -> None:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.client._store(self, data, len(data), content_type, if_generation_match)
+
+    def upload_from_file(self, file_obj, size=None, content_type=None, **kwargs) -> None:
+        data = file_obj.read() if size is None else file_obj.read(size)
+        self.client._store(self, data, len(data), content_type)
+
+    def upload_from_filename(self, filename, content_type=None, **kwargs) -> None:
+        with open(filename, "rb") as f:
+            self.upload_from_file(f, content_type=content_type)
+
+    def open(self, mode: str = "r", chunk_size: Optional[int] = None, **kwargs):
+        if mode == "wb":
+            return BlobWriter(self, chunk_size=chunk_size, **kwargs)
+        if mode == "rb":
+            return io.BytesIO(self.download_as_bytes())
+        raise ValueError(f"FakeBlob.open does not support mode '{mode}'")
+
+    def _initiate_resumable_upload(self, client, stream, content_type, size, num_retries, chunk_size=None, retry=None, **kwargs):
+        return _FakeResumableUpload(self, stream, chunk_size, content_type), None
+
+    # --- Reads ---
+
+    def reload(self, **kwargs) -> None:
+        self.client.requests["metadata"] += 1
+        self._load(self.client._get(self))
+
+    def exists(self, **kwargs) -> bool:
+        return (self.bucket.name, self.name) in self.client.objects
+
+    def download_as_bytes(self, start: Optional[int] = None, end: Optional[int] = None, **kwargs) -> bytes:
+        stored = self.client._get(self)
+        if stored.data is None:
+            raise ValueError("FakeStorageClient(keep_data=False) does not keep object contents")
+        self.generation = stored.generation
+        data = stored.data[start or 0:None if end is None else end + 1]
+        self.client.requests["ranged_read" if start is not None or end is not None else "download"] += 1
+        self.client.bytes_read += len(data)
+        return data
+
+    def download_to_file(self, file_obj, **kwargs) -> None:
+        file_obj.write(self.download_as_bytes())
+
+    def download_to_filename(self, filename: str, **kwargs) -> None:
+        with open(filename, "wb") as f:
+            self.download_to_file(f)
+
+    def delete(self, **kwargs) -> None:
+        self.client._get(self)
+        with self.client._lock:
+            del self.client.objects[(self.bucket.name, self.name)]
+            self.client.requests["delete"] += 1
+
+
+class _FakeResumableUpload:
+    """Consumes BlobWriter chunks; a short (final) chunk completes the object."""
+
+    def __init__(self, blob: FakeBlob, stream, chunk_size: int, content_type):
+        self._blob = blob
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._content_type = content_type
+        self._parts = io.BytesIO() if blob.client.keep_data else None
+        self._size = 0
+        self.finished = False
+
+    def transmit_next_chunk(self, transport, timeout=None) -> None:
+        chunk = self._stream.read(self._chunk_size)
+        self._size += len(chunk)
+        if self._parts is not None:
+            self._parts.write(chunk)
+        self._blob.client.requests["upload_chunk"] += 1
+        if len(chunk) < self._chunk_size:
+            data = self._parts.getvalue() if self._parts is not None else b""
+            self._blob.client._store(self._blob, data, self._size, self._content_type)
+            self.finished = True
+
+
+class _BurstHTTPServer(http.server.ThreadingHTTPServer):
+    request_queue_size = 128  # Accept bursts of new connections without resets
+
+
+class FakeHttpServer:
+    """
+    Local HTTP server for REST endpoints. handle(path, body) is called for every POST
+    and returns (status, json_body[, headers]); it may sleep to model latency.
+    requests counts POSTs per path; connections counts accepted TCP connections.
+    """
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.requests = Counter()
+        self.connections = 0
+        fake = self
+
+        class _Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like the real endpoints
+            disable_nagle_algorithm = True  # Headers and body go out in separate writes
+
+            def setup(self):
+                super().setup()
+                with fake._lock:
+                    fake.connections += 1
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                with fake._lock:
+                    fake.requests[self.path] += 1
+                status, payload, *headers = fake.handle(self.path, json.loads(body) if body else None)
+                data = json.dumps(payload).encode("utf-8")
+                try:
+                    self.send_response(status)
+                    for name, value in (headers[0] if headers else {}).items():
+                        self.send_header(name, value)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # The client gave up (e.g. read timeout)
+
+            def log_message(self, *args):
+                pass
+
+        self._lock = threading.Lock()
+        self._server = _BurstHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def __enter__(self) -> "FakeHttpServer":
+        threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class FakeLyria:
+    """
+    Handler for FakeHttpServer that answers Lyria :predict calls.
+
+    Every instance yields sample_count (default 1) predictions whose WAV's PCM data
+    starts with the instance's prompt, so tests can tell which prompt a clip came from.
+    Each call sleeps seconds_per_request plus seconds_per_sample per sample requested.
+    Prompts listed in short_prompts get one prediction fewer than requested.
+    """
+
+    def __init__(self, clip_seconds: float = 0.05, seconds_per_request: float = 0.0,
+                 seconds_per_sample: float = 0.0, short_prompts=()):
+        self.clip_seconds = clip_seconds
+        self.seconds_per_request = seconds_per_request
+        self.seconds_per_sample = seconds_per_sample
+        self.short_prompts = set(short_prompts)
+        self.bodies = []
+
+    def __call__(self, path: str, body: Dict):
+        self.bodies.append(body)
+        predictions = []
+        for instance in body["instances"]:
+            samples = instance.get("sample_count", 1)
+            if instance["prompt"] in self.short_prompts:
+                samples -= 1
+            clip = base64.b64encode(self.clip(instance["prompt"])).decode("ascii")
+            predictions.extend({"bytesBase64Encoded": clip, "mimeType": "audio/wav"} for _ in range(samples))
+        samples_requested = sum(instance.get("sample_count", 1) for instance in body["instances"])
+        time.sleep(self.seconds_per_request + self.seconds_per_sample * samples_requested)
+        return 200, {"predictions": predictions}
+
+    def clip(self, prompt: str) -> bytes:
+        frames = max(1, int(self.clip_seconds * 48000))
+        tag = prompt.encode("utf-8")[:frames * 4]
+        pcm = tag + b"\0" * (frames * 4 - len(tag))
+        return struct.pack(
+            "<4sI4s4sIHHIIHH4sI",
+            b"RIFF", 36 + len(pcm), b"WAVE",
+            b"fmt ", 16, 1, 2, 48000, 48000 * 4, 4, 16,
+            b"data", len(pcm),
+        ) + pcm
+
+    @staticmethod
+    def prompt_of(wav: bytes) -> str:
+        return wav[44:].split(b"\0", 1)[0].decode("utf-8")
+
+
+class FakeTranscoder:
+    """
+    Async stand-in for TranscoderServiceAsyncClient (create_job, get_job, delete_job).
+
+    A job is RUNNING for job_seconds(job) after create_job, then SUCCEEDED (FAILED if
+    job_seconds returns a negative duration, after its absolute value); start_time and
+    end_time are set as the service sets them. With max_running, create_job raises
+    ResourceExhausted while that many jobs are running, like the concurrent-job quota;
+    deleted jobs stop counting. Every call sleeps rpc_seconds. calls counts calls by
+    method and max_seen_running the peak number of running jobs.
+    """
+
+    def __init__(self, job_seconds=1.0, max_running: Optional[int] = None, rpc_seconds: float = 0.0):
+        self.job_seconds = job_seconds if callable(job_seconds) else (lambda job: job_seconds)
+        self.max_running = max_running
+        self.rpc_seconds = rpc_seconds
+        self.calls: Counter = Counter()
+        self.deleted = []
+        self.max_seen_running = 0
+        self._jobs: Dict[str, Tuple[float, float, bool, object]] = {}  # name -> (start, end, failed, job)
+        self._ids = itertools.count(1)
+
+    async def create_job(self, parent: str, job):
+        await self._call("create_job")
+        running = self.running()
+        if self.max_running is not None and running >= self.max_running:
+            raise google_exceptions.ResourceExhausted("Concurrent job quota exceeded")
+        seconds = self.job_seconds(job)
+        name = f"{parent}/jobs/fake-{next(self._ids)}"
+        started = time.monotonic()
+        self._jobs[name] = (started, started + abs(seconds), seconds < 0, job)
+        self.max_seen_running = max(self.max_seen_running, running + 1)
+        return self._status(name)
+
+    async def get_job(self, name: str):
+        await self._call("get_job")
+        if name not in self._jobs:
+            raise google_exceptions.NotFound(f"Job {name} not found")
+        return self._status(name)
+
+    async def delete_job(self, name: str):
+        await self._call("delete_job")
+        if self._jobs.pop(name, None) is None:
+            raise google_exceptions.NotFound(f"Job {name} not found")
+        self.deleted.append(name)
+
+    def running(self) -> int:
+        now = time.monotonic()
+        return sum(1 for _, end, _, _ in self._jobs.values() if end > now)
+
+    def end_of(self, name: str) -> float:
+        """time.monotonic() at which the job finishes."""
+        return self._jobs[name][1]
+
+    def push_listener(self) -> "FakePushListener":
+        return FakePushListener(self)
+
+    async def _call(self, method: str) -> None:
+        self.calls[method] += 1
+        if self.rpc_seconds:
+            await asyncio.sleep(self.rpc_seconds)
+
+    def _status(self, name: str):
+        from google.cloud.video.transcoder_v1.types import Job
+
+        started, ended, failed, _ = self._jobs[name]
+        now = time.monotonic()
+        wall = time.time() - now  # Maps monotonic times onto wall-clock timestamps
+        status = Job(name=name, state=Job.ProcessingState.RUNNING, start_time=_utc(wall + started))
+        if now >= ended:
+            status.state = Job.ProcessingState.FAILED if failed else Job.ProcessingState.SUCCEEDED
+            status.end_time = _utc(wall + ended)
+            if failed:
+                status.error = {"code": 3, "message": "fake failure"}
+        return status
+
+
+class FakePushListener:
+    """
+    Stands in for transcoder_waiter's Pub/Sub listener: resolves a job's future when the
+    FakeTranscoder finishes it, as the completion notification would.
+    """
+
+    def __init__(self, transcoder: FakeTranscoder):
+        self.transcoder = transcoder
+        self.registered = set()
+
+    def register(self, job_name: str) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        delay = max(0.0, self.transcoder.end_of(job_name) - time.monotonic())
+        loop.call_later(delay, lambda: future.done() or future.set_result("SUCCEEDED"))
+        self.registered.add(job_name)
+        return future
+
+    def unregister(self, job_name: str) -> None:
+        self.registered.discard(job_name)
+
+
+def _utc(seconds: float) -> datetime.datetime:
+    return datetime.datetime.fromtimestamp(seconds, tz=datetime.timezone.utc)
+
+
+class FakeGemini(BaseLlm):
+    """
+    Scripted stand-in for a Gemini model, for running the agents offline.
+
+    Each turn sleeps seconds_per_call, then calls the next tool of the haiku flow that
+    the agent offers and has not called yet: the search sub-agent, TTS, Lyria, the mix,
+    then the public URL. Arguments come from the question and earlier tool results. With
+    nothing left to call it replies with the haiku (and the public URL, if there is one).
+    The google_search built-in is never "called"; the reply is the grounded answer.
+    """
+
+    model: str = "gemini-2.0-flash"  # google_search only attaches to Gemini 2 models
+    seconds_per_call: float = 0.0
+    haiku: str = "Tests pass at dawn / the build is green and quiet / ship it before lunch"
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        if self.seconds_per_call:
+            await asyncio.sleep(self.seconds_per_call)
+        question, results = "", {}
+        for content in llm_request.contents or []:
+            for part in content.parts or []:
+                if part.text and content.role == "user" and not question:
+                    question = part.text
+                if part.function_response is not None:
+                    results[part.function_response.name] = (part.function_response.response or {}).get("result")
+        for name, args in self._plan(question, results):
+            if name in llm_request.tools_dict and name not in results:
+                call = genai_types.FunctionCall(name=name, args=args)
+                yield LlmResponse(content=genai_types.Content(role="model", parts=[genai_types.Part(function_call=call)]))
+                return
+        text = self.haiku
+        if results.get("gcs_uri_to_public_url"):
+            text += f"\n\n{results['gcs_uri_to_public_url']}"
+        yield LlmResponse(content=genai_types.Content(role="model", parts=[genai_types.Part(text=text)]))
+
+    def _plan(self, question: str, results: Dict):
+        return (
+            ("swe_agent", {"request": question}),
+            ("text_to_speech_async", {"text": f"<speak>{self.haiku}</speak>", "voice_category": "male_high", "speaking_rate": 1.2}),
+            ("generate_lyria_music", {"prompt": "A HOT, high-energy EDM soundtrack", "negative_prompt": "vocals"}),
+            ("mix_voice_and_music", {"voice_uri": results.get("text_to_speech_async"), "music_uri": results.get("generate_lyria_music")}),
+            ("gcs_uri_to_public_url", {"gcs_uri": results.get("mix_voice_and_music")}),
+        )
+
+
+def percentile(samples, fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of samples (None if empty)."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def install_fakes(server: FakeTextToSpeechServer, storage: FakeStorageClient) -> None:
+    """
+    For benchmark scripts: points the shared TTS and storage clients at the fakes, as the
+    fake_tts fixture does for tests (without undoing it afterwards).
+    """
+    from hack_agent import gcs_client, text_to_speech, tts_clients, voice_catalog
+    from hack_agent.result_cache import ResultCache
+
+    gcs_client._clients = storage.registry()
+    tts_clients._clients = {}
+    tts_clients._CLIENT_FACTORIES = {
+        tts_clients.STANDARD_CLIENT: server.standard_client,
+        tts_clients.LONG_AUDIO_CLIENT: server.long_audio_client,
+    }
+    tts_clients._ASYNC_CLIENT_FACTORIES = {
+        tts_clients.STANDARD_CLIENT: server.standard_async_client,
+        tts_clients.LONG_AUDIO_CLIENT: server.long_audio_async_client,
+    }
+    voice_catalog._catalog = voice_catalog.VoiceCatalog(
+        snapshot_path=None, refresh_seconds=float("inf"), fetch_voices=None,
+    )
+    text_to_speech._tts_cache = ResultCache(name="tts_cache_bench", max_entries=64, ttl_seconds=3600, index_path=None)
+    text_to_speech.TTS_CACHE_ENABLED = False
@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+import pytest
+
+from hack_agent import pipeline
+from hack_agent.llm_usage import get_llm_usage_metrics, instrument_llm_usage
+from hack_agent.pipeline import build_pipeline_agent, run_agent, run_fast_path
+from tests.fakes import FakeGemini
+
+
+@pytest.fixture
+def fake_gemini(monkeypatch, fake_tts, fake_lyria):
+    """A FakeGemini for every agent, with TTS, Lyria and GCS on their fakes too."""
+    model = FakeGemini()
+    monkeypatch.setattr(pipeline, "PIPELINE_MODEL", model)
+    return model
+
+
+def _llm_calls(root_name):
+    """(requests, LLM calls) recorded so far for a root agent."""
+    observed = get_llm_usage_metrics()["observations"].get(f"{root_name}.llm_calls")
+    return (observed["count"], observed["total"]) if observed else (0, 0)
+
+
+def _delta(before, after):
+    return after[0] - before[0], after[1] - before[1]
+
+
+def test_fast_path_uses_one_llm_call_and_records_it(fake_gemini, fake_storage):
+    before = _llm_calls("swe_fast_agent")
+    text = asyncio.run(run_fast_path("what is the weather in Paris?"))
+    assert text.startswith(fake_gemini.haiku)
+    assert "https://storage.googleapis.com/" in text
+    assert _delta(before, _llm_calls("swe_fast_agent")) == (1, 1)
+
+
+def test_pipeline_speaks_once_and_overlaps_speech_with_music(fake_gemini, fake_tts, fake_lyria):
+    fake_gemini.seconds_per_call = 0.4
+    fake_tts.base_seconds = 0.4
+    fake_lyria.seconds_per_request = 0.8
+    before = _llm_calls("swe_pipeline_agent")
+    started = time.monotonic()
+    text = asyncio.run(run_agent(instrument_llm_usage(build_pipeline_agent()), "what is the weather in Paris?"))
+    elapsed = time.monotonic() - started
+    assert text.startswith(fake_gemini.haiku)
+    assert "https://storage.googleapis.com/lyria-bucket/mix_output_" in text
+    assert sum(fake_tts.calls.values()) == 1
+    assert _delta(before, _llm_calls("swe_pipeline_agent")) == (1, 1)
+    # Speech (LLM + TTS, 0.8 s) and music (0.8 s) run side by side, not one after the other.
+    assert 0.8 <= elapsed < 1.2
+
+
+def test_conversational_agent_spends_a_turn_per_tool(fake_gemini, monkeypatch):
+    from hack_agent import agent
+
+    monkeypatch.setattr(agent.root_agent, "model", fake_gemini)
+    monkeypatch.setattr(agent.ga, "model", fake_gemini)
+    before = _llm_calls(agent.root_agent.name)
+    text = asyncio.run(run_agent(agent.root_agent, "what is the news about rust?"))
+    assert "https://storage.googleapis.com/" in text
+    # Search sub-agent, five tool-choosing turns and the final reply.
+    assert _delta(before, _llm_calls(agent.root_agent.name)) == (1, 7)
@@ -0,0 +1,182 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from google.adk.agents import BaseAgent
+from google.adk.tools.agent_tool import AgentTool
+
+from hack_agent import answer_cache
+from hack_agent.answer_cache import CachedAgentTool, classify_intent, get_answer_cache_stats, normalize_query
+from hack_agent.metrics import Metrics
+
+
+class _StubAgent(BaseAgent):
+    """Never run: the upstream AgentTool.run_async is replaced by the upstream fixture."""
+
+
+class _Upstream:
+    """Stands in for AgentTool.run_async: counts calls, waits `seconds`, then answers or raises."""
+
+    def __init__(self):
+        self.calls = []
+        self.seconds = 0.05
+        self.error = None
+        self.answer = "Sunny haiku"
+
+    async def __call__(self, tool, *, args, tool_context):
+        self.calls.append(args["request"])
+        await asyncio.sleep(self.seconds)
+        if self.error is not None:
+            raise self.error
+        return self.answer
+
+
+@pytest.fixture(autouse=True)
+def fresh_answer_cache(monkeypatch):
+    monkeypatch.setattr(answer_cache, "ANSWER_CACHE_ENABLED", True)
+    monkeypatch.setattr(answer_cache, "_caches", {})
+    monkeypatch.setattr(answer_cache, "_in_flight", {})
+    monkeypatch.setattr(answer_cache, "_upstream_latency", {})
+    monkeypatch.setattr(answer_cache, "_answer_metrics", Metrics("answer_cache_test"))
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    stub = _Upstream()
+    monkeypatch.setattr(AgentTool, "run_async", lambda self, *, args, tool_context: stub(self, args=args, tool_context=tool_context))
+    return stub
+
+
+def _tool():
+    return CachedAgentTool(agent=_StubAgent(name="search_agent"))
+
+
+async def _ask(tool, request, locale=None):
+    return await tool.run_async(args={"request": request}, tool_context=SimpleNamespace(state={"locale": locale} if locale else {}))
+
+
+@pytest.mark.parametrize("query, intent", [
+    ("weather today", "weather"),
+    ("Is it going to rain in Seattle tomorrow?", "weather"),
+    ("What time is it in London?", "time"),
+    ("what day is it", "time"),
+    ("Who won the football match last night?", "general"),
+])
+def test_classify_intent(query, intent):
+    assert classify_intent(query) == intent
+
+
+def test_normalize_query_drops_filler_and_punctuation():
+    assert normalize_query("Hey, please tell me:  What's the WEATHER?") == "what s the weather"
+
+
+def test_concurrent_identical_questions_make_one_upstream_call(upstream):
+    tool = _tool()
+    questions = ["What's the weather in Paris?", "what's the weather in paris", "Please, what's the weather in Paris"] * 4
+
+    async def _run():
+        return await asyncio.gather(*(_ask(tool, question) for question in questions))
+
+    answers = asyncio.run(_run())
+    assert answers == ["Sunny haiku"] * 12
+    assert len(upstream.calls) == 1
+    assert get_answer_cache_stats()["counters"]["coalesced"] == 11
+
+
+def test_locale_is_part_of_the_key(upstream):
+    tool = _tool()
+
+    async def _run():
+        await _ask(tool, "weather today", locale="en-US")
+        await _ask(tool, "weather today", locale="fr-FR")
+        await _ask(tool, "weather today", locale="en-US")
+
+    asyncio.run(_run())
+    assert len(upstream.calls) == 2
+
+
+def test_answers_expire_per_intent(upstream, monkeypatch):
+    monkeypatch.setitem(answer_cache.ANSWER_CACHE_TTL_SECONDS, "time", 0.1)
+    tool = _tool()
+
+    async def _run():
+        await _ask(tool, "What time is it in Tokyo?")
+        await _ask(tool, "weather in Tokyo")
+        await _ask(tool, "What time is it in Tokyo?")  # Fresh: cached
+        await asyncio.sleep(0.15)
+        await _ask(tool, "What time is it in Tokyo?")  # Expired
+        await _ask(tool, "weather in Tokyo")  # Weather lives longer
+
+    asyncio.run(_run())
+    assert upstream.calls == ["What time is it in Tokyo?", "weather in Tokyo", "What time is it in Tokyo?"]
+    counters = get_answer_cache_stats()["counters"]
+    assert (counters["hits_time"], counters["misses_time"], counters["hits_weather"]) == (1, 2, 1)
+
+
+def test_errored_leader_fails_its_waiters_and_is_not_cached(upstream):
+    upstream.error = RuntimeError("search backend down")
+    tool = _tool()
+
+    async def _run():
+        return await asyncio.gather(*(_ask(tool, "news about rust") for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(_run())
+    assert all(isinstance(result, RuntimeError) and str(result) == "search backend down" for result in results)
+    assert len(upstream.calls) == 1
+
+    upstream.error = None
+    assert asyncio.run(_ask(tool, "news about rust")) == "Sunny haiku"
+    assert len(upstream.calls) == 2
+
+
+def test_empty_answer_is_not_cached(upstream):
+    upstream.answer = "  "
+    tool = _tool()
+    asyncio.run(_ask(tool, "news about rust"))
+    asyncio.run(_ask(tool, "news about rust"))
+    assert len(upstream.calls) == 2
+
+
+def test_waiter_reruns_upstream_when_the_leader_is_cancelled(upstream):
+    upstream.seconds = 0.2
+    tool = _tool()
+
+    async def _run():
+        leader = asyncio.ensure_future(_ask(tool, "news about rust"))
+        await asyncio.sleep(0.05)
+        follower = asyncio.ensure_future(_ask(tool, "news about rust"))
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    started = time.monotonic()
+    assert asyncio.run(_run()) == "Sunny haiku"
+    assert len(upstream.calls) == 2
+    assert time.monotonic() - started >= 0.3  # The follower ran its own upstream call
+    assert answer_cache._in_flight == {}
+
+
+def test_hit_ratio_counts_hits_and_coalesced_calls(upstream):
+    tool = _tool()
+    assert get_answer_cache_stats()["hit_ratio"] is None
+
+    async def _run():
+        await asyncio.gather(_ask(tool, "news about rust"), _ask(tool, "news about rust"))  # Miss + coalesced
+        await _ask(tool, "news about rust")
+        await _ask(tool, "News about Rust!")
+
+    asyncio.run(_run())
+    stats = get_answer_cache_stats()
+    assert stats["hit_ratio"] == pytest.approx(0.75)
+    assert stats["counters"]["saved_seconds"] == pytest.approx(3 * upstream.seconds, rel=0.5)
+
+
+def test_disabled_cache_passes_every_call_through(upstream, monkeypatch):
+    monkeypatch.setattr(answer_cache, "ANSWER_CACHE_ENABLED", False)
+    tool = _tool()
+    asyncio.run(_ask(tool, "news about rust"))
+    asyncio.run(_ask(tool, "news about rust"))
+    assert len(upstream.calls) == 2
@@ -0,0 +1,113 @@
+import struct
+from collections import OrderedDict
+
+import pytest
+
+from hack_agent import audio_probe
+from hack_agent.audio_probe import AudioProbeError, get_gcs_audio_duration, probe_gcs_audio_duration
+from hack_agent.wav_utils import build_wav_header
+from tests.fakes import fake_mp3
+
+# Every fake_mp3 frame holds 1152 samples at 48 kHz.
+MP3_FRAME_SECONDS = 1152 / 48000.0
+
+
+@pytest.fixture(autouse=True)
+def empty_duration_cache(monkeypatch):
+    monkeypatch.setattr(audio_probe, "_duration_cache", OrderedDict())
+
+
+def _store(storage, name, data, metadata=None):
+    blob = storage.bucket("audio").blob(name)
+    blob.metadata = metadata
+    blob.upload_from_string(data)
+    storage.requests.clear()
+    storage.bytes_read = 0
+    return storage.bucket("audio").blob(name)  # Fresh handle without loaded metadata
+
+
+def _wav(seconds, sample_rate=24000, channels=2):
+    data_size = int(seconds * sample_rate) * channels * 2
+    return build_wav_header(sample_rate, channels, 16, data_size) + b"\x00" * data_size
+
+
+def test_wav_duration_comes_from_the_header(fake_storage):
+    blob = _store(fake_storage, "long.wav", _wav(30.0))
+    assert probe_gcs_audio_duration(blob) == pytest.approx(30.0)
+    assert fake_storage.requests["download"] == 0
+    assert fake_storage.requests["ranged_read"] == 1
+    assert fake_storage.bytes_read == audio_probe.PROBE_HEAD_BYTES
+
+
+def test_wav_with_large_chunk_before_data_reads_a_bigger_header(fake_storage):
+    wav = _wav(5.0, channels=1)
+    extra = b"LIST" + struct.pack("<I", 20000) + b"\x00" * 20000
+    wav = wav[:36] + extra + wav[36:]
+    blob = _store(fake_storage, "tagged.wav", wav)
+    assert probe_gcs_audio_duration(blob) == pytest.approx(5.0)
+    assert fake_storage.requests["ranged_read"] == 2
+    assert fake_storage.requests["download"] == 0
+
+
+@pytest.mark.parametrize("metadata, expected", [
+    (None, 48000 / (audio_probe.PCM_DEFAULT_SAMPLE_RATE * audio_probe.PCM_DEFAULT_CHANNELS * 2.0)),
+    ({"sample_rate_hertz": "8000", "channels": "2"}, 48000 / (8000 * 2 * 2.0)),
+])
+def test_pcm_duration_comes_from_the_size(fake_storage, metadata, expected):
+    blob = _store(fake_storage, "speech.pcm", b"\x01\x02" * 24000, metadata)
+    assert probe_gcs_audio_duration(blob) == pytest.approx(expected)
+    assert fake_storage.requests["download"] == 0
+
+
+def test_mp3_xing_frame_count(fake_storage):
+    blob = _store(fake_storage, "vbr.mp3", fake_mp3(2000, bitrates_kbps=(64, 320), xing=True))
+    assert probe_gcs_audio_duration(blob) == pytest.approx(2000 * MP3_FRAME_SECONDS)
+    assert fake_storage.requests["download"] == 0
+    assert fake_storage.bytes_read <= audio_probe.PROBE_HEAD_BYTES
+
+
+def test_mp3_cbr_duration_from_size_excludes_tags(fake_storage):
+    mp3 = fake_mp3(1500, bitrates_kbps=(128,), id3v2_bytes=1000, id3v1=True)
+    blob = _store(fake_storage, "cbr.mp3", mp3)
+    assert probe_gcs_audio_duration(blob) == pytest.approx(1500 * MP3_FRAME_SECONDS)
+    assert fake_storage.requests["download"] == 0
+    assert fake_storage.bytes_read < audio_probe.PROBE_HEAD_BYTES + 128
+
+
+def test_mp3_after_large_id3_tag_reads_past_it(fake_storage):
+    mp3 = fake_mp3(100, xing=True, id3v2_bytes=200 * 1024)  # e.g. embedded cover art
+    blob = _store(fake_storage, "cover.mp3", mp3)
+    assert probe_gcs_audio_duration(blob) == pytest.approx(100 * MP3_FRAME_SECONDS)
+    assert fake_storage.requests["ranged_read"] == 2
+    assert fake_storage.bytes_read == 2 * audio_probe.PROBE_HEAD_BYTES
+
+
+def test_unknown_format_falls_back_to_a_full_download(fake_storage):
+    blob = _store(fake_storage, "noise.ogg", b"\x00" * 4096)
+    with pytest.raises(AudioProbeError):
+        probe_gcs_audio_duration(blob)
+    assert fake_storage.requests["download"] == 1
+
+
+def test_missing_and_empty_objects_raise(fake_storage):
+    with pytest.raises(AudioProbeError, match="not found"):
+        get_gcs_audio_duration(fake_storage.bucket("audio").blob("missing.wav"))
+    with pytest.raises(AudioProbeError, match="empty"):
+        probe_gcs_audio_duration(_store(fake_storage, "empty.wav", b""))
+
+
+def test_duration_is_cached_per_generation(fake_storage):
+    blob = _store(fake_storage, "clip.wav", _wav(2.0))
+    assert get_gcs_audio_duration(blob) == pytest.approx(2.0)
+    fake_storage.requests.clear()
+    assert get_gcs_audio_duration(fake_storage.bucket("audio").blob("clip.wav")) == pytest.approx(2.0)
+    assert fake_storage.requests["ranged_read"] == 0
+
+    fake_storage.bucket("audio").blob("clip.wav").upload_from_string(_wav(3.0))  # New generation
+    assert get_gcs_audio_duration(fake_storage.bucket("audio").blob("clip.wav")) == pytest.approx(3.0)
+
+
+def test_stamped_metadata_skips_the_probe(fake_storage):
+    blob = _store(fake_storage, "stamped.wav", _wav(1.0), {audio_probe.DURATION_METADATA_KEY: "12.5"})
+    assert get_gcs_audio_duration(blob) == 12.5
+    assert fake_storage.requests == {"metadata": 1}
@@ -0,0 +1,119 @@
+import datetime
+import threading
+import time
+
+import pytest
+from google.auth import credentials as google_credentials
+
+from hack_agent import gcp_auth
+from hack_agent.gcp_auth import get_access_token, get_credentials, get_token_refresh_count
+
+
+class FakeCredentials(google_credentials.Credentials):
+    """Credentials whose refresh() takes refresh_seconds and issues a token valid for lifetime_seconds."""
+
+    def __init__(self, lifetime_seconds=3600.0, refresh_seconds=0.05, token="token-0", expires_in=None):
+        super().__init__()
+        self.lifetime_seconds = lifetime_seconds
+        self.refresh_seconds = refresh_seconds
+        self.refreshes = 0
+        self.token = token
+        self.expiry = _utcnow() + datetime.timedelta(seconds=expires_in) if expires_in is not None else None
+        if expires_in is None:
+            self.token = None
+
+    def refresh(self, request):
+        time.sleep(self.refresh_seconds)
+        self.refreshes += 1
+        self.token = f"token-{self.refreshes}"
+        self.expiry = _utcnow() + datetime.timedelta(seconds=self.lifetime_seconds)
+
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)  # google-auth's naive UTC
+
+
+@pytest.fixture
+def install(monkeypatch):
+    """Makes the given FakeCredentials the process-wide credentials."""
+    monkeypatch.setattr(gcp_auth, "_background_refresh", None)
+
+    def _install(credentials):
+        monkeypatch.setattr(gcp_auth, "_credentials", credentials)
+        monkeypatch.setattr(gcp_auth, "_project_id", "test-project")
+        return credentials
+
+    return _install
+
+
+def test_token_is_reused_until_near_expiry(install):
+    credentials = install(FakeCredentials())
+    refreshes_before = get_token_refresh_count()
+    tokens = {get_access_token() for _ in range(20)}
+    assert tokens == {"token-1"}
+    assert credentials.refreshes == 1
+    assert get_token_refresh_count() - refreshes_before == 1
+
+
+def test_concurrent_callers_share_one_refresh(install):
+    credentials = install(FakeCredentials(refresh_seconds=0.1))
+    barrier = threading.Barrier(16)
+    tokens = []
+
+    def _get():
+        barrier.wait()
+        tokens.append(get_access_token())
+
+    threads = [threading.Thread(target=_get) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert credentials.refreshes == 1
+    assert set(tokens) == {"token-1"}
+
+
+def test_token_inside_the_margin_is_refreshed_before_use(install):
+    credentials = install(FakeCredentials(expires_in=gcp_auth.TOKEN_REFRESH_MARGIN_SECONDS / 2))
+    assert get_access_token() == "token-1"
+    assert credentials.refreshes == 1
+
+
+def test_token_near_expiry_is_refreshed_in_the_background(install):
+    remaining = (gcp_auth.TOKEN_REFRESH_MARGIN_SECONDS + gcp_auth.TOKEN_BACKGROUND_REFRESH_SECONDS) / 2
+    credentials = install(FakeCredentials(expires_in=remaining, refresh_seconds=0.1))
+    started = time.monotonic()
+    assert get_access_token() == "token-0"  # Still valid: returned without waiting
+    assert time.monotonic() - started < 0.05
+    gcp_auth._background_refresh.join(5)
+    assert credentials.refreshes == 1
+    assert get_access_token() == "token-1"
+    assert credentials.refreshes == 1
+
+
+def test_failed_background_refresh_is_retried_in_the_foreground(install, capsys):
+    class _FlakyCredentials(FakeCredentials):
+        fail_next = True
+
+        def refresh(self, request):
+            if self.fail_next:
+                self.fail_next = False
+                raise RuntimeError("metadata server unavailable")
+            super().refresh(request)
+
+    remaining = (gcp_auth.TOKEN_REFRESH_MARGIN_SECONDS + gcp_auth.TOKEN_BACKGROUND_REFRESH_SECONDS) / 2
+    credentials = install(_FlakyCredentials(expires_in=remaining))
+    assert get_access_token() == "token-0"
+    gcp_auth._background_refresh.join(5)
+    assert "Background token refresh failed" in capsys.readouterr().out
+    credentials.expiry = _utcnow()  # Now inside the margin
+    assert get_access_token() == "token-1"
+
+
+def test_credentials_are_discovered_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(gcp_auth, "_credentials", None)
+    monkeypatch.setattr(gcp_auth.google.auth, "default", lambda scopes: calls.append(scopes) or (FakeCredentials(), "adc-project"))
+    assert get_credentials()[1] == "adc-project"
+    assert get_credentials()[0] is get_credentials()[0]
+    assert calls == [[gcp_auth.CLOUD_PLATFORM_SCOPE]]
@@ -0,0 +1,28 @@
+import pytest
+from google.auth.transport.requests import AuthorizedSession
+
+from hack_agent import gcs_client
+
+
+@pytest.fixture
+def emulator(monkeypatch):
+    """Anonymous clients for a (never contacted) emulator, in an empty registry."""
+    monkeypatch.setenv("STORAGE_EMULATOR_HOST", "http://127.0.0.1:9")
+    monkeypatch.setattr(gcs_client, "_clients", {})
+
+
+def test_shared_client_uses_a_pooled_authorized_session(emulator):
+    client = gcs_client.get_storage_client()
+    assert gcs_client.get_storage_client() is client
+    assert isinstance(client._http, AuthorizedSession)
+    for scheme in ("https://", "http://"):
+        pool = client._http.get_adapter(f"{scheme}storage.googleapis.com").poolmanager
+        assert pool.connection_pool_kw["maxsize"] == gcs_client.GCS_MAX_CONNECTIONS
+
+
+def test_one_client_per_project(emulator):
+    default = gcs_client.get_storage_client()
+    other = gcs_client.get_storage_client("other-project")
+    assert other is not default
+    assert other.project == "other-project"
+    assert gcs_client.get_storage_client("other-project") is other
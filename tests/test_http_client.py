@@ -0,0 +1,82 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from hack_agent import http_client
+from tests.fakes import FakeHttpServer
+
+
+@pytest.fixture(autouse=True)
+def fresh_session(monkeypatch):
+    """A new pooled session per test, with fast backoff and a short read timeout."""
+    monkeypatch.setattr(http_client, "_session", None)
+    monkeypatch.setattr(http_client, "HTTP_BACKOFF_BASE_SECONDS", 0.01)
+    monkeypatch.setattr(http_client, "HTTP_READ_TIMEOUT_SECONDS", 0.3)
+    yield
+    if http_client._session is not None:
+        http_client._session.close()
+
+
+def _scripted(*responses):
+    """A handler that returns the given (status, body) pairs in order, then repeats the last."""
+    remaining = list(responses)
+
+    def _handle(path, body):
+        response = remaining.pop(0) if len(remaining) > 1 else remaining[0]
+        if response == "hang":
+            time.sleep(1.0)
+            return 200, {}
+        return response
+    return _handle
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_throttling_statuses_are_retried(status):
+    with FakeHttpServer(_scripted((status, {}), (status, {}), (200, {"ok": True}))) as server:
+        response = http_client.post_json(f"{server.url}/predict", {}, {"instances": []})
+    assert response.json() == {"ok": True}
+    assert server.requests["/predict"] == 3
+
+
+@pytest.mark.parametrize("status", [500, 502, 504])
+def test_server_errors_are_not_retried(status):
+    with FakeHttpServer(_scripted((status, {}), (200, {}))) as server:
+        response = http_client.post_json(f"{server.url}/predict", {}, {})
+    assert response.status_code == status
+    assert server.requests["/predict"] == 1
+
+
+def test_read_timeout_is_not_retried():
+    with FakeHttpServer(_scripted("hang")) as server:
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            http_client.post_json(f"{server.url}/predict", {}, {})
+    assert server.requests["/predict"] == 1
+
+
+def test_retries_stop_after_the_limit(monkeypatch):
+    monkeypatch.setattr(http_client, "HTTP_MAX_RETRIES", 2)
+    with FakeHttpServer(_scripted((429, {}))) as server:
+        response = http_client.post_json(f"{server.url}/predict", {}, {})
+    assert response.status_code == 429
+    assert server.requests["/predict"] == 3
+
+
+def test_connect_errors_are_retried(caplog):
+    with FakeHttpServer(_scripted((200, {}))) as server:
+        url = server.url
+    # The server is gone, so every attempt fails to connect before the request is sent.
+    with caplog.at_level("WARNING", logger="urllib3.connectionpool"):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            http_client.post_json(f"{url}/predict", {}, {})
+    retries = [record for record in caplog.records if record.getMessage().startswith("Retrying")]
+    assert len(retries) == http_client.HTTP_MAX_RETRIES
+
+
+def test_concurrent_requests_reuse_pooled_connections():
+    with FakeHttpServer(_scripted((200, {}))) as server:
+        with ThreadPoolExecutor(8) as pool:
+            responses = list(pool.map(lambda _: http_client.post_json(f"{server.url}/predict", {}, {}), range(200)))
+    assert all(response.status_code == 200 for response in responses)
+    assert server.connections <= 8
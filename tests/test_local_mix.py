@@ -0,0 +1,143 @@
+import io
+
+import numpy as np
+import pytest
+
+from hack_agent import local_mix
+from hack_agent.local_mix import LocalMixError, _Ducker, _Resampler, mix_to_gcs, mix_voice_and_music
+from hack_agent.wav_utils import build_wav_header, parse_wav_header
+from tests.fakes import FakeBlob
+
+VOICE_URI = "gs://voice-bucket/speech.wav"
+MUSIC_URI = "gs://music-bucket/music.wav"
+
+
+def _tone(seconds, rate, channels=1, freq=440.0, amplitude=0.25):
+    t = np.arange(int(seconds * rate), dtype=np.float32) / rate
+    return np.repeat((np.sin(2 * np.pi * freq * t) * amplitude)[:, None], channels, axis=1).astype(np.float32)
+
+
+def _wav(samples, rate):
+    pcm = np.clip(np.rint(samples * 32767.0), -32768, 32767).astype("<i2").tobytes()
+    return build_wav_header(rate, samples.shape[1], 16, len(pcm)) + pcm
+
+
+def _pcm(wav):
+    header = parse_wav_header(wav)
+    data = np.frombuffer(wav[header.data_offset:header.data_offset + header.data_size], dtype="<i2")
+    return header, data.astype(np.float32).reshape(-1, header.channels) / 32768.0
+
+
+def _resample_in_blocks(samples, in_rate, out_rate, block_sizes):
+    resampler = _Resampler(in_rate, out_rate)
+    position, out = 0, []
+    for frames in block_sizes:
+        wanted = resampler.input_needed(frames)
+        out.append(resampler.process(samples[position:position + wanted], frames))
+        position += wanted
+    return np.concatenate(out)
+
+
+@pytest.mark.parametrize("in_rate, out_rate", [(24000, 48000), (48000, 48000), (44100, 48000)])
+def test_resampler_is_continuous_across_block_boundaries(in_rate, out_rate):
+    samples = _tone(0.5, in_rate)
+    total = int(0.45 * out_rate)
+    blocks = [1000, 1, 777, 4096, 333] * 8
+    blocks = blocks[:next(i for i in range(len(blocks)) if sum(blocks[:i + 1]) >= total)] or [total]
+    blocks.append(total - sum(blocks))
+    streamed = _resample_in_blocks(samples, in_rate, out_rate, blocks)
+    whole = _resample_in_blocks(samples, in_rate, out_rate, [total])
+    np.testing.assert_allclose(streamed, whole, atol=1e-6)
+    expected = _tone(0.5, out_rate)[:total]
+    assert np.max(np.abs(streamed - expected)) < 0.01  # Linear interpolation of a 440 Hz tone
+
+
+def test_equal_rates_pass_samples_through_unchanged():
+    samples = _tone(0.1, 48000, channels=2)
+    out = _resample_in_blocks(samples, 48000, 48000, [1000, 2000, 1800])
+    np.testing.assert_array_equal(out, samples)
+
+
+def test_resampler_pads_with_silence_after_the_input_ends():
+    out = _resample_in_blocks(_tone(0.01, 24000), 24000, 48000, [480, 480])
+    assert np.all(out[490:] == 0.0)
+
+
+def test_ducker_lowers_music_under_speech_and_recovers_in_silence():
+    rate = 48000
+    ducker = _Ducker(rate)
+    silence = ducker.gains(np.zeros((rate, 2), np.float32))
+    assert silence.min() == pytest.approx(1.0)
+    speech = ducker.gains(_tone(1.0, rate, channels=2))
+    ducked = 10 ** (local_mix.LOCAL_MIX_DUCK_DB / 20)
+    assert speech[-1] == pytest.approx(ducked, abs=0.01)
+    assert speech[0] > speech[rate // 10] > speech[-1]  # Attack smoothing, not a step
+    recovered = ducker.gains(np.zeros((2 * rate, 2), np.float32))
+    assert recovered[rate // 20] < 0.5  # Release is slower than attack
+    assert recovered[-1] == pytest.approx(1.0, abs=0.01)
+
+
+@pytest.fixture
+def inputs(fake_storage, monkeypatch):
+    """1 s of 24 kHz mono speech and 10 s of 48 kHz stereo music in fake_storage."""
+    monkeypatch.delenv("GOOGLE_CLOUD_BUCKET", raising=False)
+    fake_storage.write_uri(VOICE_URI, _wav(_tone(1.0, 24000), 24000))
+    fake_storage.write_uri(MUSIC_URI, _wav(_tone(10.0, 48000, channels=2, freq=220.0, amplitude=0.5), 48000))
+    return fake_storage
+
+
+def test_mix_is_a_wav_of_voice_length_plus_tail(inputs):
+    output_uri = mix_voice_and_music(VOICE_URI, MUSIC_URI)
+    assert output_uri.startswith("gs://voice-bucket/mix_output_")
+    wav = inputs.read_uri(output_uri)
+    header, mixed = _pcm(wav)
+    frames = 48000 + int(local_mix.LOCAL_MIX_TAIL_SECONDS * 48000)
+    assert (header.sample_rate, header.channels, header.bits_per_sample) == (48000, 2, 16)
+    assert header.data_size == frames * 4
+    assert len(wav) == header.data_offset + header.data_size
+    bucket, name = output_uri[len("gs://"):].split("/", 1)
+    assert float(inputs.objects[(bucket, name)].metadata["duration_seconds"]) == pytest.approx(frames / 48000)
+
+    # After the voice ends the music (amplitude 0.5 at the base gain) fades out linearly.
+    tail = np.abs(mixed[48000:]).max(axis=1)
+    envelope = 0.5 * 10 ** (local_mix.LOCAL_MIX_MUSIC_GAIN_DB / 20) * (1.0 - np.arange(len(tail)) / len(tail))
+    assert np.all(tail <= envelope + 0.002)
+    assert tail[:4800].max() > 10 ** (local_mix.LOCAL_MIX_DUCK_DB / 20) * envelope[0]  # Audible, coming out of the duck
+
+
+def test_unsupported_input_is_an_error_message(inputs):
+    inputs.write_uri("gs://music-bucket/music.mp3", b"\xff\xfb" + bytes(1000))
+    assert mix_voice_and_music(VOICE_URI, "gs://music-bucket/music.mp3").startswith("ERROR: ")
+    assert mix_voice_and_music(VOICE_URI, "gs://music-bucket/missing.wav").startswith("ERROR: Cannot read")
+
+
+def _record_opened_files(monkeypatch):
+    opened = []
+    original = FakeBlob.open
+
+    def _open(self, mode="r", **kwargs):
+        file = original(self, mode, **kwargs)
+        if mode == "rb":
+            opened.append(file)
+        return file
+
+    monkeypatch.setattr(FakeBlob, "open", _open)
+    return opened
+
+
+def test_sources_are_closed_when_the_output_fails(inputs, monkeypatch):
+    opened = _record_opened_files(monkeypatch)
+    output = inputs.bucket("out").blob("mix.wav")
+    monkeypatch.setattr(output, "open", lambda *args, **kwargs: (_ for _ in ()).throw(OSError("upload failed")))
+    with pytest.raises(OSError, match="upload failed"):
+        mix_to_gcs(inputs.bucket("voice-bucket").blob("speech.wav"), inputs.bucket("music-bucket").blob("music.wav"), output)
+    assert len(opened) == 2 and all(isinstance(file, io.BytesIO) and file.closed for file in opened)
+
+
+def test_voice_is_closed_when_the_music_is_invalid(inputs, monkeypatch):
+    opened = _record_opened_files(monkeypatch)
+    inputs.write_uri("gs://music-bucket/music.txt", b"not audio")
+    with pytest.raises(LocalMixError):
+        mix_to_gcs(inputs.bucket("voice-bucket").blob("speech.wav"), inputs.bucket("music-bucket").blob("music.txt"),
+                   inputs.bucket("out").blob("mix.wav"))
+    assert len(opened) == 1 and opened[0].closed
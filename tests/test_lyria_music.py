@@ -0,0 +1,148 @@
+import base64
+import binascii
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from hack_agent import lyria_music
+from hack_agent.wav_utils import build_wav_header, parse_wav_header
+from tests.fakes import FakeLyria, FakeStorageClient
+
+
+def _wav(seconds: float, sample_rate: int = 48000, channels: int = 2) -> bytes:
+    frames = int(seconds * sample_rate)
+    pcm = np.random.default_rng(0).integers(-2000, 2000, frames * channels, dtype="<i2").tobytes()
+    return build_wav_header(sample_rate, channels, 16, len(pcm)) + pcm
+
+
+def test_base64_upload_round_trips_and_stamps_duration():
+    storage = FakeStorageClient()
+    wav = _wav(1.5)
+    size = lyria_music._upload_base64_audio(storage.bucket("b"), "clip.wav", base64.b64encode(wav).decode())
+    assert size == len(wav)
+    stored = storage.objects[("b", "clip.wav")]
+    assert stored.data == wav
+    assert stored.content_type == "audio/wav"
+    assert float(stored.metadata["duration_seconds"]) == pytest.approx(1.5)
+
+
+def test_base64_upload_streams_in_chunks_with_bounded_memory():
+    storage = FakeStorageClient(keep_data=False)
+    wav = _wav(80.0)  # ~15 MiB, past the library's 8 MiB multipart threshold
+    encoded = base64.b64encode(wav).decode()
+    del wav
+    tracemalloc.start()
+    try:
+        size = lyria_music._upload_base64_audio(storage.bucket("b"), "clip.wav", encoded)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert storage.objects[("b", "clip.wav")].size == size
+    assert storage.requests["upload_chunk"] >= size // lyria_music.LYRIA_UPLOAD_CHUNK_BYTES
+    # A few upload chunks at most, never the whole decoded file.
+    assert peak < 0.25 * size, f"peak {peak / 2**20:.1f} MiB for a {size / 2**20:.1f} MiB WAV"
+
+
+@pytest.mark.parametrize("encoded", ["abc", "ab$d", "a=bc", "YWJj===="])
+def test_invalid_base64_uploads_nothing(encoded):
+    storage = FakeStorageClient()
+    with pytest.raises(binascii.Error):
+        lyria_music._upload_base64_audio(storage.bucket("b"), "clip.wav", encoded)
+    assert storage.objects == {} and storage.requests["upload_chunk"] == 0
+
+
+def test_failed_upload_leaves_no_partial_object(monkeypatch):
+    storage = FakeStorageClient()
+    monkeypatch.setattr(lyria_music, "LYRIA_UPLOAD_CHUNK_BYTES", 256 * 1024)
+    from tests import fakes
+    transmit = fakes._FakeResumableUpload.transmit_next_chunk
+
+    def _fail_second_chunk(self, transport, timeout=None):
+        if storage.requests["upload_chunk"] == 1:
+            raise ConnectionError("upload interrupted")
+        return transmit(self, transport, timeout)
+
+    monkeypatch.setattr(fakes._FakeResumableUpload, "transmit_next_chunk", _fail_second_chunk)
+    with pytest.raises(ConnectionError):
+        lyria_music._upload_base64_audio(storage.bucket("b"), "clip.wav", base64.b64encode(_wav(10.0)).decode())
+    assert storage.objects == {}
+
+
+def _clip_prompts(storage, uris):
+    return [FakeLyria.prompt_of(storage.read_uri(uri)) for uri in uris]
+
+
+def test_batch_maps_predictions_to_their_instances(fake_lyria, fake_storage, monkeypatch):
+    monkeypatch.setattr(lyria_music, "LYRIA_MAX_INSTANCES_PER_REQUEST", 3)
+    items = [{"prompt": "drums"}, {"prompt": "piano", "seed": 7}, {"prompt": "drums"},
+             {"prompt": "harp"}, {"prompt": "drums"}, {"prompt": "piano", "seed": 8}]
+    uris = lyria_music.generate_lyria_music_batch(items, use_cache=False)
+    assert _clip_prompts(fake_storage, uris) == [item["prompt"] for item in items]
+    assert len(set(uris)) == len(items)
+    # Seedless duplicates fold into one instance; seeded items stay separate.
+    instances = [instance for body in fake_lyria.bodies for instance in body["instances"]]
+    assert sorted((i["prompt"], i.get("sample_count", 1), i.get("seed")) for i in instances) == [
+        ("drums", 3, None), ("harp", 1, None), ("piano", 1, 7), ("piano", 1, 8),
+    ]
+
+
+def test_short_response_fails_the_request_instead_of_shifting_clips(fake_lyria, fake_storage, monkeypatch):
+    monkeypatch.setattr(lyria_music, "LYRIA_MAX_INSTANCES_PER_REQUEST", 8)
+    fake_lyria.short_prompts.add("drums")
+    items = [{"prompt": "piano", "seed": 1}, {"prompt": "drums"}, {"prompt": "drums"}, {"prompt": "harp", "seed": 2}]
+    results = lyria_music.generate_lyria_music_batch(items, use_cache=False)
+    assert all(result.startswith("ERROR: Lyria returned 3 predictions for 4 requested samples") for result in results)
+    assert not any(name.startswith("lyria_output_") for _, name in fake_storage.objects)
+
+
+def test_short_response_only_fails_its_own_request(fake_lyria, fake_storage, monkeypatch):
+    monkeypatch.setattr(lyria_music, "LYRIA_MAX_INSTANCES_PER_REQUEST", 1)
+    fake_lyria.short_prompts.add("drums")
+    items = [{"prompt": "piano"}, {"prompt": "drums"}, {"prompt": "drums"}, {"prompt": "harp"}]
+    results = lyria_music.generate_lyria_music_batch(items, use_cache=False)
+    assert results[1].startswith("ERROR") and results[2].startswith("ERROR")
+    assert _clip_prompts(fake_storage, [results[0], results[3]]) == ["piano", "harp"]
+
+
+def test_batch_reuses_cached_clips(fake_lyria, fake_storage):
+    first = lyria_music.generate_lyria_music_batch([{"prompt": "drums"}, {"prompt": "drums"}])
+    calls = len(fake_lyria.bodies)
+    assert lyria_music.generate_lyria_music_batch([{"prompt": "Drums."}, {"prompt": "drums"}]) == first
+    assert len(fake_lyria.bodies) == calls
+
+
+@pytest.mark.parametrize("target, crossfade, clips", [(10, 2, 1), (30, 2, 1), (31, 2, 2), (70, 2, 3), (600, 2, 22), (600, 0, 20)])
+def test_soundtrack_clip_count_covers_the_target(target, crossfade, clips):
+    count = lyria_music.soundtrack_clip_count(target, crossfade)
+    assert count == clips
+    assert count * lyria_music.LYRIA_CLIP_SECONDS - (count - 1) * crossfade >= target
+
+
+def test_extended_soundtrack_is_one_crossfaded_wav(fake_lyria, fake_storage):
+    fake_lyria.clip_seconds = lyria_music.LYRIA_CLIP_SECONDS
+    uri = lyria_music.extend_lyria_soundtrack("calm ambient pads", None, 70.0, crossfade_seconds=2.0)
+    assert uri.startswith("gs://lyria-bucket/lyria_soundtrack_")
+    wav = parse_wav_header(fake_storage.read_uri(uri))
+    assert (wav.sample_rate, wav.channels, wav.bits_per_sample) == (48000, 2, 16)
+    assert wav.duration_seconds == pytest.approx(3 * 30.0 - 2 * 2.0)
+    assert float(fake_storage.objects[("lyria-bucket", uri.rsplit("/", 1)[1])].metadata["duration_seconds"]) == \
+        pytest.approx(86.0)
+    # Three samples of one prompt, requested together.
+    assert sum(i.get("sample_count", 1) for body in fake_lyria.bodies for i in body["instances"]) == 3
+
+
+def test_soundtrack_limits_are_reported(fake_lyria, monkeypatch):
+    monkeypatch.setattr(lyria_music, "LYRIA_EXTEND_MAX_CLIPS", 4)
+    assert lyria_music.extend_lyria_soundtrack("pads", None, 600.0).startswith("ERROR: A 600s soundtrack needs")
+    assert lyria_music.extend_lyria_soundtrack("pads", None, 60.0, crossfade_seconds=30.0).startswith(
+        "ERROR: crossfade_seconds must be shorter")
+    assert fake_lyria.bodies == []
+
+
+def test_stitching_rejects_mismatched_clips():
+    storage = FakeStorageClient()
+    mono = build_wav_header(48000, 1, 16, 4) + b"\0" * 4
+    with pytest.raises(lyria_music.LyriaError):
+        lyria_music._upload_stitched_clips(storage.bucket("b"), "s.wav", [_wav(0.1), mono], 0.01)
+    assert storage.objects == {}
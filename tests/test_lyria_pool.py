@@ -0,0 +1,65 @@
+import itertools
+import time
+
+import pytest
+
+from hack_agent import lyria_music, lyria_pool
+from hack_agent.lyria_pool import LyriaClipPool
+
+TEMPLATE = {"prompt": "a hot edm soundtrack"}
+
+
+@pytest.fixture
+def pool_generate(fake_storage):
+    """A generate() for the pool that writes small clips to fake storage."""
+    counter = itertools.count()
+
+    def _generate(prompt, negative_prompt):
+        uri = f"gs://lyria-bucket/pool_{next(counter)}.wav"
+        fake_storage.write_uri(uri, b"RIFF")
+        return uri, 4
+    return _generate
+
+
+def _wait_for_depth(pool, depth, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while pool.stats()["depth"][TEMPLATE["prompt"]] < depth:
+        assert time.monotonic() < deadline, "pool did not fill"
+        time.sleep(0.01)
+
+
+def test_pool_is_consulted_before_the_cache_and_not_cached(fake_lyria, pool_generate, monkeypatch):
+    # Two clips up front (the token bucket's burst), then effectively no refills.
+    pool = LyriaClipPool([TEMPLATE], depth=2, clips_per_minute=0.001, max_concurrent=2, generate=pool_generate)
+    monkeypatch.setattr(lyria_pool, "_pool", pool)
+    pool.start()
+    try:
+        _wait_for_depth(pool, 2)
+        first = lyria_music.generate_lyria_music("A hot EDM soundtrack.", None)
+        second = lyria_music.generate_lyria_music("a hot edm soundtrack", None)
+        assert {first, second} == {"gs://lyria-bucket/pool_0.wav", "gs://lyria-bucket/pool_1.wav"}
+        assert fake_lyria.bodies == []
+
+        # Pool drained: generated and cached as usual, and pooled clips never come back.
+        third = lyria_music.generate_lyria_music("a hot edm soundtrack", None)
+        assert third.startswith("gs://lyria-bucket/lyria_output_")
+        assert lyria_music.generate_lyria_music("a hot edm soundtrack", None) == third
+        assert len(fake_lyria.bodies) == 1
+    finally:
+        pool.stop(delete_unused=False)
+
+
+@pytest.mark.parametrize("delete_on_exit", [False, True])
+def test_unused_clips_are_only_deleted_at_exit_when_enabled(fake_storage, pool_generate, monkeypatch, delete_on_exit):
+    exit_handlers = []
+    monkeypatch.setattr(lyria_pool, "_pool", None)
+    monkeypatch.setattr(lyria_pool, "LYRIA_POOL_DELETE_ON_EXIT", delete_on_exit)
+    monkeypatch.setattr(lyria_pool.atexit, "register", exit_handlers.append)
+    monkeypatch.setattr(lyria_pool, "LyriaClipPool", lambda templates: LyriaClipPool(
+        templates, depth=1, clips_per_minute=0.001, max_concurrent=1, generate=pool_generate,
+    ))
+    pool = lyria_pool.start_lyria_pool([TEMPLATE])
+    _wait_for_depth(pool, 1)
+    (on_exit,) = exit_handlers
+    on_exit()
+    assert (("lyria-bucket", "pool_0.wav") in fake_storage.objects) is not delete_on_exit
@@ -0,0 +1,95 @@
+import asyncio
+import functools
+
+import pytest
+from google.cloud.video.transcoder_v1.types import Job
+
+from hack_agent import mux_scheduler, transcoder_waiter
+from hack_agent.mux_scheduler import MuxScheduler
+from hack_agent.transcoder_waiter import TranscoderJobError
+from tests.fakes import FakeTranscoder
+
+PARENT = "projects/test-project/locations/us-central1"
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(mux_scheduler, "PollSchedule", functools.partial(transcoder_waiter.PollSchedule, 0.02, 1.5, 0.1))
+    monkeypatch.setattr(transcoder_waiter, "_throughput", transcoder_waiter._ThroughputModel())
+
+
+async def _build_job(client, parent, video_uri, audio_uri, end_time_offset, text_stream_content):
+    """Jobs run for end_time_offset / 10 seconds on the fake, then fail if the audio is named "fail"."""
+    seconds = -end_time_offset / 10.0 if audio_uri.endswith("/fail.wav") else end_time_offset / 10.0
+    return Job(labels={"seconds": str(seconds)}), f"gs://out/{audio_uri.rsplit('/', 1)[-1]}.mp4"
+
+
+def _transcoder(**kwargs):
+    return FakeTranscoder(job_seconds=lambda job: float(job.labels["seconds"]), **kwargs)
+
+
+def _scheduler(transcoder, **kwargs):
+    return MuxScheduler(client=transcoder, parent=PARENT, subscription=None, build_job=_build_job, **kwargs)
+
+
+def _jobs(*offsets):
+    return [{"video_uri": "gs://in/video.mp4", "audio_uri": f"gs://in/{i}.wav", "end_time_offset": offset}
+            for i, offset in enumerate(offsets)]
+
+
+async def _collect(scheduler, jobs):
+    return [result async for result in scheduler.mux_many(jobs)]
+
+
+def test_burst_stays_under_the_concurrency_limit():
+    transcoder = _transcoder()
+    scheduler = _scheduler(transcoder, max_concurrent_jobs=3)
+    results = asyncio.run(_collect(scheduler, _jobs(*([1.0] * 9))))
+    assert all(result.ok for result in results)
+    assert sorted(result.index for result in results) == list(range(9))
+    assert transcoder.max_seen_running == 3
+    assert max(result.queue_wait_seconds for result in results) >= 0.2  # The last three waited two rounds
+
+
+def test_results_arrive_as_jobs_finish():
+    scheduler = _scheduler(_transcoder(), max_concurrent_jobs=3)
+    results = asyncio.run(_collect(scheduler, _jobs(3.0, 0.5, 1.5)))
+    assert [result.index for result in results] == [1, 2, 0]
+    assert results[0].output_uri == "gs://out/1.wav.mp4"
+
+
+def test_quota_rejection_requeues_instead_of_failing():
+    transcoder = _transcoder(max_running=2)
+    scheduler = _scheduler(transcoder, max_concurrent_jobs=4, quota_retry_seconds=0.05)
+    results = asyncio.run(_collect(scheduler, _jobs(*([0.5] * 6))))
+    assert all(result.ok for result in results)
+    assert transcoder.max_seen_running == 2
+    assert transcoder.calls["create_job"] > 6  # Rejected submissions were retried
+
+
+def test_failed_job_reports_its_error():
+    scheduler = _scheduler(_transcoder(), max_concurrent_jobs=2)
+    jobs = _jobs(0.5, 0.5)
+    jobs[1]["audio_uri"] = "gs://in/fail.wav"
+    results = asyncio.run(_collect(scheduler, jobs))
+    errors = {result.index: result.error for result in results}
+    assert errors[0] is None
+    assert isinstance(errors[1], TranscoderJobError)
+
+
+def test_timed_out_job_is_deleted_before_its_slot_is_reused():
+    transcoder = _transcoder()
+    scheduler = _scheduler(transcoder, max_concurrent_jobs=1, timeout_seconds=0.2)
+    results = {result.index: result for result in asyncio.run(_collect(scheduler, _jobs(100.0, 0.5)))}
+    assert isinstance(results[0].error, asyncio.TimeoutError)
+    assert transcoder.deleted == [results[0].job_name]
+    assert results[1].ok
+    assert transcoder.max_seen_running == 1
+
+
+def test_invalid_job_fails_without_a_submission():
+    transcoder = _transcoder()
+    scheduler = _scheduler(transcoder)
+    result = asyncio.run(scheduler.mux("video.mp4", "gs://in/a.wav", 1.0))
+    assert isinstance(result.error, ValueError)
+    assert transcoder.calls["create_job"] == 0
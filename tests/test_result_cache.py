@@ -0,0 +1,106 @@
+import json
+import threading
+import time
+
+from hack_agent.result_cache import ResultCache, make_cache_key
+from tests.fakes import FakeBlob
+
+MANIFEST = "gs://cache-bucket/cache/manifest.json"
+
+
+def _cache(name="cache", evicted=None, **overrides):
+    options = dict(max_entries=8, ttl_seconds=3600, index_path=MANIFEST)
+    options.update(overrides)
+    on_evict = (lambda key, entry: evicted.append(key)) if evicted is not None else None
+    return ResultCache(name=name, on_evict=on_evict, **options)
+
+
+def _manifest(storage):
+    return json.loads(storage.read_uri(MANIFEST))
+
+
+def test_cache_key_is_stable_and_order_independent():
+    assert make_cache_key(a=1, b="x") == make_cache_key(b="x", a=1)
+    assert make_cache_key(a=1) != make_cache_key(a=2)
+
+
+def test_local_index_survives_restart(tmp_path):
+    path = str(tmp_path / "index.json")
+    _cache(index_path=path).put("k", "gs://b/k.wav")
+    assert _cache(index_path=path).get("k") == "gs://b/k.wav"
+
+
+def test_manifest_is_shared_between_processes(fake_storage):
+    _cache().put("k", "gs://b/k.wav")
+    assert _cache().get("k") == "gs://b/k.wav"
+
+
+def test_merge_keeps_entries_another_process_removed_removed(fake_storage):
+    a, b = _cache(), _cache()
+    a.put("k1", "gs://b/1.wav")
+    a.put("k2", "gs://b/2.wav")
+    assert b.get("k1") == "gs://b/1.wav"  # b now holds k1 and k2 in memory and index
+    a.invalidate("k1")
+    b.put("k3", "gs://b/3.wav")  # Conflicts with a's write and merges
+    assert set(_manifest(fake_storage)) == {"k2", "k3"}
+    assert b.get("k1") is None
+    assert b.metrics.snapshot()["counters"]["manifest_conflicts"] >= 1
+
+
+def test_merge_does_not_resurrect_our_own_evictions(fake_storage):
+    evicted = []
+    a, b = _cache(evicted=evicted, max_index_entries=2), _cache()
+    a.put("old", "gs://b/old.wav")
+    time.sleep(0.01)
+    b.get("old")  # b reads the manifest
+    a.put("mid", "gs://b/mid.wav")
+    b.put("other", "gs://b/other.wav")  # a's next write now conflicts
+    time.sleep(0.01)
+    a.put("new", "gs://b/new.wav")  # Evicts "old" locally, then merges b's manifest
+    assert "old" in evicted
+    manifest = _manifest(fake_storage)
+    assert "old" not in manifest
+    assert {"new", "other"} <= set(manifest)
+
+
+def test_manifest_upload_happens_outside_the_lock_and_coalesces(fake_storage, monkeypatch):
+    cache = _cache()
+    cache.put("warm", "gs://b/warm.wav")
+    uploads = []
+    upload_started, release_upload = threading.Event(), threading.Event()
+    upload = FakeBlob.upload_from_string
+
+    def _slow_upload(blob, data, **kwargs):
+        uploads.append(data)
+        upload_started.set()
+        release_upload.wait(10)
+        return upload(blob, data, **kwargs)
+
+    monkeypatch.setattr(FakeBlob, "upload_from_string", _slow_upload)
+    writer = threading.Thread(target=cache.put, args=("first", "gs://b/first.wav"))
+    writer.start()
+    try:
+        assert upload_started.wait(5)
+        started = time.monotonic()
+        assert cache.get("warm") == "gs://b/warm.wav"
+        for i in range(10):
+            cache.put(f"k{i}", f"gs://b/{i}.wav")
+        assert time.monotonic() - started < 1.0  # Nobody waited for the blocked upload
+    finally:
+        release_upload.set()
+        writer.join(5)
+    assert len(uploads) == 2  # The blocked upload plus one carrying all ten later puts
+    assert set(_manifest(fake_storage)) == {"warm", "first"} | {f"k{i}" for i in range(10)}
+
+
+def test_replacing_an_entry_evicts_the_old_value(tmp_path):
+    evicted = []
+    cache = ResultCache(name="replace", max_entries=8, ttl_seconds=3600, index_path=str(tmp_path / "index.json"),
+                        max_total_bytes=100, on_evict=lambda key, entry: evicted.append((key, entry["value"])))
+    cache.put("k", "gs://b/old.wav", size_bytes=60)
+    cache.put("k", "gs://b/new.wav", size_bytes=60)
+    assert evicted == [("k", "gs://b/old.wav")]
+    assert cache.get("k") == "gs://b/new.wav"
+    cache.put("k", "gs://b/new.wav", size_bytes=60)  # Same value: nothing to delete
+    assert evicted == [("k", "gs://b/old.wav")]
+    assert cache.metrics.snapshot()["gauges"]["index_bytes"] == 60
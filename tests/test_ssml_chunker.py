@@ -0,0 +1,60 @@
+import re
+
+from hack_agent.ssml_chunker import split_ssml, split_text
+
+SSML = (
+    '<speak xml:lang="en-US">'
+    "<p>First paragraph. It has two sentences.</p>"
+    '<p><prosody rate="slow">A slow paragraph. Still slow here.</prosody></p>'
+    '<break time="500ms"/>'
+    "Trailing words without a paragraph. And another sentence!"
+    "</speak>"
+)
+
+
+def _body(chunk):
+    assert chunk.startswith('<speak xml:lang="en-US">') and chunk.endswith("</speak>")
+    return chunk[len('<speak xml:lang="en-US">'):-len("</speak>")]
+
+
+def _balanced(fragment):
+    depth = 0
+    for tag in re.findall(r"<[^>]+>", fragment):
+        if tag.startswith("</"):
+            depth -= 1
+        elif not tag.endswith("/>"):
+            depth += 1
+        assert depth >= 0
+    return depth == 0
+
+
+def test_chunks_are_complete_documents_that_rejoin_to_the_input():
+    chunks = split_ssml(SSML, 80)
+    assert len(chunks) > 1
+    assert "".join(_body(chunk) for chunk in chunks) == _body(SSML)
+    assert all(_balanced(_body(chunk)) for chunk in chunks)
+
+
+def test_never_splits_inside_an_element():
+    chunks = split_ssml(SSML, 1)
+    assert any("<prosody" in chunk and "Still slow here." in chunk for chunk in chunks)
+    assert all(_balanced(_body(chunk)) for chunk in chunks)
+
+
+def test_short_input_is_one_chunk():
+    assert split_ssml(SSML, 10_000) == [SSML]
+
+
+def test_speak_wrapper_is_added_when_missing():
+    assert split_ssml("Hello there.", 1000) == ["<speak>Hello there.</speak>"]
+
+
+def test_chunks_respect_the_byte_budget_where_possible():
+    text = " ".join(f"Sentence number {i}." for i in range(40))
+    chunks = split_ssml(f"<speak>{text}</speak>", 120)
+    assert all(len(chunk.encode("utf-8")) <= 120 for chunk in chunks)
+
+
+def test_split_text_packs_sentences():
+    chunks = split_text("One. Two two. Three three three! Four?", 16)
+    assert chunks == ["One. Two two.", "Three three three!", "Four?"]
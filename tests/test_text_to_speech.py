@@ -0,0 +1,182 @@
+import asyncio
+import contextlib
+import threading
+
+import pytest
+
+from hack_agent import text_to_speech
+from hack_agent.wav_utils import parse_wav_header
+from tests.fakes import FakeBlob
+
+SHORT_SSML = "<speak>Tabs or spaces, friend? The linter decides for you. Merge conflict at dawn.</speak>"
+
+
+def _synthesize(text, **overrides):
+    kwargs = dict(
+        text=text,
+        gcs_bucket_name="test-bucket",
+        voice_category="male_high",
+        speaking_rate=1.0,
+        pitch=0.0,
+        volume_gain_db=0.0,
+        timeout_seconds=30.0,
+        is_ssml=True,
+        GOOGLE_CLOUD_PROJECT="test-project",
+        GOOGLE_CLOUD_LOCATION="us-central1",
+    )
+    kwargs.update(overrides)
+    return kwargs
+
+
+def _run(use_async, kwargs):
+    if use_async:
+        return asyncio.run(text_to_speech.synthesize_text_to_gcs_async(**kwargs))
+    return text_to_speech.synthesize_text_to_gcs_sync(**kwargs)
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_unary_output_is_stored_as_wav(fake_tts, fake_storage, use_async):
+    uri = _run(use_async, _synthesize(SHORT_SSML))
+    assert uri.endswith(".wav")
+    wav = parse_wav_header(fake_storage.read_uri(uri))
+    assert wav is not None and wav.bits_per_sample == 16
+    assert fake_tts.calls == {"SynthesizeSpeech": 1, "SynthesizeLongAudio": 0}
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_chunked_output_is_stored_as_wav(fake_tts, fake_storage, monkeypatch, use_async):
+    monkeypatch.setattr(text_to_speech, "TTS_FAST_PATH_MAX_BYTES", 100)
+    monkeypatch.setattr(text_to_speech, "TTS_CHUNKED_MODE", True)
+    monkeypatch.setattr(text_to_speech, "TTS_CHUNK_TARGET_BYTES", 60)
+    uri = _run(use_async, _synthesize(SHORT_SSML * 3))
+    assert uri.endswith(".wav")
+    assert parse_wav_header(fake_storage.read_uri(uri)) is not None
+    assert fake_tts.calls["SynthesizeSpeech"] > 1
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_long_audio_output_keeps_pcm_name(fake_tts, fake_storage, monkeypatch, use_async):
+    monkeypatch.setattr(text_to_speech, "TTS_FAST_PATH_MAX_BYTES", 0)
+    uri = _run(use_async, _synthesize(SHORT_SSML))
+    assert uri.endswith(".pcm")
+    assert fake_tts.calls == {"SynthesizeSpeech": 0, "SynthesizeLongAudio": 1}
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_repeat_request_is_served_from_cache(fake_tts, fake_storage, use_async):
+    first = _run(use_async, _synthesize(SHORT_SSML))
+    assert _run(use_async, _synthesize(SHORT_SSML)) == first
+    assert fake_tts.calls["SynthesizeSpeech"] == 1
+
+
+def test_async_cache_io_runs_off_the_event_loop(fake_tts, fake_storage, monkeypatch):
+    cache = text_to_speech._tts_cache
+    cache_threads = []
+
+    def _record(method):
+        def _wrapper(*args, **kwargs):
+            cache_threads.append(threading.get_ident())
+            return method(*args, **kwargs)
+        return _wrapper
+
+    monkeypatch.setattr(cache, "get", _record(cache.get))
+    monkeypatch.setattr(cache, "put", _record(cache.put))
+
+    async def _synthesize_twice():
+        loop_thread = threading.get_ident()
+        kwargs = _synthesize(SHORT_SSML)
+        await text_to_speech.synthesize_text_to_gcs_async(**kwargs)
+        await text_to_speech.synthesize_text_to_gcs_async(**kwargs)
+        return loop_thread
+
+    loop_thread = asyncio.run(_synthesize_twice())
+    assert len(cache_threads) == 3  # miss, put, hit
+    assert loop_thread not in cache_threads
+
+
+STREAM_SSML = "<speak>" + " ".join(f"Sentence number {i} of the stream." for i in range(12)) + "</speak>"
+
+
+def _stream():
+    return text_to_speech.synthesize_text_stream(
+        text=STREAM_SSML,
+        gcs_bucket_name="test-bucket",
+        voice_category="male_high",
+        speaking_rate=1.0,
+        audio_encoding="LINEAR16",
+        timeout_seconds=30.0,
+        is_ssml=True,
+        GOOGLE_CLOUD_PROJECT="test-project",
+    )
+
+
+def test_stream_is_teed_into_gcs(fake_tts, fake_storage, monkeypatch):
+    monkeypatch.setattr(text_to_speech, "TTS_STREAM_CHUNK_BYTES", 80)
+    stream = _stream()
+
+    async def _collect():
+        return [chunk async for chunk in stream]
+
+    chunks = asyncio.run(_collect())
+    assert len(chunks) > 1
+    assert fake_storage.read_uri(stream.gcs_uri) == b"".join(chunks)
+
+
+def test_stream_stopped_early_deletes_the_partial_object(fake_tts, fake_storage, monkeypatch):
+    monkeypatch.setattr(text_to_speech, "TTS_STREAM_CHUNK_BYTES", 80)
+    stream = _stream()
+
+    async def _first_chunk():
+        async with contextlib.aclosing(stream.__aiter__()) as chunks:
+            async for chunk in chunks:
+                return chunk
+
+    assert asyncio.run(_first_chunk())
+    assert stream.gcs_uri is None
+    assert fake_storage.objects == {}
+    assert fake_storage.requests["delete"] == 1
+
+
+def test_stream_waits_for_a_slow_upload_instead_of_buffering(fake_tts, fake_storage, monkeypatch):
+    monkeypatch.setattr(text_to_speech, "TTS_STREAM_CHUNK_BYTES", 40)
+    monkeypatch.setattr(text_to_speech, "TTS_STREAM_UPLOAD_QUEUE_CHUNKS", 2)
+    upload_gate = threading.Event()
+    open_blob = FakeBlob.open
+
+    class _StalledWriter:
+        def __init__(self, writer):
+            self._writer = writer
+
+        def write(self, data):
+            upload_gate.wait(10)
+            return self._writer.write(data)
+
+        def close(self):
+            self._writer.close()
+
+    monkeypatch.setattr(FakeBlob, "open", lambda blob, mode="r", **kw: _StalledWriter(open_blob(blob, mode, **kw)))
+    stream = _stream()
+
+    async def _consume():
+        chunks = stream.__aiter__()
+        received = []
+        while True:
+            pending = asyncio.ensure_future(chunks.__anext__())
+            done, _ = await asyncio.wait((pending,), timeout=1.0)
+            if not done:
+                break
+            received.append(pending.result())
+        stalled_after = len(received)
+        upload_gate.set()
+        received.append(await pending)  # The chunk that was waiting for room
+        received.extend([chunk async for chunk in chunks])
+        return stalled_after, received
+
+    try:
+        stalled_after, received = asyncio.run(_consume())
+    finally:
+        upload_gate.set()
+    # One chunk stuck in the writer and two queued; the fourth waits for room.
+    assert stalled_after <= 1 + 2
+    assert len(received) > stalled_after
+    assert fake_storage.read_uri(stream.gcs_uri) == b"".join(received)
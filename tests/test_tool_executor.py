@@ -0,0 +1,129 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from hack_agent import tool_executor
+from hack_agent.tool_executor import async_tool
+from tests.fakes import percentile
+
+LONG_TTS_SECONDS = 1.0
+SESSIONS = 20
+CALLS_PER_SESSION = 10
+
+
+@pytest.fixture(autouse=True)
+def fresh_pools(monkeypatch):
+    monkeypatch.setattr(tool_executor, "_pools", {})
+
+
+def text_to_speech(text):
+    """Stands in for a long-audio TTS call blocking on operation.result()."""
+    time.sleep(LONG_TTS_SECONDS)
+    return "gs://bucket/speech.wav"
+
+
+def get_audio_duration(uri):
+    """Stands in for a quick blocking call (a ranged GCS read)."""
+    time.sleep(0.005)
+    return 1.0
+
+
+async def _session_latencies(duration_tool):
+    """Latency of every call made by SESSIONS concurrent sessions."""
+    latencies = []
+
+    async def _session():
+        for _ in range(CALLS_PER_SESSION):
+            started = time.perf_counter()
+            await duration_tool("gs://bucket/clip.wav")
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(_session() for _ in range(SESSIONS)))
+    return latencies
+
+
+async def _with_long_tts(tts_tool, duration_tool):
+    """Session latencies when a long TTS call starts while the sessions are running."""
+    sessions = asyncio.ensure_future(_session_latencies(duration_tool))
+    await asyncio.sleep(0.02)
+    tts = asyncio.ensure_future(tts_tool("a long script"))
+    latencies = await sessions
+    overlapped = not tts.done()
+    await tts
+    return latencies, overlapped
+
+
+def test_p99_of_other_sessions_stays_flat_while_long_tts_runs():
+    duration_tool = async_tool(get_audio_duration, max_workers=8)
+    tts_tool = async_tool(text_to_speech, max_workers=2)
+    baseline = asyncio.run(_session_latencies(duration_tool))
+    loaded, overlapped = asyncio.run(_with_long_tts(tts_tool, duration_tool))
+    assert overlapped
+    assert percentile(loaded, 0.99) < percentile(baseline, 0.99) + 0.05
+    assert percentile(loaded, 0.99) < LONG_TTS_SECONDS / 10
+
+
+def test_blocking_tts_on_the_loop_stalls_other_sessions():
+    """The same load with TTS called synchronously on the event loop (the old behaviour)."""
+    async def blocking_tts(text):
+        return text_to_speech(text)
+
+    latencies, _ = asyncio.run(_with_long_tts(blocking_tts, async_tool(get_audio_duration, max_workers=8)))
+    assert percentile(latencies, 0.99) >= LONG_TTS_SECONDS * 0.9
+
+
+def test_wrapper_keeps_the_tool_declaration():
+    tool = async_tool(get_audio_duration)
+    assert tool.__name__ == "get_audio_duration"
+    assert tool.__doc__ == get_audio_duration.__doc__
+    assert asyncio.iscoroutinefunction(tool)
+
+
+def test_full_queue_rejects_instead_of_piling_up():
+    release = threading.Event()
+
+    def slow_tool():
+        release.wait(5)
+        return "done"
+
+    tool = async_tool(slow_tool, max_workers=1, max_queue=1)
+
+    async def _run():
+        running = asyncio.ensure_future(tool())
+        queued = asyncio.ensure_future(tool())
+        await asyncio.sleep(0.05)
+        rejected = await tool()
+        release.set()
+        return rejected, await running, await queued
+
+    rejected, first, second = asyncio.run(_run())
+    assert rejected.startswith("ERROR: slow_tool is busy")
+    assert (first, second) == ("done", "done")
+
+
+def test_cancelled_session_drops_its_queued_call():
+    release = threading.Event()
+    calls = []
+
+    def busy_tool(n):
+        calls.append(n)
+        release.wait(5)
+
+    tool = async_tool(busy_tool, max_workers=1)
+
+    async def _run():
+        running = asyncio.ensure_future(tool(1))
+        queued = asyncio.ensure_future(tool(2))
+        await asyncio.sleep(0.05)
+        queued.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        await running
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+
+    asyncio.run(_run())
+    assert calls == [1]
+    assert tool_executor._pools["busy_tool"].queued == 0
@@ -0,0 +1,107 @@
+import asyncio
+import datetime
+
+import pytest
+from google.api_core.exceptions import AlreadyExists, NotFound
+from google.cloud.video import transcoder_v1
+from google.cloud.video.transcoder_v1.types import JobConfig
+
+from hack_agent import transcoder_config
+from hack_agent.transcoder_config import (
+    TEXT_MUX_STREAM_KEY,
+    build_mux_job_config,
+    default_ladder_config,
+    get_base_job_config,
+)
+
+PARENT = "projects/test-project/locations/us-central1"
+TOPIC = "projects/test-project/topics/transcoder-jobs"
+
+
+@pytest.fixture(autouse=True)
+def fresh_base_configs(monkeypatch):
+    monkeypatch.setattr(transcoder_config, "_base_configs", {})
+
+
+@pytest.fixture
+def base():
+    return asyncio.run(get_base_job_config(None, PARENT, template_id=None))
+
+
+def _build(base, text_track_uri=None, pubsub_topic=None):
+    return build_mux_job_config(base, "gs://in/video.mp4", "gs://in/voice.wav", 12.5, text_track_uri, pubsub_topic)
+
+
+def _manifest_streams(config):
+    return [list(manifest.mux_streams) for manifest in config.manifests]
+
+
+def test_clones_do_not_share_state_with_the_base_or_each_other(base):
+    with_text = _build(base, "gs://in/subs.vtt", TOPIC)
+    with_text.elementary_streams[0].video_stream.h264.bitrate_bps = 1
+    plain = _build(base)
+    assert JobConfig.deserialize(base) == default_ladder_config()
+    assert len(plain.inputs) == 2 and len(with_text.inputs) == 3
+    assert plain.elementary_streams[0].video_stream.h264.bitrate_bps == 5000000
+    assert not plain.pubsub_destination.topic
+
+
+def test_job_without_text_track_lists_only_audio_and_video(base):
+    config = _build(base)
+    assert [stream.key for stream in config.mux_streams] == ["sd-hls-fmp4", "audio-hls-fmp4"]
+    assert _manifest_streams(config) == [["sd-hls-fmp4", "audio-hls-fmp4"]]
+    assert list(config.edit_list[0].inputs) == [transcoder_config.VIDEO_INPUT_KEY, transcoder_config.AUDIO_INPUT_KEY]
+    assert config.edit_list[0].end_time_offset == datetime.timedelta(seconds=12.5)
+
+
+def test_text_track_adds_its_stream_to_the_manifest(base):
+    config = _build(base, "gs://in/subs.vtt")
+    assert config.inputs[-1].uri == "gs://in/subs.vtt"
+    assert config.mux_streams[-1].key == TEXT_MUX_STREAM_KEY
+    assert _manifest_streams(config) == [["sd-hls-fmp4", "audio-hls-fmp4", TEXT_MUX_STREAM_KEY]]
+
+
+def test_stale_template_manifest_drops_missing_streams():
+    template = default_ladder_config()
+    template.manifests[0].mux_streams.append(TEXT_MUX_STREAM_KEY)  # Registered when text was always listed
+    config = _build(JobConfig.serialize(template))
+    assert _manifest_streams(config) == [["sd-hls-fmp4", "audio-hls-fmp4"]]
+
+
+def test_pubsub_topic_is_set_when_given(base):
+    assert _build(base, pubsub_topic=TOPIC).pubsub_destination.topic == TOPIC
+
+
+class _TemplateClient:
+    def __init__(self, registered_by_other=False):
+        self.registered_by_other = registered_by_other
+        self.templates = {}
+        self.calls = []
+
+    async def get_job_template(self, name):
+        self.calls.append("get")
+        if name not in self.templates:
+            raise NotFound(name)
+        return self.templates[name]
+
+    async def create_job_template(self, parent, job_template, job_template_id):
+        self.calls.append("create")
+        name = f"{parent}/jobTemplates/{job_template_id}"
+        self.templates[name] = transcoder_v1.types.JobTemplate(name=name, config=job_template.config)
+        if self.registered_by_other:
+            raise AlreadyExists(name)
+        return self.templates[name]
+
+
+@pytest.mark.parametrize("registered_by_other", [False, True])
+def test_missing_template_is_registered_once_and_cached(registered_by_other):
+    client = _TemplateClient(registered_by_other)
+
+    async def _run():
+        return [await get_base_job_config(client, PARENT, template_id="mux-ladder") for _ in range(3)]
+
+    first, *rest = asyncio.run(_run())
+    assert all(config == first for config in rest)
+    assert JobConfig.deserialize(first) == default_ladder_config()
+    assert client.calls.count("create") == 1
+    assert client.calls == ["get", "create"] + (["get"] if registered_by_other else [])
@@ -0,0 +1,106 @@
+import asyncio
+import functools
+import time
+from types import SimpleNamespace
+
+import pytest
+from google.cloud.video.transcoder_v1.types import Job
+
+from hack_agent import mux_scheduler, transcoder_waiter
+from hack_agent.mux_scheduler import MuxScheduler
+from hack_agent.transcoder_waiter import PollSchedule, estimate_eta_seconds
+from tests.fakes import FakeTranscoder
+
+PARENT = "projects/test-project/locations/us-central1"
+SUBSCRIPTION = "projects/p/subscriptions/jobs"
+
+
+@pytest.fixture(autouse=True)
+def fresh_throughput_model(monkeypatch):
+    monkeypatch.setattr(transcoder_waiter, "_throughput", transcoder_waiter._ThroughputModel())
+
+
+def _use_schedule(monkeypatch, initial_seconds=0.02, multiplier=2.0, max_seconds=0.2):
+    monkeypatch.setattr(mux_scheduler, "PollSchedule", functools.partial(PollSchedule, initial_seconds, multiplier, max_seconds))
+
+
+async def _build_job(client, parent, video_uri, audio_uri, end_time_offset, text_stream_content):
+    return Job(), "gs://out/muxed.mp4"
+
+
+async def _run_job(transcoder, media_seconds=4.0, subscription=None):
+    """Muxes one job; returns its result and how long after the job ended the wait returned."""
+    scheduler = MuxScheduler(client=transcoder, parent=PARENT, subscription=subscription, build_job=_build_job)
+    result = await scheduler.mux("gs://in/video.mp4", "gs://in/voice.wav", media_seconds)
+    return result, time.monotonic() - transcoder.end_of(result.job_name)
+
+
+def test_schedule_backs_off_geometrically_to_the_cap():
+    schedule = PollSchedule(initial_seconds=1.0, multiplier=2.0, max_seconds=5.0)
+    assert [schedule.next_delay(None) for _ in range(5)] == [1.0, 2.0, 4.0, 5.0, 5.0]
+
+
+def test_schedule_follows_the_eta_within_bounds():
+    schedule = PollSchedule(initial_seconds=1.0, multiplier=2.0, max_seconds=15.0)
+    assert schedule.next_delay(6.0) == 6.0
+    assert schedule.next_delay(0.2) == 1.0
+    assert schedule.next_delay(100.0) == 15.0
+
+
+def test_schedule_restarts_fast_once_the_eta_has_passed():
+    schedule = PollSchedule(initial_seconds=1.0, multiplier=2.0, max_seconds=15.0)
+    schedule.next_delay(None)
+    schedule.next_delay(None)
+    schedule.next_delay(8.0)
+    assert schedule.next_delay(-1.0) == 1.0
+    assert schedule.next_delay(None) == 2.0
+
+
+def test_eta_from_progress_fraction():
+    job = SimpleNamespace(progress=SimpleNamespace(processed=0.25))
+    assert estimate_eta_seconds(job, elapsed_seconds=3.0, media_seconds=None) == pytest.approx(9.0)
+
+
+def test_eta_from_learned_throughput():
+    assert estimate_eta_seconds(Job(), elapsed_seconds=1.0, media_seconds=60.0) is None
+    transcoder_waiter._throughput.observe(job_seconds=10.0, media_seconds=100.0)
+    assert estimate_eta_seconds(Job(), elapsed_seconds=1.0, media_seconds=60.0) == pytest.approx(5.0)
+
+
+def test_short_job_returns_soon_after_it_finishes(monkeypatch):
+    _use_schedule(monkeypatch)
+    transcoder = FakeTranscoder(job_seconds=0.3)
+    result, added = asyncio.run(_run_job(transcoder))
+    assert result.ok
+    assert added < 0.25  # At most one max_seconds step late (vs a fixed 15 s sleep before)
+    assert transcoder.calls["get_job"] <= 6
+
+
+def test_learned_eta_times_the_poll_for_completion(monkeypatch):
+    _use_schedule(monkeypatch, max_seconds=1.0)
+    transcoder_waiter._throughput.observe(job_seconds=0.4, media_seconds=4.0)
+    transcoder = FakeTranscoder(job_seconds=0.4)
+    result, added = asyncio.run(_run_job(transcoder, media_seconds=4.0))
+    assert result.ok
+    assert transcoder.calls["get_job"] <= 3
+    assert added < 0.1
+
+
+def test_finished_jobs_train_the_throughput_model(monkeypatch):
+    _use_schedule(monkeypatch)
+    asyncio.run(_run_job(FakeTranscoder(job_seconds=0.2), media_seconds=2.0))
+    assert transcoder_waiter._throughput.expected_seconds(10.0) == pytest.approx(1.0, rel=0.3)
+
+
+def test_push_notification_resolves_without_polling(monkeypatch):
+    transcoder = FakeTranscoder(job_seconds=0.3)
+    listener = transcoder.push_listener()
+    monkeypatch.setitem(transcoder_waiter._listeners, SUBSCRIPTION, listener)
+    monkeypatch.setattr(mux_scheduler, "TRANSCODER_PUSH_FALLBACK_POLL_SECONDS", 60.0)
+    _use_schedule(monkeypatch, initial_seconds=60.0, max_seconds=60.0)  # Only the notification can wake it
+
+    result, added = asyncio.run(_run_job(transcoder, subscription=SUBSCRIPTION))
+    assert result.ok
+    assert added < 0.1
+    assert transcoder.calls["get_job"] == 2  # Initial status, then confirmation of the notification
+    assert not listener.registered
@@ -0,0 +1,137 @@
+import asyncio
+import threading
+
+import pytest
+from google.cloud import texttospeech_v1 as texttospeech
+
+from hack_agent import tts_clients
+from tests.fakes import FakeTextToSpeechServer
+
+
+@pytest.fixture
+def server():
+    with FakeTextToSpeechServer() as fake:
+        yield fake
+
+
+@pytest.fixture
+def registry(monkeypatch, server):
+    """Empty registries whose factories build clients for the fake server, counting creations."""
+    created = {tts_clients.STANDARD_CLIENT: 0, tts_clients.LONG_AUDIO_CLIENT: 0}
+
+    def _factory(kind, build):
+        def _create():
+            created[kind] += 1
+            return build()
+        return _create
+
+    monkeypatch.setattr(tts_clients, "_clients", {})
+    monkeypatch.setattr(tts_clients, "_CLIENT_FACTORIES", {
+        tts_clients.STANDARD_CLIENT: _factory(tts_clients.STANDARD_CLIENT, server.standard_client),
+        tts_clients.LONG_AUDIO_CLIENT: _factory(tts_clients.LONG_AUDIO_CLIENT, server.long_audio_client),
+    })
+    monkeypatch.setattr(tts_clients, "_ASYNC_CLIENT_FACTORIES", {
+        tts_clients.STANDARD_CLIENT: server.standard_async_client,
+        tts_clients.LONG_AUDIO_CLIENT: server.long_audio_async_client,
+    })
+    return created
+
+
+def _synthesize(client):
+    return client.synthesize_speech(
+        input=texttospeech.SynthesisInput(ssml="<speak>hello</speak>"),
+        voice=texttospeech.VoiceSelectionParams(language_code="en-US"),
+        audio_config=texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.LINEAR16),
+    )
+
+
+def test_client_is_created_lazily_and_reused(registry, server):
+    assert registry[tts_clients.STANDARD_CLIENT] == 0
+    first = tts_clients.get_standard_client()
+    for _ in range(5):
+        assert tts_clients.get_standard_client() is first
+        _synthesize(tts_clients.get_standard_client())
+    assert registry == {tts_clients.STANDARD_CLIENT: 1, tts_clients.LONG_AUDIO_CLIENT: 0}
+    assert server.calls["SynthesizeSpeech"] == 5
+    assert len(server.peers) == 1  # Every call went over the same connection
+
+
+def test_concurrent_first_use_creates_one_client(registry):
+    barrier = threading.Barrier(16)
+    clients = []
+
+    def _get():
+        barrier.wait()
+        clients.append(tts_clients.get_long_audio_client())
+
+    threads = [threading.Thread(target=_get) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert registry[tts_clients.LONG_AUDIO_CLIENT] == 1
+    assert len({id(client) for client in clients}) == 1
+
+
+def test_client_past_max_age_is_replaced(registry, monkeypatch):
+    first = tts_clients.get_standard_client()
+    monkeypatch.setattr(tts_clients, "TTS_CLIENT_MAX_AGE_SECONDS", 0.0)
+    assert tts_clients.get_standard_client() is not first
+    assert registry[tts_clients.STANDARD_CLIENT] == 2
+
+
+# grpc's connectivity-polling thread raises once the subscribed channel is closed under it.
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_client_with_closed_channel_is_replaced(registry):
+    first = tts_clients.get_standard_client()
+    first.transport.close()
+    replacement = tts_clients.get_standard_client()
+    assert replacement is not first
+    _synthesize(replacement)
+
+
+def test_invalidate_only_evicts_the_failed_client(registry):
+    first = tts_clients.get_standard_client()
+    tts_clients.invalidate_tts_client(tts_clients.STANDARD_CLIENT)
+    second = tts_clients.get_standard_client()
+    # A late failure reported for the old client must not evict its replacement.
+    tts_clients.invalidate_tts_client(tts_clients.STANDARD_CLIENT, first)
+    assert tts_clients.get_standard_client() is second
+    assert registry[tts_clients.STANDARD_CLIENT] == 2
+
+
+def test_unknown_kind_is_rejected(registry):
+    with pytest.raises(ValueError):
+        tts_clients.get_tts_client("bogus")
+
+
+def test_warm_up_creates_and_connects_all_clients(registry, server):
+    tts_clients.warm_up_tts_clients()
+    assert registry == {tts_clients.STANDARD_CLIENT: 1, tts_clients.LONG_AUDIO_CLIENT: 1}
+    _synthesize(tts_clients.get_standard_client())
+    assert registry[tts_clients.STANDARD_CLIENT] == 1
+
+
+def test_async_clients_are_pooled_per_event_loop(registry):
+    async def _clients_in_loop():
+        client = tts_clients.get_async_tts_client(tts_clients.STANDARD_CLIENT)
+        assert tts_clients.get_async_tts_client(tts_clients.STANDARD_CLIENT) is client
+        response = await client.synthesize_speech(
+            input=texttospeech.SynthesisInput(ssml="<speak>hi</speak>"),
+            voice=texttospeech.VoiceSelectionParams(language_code="en-US"),
+            audio_config=texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.LINEAR16),
+        )
+        assert response.audio_content[:4] == b"RIFF"
+        return client
+
+    assert asyncio.run(_clients_in_loop()) is not asyncio.run(_clients_in_loop())
+
+
+def test_closed_async_client_is_replaced(registry):
+    async def _replace_after_close():
+        first = tts_clients.get_async_tts_client(tts_clients.STANDARD_CLIENT)
+        await first.transport.close()
+        return first, tts_clients.get_async_tts_client(tts_clients.STANDARD_CLIENT)
+
+    first, replacement = asyncio.run(_replace_after_close())
+    assert replacement is not first
@@ -0,0 +1,103 @@
+import json
+import threading
+import time
+
+import pytest
+from google.cloud.texttospeech_v1.types import SsmlVoiceGender
+
+from hack_agent.voice_catalog import VOICE_CATEGORY_DEFAULTS, VoiceCatalog, parse_voice_name
+
+
+def _voice(name, gender):
+    return {"name": name, "language_codes": ["-".join(name.split("-")[:2])], "ssml_gender": gender,
+            "natural_sample_rate_hertz": 24000}
+
+
+@pytest.fixture
+def fixture_catalog():
+    """The bundled offline fixture, never refreshed."""
+    return VoiceCatalog(snapshot_path=None, refresh_seconds=float("inf"), fetch_voices=None)
+
+
+@pytest.mark.parametrize("category", sorted(VOICE_CATEGORY_DEFAULTS))
+def test_original_categories_keep_their_pinned_voices(fixture_catalog, category):
+    pinned = VOICE_CATEGORY_DEFAULTS[category]
+    assert fixture_catalog.resolve(category) == {
+        "language_code": "en-US", "name": pinned["name"], "ssml_gender": pinned["ssml_gender"],
+    }
+
+
+@pytest.mark.parametrize("category, name, gender", [
+    ("female_neural2", "en-US-Neural2-C", SsmlVoiceGender.FEMALE),
+    ("male_chirp3-hd", "en-US-Chirp3-HD-Charon", SsmlVoiceGender.MALE),
+    ("en-GB:female_high", "en-GB-Wavenet-A", SsmlVoiceGender.FEMALE),
+    ("en-GB:male_low", "en-GB-Standard-B", SsmlVoiceGender.MALE),
+    ("Male High", "en-US-Wavenet-D", SsmlVoiceGender.MALE),
+])
+def test_categories_resolve_per_language_and_tier(fixture_catalog, category, name, gender):
+    voice = fixture_catalog.resolve(category)
+    assert (voice["name"], voice["ssml_gender"]) == (name, gender)
+    assert voice["language_code"] == parse_voice_name(name)[0]
+
+
+def test_language_argument_applies_to_unprefixed_categories(fixture_catalog):
+    assert fixture_catalog.resolve("male_high", language_code="de-DE")["name"] == "de-DE-Wavenet-B"
+
+
+def test_high_falls_back_through_the_tiers():
+    catalog = VoiceCatalog(snapshot_path=None, refresh_seconds=float("inf"), fetch_voices=None, fallback_path=None)
+    catalog.load_voices([
+        _voice("xx-XX-Studio-B", "FEMALE"),
+        _voice("xx-XX-Neural2-A", "MALE"),
+        _voice("xx-XX-Studio-C", "MALE"),
+    ], time.time())
+    assert catalog.resolve("xx-XX:male_high")["name"] == "xx-XX-Neural2-A"  # No Wavenet voice
+    assert catalog.resolve("xx-XX:female_high")["name"] == "xx-XX-Studio-B"
+    with pytest.raises(ValueError, match="female_studio"):
+        catalog.resolve("xx-XX:female_low")
+
+
+def test_empty_catalog_still_serves_the_pinned_categories():
+    catalog = VoiceCatalog(snapshot_path=None, refresh_seconds=float("inf"), fetch_voices=None, fallback_path=None)
+    assert catalog.resolve("female_low")["name"] == "en-US-Standard-F"
+    with pytest.raises(ValueError, match="unknown language"):
+        catalog.resolve("female_neural2")
+
+
+def test_refresh_persists_a_snapshot_that_later_catalogs_load(tmp_path):
+    snapshot = tmp_path / "catalog" / "voices.json"
+    voices = [_voice("en-US-Wavenet-D", "MALE"), _voice("fr-FR-Wavenet-A", "FEMALE")]
+    VoiceCatalog(snapshot_path=str(snapshot), refresh_seconds=3600, fetch_voices=lambda: voices).refresh()
+    assert json.loads(snapshot.read_text())["voices"] == voices
+
+    fetches = []
+    reloaded = VoiceCatalog(snapshot_path=str(snapshot), refresh_seconds=3600, fetch_voices=lambda: fetches.append(1) or [])
+    assert reloaded.resolve("fr-FR:female_high")["name"] == "fr-FR-Wavenet-A"
+    assert reloaded.categories("fr-FR") == ["female_high", "female_wavenet"]
+    assert fetches == []  # Snapshot is fresh: no list_voices call
+
+
+def test_unreadable_snapshot_falls_back_to_the_fixture(tmp_path):
+    snapshot = tmp_path / "voices.json"
+    snapshot.write_text("{not json")
+    catalog = VoiceCatalog(snapshot_path=str(snapshot), refresh_seconds=float("inf"), fetch_voices=None)
+    assert catalog.resolve("en-GB:male_high")["name"] == "en-GB-Wavenet-B"
+
+
+def test_stale_catalog_is_replaced_by_a_background_refresh():
+    answered = threading.Event()
+
+    def _fetch():
+        answered.wait(5)
+        return [_voice("en-US-Wavenet-D", "MALE"), _voice("it-IT-Wavenet-A", "FEMALE")]
+
+    catalog = VoiceCatalog(snapshot_path=None, refresh_seconds=3600, fetch_voices=_fetch)
+    # The fixture (fetched_at 0) answers at once while the refresh runs.
+    assert catalog.resolve("en-GB:female_high")["name"] == "en-GB-Wavenet-A"
+    answered.set()
+    deadline = time.monotonic() + 5
+    while "it-IT-Wavenet-A" not in catalog.by_name and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert catalog.resolve("it-IT:female_high")["name"] == "it-IT-Wavenet-A"
+    with pytest.raises(ValueError):
+        catalog.resolve("en-GB:female_high")  # Index replaced, not merged
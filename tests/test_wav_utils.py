@@ -0,0 +1,81 @@
+import io
+
+import numpy as np
+
+from hack_agent.wav_utils import (
+    WAV_HEADER_SIZE,
+    build_wav_header,
+    crossfaded_length,
+    parse_wav_header,
+    pcm_view,
+    write_crossfaded_pcm,
+)
+
+
+def _pcm(values, channels=1):
+    return np.repeat(np.asarray(values, dtype="<i2"), channels).tobytes()
+
+
+def test_header_round_trip():
+    header = build_wav_header(24000, 2, 16, 4800)
+    assert len(header) == WAV_HEADER_SIZE
+    wav = parse_wav_header(header + b"\0" * 4800)
+    assert (wav.sample_rate, wav.channels, wav.bits_per_sample) == (24000, 2, 16)
+    assert (wav.data_offset, wav.data_size) == (WAV_HEADER_SIZE, 4800)
+    assert wav.duration_seconds == 0.05
+
+
+def test_header_skips_extra_chunks_and_clamps_streamed_size():
+    fmt = build_wav_header(8000, 1, 16, 0)[12:36]
+    header = b"RIFF\xff\xff\xff\xffWAVE" + fmt + b"LIST\x03\x00\x00\x00abc\x00" + b"data\xff\xff\xff\xff"
+    wav = parse_wav_header(header + b"\0" * 100)
+    assert wav.data_offset == len(header)
+    assert wav.data_size == 100
+
+
+def test_non_wav_data_is_not_parsed():
+    assert parse_wav_header(b"\0" * 64) is None
+    assert bytes(pcm_view(b"\1\2\3\4")) == b"\1\2\3\4"
+
+
+def test_pcm_view_strips_header_without_copying():
+    segment = build_wav_header(8000, 1, 16, 4) + b"\1\0\2\0"
+    view = pcm_view(segment)
+    assert bytes(view) == b"\1\0\2\0"
+    assert view.obj is segment
+
+
+def test_crossfade_mixes_only_the_overlap():
+    a = _pcm([1000] * 100)
+    b = _pcm([-1000] * 100)
+    out = io.BytesIO()
+    written = write_crossfaded_pcm(out, [memoryview(a), memoryview(b)], channels=1, crossfade_frames=10)
+    samples = np.frombuffer(out.getvalue(), dtype="<i2")
+    assert written == len(out.getvalue()) == crossfaded_length([len(a), len(b)], 1, 10) == 2 * 190
+    assert (samples[:90] == 1000).all() and (samples[100:] == -1000).all()
+    fade = samples[90:100]
+    assert (np.diff(fade) < 0).all()  # Moves monotonically from the first segment to the second
+
+
+def test_crossfade_keeps_constant_level_for_identical_signals():
+    tone = _pcm([8000] * 50, channels=2)
+    out = io.BytesIO()
+    write_crossfaded_pcm(out, [memoryview(tone)] * 3, channels=2, crossfade_frames=8)
+    samples = np.frombuffer(out.getvalue(), dtype="<i2")
+    # Equal-power curves peak at sqrt(2) mid-fade for fully correlated input; never dip.
+    assert samples.min() >= 8000 and samples.max() <= int(8000 * 2 ** 0.5) + 1
+    assert len(samples) == 2 * (150 - 2 * 8)
+
+
+def test_crossfade_is_clamped_to_half_the_shortest_segment():
+    short, long = _pcm([1] * 4), _pcm([2] * 100)
+    assert crossfaded_length([len(short), len(long)], 1, 50) == 2 * (104 - 2)
+    out = io.BytesIO()
+    assert write_crossfaded_pcm(out, [memoryview(short), memoryview(long)], 1, 50) == 2 * 102
+
+
+def test_zero_crossfade_is_plain_concatenation():
+    a, b = _pcm([1, 2, 3]), _pcm([4, 5])
+    out = io.BytesIO()
+    write_crossfaded_pcm(out, [memoryview(a), memoryview(b)], 1, 0)
+    assert out.getvalue() == a + b